@@ -1,39 +1,168 @@
+import base64
+import hashlib
+import json
 import os
-import shutil
+import time
 import uuid
-from typing import List
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
 
-from fastapi import APIRouter, File, UploadFile, HTTPException, Depends
+from fastapi import APIRouter, File, UploadFile, HTTPException, Depends, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 from mimetypes import guess_type
+from sqlalchemy import delete, func, insert, select, tuple_
 from sqlalchemy.orm import Session
 
 from app.core.models import Document, DocumentStatus, Client
-from app.services.rag_service import ingest_document_task, rag_service_instance
-from app.api.schemas import ChatQuery, ChatResponse, UploadResponse, DocumentSchema, ClientCreate, ClientLogin, Token
+from app.services.rag_service import enqueue_ingestion, enqueue_ingestions, rag_service_instance, RAG_ERROR_MESSAGE
+from app.services.uploads import StoredUpload, UploadRejected, discard_uploads, store_pdf_upload, store_zip_upload
+from app.services.progress import subscribe_progress
+from app.services.tenant_cache import tenant_token_cache
+from app.services.rate_limit import RateLimitExceeded, chat_admission, chat_rate_limiter, chat_trusted_proxies, resolve_client_ip
+from app.api.schemas import (
+    ChatQuery, ChatResponse, UploadResponse, BulkUploadResponse, BulkUploadItem, BulkUploadRejection,
+    DocumentSchema, ClientCreate, ClientLogin, Token,
+)
 from app.core.config import settings
 from app.core.security import get_password_hash, create_access_token, decode_access_token, verify_password 
 from app.core.db import get_db
+from app.core.metrics import bind_labels
 
 
 router = APIRouter()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
-def validate_client_token(client_token: str, db: Session = Depends(get_db)) -> str:
-    """Verifica se o token existe e está ativo no PostgreSQL."""
-    client = db.query(Client).filter(
-        Client.client_token == client_token,
-        Client.is_active == True
-    ).first()
-    
-    if not client:
-        raise HTTPException(
-            status_code=401, 
-            detail="Token de cliente inválido ou não autorizado. Cliente não encontrado ou inativo."
-        )
+def _invalid_client_token() -> HTTPException:
+    return HTTPException(
+        status_code=401, 
+        detail="Token de cliente inválido ou não autorizado. Cliente não encontrado ou inativo."
+    )
+
+def validate_client_token(client_token: str, db: Session = Depends(get_db), check_local: bool = True) -> str:
+    """Verifica se o token existe e está ativo (cache local/Redis; PostgreSQL só em miss)."""
+    def is_active_in_db(token: str) -> bool:
+        return db.query(Client.id).filter(
+            Client.client_token == token,
+            Client.is_active == True
+        ).first() is not None
+
+    if tenant_token_cache is not None:
+        active = tenant_token_cache.validate(client_token, is_active_in_db, check_local=check_local)
+    else:
+        active = is_active_in_db(client_token)
+
+    if not active:
+        raise _invalid_client_token()
         
-    return client.client_token
+    return client_token
+
+async def resolve_tenant(client_token: str, db: Session) -> str:
+    """
+    Valida o client_token do widget; hits na camada local respondem sem passar pelo
+    threadpool (e sem tocar no pool de conexões); em miss, a sessão `db` é fechada logo após a consulta.
+    """
+    if tenant_token_cache is not None:
+        cached = tenant_token_cache.get_local(client_token)
+        if cached is True:
+            bind_labels(tenant=client_token)
+            return client_token
+        if cached is False:
+            raise _invalid_client_token()
+    def validate_and_release() -> str:
+        try:
+            return validate_client_token(client_token, db, check_local=False)
+        finally:
+            # Devolve a conexão ao pool antes da busca e da chamada à LLM (segundos),
+            # em vez de mantê-la até o fim da requisição (ou do streaming).
+            db.close()
+
+    # A sessão SQLAlchemy e o Redis são síncronos: a validação roda no threadpool para não travar o event loop.
+    tenant_id = await run_in_threadpool(validate_and_release)
+    bind_labels(tenant=tenant_id)
+    return tenant_id
+
+def _client_ip(request: Request) -> Optional[str]:
+    return resolve_client_ip(
+        request.client.host if request.client else None,
+        request.headers.get("x-forwarded-for"),
+        chat_trusted_proxies,
+        settings.CHAT_TRUST_FORWARDED_FOR,
+    )
+
+def _too_many_requests(e: RateLimitExceeded) -> HTTPException:
+    if e.scope in ("overload", "tenant_concurrency"):
+        detail = "Serviço sobrecarregado. Tente novamente em instantes."
+    else:
+        detail = "Limite de mensagens excedido. Tente novamente em instantes."
+    return HTTPException(status_code=429, detail=detail, headers={"Retry-After": e.retry_after_header})
+
+async def check_chat_rate_limit(request: Request, tenant_id: str, db: Session) -> None:
+    """Token bucket do tenant e do IP do usuário; os limites do Client ficam em cache (banco só em miss)."""
+    if chat_rate_limiter is None:
+        return
+    limits = chat_rate_limiter.cached_limits(tenant_id)
+
+    def load_and_check() -> None:
+        nonlocal limits
+        if limits is None:
+            try:
+                client = db.query(
+                    Client.chat_rate_per_minute, Client.chat_burst, Client.chat_ip_rate_per_minute, Client.chat_ip_burst
+                ).filter(Client.client_token == tenant_id).first()
+            finally:
+                db.close()
+            limits = chat_rate_limiter.load_limits(tenant_id, client)
+        chat_rate_limiter.check(tenant_id, _client_ip(request), limits)
+
+    try:
+        if limits is None or chat_rate_limiter.store.blocking:
+            await run_in_threadpool(load_and_check)
+        else:
+            load_and_check()
+    except RateLimitExceeded as e:
+        raise _too_many_requests(e)
+
+async def acquire_chat_slot(tenant_id: str) -> None:
+    """Vaga na admissão global do /chat; 429 na hora se o processo (ou o tenant) já está no limite."""
+    if chat_admission is None:
+        return
+    try:
+        await chat_admission.acquire(tenant_id)
+    except RateLimitExceeded as e:
+        raise _too_many_requests(e)
+
+def release_chat_slot(tenant_id: str) -> None:
+    if chat_admission is not None:
+        chat_admission.release(tenant_id)
+
+class _ChatSlot:
+    """Vaga do /chat/stream: liberada uma única vez, no fim do stream ou da resposta (o que vier antes)."""
+    def __init__(self, tenant_id: str):
+        self.tenant_id = tenant_id
+        self.released = False
+
+    def release(self) -> None:
+        if not self.released:
+            self.released = True
+            release_chat_slot(self.tenant_id)
+
+class _ChatStreamingResponse(StreamingResponse):
+    """
+    Libera a vaga ao fim da resposta mesmo se o gerador nunca for iterado (cliente
+    desconectado antes do corpo, erro ao enviar os headers): sem isso o `finally` do
+    gerador não roda e a vaga fica presa até o processo reiniciar.
+    """
+    def __init__(self, content, slot: _ChatSlot, **kwargs):
+        super().__init__(content, **kwargs)
+        self.slot = slot
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.slot.release()
 
 async def get_current_client_token(token: str = Depends(oauth2_scheme)) -> str:
     """Verifica o JWT e retorna o client_token do usuário logado."""
@@ -50,48 +179,78 @@ async def get_current_client_token(token: str = Depends(oauth2_scheme)) -> str:
     if client_token_from_jwt is None:
          raise HTTPException(status_code=401, detail="Token mal formado.")
     
+    bind_labels(tenant=client_token_from_jwt)
     return client_token_from_jwt
 
 
-@router.post("/documents/upload", response_model=UploadResponse, status_code=202)
-async def upload_document(
-    client_token: str = Depends(get_current_client_token), 
-    file: UploadFile = File(...),
-    db: Session = Depends(get_db)
-):
-    if not file.filename.lower().endswith(('.pdf')):
-        raise HTTPException(
-            status_code=400, 
-            detail="Formato de arquivo não suportado. Apenas PDF é permitido."
-        )
-
-    safe_filename = f"{client_token}_{uuid.uuid4().hex}_{file.filename}"
-    file_path = os.path.join(settings.UPLOAD_FOLDER, safe_filename)
-    os.makedirs(settings.UPLOAD_FOLDER, exist_ok=True)
-    
+async def _store_pdf_upload(file: UploadFile, client_token: str) -> StoredUpload:
+    """Valida e grava o upload (fora do event loop); recusas viram o HTTP correspondente."""
     try:
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        return await store_pdf_upload(file, client_token, settings.UPLOAD_FOLDER, settings.UPLOAD_MAX_FILE_BYTES)
+    except UploadRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=e.reason)
     except Exception as e:
         print(f"Erro ao salvar arquivo: {e}")
         raise HTTPException(status_code=500, detail="Erro ao salvar o arquivo no disco.")
 
+def _get_owned_document(db: Session, document_id: int, tenant_id: str) -> Document:
+    doc = db.query(Document).filter(
+        Document.id == document_id,
+        Document.client_id == tenant_id
+    ).first()
+    if not doc:
+        raise HTTPException(status_code=404, detail="Documento não encontrado ou acesso negado.")
+    return doc
+
+def _ensure_not_processing(doc: Document) -> None:
+    if doc.status in (DocumentStatus.PENDING, DocumentStatus.PROCESSING):
+        raise HTTPException(status_code=409, detail="Documento ainda em processamento. Tente novamente ao final.")
+
+def _register_upload(db: Session, response: Response, client_token: str, filename: str, stored: StoredUpload) -> UploadResponse:
+    """Registra o PDF já gravado e despacha a ingestão (banco, disco e fila: roda no threadpool)."""
+    file_path, content_hash = stored.file_path, stored.content_hash
+
+    # Arquivo idêntico já enviado por este cliente (e não falhou): não reprocessa.
+    try:
+        existing_doc = db.query(Document).filter(
+            Document.client_id == client_token,
+            Document.content_hash == content_hash,
+            Document.status != DocumentStatus.FAILED
+        ).first()
+    except Exception:
+        discard_uploads([stored])
+        raise
+    if existing_doc:
+        os.remove(file_path)
+        response.status_code = 200
+        return UploadResponse(
+            message="Documento idêntico já enviado. Processamento ignorado.",
+            filename=filename,
+            client_id=client_token,
+            doc_id=existing_doc.id
+        )
+
     new_doc = Document(
         client_id=client_token,
-        filename=file.filename,
+        filename=filename,
         file_path=file_path,
+        content_hash=content_hash,
         status=DocumentStatus.PENDING
     )
     db.add(new_doc)
-    db.commit()
+    try:
+        db.commit()
+    except Exception:
+        discard_uploads([stored])
+        raise
     db.refresh(new_doc)
 
     try:
-        task = ingest_document_task.delay(new_doc.id)
+        task_id = enqueue_ingestion(new_doc.id, client_token, file_path)
         
         return UploadResponse(
-            message=f"Processamento iniciado em segundo plano. ID da Tarefa: {task.id}",
-            filename=file.filename,
+            message=f"Processamento iniciado em segundo plano. ID da Tarefa: {task_id}",
+            filename=filename,
             client_id=client_token,
             doc_id=new_doc.id
         )
@@ -106,15 +265,271 @@ async def upload_document(
             detail="Serviço de Processamento (Fila) está indisponível. Tente novamente mais tarde."
         )
 
+@router.post("/documents/upload", response_model=UploadResponse, status_code=202)
+async def upload_document(
+    response: Response,
+    client_token: str = Depends(get_current_client_token), 
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db)
+):
+    stored = await _store_pdf_upload(file, client_token)
+    return await run_in_threadpool(_register_upload, db, response, client_token, file.filename, stored)
+
+def _register_bulk_upload(
+    db: Session, client_token: str, stored: List[StoredUpload], rejected: List[UploadRejected]
+) -> BulkUploadResponse:
+    """Deduplica, registra os PDFs gravados com um único INSERT e despacha a ingestão em lote
+    (roda no threadpool). Se o registro falhar, os arquivos gravados são removidos."""
+    try:
+        # Arquivos idênticos a documentos já enviados (ou repetidos neste envio) não são reprocessados.
+        known = dict(db.query(Document.content_hash, Document.id).filter(
+            Document.client_id == client_token,
+            Document.content_hash.in_({s.content_hash for s in stored}),
+            Document.status != DocumentStatus.FAILED
+        ).all()) if stored else {}
+        new, duplicates, batch_hashes = [], [], set()
+        for upload in stored:
+            if upload.content_hash in known or upload.content_hash in batch_hashes:
+                duplicates.append(upload)
+            else:
+                batch_hashes.add(upload.content_hash)
+                new.append(upload)
+
+        doc_ids = []
+        if new:
+            doc_ids = db.scalars(
+                insert(Document).returning(Document.id, sort_by_parameter_order=True),
+                [
+                    {
+                        "client_id": client_token,
+                        "filename": upload.filename,
+                        "file_path": upload.file_path,
+                        "content_hash": upload.content_hash,
+                        "status": DocumentStatus.PENDING,
+                    }
+                    for upload in new
+                ],
+            ).all()
+            db.commit()
+    except Exception:
+        discard_uploads(stored)
+        raise
+    discard_uploads(duplicates)
+
+    if new:
+        try:
+            enqueue_ingestions(client_token, [(doc_id, upload.size) for doc_id, upload in zip(doc_ids, new)])
+        except Exception as e:
+            db.execute(delete(Document).where(Document.id.in_(doc_ids)))
+            db.commit()
+            discard_uploads(new)
+            print(f"Erro ao disparar tarefas Celery: {e}")
+            raise HTTPException(
+                status_code=503,
+                detail="Serviço de Processamento (Fila) está indisponível. Tente novamente mais tarde."
+            )
+
+    accepted = [BulkUploadItem(filename=u.filename, doc_id=doc_id) for doc_id, u in zip(doc_ids, new)]
+    batch_ids = dict(zip((u.content_hash for u in new), doc_ids))
+    accepted += [
+        BulkUploadItem(filename=u.filename, doc_id=known.get(u.content_hash) or batch_ids[u.content_hash], duplicate=True)
+        for u in duplicates
+    ]
+    return BulkUploadResponse(
+        message=f"{len(new)} documento(s) em processamento, {len(duplicates)} idêntico(s) ignorado(s), {len(rejected)} recusado(s).",
+        client_id=client_token,
+        accepted=accepted,
+        rejected=[BulkUploadRejection(filename=e.filename or "", reason=e.reason) for e in rejected],
+    )
+
+@router.post("/documents/upload/bulk", response_model=BulkUploadResponse, status_code=202)
+async def upload_documents_bulk(
+    client_token: str = Depends(get_current_client_token),
+    files: List[UploadFile] = File(...),
+    db: Session = Depends(get_db)
+):
+    """Envio de vários PDFs e/ou arquivos .zip com PDFs. Cada arquivo é validado e gravado
+    individualmente (os recusados vêm em `rejected`); os documentos novos entram no banco
+    com um único INSERT e a ingestão é despachada em lote."""
+    stored, rejected = [], []
+    try:
+        for file in files:
+            remaining = settings.UPLOAD_MAX_FILES - len(stored)
+            try:
+                if remaining <= 0:
+                    raise UploadRejected(file.filename, f"Limite de {settings.UPLOAD_MAX_FILES} arquivos por envio.", 413)
+                if (file.filename or "").lower().endswith(".zip"):
+                    extracted, refused = await store_zip_upload(
+                        file, client_token, settings.UPLOAD_FOLDER, settings.UPLOAD_MAX_FILE_BYTES, remaining
+                    )
+                    stored += extracted
+                    rejected += refused
+                else:
+                    stored.append(await store_pdf_upload(file, client_token, settings.UPLOAD_FOLDER, settings.UPLOAD_MAX_FILE_BYTES))
+            except UploadRejected as e:
+                rejected.append(e)
+            except Exception as e:
+                print(f"Erro ao salvar arquivo: {e}")
+                rejected.append(UploadRejected(file.filename, "Erro ao salvar o arquivo no disco.", 500))
+    except BaseException:
+        # Requisição cancelada no meio do envio: os PDFs já gravados não ficam órfãos.
+        discard_uploads(stored)
+        raise
+
+    return await run_in_threadpool(_register_bulk_upload, db, client_token, stored, rejected)
+
+def _replace_document(
+    db: Session, response: Response, doc: Document, client_token: str, filename: str, stored: StoredUpload
+) -> UploadResponse:
+    """Troca o arquivo do documento e despacha a reindexação (banco, disco e fila: roda no threadpool)."""
+    file_path, content_hash = stored.file_path, stored.content_hash
+    if doc.content_hash == content_hash and doc.status == DocumentStatus.COMPLETED:
+        os.remove(file_path)
+        response.status_code = 200
+        return UploadResponse(
+            message="Conteúdo idêntico ao já indexado. Processamento ignorado.",
+            filename=doc.filename,
+            client_id=client_token,
+            doc_id=doc.id
+        )
+
+    previous = (doc.filename, doc.file_path, doc.content_hash, doc.status)
+    doc.filename = filename
+    doc.file_path = file_path
+    doc.content_hash = content_hash
+    doc.status = DocumentStatus.PENDING
+    try:
+        db.commit()
+    except Exception:
+        discard_uploads([stored])
+        raise
+
+    try:
+        task_id = enqueue_ingestion(doc.id, client_token, file_path)
+    except Exception as e:
+        doc.filename, doc.file_path, doc.content_hash, doc.status = previous
+        db.commit()
+        if os.path.exists(file_path): os.remove(file_path)
+        print(f"Erro ao disparar tarefa Celery: {e}") 
+        raise HTTPException(
+            status_code=503, 
+            detail="Serviço de Processamento (Fila) está indisponível. Tente novamente mais tarde."
+        )
+
+    if previous[1] != file_path and os.path.exists(previous[1]):
+        os.remove(previous[1])
+
+    return UploadResponse(
+        message=f"Reindexação incremental iniciada em segundo plano. ID da Tarefa: {task_id}",
+        filename=filename,
+        client_id=client_token,
+        doc_id=doc.id
+    )
+
+@router.put("/documents/{document_id}", response_model=UploadResponse, status_code=202)
+async def reingest_document(
+    document_id: int,
+    response: Response,
+    client_token: str = Depends(get_current_client_token),
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db)
+):
+    """Substitui o conteúdo de um documento e o reindexa de forma incremental:
+    só os chunks novos são embedados e só os que deixaram de existir são removidos."""
+    doc = await run_in_threadpool(_get_owned_document, db, document_id, client_token)
+    _ensure_not_processing(doc)
+
+    stored = await _store_pdf_upload(file, client_token)
+    return await run_in_threadpool(_replace_document, db, response, doc, client_token, file.filename, stored)
+
+@router.delete("/documents/{document_id}", status_code=204)
+def delete_document(
+    document_id: int,
+    tenant_id: str = Depends(get_current_client_token),
+    db: Session = Depends(get_db)
+):
+    """Remove um documento: seus chunks na collection do cliente (sem recriá-la),
+    o arquivo em disco e o registro no banco. Handler síncrono: o FastAPI o roda
+    no threadpool, fora do event loop."""
+    doc = _get_owned_document(db, document_id, tenant_id)
+    _ensure_not_processing(doc)
+
+    deleted = rag_service_instance.delete_document_vectors(tenant_id, doc.id, os.path.basename(doc.file_path))
+    if not deleted:
+        raise HTTPException(status_code=503, detail="Erro ao remover os vetores do documento. Tente novamente.")
+
+    if os.path.exists(doc.file_path):
+        os.remove(doc.file_path)
+    db.delete(doc)
+    db.commit()
+    return Response(status_code=204)
+
 @router.post("/chat", response_model=ChatResponse)
-async def chat_query(data: ChatQuery, db: Session = Depends(get_db)):
-    tenant_id = validate_client_token(data.client_token, db)
-    answer = rag_service_instance.query_rag_service(data.query, tenant_id)
+async def chat_query(data: ChatQuery, request: Request, db: Session = Depends(get_db)):
+    tenant_id = await resolve_tenant(data.client_token, db)
+    await check_chat_rate_limit(request, tenant_id, db)
+    await acquire_chat_slot(tenant_id)
+    try:
+        answer = await rag_service_instance.aquery_rag_service(data.query, tenant_id, data.session_id)
+    finally:
+        release_chat_slot(tenant_id)
     
-    if "Desculpe, houve um erro interno" in answer:
+    if answer == RAG_ERROR_MESSAGE:
         raise HTTPException(status_code=503, detail=answer)
         
-    return ChatResponse(answer=answer)
+    return ChatResponse(answer=answer, session_id=data.session_id)
+
+def _sse_event(event: str, payload: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+@router.post("/chat/stream")
+async def chat_query_stream(data: ChatQuery, request: Request, db: Session = Depends(get_db)):
+    """Versão SSE do /chat: envia eventos `token` conforme a resposta é gerada e um
+    evento final `done` com o tempo até o primeiro token e o tempo total (ms)."""
+    tenant_id = await resolve_tenant(data.client_token, db)
+    await check_chat_rate_limit(request, tenant_id, db)
+    # A vaga é ocupada antes de responder (o 429 ainda pode ser enviado) e liberada no fim do stream.
+    await acquire_chat_slot(tenant_id)
+    slot = _ChatSlot(tenant_id)
+
+    async def event_stream():
+        started = time.perf_counter()
+        first_token_at = None
+        try:
+            async for chunk in rag_service_instance.astream_rag_service(data.query, tenant_id, data.session_id):
+                if not chunk:
+                    continue
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                yield _sse_event("token", {"token": chunk})
+        except Exception as e:
+            print(f"Erro no pipeline RAG (stream): {e}")
+            yield _sse_event("error", {"detail": RAG_ERROR_MESSAGE})
+            return
+
+        finished = time.perf_counter()
+        yield _sse_event("done", {
+            "ttft_ms": round(((first_token_at or finished) - started) * 1000, 1),
+            "total_ms": round((finished - started) * 1000, 1),
+        })
+
+    async def admitted_stream():
+        try:
+            async for event in event_stream():
+                yield event
+        finally:
+            slot.release()
+
+    try:
+        return _ChatStreamingResponse(
+            admitted_stream(),
+            slot,
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+    except BaseException:
+        slot.release()
+        raise
 
 @router.post("/register", response_model=Token, status_code=201)
 async def register_client(data: ClientCreate, db: Session = Depends(get_db)):
@@ -163,17 +578,108 @@ async def login_for_access_token(data: ClientLogin, db: Session = Depends(get_db
         client_token=client.client_token
     )
 
+def _encode_cursor(position: datetime, doc_id: int) -> str:
+    raw = f"{position.isoformat()}|{doc_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        position, doc_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(position), int(doc_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Cursor inválido.")
+
+def _document_history_page(
+    db: Session, tenant_id: str, limit: int, cursor: Optional[str], since: Optional[datetime], if_none_match: Optional[str]
+):
+    """Retorna (documentos ou None se o ETag confere, cabeçalhos da resposta)."""
+    # Contagem e última mudança por status (índice client_id/status): qualquer upload,
+    # troca de status ou exclusão muda esse resumo, e o 304 sai sem ler as linhas.
+    summary = db.execute(
+        select(Document.status, func.count(), func.max(Document.updated_at), func.max(Document.id))
+        .where(Document.client_id == tenant_id)
+        .group_by(Document.status)
+    ).all()
+    state = sorted((row[0].value, row[1], str(row[2]), row[3]) for row in summary)
+    # No polling com `since` o ETag depende só do estado: o cursor avança a cada resposta,
+    # e o If-None-Match da resposta anterior ainda significa "nada mudou desde então".
+    request_key = ("since", limit, cursor) if since is not None else ("list", limit, cursor)
+    etag = 'W/"' + hashlib.sha1(repr((state, request_key)).encode("utf-8")).hexdigest()[:24] + '"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "private, no-cache",
+        "X-Total-Count": str(sum(row[1] for row in summary)),
+    }
+    last_change = max((row[2] for row in summary if row[2] is not None), default=None)
+    if last_change is not None:
+        headers["X-Changes-Cursor"] = last_change.isoformat()
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return None, headers
+
+    query = select(Document).where(Document.client_id == tenant_id)
+    if since is not None:
+        # Mudanças em ordem (updated_at, id); o cursor continua de onde a página anterior parou.
+        position_column = Document.updated_at
+        query = query.where(Document.updated_at > since - timedelta(seconds=settings.DOCUMENTS_SINCE_OVERLAP_SECONDS))
+        if cursor:
+            query = query.where(tuple_(Document.updated_at, Document.id) > tuple_(*_decode_cursor(cursor)))
+        query = query.order_by(Document.updated_at, Document.id)
+    else:
+        # Mais recentes primeiro, por keyset (índice client_id/uploaded_at/id): custo constante por página.
+        position_column = Document.uploaded_at
+        if cursor:
+            query = query.where(tuple_(Document.uploaded_at, Document.id) < tuple_(*_decode_cursor(cursor)))
+        query = query.order_by(Document.uploaded_at.desc(), Document.id.desc())
+
+    documents = db.scalars(query.limit(limit)).all()
+    if len(documents) == limit:
+        last = documents[-1]
+        headers["X-Next-Cursor"] = _encode_cursor(getattr(last, position_column.key), last.id)
+    return documents, headers
+
 @router.get("/documents", response_model=List[DocumentSchema])
 async def get_document_history(
+    request: Request,
+    response: Response,
+    limit: int = Query(settings.DOCUMENTS_PAGE_SIZE, ge=1, le=settings.DOCUMENTS_MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor da página anterior."),
+    since: Optional[datetime] = Query(None, description="X-Changes-Cursor de uma resposta anterior: só o que mudou desde então."),
     tenant_id: str = Depends(get_current_client_token),
     db: Session = Depends(get_db)
 ):
-    documents = db.query(Document).filter(
-        Document.client_id == tenant_id
-    ).all()
-    
+    """Histórico de documentos do cliente logado, dos mais recentes aos mais antigos, em
+    páginas de `limit` (a próxima página vem em X-Next-Cursor e o total em X-Total-Count).
+    Com `since`, só os documentos criados ou com status alterado desde o cursor; exclusões
+    não aparecem, mas mudam o total. Com If-None-Match igual ao ETag, responde 304."""
+    documents, headers = await run_in_threadpool(
+        _document_history_page, db, tenant_id, limit, cursor, since, request.headers.get("if-none-match")
+    )
+    if documents is None:
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
     return documents
 
+@router.get("/documents/events")
+async def document_events(
+    request: Request,
+    tenant_id: str = Depends(get_current_client_token),
+):
+    """SSE com o progresso das ingestões do cliente logado: eventos `progress`
+    (etapa, páginas/chunks processados, fração e ETA) publicados pelo worker,
+    mais comentários de keepalive periódicos. Substitui o polling do dashboard."""
+    async def event_stream():
+        async for event in subscribe_progress(tenant_id):
+            if await request.is_disconnected():
+                break
+            yield ": keepalive\n\n" if event is None else _sse_event("progress", event)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @router.get("/documents/download/{document_id}")
 async def download_document(
     document_id: int,
@@ -1,15 +1,19 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 
 class ChatQuery(BaseModel):
     """Schema para a requisição de consulta do chatbot."""
     query: str = Field(..., description="A pergunta do usuário final.")
     client_token: str = Field(..., description="O token de segurança/identificação do cliente (Tenant ID).")
+    session_id: Optional[str] = Field(
+        None, max_length=128, description="Identificador da conversa (gerado pelo widget); sem ele a pergunta é avulsa."
+    )
 
 class ChatResponse(BaseModel):
     """Schema para a resposta do chatbot."""
     answer: str = Field(..., description="A resposta gerada pelo RAG.")
+    session_id: Optional[str] = Field(None, description="A conversa à qual a resposta pertence.")
     
 class UploadResponse(BaseModel):
     """Schema para a resposta após o upload e ingestão."""
@@ -18,6 +22,22 @@ class UploadResponse(BaseModel):
     client_id: str
     doc_id: int
 
+class BulkUploadItem(BaseModel):
+    filename: str
+    doc_id: int
+    duplicate: bool = False  # conteúdo idêntico a um documento já enviado: não é reprocessado
+
+class BulkUploadRejection(BaseModel):
+    filename: str
+    reason: str
+
+class BulkUploadResponse(BaseModel):
+    """Schema para a resposta do upload de vários arquivos (PDFs e/ou zips)."""
+    message: str
+    client_id: str
+    accepted: List[BulkUploadItem]
+    rejected: List[BulkUploadRejection]
+
 class Token(BaseModel):
     """Resposta com o Access Token e o tipo."""
     access_token: str
@@ -43,6 +63,7 @@ class DocumentSchema(BaseModel):
     id: int
     filename: str
     uploaded_at: datetime
+    updated_at: Optional[datetime] = None
     status: str
     
     class Config:
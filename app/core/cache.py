@@ -0,0 +1,135 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class LRUCache:
+    """
+    Cache em memória, thread-safe, com despejo LRU e TTL opcional por entrada.
+    Mantém contadores de hits/misses/evictions para inspeção em produção.
+
+    `get_or_create` constrói o valor fora do lock global, com um lock por chave:
+    uma construção lenta (ex: abrir a collection de um tenant) não bloqueia as
+    leituras das demais chaves.
+    """
+    def __init__(self, max_entries: int = 128, ttl_seconds: Optional[float] = None):
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds if ttl_seconds and ttl_seconds > 0 else None
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._building: Dict[Hashable, "_Build"] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _expired(self, expires_at: Optional[float]) -> bool:
+        return expires_at is not None and time.monotonic() >= expires_at
+
+    def _peek(self, key: Hashable) -> Any:
+        """Valor válido (e marca como recente) ou `_MISSING`, sem contar hit/miss. Chamar com o lock."""
+        entry = self._data.get(key)
+        if entry is None or self._expired(entry[1]):
+            if entry is not None:
+                del self._data[key]
+            return _MISSING
+        self._data.move_to_end(key)
+        return entry[0]
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            value = self._peek(key)
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        ttl = ttl_seconds if ttl_seconds is not None else self.ttl_seconds
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_create(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        """
+        Retorna o valor em cache ou o cria com `factory` (uma única vez por chave).
+        Conta um hit ou um miss por chamada; quem aguardou a construção de outra thread
+        conta como miss.
+        """
+        with self._lock:
+            value = self.get(key, _MISSING)
+            if value is not _MISSING:
+                return value
+            build = self._building.get(key)
+            if build is None:
+                build = self._building[key] = _Build()
+            build.waiters += 1
+
+        try:
+            with build.lock:
+                # Quem esperou a construção de outra thread encontra o valor já no cache.
+                with self._lock:
+                    value = self._peek(key)
+                    build.invalidated = False
+                if value is not _MISSING:
+                    return value
+                value = factory()
+                with self._lock:
+                    # Invalidada durante a construção: o valor pode já estar velho, não entra no cache.
+                    if not build.invalidated:
+                        self.put(key, value)
+                return value
+        finally:
+            with self._lock:
+                build.waiters -= 1
+                if build.waiters == 0 and self._building.get(key) is build:
+                    del self._building[key]
+
+    def invalidate(self, key: Hashable) -> bool:
+        with self._lock:
+            build = self._building.get(key)
+            if build is not None:
+                build.invalidated = True
+            return self._data.pop(key, None) is not None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def items(self):
+        """Snapshot (chave, valor) das entradas válidas, da menos para a mais recente."""
+        with self._lock:
+            return [(k, v[0]) for k, v in self._data.items() if not self._expired(v[1])]
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+class _Build:
+    """Construção em andamento de uma chave: lock próprio e quantas threads a aguardam."""
+    __slots__ = ("lock", "waiters", "invalidated")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.waiters = 0
+        self.invalidated = False
+
+
+_MISSING = object()
@@ -1,5 +1,14 @@
+import time
+from contextlib import ExitStack
+
 from celery import Celery
+from kombu import Queue
+from celery.signals import (
+    before_task_publish, task_postrun, task_prerun, worker_init, worker_process_init, worker_process_shutdown,
+)
 from app.core.config import settings
+from app.core.metrics import end_metric_context, stage_metrics, start_metric_context
+from app.core import telemetry
 
 celery_app = Celery(
     "rag_tasks", 
@@ -15,4 +24,87 @@ celery_app.conf.update(
     task_serializer='json',
     result_serializer='json',
     accept_content=['json'],
-)
\ No newline at end of file
+
+    # Ingestão em duas filas (ver app/services/ingest_scheduler.py); suba workers separados:
+    #   celery -A app.core.celery_app worker -Q ingest_small -c 4
+    #   celery -A app.core.celery_app worker -Q ingest_large -c 2
+    task_default_queue='ingest_small',
+    task_queues=(Queue('ingest_small'), Queue('ingest_large')),
+    worker_prefetch_multiplier=settings.CELERY_WORKER_PREFETCH_MULTIPLIER,
+    task_acks_late=settings.CELERY_TASK_ACKS_LATE,
+    task_reject_on_worker_lost=settings.CELERY_TASK_ACKS_LATE,
+
+    # Despacho periódico do escalonador de ingestões: devolve as vagas de workers mortos
+    # (lease vencido) mesmo sem novos uploads. Requer o beat:
+    #   celery -A app.core.celery_app beat
+    beat_schedule={
+        'dispatch-ingestions': {
+            'task': 'dispatch_ingestions_task',
+            'schedule': settings.INGEST_DISPATCH_INTERVAL_SECONDS,
+            'options': {'queue': 'ingest_small', 'expires': settings.INGEST_DISPATCH_INTERVAL_SECONDS},
+        },
+    } if settings.INGEST_DISPATCH_INTERVAL_SECONDS > 0 else {},
+)
+
+
+@worker_process_init.connect
+def _reset_db_pools(**kwargs):
+    # Conexões herdadas do processo pai (fork) não podem ser compartilhadas: cada filho abre as suas.
+    from app.core.db import ENGINES
+
+    for current in ENGINES:
+        current.dispose(close=False)
+
+
+@worker_process_init.connect
+def _warm_up_rag_service(**kwargs):
+    # Depois do fork: clientes do Chroma/OpenAI não devem ser herdados do processo pai.
+    if settings.SERVICE_WARMUP:
+        from app.services.rag_service import rag_service_instance
+
+        print(f"RAGService aquecido (ms por componente): {rag_service_instance.warm_up(ingestion=True)}")
+
+
+@worker_init.connect
+def _setup_observability(**kwargs):
+    telemetry.setup_metrics(settings)
+    telemetry.setup_tracing(settings, "rag-worker")
+    if settings.CELERY_METRICS_PORT and settings.METRICS_ENABLED:
+        try:
+            telemetry.start_metrics_server(settings.CELERY_METRICS_PORT)
+        except Exception as e:
+            print(f"Erro ao iniciar o servidor de métricas do worker: {e}")
+
+
+@worker_process_shutdown.connect
+def _release_process_metrics(pid=None, **kwargs):
+    telemetry.mark_process_dead(pid)
+
+
+@before_task_publish.connect
+def _propagate_trace(headers=None, **kwargs):
+    # Leva o trace da requisição (ex: upload) até a task, que vira um span filho dela.
+    # Um traceparent já presente (capturado no envio do job ao escalonador) é mantido.
+    if headers is not None and "traceparent" not in headers:
+        telemetry.inject_trace_context(headers)
+
+
+# Estado por task em execução: (início, escopo de labels, spans abertos)
+_running_tasks = {}
+
+
+@task_prerun.connect
+def _start_task_observation(task_id=None, task=None, **kwargs):
+    spans = ExitStack()
+    spans.enter_context(telemetry.traced_span(task.name, lambda key: getattr(task.request, key, None), kind="consumer"))
+    _running_tasks[task_id] = (time.perf_counter(), start_metric_context(endpoint=task.name), spans)
+
+
+@task_postrun.connect
+def _end_task_observation(task_id=None, task=None, state=None, **kwargs):
+    started, labels_token, spans = _running_tasks.pop(task_id, (None, None, None))
+    if started is None:
+        return
+    stage_metrics.observe("celery_task", time.perf_counter() - started, task=task.name, state=state or "")
+    spans.close()
+    end_metric_context(labels_token)
@@ -1,4 +1,5 @@
 import os
+from typing import Optional
 from pydantic_settings import BaseSettings
 from dotenv import load_dotenv
 
@@ -30,5 +31,168 @@ class Settings(BaseSettings):
     )
     
     UPLOAD_FOLDER: str = os.path.join(BASE_DIR, "data")
+    UPLOAD_MAX_FILE_BYTES: int = 50 * 1024 * 1024  # por PDF (inclusive dentro de zip)
+    UPLOAD_MAX_FILES: int = 100  # PDFs por envio no upload em lote
+    UPLOAD_MAX_REQUEST_BYTES: int = 500 * 1024 * 1024  # Content-Length maior é recusado (413) antes de ler o corpo
+
+    # Histórico de documentos (GET /documents): paginação por keyset
+    DOCUMENTS_PAGE_SIZE: int = 100  # `limit` padrão
+    DOCUMENTS_MAX_PAGE_SIZE: int = 500
+    DOCUMENTS_SINCE_OVERLAP_SECONDS: float = 2.0  # `since` recua um pouco: mudanças de transações ainda abertas não se perdem
+
+    # Pools de conexão do PostgreSQL (por processo): API e worker Celery têm pools separados
+    DB_POOL_SIZE: int = 5  # conexões mantidas abertas por processo da API
+    DB_MAX_OVERFLOW: int = 10  # conexões extras em picos (fechadas ao serem devolvidas)
+    WORKER_DB_POOL_SIZE: int = 2  # por processo filho do Celery (uma task por vez)
+    WORKER_DB_MAX_OVERFLOW: int = 0
+    DB_POOL_TIMEOUT_SECONDS: int = 30  # espera máxima por uma conexão livre
+    DB_POOL_RECYCLE_SECONDS: int = 1800  # renova conexões antigas (proxies/PgBouncer derrubam conexões ociosas)
+    DB_POOL_PRE_PING: bool = True  # testa a conexão no checkout (descarta conexões mortas)
+
+    # Backends do RAGService (app/services/providers.py), criados no primeiro uso
+    LLM_PROVIDER: str = "openai"  # 'openai', 'fake' ou 'modulo:fabrica'
+    EMBEDDINGS_PROVIDER: str = "openai"  # 'openai', 'fake', 'fake_lexical' ou 'modulo:fabrica'
+    VECTOR_STORE_PROVIDER: str = "chroma"  # 'chroma', 'pgvector', 'hnsw' ou 'modulo:fabrica'
+    LLM_MODEL: str = "gpt-3.5-turbo"
+    LLM_TEMPERATURE: float = 0.1
+    EMBEDDINGS_MODEL: Optional[str] = None  # padrão do langchain_openai
+    FAKE_LLM_LATENCY: float = 0.0  # segundos por resposta dos backends falsos (testes/benchmarks)
+    FAKE_EMBEDDINGS_LATENCY: float = 0.0
+    CHROMA_PATH: str = "chroma_db"
+    SERVICE_WARMUP: bool = False  # cria os backends na inicialização (API/worker) em vez de na 1ª requisição
+
+    # Cache de vector stores (Chroma) por tenant
+    VECTOR_STORE_CACHE_MAX_ENTRIES: int = 64
+    VECTOR_STORE_CACHE_TTL_SECONDS: int = 300
+    CHROMA_MEMORY_LIMIT_BYTES: int = 0  # 0 = sem limite para o cache de segmentos do Chroma
+
+    # VECTOR_STORE_PROVIDER=pgvector (app/services/pgvector_store.py)
+    PGVECTOR_DATABASE_URL: Optional[str] = None  # padrão: DATABASE_URL
+    PGVECTOR_DIMENSIONS: int = 1536  # dimensão dos embeddings (text-embedding-ada-002 / 3-small)
+    PGVECTOR_INDEX: str = "hnsw"  # 'hnsw', 'ivfflat' ou 'none' (busca exata)
+    PGVECTOR_IVFFLAT_LISTS: int = 100
+    PGVECTOR_IVFFLAT_PROBES: int = 10
+    PGVECTOR_POOL_SIZE: int = 5
+    PGVECTOR_MAX_OVERFLOW: int = 5
+
+    # Parâmetros HNSW (pgvector com PGVECTOR_INDEX=hnsw e VECTOR_STORE_PROVIDER=hnsw)
+    HNSW_M: int = 16  # vizinhos por nó: mais memória e recall
+    HNSW_EF_CONSTRUCTION: int = 200  # qualidade do grafo (custo da indexação)
+    HNSW_EF_SEARCH: int = 64  # candidatos por busca: recall x latência
+    HNSW_PATH: str = "hnsw_index"  # VECTOR_STORE_PROVIDER=hnsw: índices e chunks por tenant
+
+    # Versão da collection de cada tenant, incrementada pelo worker a cada ingestão/exclusão e lida
+    # pela API a cada pergunta: invalida o cache de respostas em todos os processos.
+    # 'redis' (padrão) ou 'local' (só um processo: API e ingestão juntos, em desenvolvimento)
+    COLLECTION_VERSIONS_BACKEND: str = "redis"
+    COLLECTION_VERSIONS_REDIS_URL: Optional[str] = None  # padrão: CELERY_REDIS_DSN
+
+    # Cache de respostas do chat por tenant ('local', 'redis' ou 'none')
+    ANSWER_CACHE_BACKEND: str = "local"
+    ANSWER_CACHE_REDIS_URL: Optional[str] = None  # padrão: CELERY_REDIS_DSN
+    ANSWER_CACHE_TTL_SECONDS: int = 3600
+    ANSWER_CACHE_MAX_ENTRIES_PER_TENANT: int = 256
+    ANSWER_CACHE_SIMILARITY_THRESHOLD: float = 0.95  # 0 desativa o casamento por similaridade
+    ANSWER_CACHE_SIMILARITY_MAX_CANDIDATES: int = 128  # respostas mais recentes comparadas por similaridade
+
+    # Memória de conversa do /chat por session_id ('local', 'redis' ou 'none')
+    CONVERSATION_BACKEND: str = "local"
+    CONVERSATION_REDIS_URL: Optional[str] = None  # padrão: CELERY_REDIS_DSN
+    CONVERSATION_TTL_SECONDS: int = 1800  # sessão inativa expira
+    CONVERSATION_MAX_SESSIONS: int = 10000  # backend local
+    CONVERSATION_MAX_TURNS: int = 6  # acima disso os turnos antigos viram resumo
+    CONVERSATION_KEEP_TURNS: int = 3  # turnos recentes mantidos na íntegra após resumir
+    CONVERSATION_TURN_MAX_TOKENS: int = 200  # corte de cada pergunta/resposta guardada
+    CONVERSATION_SUMMARY_MAX_TOKENS: int = 200
+    CONVERSATION_CONDENSE: str = "auto"  # 'auto' (só perguntas que dependem do histórico) ou 'always'
+
+    # Cache da validação do client_token do /chat ('local', 'redis' ou 'none')
+    TENANT_CACHE_BACKEND: str = "local"
+    TENANT_CACHE_REDIS_URL: Optional[str] = None  # padrão: CELERY_REDIS_DSN
+    TENANT_CACHE_TTL_SECONDS: int = 60  # tokens válidos na memória do processo
+    TENANT_CACHE_NEGATIVE_TTL_SECONDS: int = 10  # tokens inválidos (amortece floods)
+    TENANT_CACHE_REDIS_TTL_SECONDS: int = 300
+    TENANT_CACHE_MAX_ENTRIES: int = 10000
+
+    # Rate limit do /chat (token bucket) por tenant e por IP do usuário final: 'local', 'redis' ou 'none'.
+    # Padrões por minuto; as colunas chat_* do Client sobrescrevem por tenant (0 = sem limite).
+    CHAT_RATE_LIMIT_BACKEND: str = "local"
+    CHAT_RATE_LIMIT_REDIS_URL: Optional[str] = None  # padrão: CELERY_REDIS_DSN
+    CHAT_TENANT_RATE_PER_MINUTE: int = 300
+    CHAT_TENANT_BURST: int = 60
+    CHAT_IP_RATE_PER_MINUTE: int = 20
+    CHAT_IP_BURST: int = 10
+    CHAT_LIMITS_CACHE_TTL_SECONDS: int = 60  # limites do Client em memória (mudanças valem após o TTL)
+    # ATENÇÃO atrás de proxy reverso/load balancer: o IP da conexão é o do proxy e, sem
+    # CHAT_TRUSTED_PROXIES, todos os usuários do tenant dividem um único bucket por IP.
+    CHAT_TRUSTED_PROXIES: str = ""  # IPs/redes dos proxies, separados por vírgula (ex: "10.0.0.0/8"); o IP vem do X-Forwarded-For
+    CHAT_TRUST_FORWARDED_FOR: bool = False  # confia no 1º IP do X-Forwarded-For de qualquer conexão (só se a API não for acessível sem o proxy)
+
+    # Admissão do /chat por processo da API: acima disso responde 429 + Retry-After em vez de enfileirar
+    CHAT_MAX_CONCURRENT: int = 64  # 0 = sem limite
+    CHAT_MAX_WAITING: int = 64  # requisições aguardando vaga
+    CHAT_ADMISSION_TIMEOUT_SECONDS: float = 2.0  # espera máxima por vaga
+    CHAT_TENANT_MAX_CONCURRENT: int = 16  # vagas (em execução + aguardando) de um mesmo tenant; 0 = sem limite
+    CHAT_RETRY_AFTER_SECONDS: int = 2
+    CHAT_COALESCE: bool = True  # perguntas idênticas simultâneas do mesmo tenant compartilham uma geração
+
+    # Guardrail: 'serial' (LLM antes da busca), 'parallel' (LLM em paralelo com busca/geração),
+    # 'local' (apenas o classificador local, sem rede) ou 'off'
+    GUARDRAIL_MODE: str = "parallel"
+    GUARDRAIL_LOCAL_PREFILTER: bool = False  # bloqueia injeções óbvias e libera só perguntas simples de FAQ sem chamar a LLM
+
+    # Pipeline de embeddings da ingestão
+    EMBEDDING_BATCH_SIZE: int = 128  # chunks por requisição de embeddings
+    EMBEDDING_BATCH_MAX_TOKENS: int = 8000  # tokens por requisição (contados com tiktoken)
+    EMBEDDING_MAX_CONCURRENCY: int = 4  # lotes enviados em paralelo
+    EMBEDDING_MAX_RETRIES: int = 5  # tentativas por lote, com backoff exponencial
+    EMBEDDING_CACHE_ENABLED: bool = True  # reaproveita embeddings de chunks idênticos (tabela embedding_cache)
+
+    # Filas da ingestão: documentos pequenos e grandes em filas (e workers) separadas e
+    # despacho round-robin entre tenants ('redis', 'local' = só um processo, ou 'none' = FIFO)
+    INGEST_SCHEDULER: str = "redis"
+    INGEST_SCHEDULER_REDIS_URL: Optional[str] = None  # padrão: CELERY_REDIS_DSN
+    INGEST_LARGE_FILE_BYTES: int = 5 * 1024 * 1024  # a partir daqui o PDF vai para a fila ingest_large
+    INGEST_SMALL_QUEUE_WINDOW: int = 4  # jobs em execução na fila ingest_small (= concorrência dos seus workers)
+    INGEST_LARGE_QUEUE_WINDOW: int = 2  # idem para ingest_large
+    INGEST_TENANT_MAX_RUNNING: int = 2  # ingestões simultâneas por tenant
+    INGEST_TENANT_RATE_LIMIT_PER_MINUTE: int = 0  # ingestões iniciadas por tenant por minuto; 0 = sem limite
+    INGEST_LEASE_SECONDS: int = 3600  # vaga de um job cujo worker morreu volta ao tenant após esse tempo
+    INGEST_DISPATCH_INTERVAL_SECONDS: int = 60  # despacho periódico pelo Celery beat (recolhe leases vencidos); 0 = desligado
+    CELERY_WORKER_PREFETCH_MULTIPLIER: int = 1  # 1: o worker não reserva tasks que outro worker livre poderia pegar
+    CELERY_TASK_ACKS_LATE: bool = True  # ack só ao final: task de worker morto volta para a fila
+
+    # Leitura de PDFs na ingestão
+    PDF_PARSE_WORKERS: int = 1  # > 1 extrai faixas de páginas em paralelo (processos)
+    PDF_PAGES_PER_TASK: int = 16  # páginas por faixa no modo paralelo
+    INGESTION_FLUSH_CHUNKS: int = 512  # chunks acumulados antes de gerar embeddings e gravar
+    INGESTION_MEMORY_LIMIT_MB: int = 0  # teto (flexível) de RSS do worker; 0 = sem limite
+
+    # Divisão em chunks (padrão; cada Client pode sobrescrever nas colunas chunk_*)
+    CHUNK_STRATEGY: str = "structure"  # 'structure' (títulos, listas e tabelas), 'tokens', 'characters' ou "modulo:fabrica"
+    CHUNK_TOKENS: int = 256  # tamanho máximo do chunk, em tokens
+    CHUNK_OVERLAP_TOKENS: int = 32  # sobreposição ao cortar um trecho longo no meio
+    CHUNK_MIN_TOKENS: int = 64  # 'structure': seção menor que isso é juntada à seguinte
+
+    # Busca: 'vector' (só Chroma), 'keyword' (só BM25) ou 'hybrid' (os dois, fundidos por RRF)
+    RETRIEVAL_MODE: str = "hybrid"
+    RETRIEVAL_K: int = 8  # chunks candidatos ao contexto (o que vai ao prompt é limitado por CONTEXT_MAX_TOKENS)
+    RETRIEVAL_FETCH_K: int = 20  # candidatos buscados em cada índice antes da fusão/rerank
+    RETRIEVAL_RRF_K: int = 60  # constante do reciprocal rank fusion
+    RETRIEVAL_RERANK: str = "none"  # 'none', 'mmr' ou 'cross_encoder' (requer sentence-transformers)
+    RETRIEVAL_MMR_LAMBDA: float = 0.5  # 1 = só relevância, 0 = só diversidade
+    RETRIEVAL_CROSS_ENCODER_MODEL: str = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+    KEYWORD_INDEX_PATH: Optional[str] = None  # padrão: keyword_index.sqlite3 dentro do diretório do Chroma (ignorado com pgvector: termos no PostgreSQL)
+
+    # Montagem do contexto do prompt
+    CONTEXT_MAX_TOKENS: int = 1000  # orçamento de tokens (tiktoken) para os chunks no prompt
+    CONTEXT_MIN_CHUNK_TOKENS: int = 50  # sobra menor que isso não recebe mais chunks
+
+    # Observabilidade
+    METRICS_ENABLED: bool = True  # histogramas Prometheus em /metrics (requer prometheus-client)
+    METRICS_TENANT_LABELS: bool = True  # label `tenant` (hash do client_token); False reduz a cardinalidade
+    CELERY_METRICS_PORT: int = 9101  # /metrics do worker Celery; 0 desativa
+    TRACING_ENABLED: bool = False  # spans OpenTelemetry da API até a task de ingestão
+    OTEL_EXPORTER_OTLP_ENDPOINT: Optional[str] = None  # ex: http://localhost:4317 (sem valor: spans no console)
 
 settings = Settings()
\ No newline at end of file
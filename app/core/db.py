@@ -1,18 +1,92 @@
-from sqlalchemy import create_engine
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
 from app.core.config import settings
+from app.core.metrics import stage_metrics
 from app.core.models import Base
 
-# Cria o motor de conexão
-engine = create_engine(
-    settings.DATABASE_URL,
-    connect_args={
-        "client_encoding": "utf8" # Força o cliente a usar UTF-8
-    }
-)
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool que registra o tempo de espera por uma conexão livre (e os timeouts)."""
+    name = "default"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.timeouts = 0
+        self.checkouts = 0
+        self._counter_lock = threading.Lock()
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            with self._counter_lock:
+                self.timeouts += 1
+            raise
+        finally:
+            stage_metrics.observe("db_pool_wait", time.perf_counter() - started, pool=self.name)
+        with self._counter_lock:
+            self.checkouts += 1
+        return connection
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.name = self.name
+        return pool
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pool_size": self.size(),
+            "max_overflow": self._max_overflow,
+            "checked_out": self.checkedout(),
+            "checked_in": self.checkedin(),
+            "overflow": max(0, self.overflow()),
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+        }
+
+
+# Motores criados neste processo (estatísticas de pool e descarte após o fork do Celery).
+ENGINES = []
+
+
+def make_engine(name: str, pool_size: int, max_overflow: int, url: Optional[str] = None):
+    """
+    Cria um motor com pool próprio. API e worker Celery usam pools separados: o
+    total de conexões abertas no PostgreSQL é a soma de (pool_size + max_overflow)
+    de cada processo.
+    """
+    engine = create_engine(
+        url or settings.DATABASE_URL,
+        connect_args={
+            "client_encoding": "utf8" # Força o cliente a usar UTF-8
+        },
+        poolclass=InstrumentedQueuePool,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+        pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+    )
+    engine.pool.name = name
+    ENGINES.append(engine)
+    return engine
+
+
+# Motor da API (FastAPI)
+engine = make_engine("api", settings.DB_POOL_SIZE, settings.DB_MAX_OVERFLOW)
+# Motor do worker Celery (conexões só para status de documentos e cache de embeddings)
+worker_engine = make_engine("worker", settings.WORKER_DB_POOL_SIZE, settings.WORKER_DB_MAX_OVERFLOW)
 
 # Cria a Sessão de Banco de Dados
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+WorkerSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=worker_engine)
 
 # Função de dependência para o FastAPI
 def get_db():
@@ -22,6 +96,37 @@ def get_db():
     finally:
         db.close()
 
+def pool_stats() -> Dict[str, Dict[str, Any]]:
+    """Estado dos pools deste processo (conexões em uso, overflow, esperas e timeouts)."""
+    waits = stage_metrics.summary()
+    stats = {}
+    for current in ENGINES:
+        pool = current.pool
+        stats[pool.name] = {**pool.stats(), "wait": waits.get(f"db_pool_wait{{pool={pool.name}}}")}
+    return stats
+
+# Alterações de schema em tabelas que já existem (create_all só cria tabelas novas).
+# Devem ser idempotentes.
+SCHEMA_UPGRADES = [
+    "ALTER TABLE documents ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64)",
+    "CREATE INDEX IF NOT EXISTS ix_documents_content_hash ON documents (content_hash)",
+    "ALTER TABLE clients ADD COLUMN IF NOT EXISTS chat_rate_per_minute INTEGER",
+    "ALTER TABLE clients ADD COLUMN IF NOT EXISTS chat_burst INTEGER",
+    "ALTER TABLE clients ADD COLUMN IF NOT EXISTS chat_ip_rate_per_minute INTEGER",
+    "ALTER TABLE clients ADD COLUMN IF NOT EXISTS chat_ip_burst INTEGER",
+    "ALTER TABLE documents ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITH TIME ZONE DEFAULT now()",
+    "CREATE INDEX IF NOT EXISTS ix_documents_client_uploaded ON documents (client_id, uploaded_at, id)",
+    "CREATE INDEX IF NOT EXISTS ix_documents_client_updated ON documents (client_id, updated_at)",
+    "CREATE INDEX IF NOT EXISTS ix_documents_client_status ON documents (client_id, status, updated_at, id)",
+    "ALTER TABLE clients ADD COLUMN IF NOT EXISTS chunk_strategy VARCHAR",
+    "ALTER TABLE clients ADD COLUMN IF NOT EXISTS chunk_tokens INTEGER",
+    "ALTER TABLE clients ADD COLUMN IF NOT EXISTS chunk_overlap_tokens INTEGER",
+]
+
 # Função para criar todas as tabelas
 def init_db():
-    Base.metadata.create_all(bind=engine)
\ No newline at end of file
+    Base.metadata.create_all(bind=engine)
+    if engine.dialect.name == "postgresql":
+        with engine.begin() as conn:
+            for statement in SCHEMA_UPGRADES:
+                conn.execute(text(statement))
@@ -0,0 +1,158 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar, Token
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Labels da requisição/task corrente (tenant, endpoint), anexados a tudo o que for medido nela.
+_context_labels: ContextVar[Optional[Dict[str, str]]] = ContextVar("metric_labels", default=None)
+
+
+def start_metric_context(**labels: str) -> Token:
+    """Abre um escopo de labels (uma requisição HTTP, uma task do Celery); feche com `end_metric_context`."""
+    return _context_labels.set(dict(labels))
+
+
+def end_metric_context(token: Token) -> None:
+    _context_labels.reset(token)
+
+
+@contextmanager
+def metric_context(**labels: str):
+    token = start_metric_context(**labels)
+    try:
+        yield
+    finally:
+        end_metric_context(token)
+
+
+def bind_labels(**labels: str) -> None:
+    """
+    Acrescenta labels ao escopo corrente (ex: o tenant, conhecido só depois de
+    validar o token). O dicionário é compartilhado com as tarefas/threads já
+    criadas dentro do escopo, então elas também passam a ver o label.
+    """
+    current = _context_labels.get()
+    if current is None:
+        _context_labels.set(dict(labels))
+    else:
+        current.update(labels)
+
+
+def context_labels() -> Dict[str, str]:
+    return dict(_context_labels.get() or {})
+
+
+class StageMetrics:
+    """
+    Registro em memória das latências por etapa do pipeline (guardrail, busca,
+    geração...). Guarda uma janela das últimas amostras por (etapa, labels) para
+    calcular médias e percentis.
+    """
+    kind = "latency"
+    tracer: Any = None  # tracer OpenTelemetry (app.core.telemetry), quando o tracing está ativo
+
+    def __init__(self, window: int = 2048):
+        self.window = window
+        self._samples: Dict[Tuple[str, Tuple], deque] = {}
+        self._counts: Dict[Tuple[str, Tuple], int] = {}
+        self._lock = threading.Lock()
+        self._sinks: List[Callable[[str, str, float, Dict[str, Any]], None]] = []
+
+    def add_sink(self, sink: Callable[[str, str, float, Dict[str, Any]], None]) -> None:
+        """Repassa cada amostra a `sink(kind, nome, valor, labels)` (ex: exportador Prometheus)."""
+        self._sinks.append(sink)
+
+    def observe(self, stage: str, seconds: float, **labels: Any) -> None:
+        # A janela em memória agrega só pelos labels explícitos; tenant/endpoint vão apenas aos sinks.
+        key = (stage, tuple(sorted(labels.items())))
+        with self._lock:
+            if key not in self._samples:
+                self._samples[key] = deque(maxlen=self.window)
+                self._counts[key] = 0
+            self._samples[key].append(seconds)
+            self._counts[key] += 1
+        if self._sinks:
+            all_labels = {**context_labels(), **labels}
+            for sink in self._sinks:
+                try:
+                    sink(self.kind, stage, seconds, all_labels)
+                except Exception as e:
+                    print(f"Erro ao exportar a métrica {stage}: {e}")
+
+    @contextmanager
+    def time(self, stage: str, **labels: Any):
+        tracer = self.tracer
+        span = tracer.start_as_current_span(stage, attributes={k: str(v) for k, v in labels.items()}) if tracer else nullcontext()
+        started = time.perf_counter()
+        with span:
+            try:
+                yield
+            finally:
+                self.observe(stage, time.perf_counter() - started, **labels)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            snapshot = {key: (list(samples), self._counts[key]) for key, samples in self._samples.items()}
+
+        result = {}
+        for (stage, labels), (samples, count) in sorted(snapshot.items()):
+            name = stage + ("{" + ",".join(f"{k}={v}" for k, v in labels) + "}" if labels else "")
+            ordered = sorted(samples)
+            result[name] = {
+                "count": count,
+                "avg_ms": round(sum(ordered) / len(ordered) * 1000, 2),
+                "p50_ms": round(ordered[len(ordered) // 2] * 1000, 2),
+                "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 2),
+            }
+        return result
+
+    def reset(self) -> None:
+        with self._lock:
+            self._samples.clear()
+            self._counts.clear()
+
+
+class UsageMetrics(StageMetrics):
+    """
+    Mesma janela de amostras do StageMetrics, para quantidades por requisição
+    (tokens do prompt, tokens economizados...) em vez de latências.
+    """
+    kind = "usage"
+
+    def __init__(self, window: int = 2048):
+        super().__init__(window)
+        self._totals: Dict[Tuple[str, Tuple], float] = {}
+
+    def record(self, name: str, value: float, **labels: Any) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        self.observe(name, value, **labels)
+        with self._lock:
+            self._totals[key] = self._totals.get(key, 0) + value
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            snapshot = {key: (list(samples), self._counts[key], self._totals.get(key, 0)) for key, samples in self._samples.items()}
+
+        result = {}
+        for (name, labels), (samples, count, total) in sorted(snapshot.items()):
+            key = name + ("{" + ",".join(f"{k}={v}" for k, v in labels) + "}" if labels else "")
+            ordered = sorted(samples)
+            result[key] = {
+                "count": count,
+                "total": total,
+                "avg": round(sum(ordered) / len(ordered), 1),
+                "p50": ordered[len(ordered) // 2],
+                "p95": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+            }
+        return result
+
+    def reset(self) -> None:
+        super().reset()
+        with self._lock:
+            self._totals.clear()
+
+
+stage_metrics = StageMetrics()
+usage_metrics = UsageMetrics()
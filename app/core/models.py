@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, LargeBinary, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql import func
 import uuid
@@ -26,6 +26,17 @@ class Client(Base):
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    # Limites do /chat (por minuto). NULL = padrão de Settings (CHAT_*), 0 = sem limite.
+    chat_rate_per_minute = Column(Integer, nullable=True)
+    chat_burst = Column(Integer, nullable=True)
+    chat_ip_rate_per_minute = Column(Integer, nullable=True)
+    chat_ip_burst = Column(Integer, nullable=True)
+
+    # Divisão em chunks na ingestão. NULL = padrão de Settings (CHUNK_*).
+    chunk_strategy = Column(String, nullable=True)
+    chunk_tokens = Column(Integer, nullable=True)
+    chunk_overlap_tokens = Column(Integer, nullable=True)
+
     def __repr__(self):
         return f"<Client(name='{self.name}', token='{self.client_token}')>"
 
@@ -38,10 +49,32 @@ class Document(Base):
     client_id = Column(String, ForeignKey("clients.client_token"), index=True) 
     filename = Column(String)
     file_path = Column(String)
+    # SHA-256 do arquivo enviado, usado para não reprocessar uploads idênticos
+    content_hash = Column(String(64), index=True, nullable=True)
     uploaded_at = Column(DateTime(timezone=True), server_default=func.now())
     
     status = Column(
         Enum(DocumentStatus, values_callable=lambda x: [e.value for e in x], name="document_status_enum"),
         default=DocumentStatus.PENDING, 
         nullable=False
-    )
\ No newline at end of file
+    )
+    # Última mudança (status, reingestão): cursor `since` do histórico e ETag do GET /documents.
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        # Histórico paginado por keyset (mais recentes primeiro) e polling de mudanças por tenant.
+        Index("ix_documents_client_uploaded", "client_id", "uploaded_at", "id"),
+        Index("ix_documents_client_updated", "client_id", "updated_at"),
+        Index("ix_documents_client_status", "client_id", "status", "updated_at", "id"),
+    )
+
+
+class EmbeddingCacheEntry(Base):
+    """Embedding já calculado para um texto, indexado pelo hash de (modelo, texto)."""
+    __tablename__ = "embedding_cache"
+
+    content_hash = Column(String(64), primary_key=True)
+    model = Column(String, nullable=False)
+    # Vetor float32 serializado (array('f').tobytes())
+    vector = Column(LargeBinary, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
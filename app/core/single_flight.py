@@ -0,0 +1,100 @@
+"""
+Single-flight para geradores assíncronos: requisições simultâneas com a mesma
+chave compartilham uma única execução do produtor. Quem chega depois recebe os
+pedaços já produzidos e acompanha os seguintes (um stream em andamento pode ser
+assistido por vários assinantes).
+
+Vale por processo e só enquanto a execução está em andamento: terminada, a chave
+é liberada (o cache de respostas atende as repetições seguintes).
+"""
+import asyncio
+from typing import Any, AsyncIterator, Callable, Dict, Hashable, List, Optional
+
+
+class _Flight:
+    """Uma execução em andamento: pedaços produzidos até agora e quantos assinantes a acompanham."""
+    def __init__(self):
+        self.chunks: List[Any] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self.task: Optional[asyncio.Task] = None
+        self.changed = asyncio.Event()
+
+    def notify(self) -> None:
+        # Um Event por mudança: quem já esperava acorda, quem chega depois espera a próxima.
+        changed, self.changed = self.changed, asyncio.Event()
+        changed.set()
+
+
+class SingleFlight:
+    """Deduplica produtores idênticos em andamento (no event loop; não é thread-safe)."""
+    def __init__(self):
+        self._flights: Dict[Hashable, _Flight] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def _run(self, key: Hashable, flight: _Flight, chunks: AsyncIterator[Any]) -> None:
+        try:
+            async for chunk in chunks:
+                flight.chunks.append(chunk)
+                flight.notify()
+        except BaseException as e:
+            flight.error = e
+            if not isinstance(e, Exception):
+                raise
+        finally:
+            # Fecha o produtor já (cancelamento): os `finally` dele rodam agora, não na coleta de lixo.
+            await chunks.aclose()
+            flight.done = True
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+            flight.notify()
+
+    async def subscribe(
+        self,
+        key: Hashable,
+        producer: Callable[[], AsyncIterator[Any]],
+        on_coalesced: Optional[Callable[[], None]] = None,
+    ) -> AsyncIterator[Any]:
+        """
+        Produz os pedaços da execução da chave `key`, iniciando `producer()` se não
+        houver uma em andamento. Erros do produtor são repassados a todos os assinantes;
+        se todos desistirem antes do fim, a execução é cancelada.
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight()
+            self._flights[key] = flight
+            flight.task = asyncio.create_task(self._run(key, flight, producer()))
+            self.leaders += 1
+        else:
+            self.coalesced += 1
+            if on_coalesced is not None:
+                on_coalesced()
+
+        flight.subscribers += 1
+        try:
+            position = 0
+            while True:
+                if position < len(flight.chunks):
+                    position += 1
+                    yield flight.chunks[position - 1]
+                    continue
+                if flight.done:
+                    if isinstance(flight.error, asyncio.CancelledError):
+                        raise RuntimeError("Execução compartilhada cancelada.")
+                    if flight.error is not None:
+                        raise flight.error
+                    return
+                await flight.changed.wait()
+        finally:
+            flight.subscribers -= 1
+            if flight.subscribers == 0 and not flight.done:
+                # Ninguém mais espera o resultado (ex: todos os clientes desconectaram).
+                flight.task.cancel()
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+
+    def stats(self) -> Dict[str, Any]:
+        return {"leaders": self.leaders, "coalesced": self.coalesced, "in_flight": len(self._flights)}
@@ -0,0 +1,225 @@
+import hashlib
+import os
+import re
+from contextlib import nullcontext
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.metrics import StageMetrics, stage_metrics, usage_metrics
+
+# Buckets das latências (segundos) e das quantidades (tokens, textos por chamada de embeddings)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+USAGE_BUCKETS = (1, 10, 50, 100, 250, 500, 1000, 2000, 4000, 8000, 16000)
+CONTEXT_LABELS = ("tenant", "endpoint")
+
+UNMATCHED_ENDPOINT = "unmatched"
+_METRIC_NAME_RE = re.compile(r"[^a-zA-Z0-9_]")
+
+
+def tenant_label(client_id: str) -> str:
+    # O id do tenant é o client_token (credencial do widget): nas métricas vai só um hash curto.
+    return hashlib.sha256(client_id.encode("utf-8")).hexdigest()[:12]
+
+
+def endpoint_label(scope: Dict[str, Any]) -> str:
+    """
+    Template da rota casada pelo roteador (ex: `/api/v1/documents/{document_id}`),
+    nunca o caminho cru: 404s, arquivos de /static e ids não numéricos caem todos em
+    UNMATCHED_ENDPOINT em vez de criar séries novas. Só existe depois do roteamento.
+    """
+    # FastAPI recente guarda o caminho com o prefixo do include_router no contexto efetivo da rota.
+    context = (scope.get("fastapi") or {}).get("effective_route_context")
+    path = getattr(context, "path", None) or getattr(scope.get("route"), "path", None)
+    return path or UNMATCHED_ENDPOINT
+
+
+class PrometheusSink:
+    """
+    Exporta as amostras do StageMetrics/UsageMetrics como histogramas Prometheus:
+    `rag_<etapa>_seconds` para latências e `rag_<nome>` para quantidades (o `_sum`
+    do histograma é o total acumulado, ex: tokens de prompt). Os labels de cada
+    métrica são fixados na primeira amostra: tenant, endpoint e os labels da etapa.
+    """
+    def __init__(self, registry: Any = None, tenant_labels: bool = True):
+        import prometheus_client
+
+        self._prometheus = prometheus_client
+        self.registry = registry or prometheus_client.REGISTRY
+        self.tenant_labels = tenant_labels
+        self._metrics: Dict[Tuple[str, str], Tuple[Any, Tuple[str, ...]]] = {}
+
+    def _metric(self, kind: str, name: str, labels: Dict[str, Any]):
+        key = (kind, name)
+        if key not in self._metrics:
+            base = "rag_" + _METRIC_NAME_RE.sub("_", name)
+            label_names = CONTEXT_LABELS + tuple(sorted(set(labels) - set(CONTEXT_LABELS)))
+            if kind == "latency":
+                metric = self._prometheus.Histogram(
+                    f"{base}_seconds", f"Latência da etapa {name}", label_names,
+                    buckets=LATENCY_BUCKETS, registry=self.registry,
+                )
+            else:
+                metric = self._prometheus.Histogram(
+                    base, f"Quantidade por evento: {name}", label_names,
+                    buckets=USAGE_BUCKETS, registry=self.registry,
+                )
+            self._metrics[key] = (metric, label_names)
+        return self._metrics[key]
+
+    def __call__(self, kind: str, name: str, value: float, labels: Dict[str, Any]) -> None:
+        metric, label_names = self._metric(kind, name, labels)
+        values = dict(labels)
+        if "tenant" in values:
+            values["tenant"] = tenant_label(values["tenant"]) if self.tenant_labels else ""
+        metric.labels(*(str(values.get(label, "")) for label in label_names)).observe(value)
+
+
+class PoolCollector:
+    """Gauges dos pools de conexão do PostgreSQL deste processo (lidos no scrape)."""
+    def collect(self):
+        from prometheus_client.core import GaugeMetricFamily
+
+        from app.core.db import pool_stats
+
+        families = {
+            "checked_out": GaugeMetricFamily("rag_db_pool_checked_out", "Conexões em uso", labels=["pool"]),
+            "checked_in": GaugeMetricFamily("rag_db_pool_checked_in", "Conexões ociosas no pool", labels=["pool"]),
+            "overflow": GaugeMetricFamily("rag_db_pool_overflow", "Conexões de overflow abertas", labels=["pool"]),
+            "timeouts": GaugeMetricFamily("rag_db_pool_timeouts", "Timeouts à espera de conexão", labels=["pool"]),
+        }
+        for pool, stats in pool_stats().items():
+            for field, family in families.items():
+                family.add_metric([pool], stats[field])
+        return list(families.values())
+
+
+_prometheus_sink: Optional[PrometheusSink] = None
+
+
+def setup_metrics(settings: Any) -> Optional[PrometheusSink]:
+    """
+    Liga a exportação Prometheus (METRICS_ENABLED). Idempotente. Com vários processos
+    (uvicorn --workers, Celery prefork) defina PROMETHEUS_MULTIPROC_DIR para que o
+    /metrics agregue as amostras de todos eles.
+    """
+    global _prometheus_sink
+    if not settings.METRICS_ENABLED or _prometheus_sink is not None:
+        return _prometheus_sink
+    try:
+        import prometheus_client
+    except ImportError:
+        print("prometheus-client não instalado: métricas Prometheus desativadas.")
+        return None
+
+    _prometheus_sink = PrometheusSink(tenant_labels=settings.METRICS_TENANT_LABELS)
+    stage_metrics.add_sink(_prometheus_sink)
+    usage_metrics.add_sink(_prometheus_sink)
+    if not os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        # Gauges lidos na hora do scrape não funcionam no modo multiprocesso.
+        prometheus_client.REGISTRY.register(PoolCollector())
+    return _prometheus_sink
+
+
+def _scrape_registry():
+    import prometheus_client
+
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        registry = prometheus_client.CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return prometheus_client.REGISTRY
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Corpo e content-type da exposição Prometheus (todas as amostras deste processo ou do diretório multiprocesso)."""
+    import prometheus_client
+
+    return prometheus_client.generate_latest(_scrape_registry()), prometheus_client.CONTENT_TYPE_LATEST
+
+
+def start_metrics_server(port: int) -> None:
+    """Servidor HTTP do /metrics fora da API (worker Celery)."""
+    import prometheus_client
+
+    prometheus_client.start_http_server(port, registry=_scrape_registry())
+    print(f"Métricas Prometheus em http://0.0.0.0:{port}/metrics")
+
+
+def mark_process_dead(pid: int) -> None:
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR") and _prometheus_sink is not None:
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(pid)
+
+
+_tracer = None
+
+
+def setup_tracing(settings: Any, service_name: str):
+    """
+    Liga o tracing OpenTelemetry (TRACING_ENABLED): cada etapa medida por
+    `stage_metrics.time` vira um span. Exporta via OTLP/gRPC para
+    OTEL_EXPORTER_OTLP_ENDPOINT (ou para o console, se não configurado). Idempotente.
+    """
+    global _tracer
+    if not settings.TRACING_ENABLED or _tracer is not None:
+        return _tracer
+    try:
+        from opentelemetry import trace
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+    except ImportError:
+        print("opentelemetry-sdk não instalado: tracing desativado.")
+        return None
+
+    if settings.OTEL_EXPORTER_OTLP_ENDPOINT:
+        try:
+            from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
+        except ImportError:
+            print("opentelemetry-exporter-otlp não instalado: tracing desativado.")
+            return None
+        exporter = OTLPSpanExporter(endpoint=settings.OTEL_EXPORTER_OTLP_ENDPOINT)
+    else:
+        exporter = ConsoleSpanExporter()
+
+    provider = TracerProvider(resource=Resource.create({"service.name": service_name}))
+    provider.add_span_processor(BatchSpanProcessor(exporter))
+    trace.set_tracer_provider(provider)
+    _tracer = trace.get_tracer("rag")
+    StageMetrics.tracer = _tracer
+    return _tracer
+
+
+def get_tracer():
+    return _tracer
+
+
+def inject_trace_context(carrier: Dict[str, Any]) -> None:
+    """Grava o contexto do span corrente (traceparent) em `carrier` (headers da mensagem Celery)."""
+    if _tracer is None:
+        return
+    from opentelemetry import propagate
+
+    propagate.inject(carrier)
+
+
+def extract_trace_context(getter: Any):
+    """Contexto do span pai a partir de `getter(chave)` (headers HTTP ou da task)."""
+    from opentelemetry import propagate
+
+    carrier = {key: value for key in ("traceparent", "tracestate") if (value := getter(key))}
+    return propagate.extract(carrier)
+
+
+def traced_span(name: str, getter: Any, kind: str = "server"):
+    """
+    Span de entrada (requisição HTTP, task Celery) filho do contexto propagado em
+    `getter(chave)`; sem tracing ativo, um contexto vazio.
+    """
+    if _tracer is None:
+        return nullcontext()
+    from opentelemetry.trace import SpanKind
+
+    return _tracer.start_as_current_span(name, context=extract_trace_context(getter), kind=getattr(SpanKind, kind.upper()))
@@ -1,13 +1,29 @@
-from fastapi import FastAPI
+import time
+
+from fastapi import Depends, FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.endpoints import router as api_router
-from app.core.db import init_db 
+from app.core.config import settings
+from app.core.db import init_db, pool_stats
+from app.core.metrics import bind_labels, metric_context, stage_metrics
+from app.core.telemetry import UNMATCHED_ENDPOINT, endpoint_label, render_metrics, setup_metrics, setup_tracing, traced_span
+from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
 
+metrics_sink = setup_metrics(settings)
+setup_tracing(settings, "rag-api")
+
+
+async def bind_endpoint_label(request: Request):
+    """Label `endpoint` das métricas da requisição: o template da rota, conhecido só depois do roteamento."""
+    bind_labels(endpoint=endpoint_label(request.scope))
+
+
 app = FastAPI(
     title="RAG Fullstack MVP API",
     description="API para o serviço de Chatbot RAG embarcado.",
     version="1.0.0",
+    dependencies=[Depends(bind_endpoint_label)],
 )
 
 app.mount("/static", StaticFiles(directory="client-website"), name="static")
@@ -16,18 +32,59 @@ app.mount("/static", StaticFiles(directory="client-website"), name="static")
 def on_startup():
     print("Criando tabelas DB...")
     init_db()
+    if settings.SERVICE_WARMUP:
+        from app.services.rag_service import rag_service_instance
+
+        print(f"RAGService aquecido (ms por componente): {rag_service_instance.warm_up()}")
 
 origins = [
     "*",
     "http://localhost:8000",
 ]
 
+@app.middleware("http")
+async def observe_request(request: Request, call_next):
+    """Latência por endpoint, labels (endpoint/tenant) para as métricas da requisição e span raiz do trace."""
+    if request.url.path == "/metrics":
+        return await call_next(request)
+    # A rota ainda não foi casada: `bind_endpoint_label` troca o label quando a requisição chega a uma rota.
+    with metric_context(endpoint=UNMATCHED_ENDPOINT), traced_span(f"HTTP {request.method}", request.headers.get) as span:
+        started = time.perf_counter()
+        status = 500
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            return response
+        finally:
+            endpoint = endpoint_label(request.scope)
+            bind_labels(endpoint=endpoint)
+            if span is not None:
+                span.update_name(f"{request.method} {endpoint}")
+            stage_metrics.observe("http_request", time.perf_counter() - started, method=request.method, status=status)
+
+@app.middleware("http")
+async def limit_upload_size(request: Request, call_next):
+    """Recusa uploads (multipart) maiores que UPLOAD_MAX_REQUEST_BYTES pelo Content-Length, antes de ler o corpo."""
+    content_length = request.headers.get("content-length")
+    if (
+        request.headers.get("content-type", "").startswith("multipart/form-data")
+        and content_length and content_length.isdigit()
+        and int(content_length) > settings.UPLOAD_MAX_REQUEST_BYTES
+    ):
+        return JSONResponse(
+            status_code=413,
+            content={"detail": f"Envio maior que o limite de {settings.UPLOAD_MAX_REQUEST_BYTES / (1024 * 1024):g} MB."},
+        )
+    return await call_next(request)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Paginação e polling do histórico de documentos (GET /documents)
+    expose_headers=["ETag", "X-Total-Count", "X-Next-Cursor", "X-Changes-Cursor"],
 )
 
 # Roteador de APIs
@@ -35,4 +92,17 @@ app.include_router(api_router, prefix="/api/v1")
 
 @app.get("/")
 def read_root():
-    return {"message": "RAG MVP API está rodando!"}
\ No newline at end of file
+    return {"message": "RAG MVP API está rodando!"}
+
+@app.get("/health/db")
+def db_pool_health():
+    """Conexões em uso/ociosas, overflow e tempo de espera dos pools deste processo."""
+    return pool_stats()
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Exposição Prometheus: latências por etapa, tokens, chamadas de embeddings e pools de conexão."""
+    if metrics_sink is None:
+        return Response("Métricas desativadas (METRICS_ENABLED ou prometheus-client ausente).", status_code=503)
+    body, content_type = render_metrics()
+    return Response(body, media_type=content_type)
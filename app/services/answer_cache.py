@@ -0,0 +1,344 @@
+import hashlib
+import re
+import threading
+import time
+import unicodedata
+from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Tuple
+
+from app.core.cache import LRUCache
+
+if TYPE_CHECKING:
+    import numpy as np
+
+
+def normalize_query(query: str) -> str:
+    """Normaliza a pergunta para casamento exato (caixa, acentos, espaços e pontuação final)."""
+    text = unicodedata.normalize("NFKD", query.casefold())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    text = re.sub(r"\s+", " ", text).strip()
+    return text.rstrip(" ?!.;:")
+
+
+def _unit(vector: List[float]) -> "np.ndarray":
+    """Vetor normalizado em float32 (numpy importado só quando há embeddings)."""
+    import numpy as np
+
+    array = np.asarray(vector, dtype=np.float32)
+    norm = float(np.linalg.norm(array)) or 1.0
+    return array / norm
+
+
+def _best_match(
+    vector: "np.ndarray", keys: Sequence[str], stored: Sequence["np.ndarray"], threshold: float
+) -> Optional[Tuple[str, float]]:
+    """Chave do vetor mais próximo com cosseno >= threshold (vetores já normalizados)."""
+    import numpy as np
+
+    # Vetores de outra dimensão (ex: troca do modelo de embeddings) são ignorados.
+    candidates = [(key, v) for key, v in zip(keys, stored) if v is not None and v.shape == vector.shape]
+    if not candidates:
+        return None
+    scores = np.stack([v for _, v in candidates]) @ vector
+    best = int(np.argmax(scores))
+    if scores[best] < threshold:
+        return None
+    return candidates[best][0], float(scores[best])
+
+
+class AnswerCacheBackend(ABC):
+    """Interface comum dos backends do cache de respostas (local ou Redis)."""
+
+    @abstractmethod
+    def get_exact(self, tenant: str, key: str) -> Optional[str]:
+        ...
+
+    @abstractmethod
+    def get_similar(self, tenant: str, vector: "np.ndarray", threshold: float) -> Optional[Tuple[str, float]]:
+        ...
+
+    @abstractmethod
+    def put(self, tenant: str, key: str, answer: str, vector: Optional["np.ndarray"]) -> None:
+        ...
+
+    @abstractmethod
+    def invalidate_tenant(self, tenant: str) -> None:
+        ...
+
+
+class LocalAnswerCacheBackend(AnswerCacheBackend):
+    """
+    Backend em processo: cada processo da API tem a sua cópia. A invalidação feita
+    pelo worker Celery chega à API pela versão da collection (`AnswerCache`).
+    """
+    def __init__(
+        self, max_entries_per_tenant: int, ttl_seconds: float, max_tenants: int = 1024, max_candidates: int = 128
+    ):
+        self.max_entries_per_tenant = max_entries_per_tenant
+        self.ttl_seconds = ttl_seconds
+        self.max_candidates = max(1, max_candidates)
+        self._tenants = LRUCache(max_entries=max_tenants)
+
+    def _tenant_cache(self, tenant: str, create: bool = False) -> Optional[LRUCache]:
+        if not create:
+            return self._tenants.get(tenant)
+        return self._tenants.get_or_create(
+            tenant, lambda: LRUCache(self.max_entries_per_tenant, self.ttl_seconds)
+        )
+
+    def get_exact(self, tenant, key):
+        cache = self._tenant_cache(tenant)
+        entry = cache.get(key) if cache else None
+        return entry[0] if entry else None
+
+    def get_similar(self, tenant, vector, threshold):
+        cache = self._tenant_cache(tenant)
+        if not cache:
+            return None
+        # Só as respostas usadas mais recentemente (items() vai da menos para a mais recente).
+        recent = cache.items()[-self.max_candidates:]
+        match = _best_match(vector, [key for key, _ in recent], [entry[1] for _, entry in recent], threshold)
+        if match is None:
+            return None
+        entry = cache.get(match[0])
+        return (entry[0], match[1]) if entry else None
+
+    def put(self, tenant, key, answer, vector):
+        self._tenant_cache(tenant, create=True).put(key, (answer, vector))
+
+    def invalidate_tenant(self, tenant):
+        self._tenants.invalidate(tenant)
+
+
+class RedisAnswerCacheBackend(AnswerCacheBackend):
+    """
+    Backend compartilhado entre processos. Por escopo (`{tenant}@{versão}`) mantém:
+      - `answer_cache:{tenant}:a` (hash key -> resposta)
+      - `answer_cache:{tenant}:v` (hash key -> vetor float32 em bytes)
+      - `answer_cache:{tenant}:lru` (sorted set key -> último acesso)
+    O TTL é renovado a cada escrita e o LRU é aplicado pelo sorted set. A busca por
+    similaridade lê só os vetores das `max_candidates` respostas mais recentes.
+    """
+    PREFIX = "answer_cache"
+
+    def __init__(self, redis_client: Any, max_entries_per_tenant: int, ttl_seconds: float, max_candidates: int = 128):
+        self.redis = redis_client
+        self.max_entries_per_tenant = max_entries_per_tenant
+        self.ttl_seconds = int(ttl_seconds)
+        self.max_candidates = max(1, max_candidates)
+
+    def _keys(self, tenant: str) -> Tuple[str, str, str]:
+        base = f"{self.PREFIX}:{tenant}"
+        return f"{base}:a", f"{base}:v", f"{base}:lru"
+
+    def _expired_before(self) -> float:
+        return time.time() - self.ttl_seconds
+
+    def _touch(self, tenant: str, key: str) -> None:
+        self.redis.zadd(self._keys(tenant)[2], {key: time.time()})
+
+    def _is_fresh(self, tenant: str, key: str) -> bool:
+        score = self.redis.zscore(self._keys(tenant)[2], key)
+        return score is not None and score >= self._expired_before()
+
+    def get_exact(self, tenant, key):
+        answers_key = self._keys(tenant)[0]
+        answer = self.redis.hget(answers_key, key)
+        if answer is None or not self._is_fresh(tenant, key):
+            return None
+        self._touch(tenant, key)
+        return answer.decode() if isinstance(answer, bytes) else answer
+
+    def get_similar(self, tenant, vector, threshold):
+        import numpy as np
+
+        _, vectors_key, lru_key = self._keys(tenant)
+        keys = [
+            k.decode() if isinstance(k, bytes) else k
+            for k in self.redis.zrevrangebyscore(
+                lru_key, "+inf", self._expired_before(), start=0, num=self.max_candidates
+            )
+        ]
+        if not keys:
+            return None
+        stored = [
+            np.frombuffer(raw, dtype=np.float32) if raw is not None else None
+            for raw in self.redis.hmget(vectors_key, keys)
+        ]
+        match = _best_match(vector, keys, stored, threshold)
+        if match is None:
+            return None
+        answer = self.get_exact(tenant, match[0])
+        return (answer, match[1]) if answer is not None else None
+
+    def put(self, tenant, key, answer, vector):
+        answers_key, vectors_key, lru_key = self._keys(tenant)
+        pipe = self.redis.pipeline()
+        pipe.hset(answers_key, key, answer)
+        if vector is not None:
+            pipe.hset(vectors_key, key, vector.astype("float32").tobytes())
+        pipe.zadd(lru_key, {key: time.time()})
+        for k in (answers_key, vectors_key, lru_key):
+            pipe.expire(k, self.ttl_seconds)
+        pipe.execute()
+        self._evict(tenant)
+
+    def _evict(self, tenant: str) -> None:
+        answers_key, vectors_key, lru_key = self._keys(tenant)
+        stale = self.redis.zrangebyscore(lru_key, "-inf", f"({self._expired_before()}")
+        overflow = self.redis.zcard(lru_key) - len(stale) - self.max_entries_per_tenant
+        if overflow > 0:
+            stale += self.redis.zrange(lru_key, len(stale), len(stale) + overflow - 1)
+        if stale:
+            pipe = self.redis.pipeline()
+            pipe.hdel(answers_key, *stale)
+            pipe.hdel(vectors_key, *stale)
+            pipe.zrem(lru_key, *stale)
+            pipe.execute()
+
+    def invalidate_tenant(self, tenant):
+        self.redis.delete(*self._keys(tenant))
+
+
+class AnswerCache:
+    """
+    Cache de respostas por tenant: casamento exato pela pergunta normalizada e,
+    opcionalmente, casamento aproximado por similaridade de embeddings.
+
+    Cada operação recebe a versão da collection do tenant (`CollectionVersions`),
+    lida pelo chamador no início da requisição. As entradas ficam no escopo
+    `{tenant}@{versão}`: depois de uma ingestão ou exclusão (em qualquer processo)
+    as perguntas novas não encontram as respostas antigas, e uma resposta gerada
+    sob uma versão já superada não é gravada. `version=None` (versão indisponível)
+    desliga o cache na requisição.
+    """
+    def __init__(self, backend: AnswerCacheBackend, similarity_threshold: float = 0.0, max_tenants: int = 4096):
+        self.backend = backend
+        self.similarity_threshold = similarity_threshold
+        # Última versão vista de cada tenant neste processo: o escopo anterior é descartado ao mudar.
+        self._versions = LRUCache(max_entries=max_tenants)
+        self._versions_lock = threading.Lock()
+        self.lookups = 0
+        self.exact_hits = 0
+        self.semantic_hits = 0
+
+    @property
+    def semantic_enabled(self) -> bool:
+        return 0 < self.similarity_threshold <= 1
+
+    @staticmethod
+    def key_for(query: str) -> str:
+        return hashlib.sha1(normalize_query(query).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _scope_name(tenant: str, version: int) -> str:
+        return f"{tenant}@{version}"
+
+    def _scope(self, tenant: str, version: Optional[int]) -> Optional[str]:
+        """Escopo do tenant na versão `version`; None se ela é desconhecida ou já foi superada."""
+        if version is None:
+            return None
+        with self._versions_lock:
+            seen = self._versions.get(tenant)
+            if seen is None or version > seen:
+                self._versions.put(tenant, version)
+        if seen is not None and version < seen:
+            return None
+        if seen is not None and version > seen:
+            self._drop(self._scope_name(tenant, seen))
+        return self._scope_name(tenant, version)
+
+    def _drop(self, scope: str) -> None:
+        try:
+            self.backend.invalidate_tenant(scope)
+        except Exception as e:
+            print(f"Erro ao invalidar cache de respostas ({scope}): {e}")
+
+    def lookup_exact(self, tenant: str, query: str, version: Optional[int]) -> Optional[str]:
+        """Busca pela pergunta normalizada (não exige embedding)."""
+        self.lookups += 1
+        scope = self._scope(tenant, version)
+        if scope is None:
+            return None
+        try:
+            answer = self.backend.get_exact(scope, self.key_for(query))
+        except Exception as e:
+            print(f"Erro ao consultar cache de respostas: {e}")
+            return None
+        if answer is not None:
+            self.exact_hits += 1
+        return answer
+
+    def lookup_similar(self, tenant: str, vector: List[float], version: Optional[int]) -> Optional[str]:
+        """Busca aproximada pelo embedding da pergunta, acima do limiar configurado."""
+        scope = self._scope(tenant, version)
+        if not self.semantic_enabled or scope is None:
+            return None
+        try:
+            match = self.backend.get_similar(scope, _unit(vector), self.similarity_threshold)
+        except Exception as e:
+            print(f"Erro ao consultar cache de respostas: {e}")
+            return None
+        if match is None:
+            return None
+        self.semantic_hits += 1
+        return match[0]
+
+    def store(
+        self, tenant: str, query: str, answer: str, vector: Optional[List[float]], version: Optional[int]
+    ) -> None:
+        """Grava a resposta gerada sob `version` (a lida antes da busca, não a atual). Respostas vazias não entram."""
+        if not answer or not answer.strip():
+            return
+        scope = self._scope(tenant, version)
+        if scope is None:
+            return
+        try:
+            self.backend.put(scope, self.key_for(query), answer, _unit(vector) if vector else None)
+        except Exception as e:
+            print(f"Erro ao gravar no cache de respostas: {e}")
+
+    def invalidate(self, tenant: str) -> None:
+        """
+        Libera já o escopo visto por este processo. As demais réplicas descartam o
+        seu ao ler a versão nova (o chamador incrementa a versão antes).
+        """
+        seen = self._versions.get(tenant)
+        if seen is not None:
+            self._drop(self._scope_name(tenant, seen))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": type(self.backend).__name__,
+            "lookups": self.lookups,
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.lookups - self.exact_hits - self.semantic_hits,
+        }
+
+
+def build_answer_cache(settings: Any) -> Optional[AnswerCache]:
+    """Cria o cache de respostas conforme `ANSWER_CACHE_BACKEND` ('local', 'redis' ou 'none')."""
+    backend_name = (settings.ANSWER_CACHE_BACKEND or "none").lower()
+    if backend_name == "none":
+        return None
+
+    if backend_name == "redis":
+        import redis
+
+        backend = RedisAnswerCacheBackend(
+            redis.Redis.from_url(settings.ANSWER_CACHE_REDIS_URL or settings.CELERY_REDIS_DSN),
+            max_entries_per_tenant=settings.ANSWER_CACHE_MAX_ENTRIES_PER_TENANT,
+            ttl_seconds=settings.ANSWER_CACHE_TTL_SECONDS,
+            max_candidates=settings.ANSWER_CACHE_SIMILARITY_MAX_CANDIDATES,
+        )
+    elif backend_name == "local":
+        backend = LocalAnswerCacheBackend(
+            max_entries_per_tenant=settings.ANSWER_CACHE_MAX_ENTRIES_PER_TENANT,
+            ttl_seconds=settings.ANSWER_CACHE_TTL_SECONDS,
+            max_candidates=settings.ANSWER_CACHE_SIMILARITY_MAX_CANDIDATES,
+        )
+    else:
+        raise ValueError(f"ANSWER_CACHE_BACKEND desconhecido: {settings.ANSWER_CACHE_BACKEND}")
+
+    return AnswerCache(backend, similarity_threshold=settings.ANSWER_CACHE_SIMILARITY_THRESHOLD)
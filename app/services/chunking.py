@@ -0,0 +1,353 @@
+"""
+Divisão dos documentos em chunks na ingestão, medida em tokens (tiktoken; sem ele,
+estimativa de ~4 caracteres por token).
+
+Estratégias registradas (CHUNK_STRATEGY ou a coluna `chunk_strategy` do Client):
+  - structure:  detecta títulos, listas e tabelas no texto da página e monta os
+                chunks por blocos: tabelas e listas não são cortadas no meio de uma
+                linha/item (partes de uma tabela repetem o cabeçalho) e cada chunk
+                leva o título da seção (também em metadata["section"]);
+  - tokens:     corte recursivo (parágrafo, linha, frase, palavra) por tokens;
+  - characters: o corte por caracteres anterior (~4 caracteres por token).
+
+Estratégias de fora do projeto podem ser registradas com `register_splitter` ou
+indicadas como "pacote.modulo:fabrica". A fábrica recebe um `ChunkingConfig` e o
+modelo do tokenizer e retorna um objeto com `split_documents(documentos)`.
+"""
+import importlib
+import re
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
+
+from app.services.tokenizer import count_tokens
+
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
+
+# Conversão usada pela estratégia 'characters' (tamanhos configurados em tokens).
+CHARS_PER_TOKEN = 4
+
+_registry: Dict[str, Callable[..., Any]] = {}
+
+
+class ChunkingConfig:
+    """Parâmetros efetivos da divisão (padrão de Settings ou sobrescritos pelo Client)."""
+    def __init__(self, strategy: str, chunk_tokens: int, overlap_tokens: int, min_tokens: int = 0):
+        self.strategy = strategy
+        self.chunk_tokens = max(16, chunk_tokens)
+        self.overlap_tokens = min(max(0, overlap_tokens), self.chunk_tokens // 2)
+        self.min_tokens = min(max(0, min_tokens), self.chunk_tokens)
+
+    def key(self) -> Tuple[str, int, int, int]:
+        return (self.strategy, self.chunk_tokens, self.overlap_tokens, self.min_tokens)
+
+    def __repr__(self):
+        return f"ChunkingConfig{self.key()}"
+
+
+def register_splitter(name: str):
+    """Decorador que registra `fabrica(config, model)` como a estratégia `name`."""
+    def decorator(factory: Callable[..., Any]) -> Callable[..., Any]:
+        _registry[name] = factory
+        return factory
+    return decorator
+
+
+def available_splitters() -> List[str]:
+    return sorted(_registry)
+
+
+def _factory(strategy: str) -> Optional[Callable[..., Any]]:
+    factory = _registry.get(strategy)
+    if factory is None and ":" in strategy:
+        module_name, attribute = strategy.split(":", 1)
+        factory = getattr(importlib.import_module(module_name), attribute)
+    return factory
+
+
+def create_splitter(config: ChunkingConfig, model: Optional[str] = None) -> Any:
+    factory = _factory(config.strategy)
+    if factory is None:
+        raise ValueError(
+            f"Estratégia de chunking inválida: {config.strategy} (use {', '.join(available_splitters())} ou 'modulo:fabrica')"
+        )
+    return factory(config, model)
+
+
+def resolve_chunking(settings: Any, client: Any = None) -> ChunkingConfig:
+    """Config do tenant: colunas chunk_* do Client (NULL = padrão de Settings)."""
+    def pick(column: str, default: Any) -> Any:
+        value = getattr(client, column, None) if client is not None else None
+        return default if value is None else value
+
+    strategy = pick("chunk_strategy", settings.CHUNK_STRATEGY)
+    try:
+        known = _factory(strategy) is not None
+    except (ImportError, AttributeError):
+        known = False
+    if not known:
+        # Valor inválido no cadastro do cliente não impede a ingestão.
+        print(f"Estratégia de chunking desconhecida ({strategy}); usando {settings.CHUNK_STRATEGY}.")
+        strategy = settings.CHUNK_STRATEGY
+    return ChunkingConfig(
+        strategy,
+        chunk_tokens=pick("chunk_tokens", settings.CHUNK_TOKENS),
+        overlap_tokens=pick("chunk_overlap_tokens", settings.CHUNK_OVERLAP_TOKENS),
+        min_tokens=settings.CHUNK_MIN_TOKENS,
+    )
+
+
+def _token_splitter(config: ChunkingConfig, model: Optional[str]):
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    return RecursiveCharacterTextSplitter(
+        chunk_size=config.chunk_tokens,
+        chunk_overlap=config.overlap_tokens,
+        length_function=lambda text: count_tokens(text, model),
+        separators=["\n\n", "\n", ". ", " ", ""],
+    )
+
+
+@register_splitter("characters")
+def _characters(config: ChunkingConfig, model: Optional[str]) -> Any:
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    return RecursiveCharacterTextSplitter(
+        chunk_size=config.chunk_tokens * CHARS_PER_TOKEN,
+        chunk_overlap=config.overlap_tokens * CHARS_PER_TOKEN,
+        separators=["\n\n", "\n", ".", " ", ""],
+    )
+
+
+@register_splitter("tokens")
+def _tokens(config: ChunkingConfig, model: Optional[str]) -> Any:
+    return _token_splitter(config, model)
+
+
+@register_splitter("structure")
+def _structure(config: ChunkingConfig, model: Optional[str]) -> Any:
+    return StructureSplitter(config, model)
+
+
+# Títulos: "Capítulo 3", "Seção 2 - Instalação", "4.2 Manutenção preventiva", "ANEXO I".
+_HEADING_KEYWORD = re.compile(r"^(cap[ií]tulo|se[cç][aã]o|parte|anexo|ap[eê]ndice|t[ií]tulo)\b", re.IGNORECASE)
+_NUMBERED_HEADING = re.compile(r"^\d+(\.\d+)*\.?\s+[A-ZÁÉÍÓÚÂÊÔÃÕÇ]")
+# Legendas ("Tabela 2 - Modelos"): ficam com o bloco seguinte, sem abrir seção nova.
+_CAPTION = re.compile(r"^(tabela|quadro|figura)\s+\d+", re.IGNORECASE)
+# Itens de lista: marcadores ou "a)", "1.", "(ii)".
+_LIST_ITEM = re.compile(r"^\s*([-•*▪●◦–·]|\(?[a-z0-9]{1,3}[.)])\s+", re.IGNORECASE)
+# Células: "R$ 1.500,00", "220V", "10%", "3/4", "12x".
+_NUMERIC_CELL = re.compile(r"^[-+(R$]*\d[\d.,:/%x×-]*[a-zA-Z%)]{0,3}$")
+
+HEADING, CAPTION, LIST, TABLE, PARAGRAPH = "heading", "caption", "list", "table", "paragraph"
+
+
+def _is_heading(line: str) -> bool:
+    words = line.split()
+    if not words or len(words) > 12 or len(line) > 100 or line[-1] in ".;,":
+        return False
+    letters = [c for c in line if c.isalpha()]
+    return bool(
+        _HEADING_KEYWORD.match(line)
+        or _NUMBERED_HEADING.match(line)
+        or (len(letters) >= 4 and line.isupper())
+    )
+
+
+def _is_table_row(line: str) -> bool:
+    if line.count("|") >= 2 or "\t" in line:
+        return True
+    if len(re.split(r"\s{2,}", line)) >= 3:
+        return True
+    cells = line.split()
+    numeric = sum(1 for cell in cells if _NUMERIC_CELL.match(cell))
+    return len(cells) >= 3 and numeric * 2 >= len(cells)
+
+
+def detect_blocks(text: str) -> List[Tuple[str, List[str]]]:
+    """Blocos (tipo, linhas) do texto de uma página: títulos, legendas, listas, tabelas (2+ linhas) e parágrafos."""
+    blocks: List[Tuple[str, List[str]]] = []
+
+    def add(kind: str, line: str) -> None:
+        if blocks and blocks[-1][0] == kind and kind not in (HEADING, CAPTION):
+            blocks[-1][1].append(line)
+        else:
+            blocks.append((kind, [line]))
+
+    for raw in text.splitlines():
+        line = raw.strip()
+        if not line:
+            # Linha em branco encerra o bloco atual.
+            if blocks and blocks[-1][1]:
+                blocks.append((PARAGRAPH, []))
+            continue
+        if _is_table_row(line):
+            add(TABLE, line)
+        elif _CAPTION.match(line) and len(line) <= 100:
+            add(CAPTION, line)
+        elif _is_heading(line):
+            add(HEADING, line)
+        elif _LIST_ITEM.match(line):
+            add(LIST, line)
+        elif blocks and blocks[-1][0] == LIST and blocks[-1][1]:
+            # Continuação de um item quebrado pelo extrator (juntada ao item no fim).
+            blocks[-1][1].append(line)
+        else:
+            add(PARAGRAPH, line)
+
+    result = []
+    for kind, lines in blocks:
+        if not lines:
+            continue
+        if kind == TABLE and len(lines) < 2:
+            kind = PARAGRAPH
+        if result and kind == PARAGRAPH and result[-1][0] == PARAGRAPH:
+            result[-1][1].extend(lines)
+            continue
+        if kind == TABLE and result and result[-1][0] in (PARAGRAPH, LIST):
+            # Cabeçalho sem números (ex: "Modelo Tensão Potência"): a linha anterior com
+            # tantas palavras quanto as células da tabela vai para a tabela.
+            previous = result[-1][1][-1]
+            if len(previous.split()) == len(lines[0].split()) and not _LIST_ITEM.match(previous):
+                lines.insert(0, result[-1][1].pop())
+                if not result[-1][1]:
+                    result.pop()
+        if kind == LIST and result and result[-1][0] == PARAGRAPH and result[-1][1][-1].endswith(":"):
+            # Frase de introdução ("Itens verificados:") fica com a lista.
+            lines.insert(0, result[-1][1].pop())
+            if not result[-1][1]:
+                result.pop()
+        result.append((kind, lines))
+
+    for kind, lines in result:
+        if kind == LIST:
+            items = []
+            for line in lines:
+                if items and not _LIST_ITEM.match(line):
+                    items[-1] += " " + line
+                else:
+                    items.append(line)
+            lines[:] = items
+    return result
+
+
+class StructureSplitter:
+    """
+    Chunks por blocos de layout, até `chunk_tokens` tokens. Seções curtas (menos de
+    `min_tokens`) são juntadas à seguinte; blocos maiores que um chunk são divididos
+    por linha de tabela, item de lista ou, em parágrafos, pelo corte por tokens.
+    """
+    def __init__(self, config: ChunkingConfig, model: Optional[str] = None):
+        self.config = config
+        self.model = model
+        self._fallback = _token_splitter(config, model)
+
+    def _tokens(self, text: str) -> int:
+        return count_tokens(text, self.model)
+
+    def _pack_lines(self, lines: List[str], header: Optional[str] = None, room: Optional[int] = None) -> List[str]:
+        """
+        Agrupa linhas inteiras em partes de até `chunk_tokens` (com o cabeçalho repetido
+        em cada parte). Com `room`, a primeira parte cabe no espaço que sobra no chunk atual.
+        """
+        header_tokens = self._tokens(header) + 1 if header else 0
+        full_budget = max(16, self.config.chunk_tokens - header_tokens)
+        budget = room - header_tokens if room is not None else full_budget
+        parts, current, used = [], [], 0
+        for line in lines:
+            tokens = self._tokens(line) + 1
+            if tokens > full_budget:
+                # Linha sozinha maior que o chunk: só aqui o corte cai no meio.
+                pieces = self._fallback.split_text(line)
+            else:
+                pieces = [line]
+            for piece in pieces:
+                piece_tokens = tokens if len(pieces) == 1 else self._tokens(piece) + 1
+                if used + piece_tokens > budget and (current or budget < full_budget):
+                    parts.append(current)
+                    current, used, budget = [], 0, full_budget
+                current.append(piece)
+                used += piece_tokens
+        if current:
+            parts.append(current)
+        return ["\n".join(([header] if header else []) + part) for part in parts if part]
+
+    def _pieces(self, kind: str, lines: List[str], room: Optional[int] = None) -> List[str]:
+        text = "\n".join(lines)
+        if self._tokens(text) <= self.config.chunk_tokens:
+            return [text]
+        # Tabela ou lista maior que um chunk: a primeira parte completa o chunk atual
+        # se ainda sobra espaço razoável nele.
+        room = room if room is not None and room >= max(self.config.min_tokens, 16) else None
+        if kind == TABLE:
+            return self._pack_lines(lines[1:], header=lines[0], room=room)
+        if kind == LIST:
+            return self._pack_lines(lines, room=room)
+        return self._fallback.split_text(text)
+
+    def split_text_with_sections(self, text: str) -> List[Tuple[str, str]]:
+        """(seção, texto) de cada chunk."""
+        limit = self.config.chunk_tokens
+        chunks: List[Tuple[str, str]] = []
+        # Seção atual e a seção do primeiro bloco de conteúdo do chunk em montagem.
+        section = chunk_section = ""
+        current: List[str] = []
+        used = body = 0
+
+        def flush():
+            nonlocal current, used, body
+            if body:
+                chunks.append((chunk_section, "\n\n".join(current)))
+            elif current and chunks:
+                # Só títulos (fim da página): vão para o chunk anterior.
+                last_section, last_text = chunks[-1]
+                chunks[-1] = (last_section, last_text + "\n\n" + "\n\n".join(current))
+            elif current:
+                chunks.append((section, "\n\n".join(current)))
+            current, used, body = [], 0, 0
+
+        trailing = 0  # títulos no fim do chunk em montagem, ainda sem conteúdo depois deles
+        for kind, lines in detect_blocks(text):
+            if kind in (HEADING, CAPTION):
+                if kind == HEADING:
+                    if body >= self.config.min_tokens:
+                        flush()
+                    section = lines[0]
+                current.append(lines[0])
+                used += self._tokens(lines[0]) + 2
+                trailing += 1
+                continue
+
+            for piece in self._pieces(kind, lines, room=limit - used if body else None):
+                tokens = self._tokens(piece) + 2
+                if body and used + tokens > limit:
+                    # Títulos pendentes abrem o chunk seguinte; sem eles, o título da seção
+                    # é repetido (continuação da seção).
+                    carried = current[len(current) - trailing:] if trailing else ([section] if section else [])
+                    if trailing:
+                        del current[len(current) - trailing:]
+                    flush()
+                    current = carried
+                    used = sum(self._tokens(line) + 2 for line in carried)
+                if not body:
+                    chunk_section = section
+                current.append(piece)
+                used += tokens
+                body += tokens
+                trailing = 0
+        flush()
+        return chunks
+
+    def split_text(self, text: str) -> List[str]:
+        return [chunk for _, chunk in self.split_text_with_sections(text)]
+
+    def split_documents(self, documents: List["Document"]) -> List["Document"]:
+        from langchain_core.documents import Document
+
+        chunks = []
+        for document in documents:
+            for section, text in self.split_text_with_sections(document.page_content):
+                metadata = dict(document.metadata)
+                if section:
+                    metadata["section"] = section
+                chunks.append(Document(page_content=text, metadata=metadata))
+        return chunks
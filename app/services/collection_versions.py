@@ -0,0 +1,50 @@
+from collections import Counter
+from typing import Any
+
+
+class CollectionVersions:
+    """
+    Versão da collection de cada tenant, incrementada a cada ingestão ou exclusão.
+
+    A invalidação acontece no worker Celery e as consultas na API: com Redis, a
+    versão é um contador compartilhado (`collection_version:{tenant}`) lido pela API
+    a cada pergunta, e o que foi cacheado sob uma versão antiga deixa de ser usado
+    em todos os processos. Sem Redis (`local`) o contador vale só para o processo,
+    o que serve apenas para desenvolvimento com API e ingestão no mesmo processo.
+    """
+    PREFIX = "collection_version"
+
+    def __init__(self, redis_client: Any = None):
+        self.redis = redis_client
+        self._local = Counter()
+
+    def get(self, tenant: str) -> int:
+        """Versão atual do tenant. Erros do Redis são propagados (o chamador decide se usa cache)."""
+        if self.redis is None:
+            return self._local[tenant]
+        value = self.redis.get(f"{self.PREFIX}:{tenant}")
+        return int(value) if value is not None else 0
+
+    def bump(self, tenant: str) -> None:
+        if self.redis is None:
+            self._local[tenant] += 1
+            return
+        try:
+            self.redis.incr(f"{self.PREFIX}:{tenant}")
+        except Exception as e:
+            print(f"Erro ao incrementar a versão da collection do tenant {tenant}: {e}")
+
+
+def build_collection_versions(settings: Any) -> CollectionVersions:
+    """Cria o contador conforme `COLLECTION_VERSIONS_BACKEND` ('redis' ou 'local')."""
+    backend_name = (settings.COLLECTION_VERSIONS_BACKEND or "local").lower()
+    if backend_name == "local":
+        return CollectionVersions()
+    if backend_name != "redis":
+        raise ValueError(f"COLLECTION_VERSIONS_BACKEND desconhecido: {settings.COLLECTION_VERSIONS_BACKEND}")
+
+    import redis
+
+    return CollectionVersions(
+        redis.Redis.from_url(settings.COLLECTION_VERSIONS_REDIS_URL or settings.CELERY_REDIS_DSN)
+    )
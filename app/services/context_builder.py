@@ -0,0 +1,119 @@
+import re
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from app.services.keyword_index import keyword_tokens
+from app.services.tokenizer import count_tokens, truncate_tokens
+
+_SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?;:])\s+|\n+")
+_SEPARATOR = "\n\n"
+
+
+def clean_text(text: str) -> str:
+    """Remove espaços redundantes e hifenização de quebra de linha vindos da extração do PDF."""
+    text = re.sub(r"(\w)-\n(\w)", r"\1\2", text)
+    text = re.sub(r"[ \t]+", " ", text)
+    text = re.sub(r" ?\n ?", "\n", text)
+    return re.sub(r"\n{3,}", "\n\n", text).strip()
+
+
+def strip_overlap(text: str, previous: str, min_overlap: int = 20) -> Optional[str]:
+    """
+    Remove de `text` o trecho que já aparece em `previous` (o `chunk_overlap` entre
+    chunks vizinhos, no início ou no fim). Retorna None se `text` estiver todo contido.
+    """
+    if text in previous:
+        return None
+    if len(text) < min_overlap or len(previous) < min_overlap:
+        return text
+
+    # Início de `text` == fim de `previous` (chunk seguinte do mesmo trecho)
+    head = text[:min_overlap]
+    start = previous.find(head)
+    while start != -1:
+        if text.startswith(previous[start:]):
+            text = text[len(previous) - start:].lstrip()
+            break
+        start = previous.find(head, start + 1)
+
+    # Fim de `text` == início de `previous` (chunk anterior do mesmo trecho)
+    tail = previous[:min_overlap]
+    end = text.rfind(tail)
+    while end != -1:
+        if previous.startswith(text[end:]):
+            text = text[:end].rstrip()
+            break
+        end = text.rfind(tail, 0, end)
+    return text or None
+
+
+class ContextBuilder:
+    """
+    Monta o contexto do prompt a partir dos chunks recuperados (em ordem de relevância),
+    preenchendo um orçamento de tokens em vez de um número fixo de chunks: limpa o texto,
+    descarta a sobreposição entre chunks e, no chunk que não cabe inteiro, mantém só as
+    frases mais ligadas à pergunta.
+    """
+    def __init__(
+        self,
+        max_tokens: int = 1000,
+        min_chunk_tokens: int = 50,
+        min_overlap_chars: int = 20,
+        model: Optional[str] = None,
+    ):
+        self.max_tokens = max_tokens
+        self.min_chunk_tokens = min_chunk_tokens
+        self.min_overlap_chars = min_overlap_chars
+        self.model = model
+
+    def _compress(self, text: str, query_terms: set, budget: int) -> str:
+        """Mantém as frases com mais termos da pergunta que couberem em `budget` (na ordem original)."""
+        sentences = [s.strip() for s in _SENTENCE_SPLIT_RE.split(text) if s and s.strip()]
+        ranked = sorted(
+            range(len(sentences)),
+            key=lambda i: (-len(query_terms.intersection(keyword_tokens(sentences[i]))), i),
+        )
+        chosen, used = [], 0
+        for index in ranked:
+            tokens = count_tokens(sentences[index], self.model) + 1
+            if used + tokens <= budget:
+                chosen.append(index)
+                used += tokens
+        if not chosen:
+            return truncate_tokens(sentences[ranked[0]], budget, self.model) if sentences else ""
+        return " ".join(sentences[i] for i in sorted(chosen))
+
+    def build(self, query: str, docs: Sequence[Any]) -> Tuple[str, Dict[str, int]]:
+        """Retorna (contexto, estatísticas de tokens/chunks da montagem)."""
+        query_terms = set(keyword_tokens(query))
+        separator_tokens = count_tokens(_SEPARATOR, self.model)
+        parts: List[str] = []
+        stats = {"chunks_in": len(docs), "chunks_used": 0, "duplicates": 0, "compressed": 0, "raw_tokens": 0, "tokens": 0}
+
+        for doc in docs:
+            remaining = self.max_tokens - stats["tokens"] - (separator_tokens if parts else 0)
+            if remaining < self.min_chunk_tokens:
+                break
+
+            text = clean_text(doc.page_content)
+            stats["raw_tokens"] += count_tokens(doc.page_content, self.model)
+            for previous in parts:
+                text = strip_overlap(text, previous, self.min_overlap_chars)
+                if text is None:
+                    break
+            if not text:
+                stats["duplicates"] += 1
+                continue
+
+            tokens = count_tokens(text, self.model)
+            if tokens > remaining:
+                text = self._compress(text, query_terms, remaining)
+                if not text:
+                    continue
+                tokens = count_tokens(text, self.model)
+                stats["compressed"] += 1
+
+            parts.append(text)
+            stats["chunks_used"] += 1
+            stats["tokens"] += tokens + (separator_tokens if len(parts) > 1 else 0)
+
+        return _SEPARATOR.join(parts), stats
@@ -0,0 +1,244 @@
+"""
+Memória de conversa do /chat por sessão (`session_id` enviado pelo widget).
+
+Cada sessão guarda um resumo dos turnos antigos e os últimos turnos na íntegra
+(perguntas e respostas cortadas em CONVERSATION_TURN_MAX_TOKENS). Acima de
+CONVERSATION_MAX_TURNS, os turnos mais antigos são resumidos pela LLM e só os
+CONVERSATION_KEEP_TURNS mais recentes continuam inteiros: o histórico que vai ao
+prompt tem tamanho limitado, qualquer que seja a duração da conversa.
+
+Antes da busca, uma pergunta que depende do histórico ("e o prazo disso?") é
+reescrita como pergunta independente; é ela que vai ao retriever, ao prompt e ao
+cache de respostas. As sessões expiram após CONVERSATION_TTL_SECONDS sem uso.
+"""
+import hashlib
+import json
+import re
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.cache import LRUCache
+from app.services.tokenizer import count_tokens, truncate_tokens
+
+CONDENSE_MODES = ("auto", "always")
+
+# Referências ao que já foi dito: a pergunta não se sustenta sem o histórico.
+_FOLLOW_UP = re.compile(
+    r"\b(isso|isto|disso|nisso|desse|dessa|deste|desta|nesse|nessa|esse|essa|esses|essas|este|esta|"
+    r"ele|ela|eles|elas|dele|dela|deles|delas|nele|nela|mesmo|mesma|tamb[eé]m|anterior|acima|"
+    r"aquele|aquela|aquilo|qual deles|qual delas)\b",
+    re.IGNORECASE,
+)
+# Continuações: "E para peças?", "Mas e o frete?", "Então quanto custa?"
+_CONTINUATION = re.compile(r"^\s*(e|mas|ent[aã]o|e\s+se)\b", re.IGNORECASE)
+
+
+def needs_condensing(question: str) -> bool:
+    """Heurística do modo 'auto': perguntas curtas ou com referências ao histórico são reescritas."""
+    return (
+        len(question.split()) <= 4
+        or bool(_CONTINUATION.match(question))
+        or bool(_FOLLOW_UP.search(question))
+    )
+
+
+def _session_key(client_id: str, session_id: str) -> str:
+    # O tenant entra na chave: um session_id não dá acesso à conversa de outro cliente.
+    return hashlib.sha256(f"{client_id}\n{session_id}".encode("utf-8")).hexdigest()
+
+
+class ConversationState:
+    """Histórico de uma sessão: resumo dos turnos antigos e turnos recentes ({"n", "question", "answer"})."""
+    def __init__(self, summary: str = "", turns: Optional[List[Dict[str, Any]]] = None, next_turn: int = 1):
+        self.summary = summary
+        self.turns = turns or []
+        self.next_turn = next_turn
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"summary": self.summary, "turns": self.turns, "next_turn": self.next_turn}
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> "ConversationState":
+        if not data:
+            return cls()
+        return cls(data.get("summary", ""), data.get("turns", []), data.get("next_turn", 1))
+
+
+class ConversationStore(ABC):
+    """Interface comum dos backends de sessões (local ou Redis)."""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def put(self, key: str, state: Dict[str, Any]) -> None:
+        ...
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        ...
+
+
+class LocalConversationStore(ConversationStore):
+    """Sessões em memória (por processo), com LRU e TTL renovado a cada turno."""
+    def __init__(self, max_sessions: int, ttl_seconds: float):
+        self._sessions = LRUCache(max_entries=max_sessions, ttl_seconds=ttl_seconds)
+
+    def get(self, key):
+        return self._sessions.get(key)
+
+    def put(self, key, state):
+        self._sessions.put(key, state)
+
+    def delete(self, key):
+        self._sessions.invalidate(key)
+
+
+class RedisConversationStore(ConversationStore):
+    """Sessões no Redis (JSON com TTL), compartilhadas entre os processos da API."""
+    PREFIX = "conversation"
+
+    def __init__(self, redis_client: Any, ttl_seconds: float):
+        self.redis = redis_client
+        self.ttl_seconds = int(ttl_seconds)
+
+    def get(self, key):
+        try:
+            raw = self.redis.get(f"{self.PREFIX}:{key}")
+        except Exception as e:
+            print(f"Erro ao ler a conversa no Redis: {e}")
+            return None
+        return json.loads(raw) if raw else None
+
+    def put(self, key, state):
+        try:
+            self.redis.set(f"{self.PREFIX}:{key}", json.dumps(state, ensure_ascii=False), ex=self.ttl_seconds)
+        except Exception as e:
+            print(f"Erro ao gravar a conversa no Redis: {e}")
+
+    def delete(self, key):
+        try:
+            self.redis.delete(f"{self.PREFIX}:{key}")
+        except Exception as e:
+            print(f"Erro ao remover a conversa no Redis: {e}")
+
+
+class ConversationMemory:
+    """
+    Histórico limitado por sessão. Não chama a LLM: devolve as entradas dos prompts
+    de reescrita (`condense_inputs`) e de resumo (`summary_inputs`) e aplica o resultado.
+    """
+    def __init__(
+        self,
+        store: ConversationStore,
+        max_turns: int = 6,
+        keep_turns: int = 3,
+        turn_max_tokens: int = 200,
+        summary_max_tokens: int = 200,
+        condense: str = "auto",
+        model: Optional[str] = None,
+    ):
+        if condense not in CONDENSE_MODES:
+            raise ValueError(f"CONVERSATION_CONDENSE inválido: {condense} (use {', '.join(CONDENSE_MODES)})")
+        self.store = store
+        self.max_turns = max(1, max_turns)
+        self.keep_turns = min(max(0, keep_turns), self.max_turns - 1)
+        self.turn_max_tokens = turn_max_tokens
+        self.summary_max_tokens = summary_max_tokens
+        self.condense = condense
+        self.model = model
+
+    def load(self, client_id: str, session_id: str) -> ConversationState:
+        return ConversationState.from_dict(self.store.get(_session_key(client_id, session_id)))
+
+    def clear(self, client_id: str, session_id: str) -> None:
+        self.store.delete(_session_key(client_id, session_id))
+
+    @staticmethod
+    def history_text(state: ConversationState) -> str:
+        lines = [f"Resumo da conversa até aqui: {state.summary}"] if state.summary else []
+        for turn in state.turns:
+            lines.append(f"Usuário: {turn['question']}")
+            lines.append(f"Assistente: {turn['answer']}")
+        return "\n".join(lines)
+
+    def condense_inputs(self, question: str, state: ConversationState) -> Optional[Dict[str, str]]:
+        """Entradas do prompt de reescrita, ou None se a pergunta vai como está (sem histórico ou independente)."""
+        if not state.turns and not state.summary:
+            return None
+        if self.condense == "auto" and not needs_condensing(question):
+            return None
+        return {"history": self.history_text(state), "question": question}
+
+    @staticmethod
+    def standalone_question(question: str, rewritten: str) -> str:
+        rewritten = rewritten.strip().strip('"').strip()
+        return rewritten or question
+
+    def remember(self, client_id: str, session_id: str, question: str, answer: str) -> bool:
+        """Acrescenta o turno à sessão. Retorna True se já há turnos demais e é hora de resumir."""
+        key = _session_key(client_id, session_id)
+        state = ConversationState.from_dict(self.store.get(key))
+        state.turns.append({
+            "n": state.next_turn,
+            "question": truncate_tokens(question, self.turn_max_tokens, self.model),
+            "answer": truncate_tokens(answer, self.turn_max_tokens, self.model),
+        })
+        state.next_turn += 1
+        self.store.put(key, state.to_dict())
+        return len(state.turns) > self.max_turns
+
+    def summary_inputs(self, client_id: str, session_id: str) -> Optional[Tuple[Dict[str, Any], int]]:
+        """Entradas do prompt de resumo com os turnos mais antigos e o número do último turno resumido."""
+        state = self.load(client_id, session_id)
+        if len(state.turns) <= self.max_turns:
+            return None
+        folded = state.turns[:len(state.turns) - self.keep_turns]
+        turns = ConversationState(turns=folded)
+        inputs = {
+            "summary": state.summary or "(vazio)",
+            "turns": self.history_text(turns),
+            "max_words": max(20, int(self.summary_max_tokens * 0.6)),
+        }
+        return inputs, folded[-1]["n"]
+
+    def apply_summary(self, client_id: str, session_id: str, summary: str, last_turn: int) -> None:
+        """Troca os turnos até `last_turn` pelo novo resumo (relê a sessão: turnos novos entram depois do resumo)."""
+        key = _session_key(client_id, session_id)
+        state = ConversationState.from_dict(self.store.get(key))
+        state.summary = truncate_tokens(summary.strip(), self.summary_max_tokens, self.model)
+        state.turns = [turn for turn in state.turns if turn["n"] > last_turn]
+        self.store.put(key, state.to_dict())
+
+    def history_tokens(self, state: ConversationState) -> int:
+        return count_tokens(self.history_text(state), self.model)
+
+
+def build_conversation_memory(settings: Any) -> Optional[ConversationMemory]:
+    """Cria a memória de conversa conforme `CONVERSATION_BACKEND` ('local', 'redis' ou 'none')."""
+    backend_name = (settings.CONVERSATION_BACKEND or "none").lower()
+    if backend_name == "none":
+        return None
+    if backend_name == "redis":
+        import redis
+
+        store = RedisConversationStore(
+            redis.Redis.from_url(settings.CONVERSATION_REDIS_URL or settings.CELERY_REDIS_DSN),
+            ttl_seconds=settings.CONVERSATION_TTL_SECONDS,
+        )
+    elif backend_name == "local":
+        store = LocalConversationStore(
+            max_sessions=settings.CONVERSATION_MAX_SESSIONS, ttl_seconds=settings.CONVERSATION_TTL_SECONDS
+        )
+    else:
+        raise ValueError(f"CONVERSATION_BACKEND desconhecido: {settings.CONVERSATION_BACKEND}")
+    return ConversationMemory(
+        store,
+        max_turns=settings.CONVERSATION_MAX_TURNS,
+        keep_turns=settings.CONVERSATION_KEEP_TURNS,
+        turn_max_tokens=settings.CONVERSATION_TURN_MAX_TOKENS,
+        summary_max_tokens=settings.CONVERSATION_SUMMARY_MAX_TOKENS,
+        condense=settings.CONVERSATION_CONDENSE,
+        model=settings.LLM_MODEL,
+    )
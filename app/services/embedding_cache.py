@@ -0,0 +1,107 @@
+import asyncio
+import hashlib
+from array import array
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from app.core.models import EmbeddingCacheEntry
+
+
+def embedding_cache_key(text: str, model: Optional[str]) -> str:
+    return hashlib.sha256(f"{model or ''}\n{text}".encode("utf-8")).hexdigest()
+
+
+def _pack(vector: List[float]) -> bytes:
+    return array("f", vector).tobytes()
+
+
+def _unpack(data: bytes) -> List[float]:
+    values = array("f")
+    values.frombytes(data)
+    return values.tolist()
+
+
+class CachedEmbeddings:
+    """
+    Envolve um backend de embeddings com um cache persistente (tabela
+    `embedding_cache`) indexado pelo hash do texto e do modelo. Apenas os textos
+    ainda não vistos são enviados ao backend; textos repetidos no mesmo lote são
+    embedados uma única vez. Consultas (`embed_query`) não passam pelo cache.
+
+    Segue a interface `Embeddings` do LangChain sem herdar dela (importar o
+    langchain_core custaria ~0,5s no import da API).
+    """
+    def __init__(self, embeddings: Any, session_factory: Callable[[], Any], model: Optional[str] = None):
+        self.embeddings = embeddings
+        self.session_factory = session_factory
+        self.model = model or getattr(embeddings, "model", None)
+        self.hits = 0
+        self.misses = 0
+
+    def _load(self, keys: List[str]) -> Dict[str, List[float]]:
+        db = self.session_factory()
+        try:
+            rows = db.execute(
+                select(EmbeddingCacheEntry.content_hash, EmbeddingCacheEntry.vector)
+                .where(EmbeddingCacheEntry.content_hash.in_(keys))
+            ).all()
+            return {key: _unpack(vector) for key, vector in rows}
+        finally:
+            db.close()
+
+    def _save(self, entries: Dict[str, List[float]]) -> None:
+        db = self.session_factory()
+        try:
+            insert = sqlite_insert if db.get_bind().dialect.name == "sqlite" else pg_insert
+            db.execute(
+                insert(EmbeddingCacheEntry)
+                .values([
+                    {"content_hash": key, "model": self.model or "", "vector": _pack(vector)}
+                    for key, vector in entries.items()
+                ])
+                .on_conflict_do_nothing(index_elements=["content_hash"])
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [embedding_cache_key(text, self.model) for text in texts]
+        try:
+            found = self._load(list(set(keys)))
+        except Exception as e:
+            print(f"Cache de embeddings indisponível, embedando tudo: {e}")
+            found = {}
+
+        missing: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in found:
+                missing.setdefault(key, text)
+        self.hits += len(texts) - sum(1 for key in keys if key in missing)
+        self.misses += len(missing)
+
+        if missing:
+            vectors = self.embeddings.embed_documents(list(missing.values()))
+            computed = dict(zip(missing.keys(), vectors))
+            try:
+                self._save(computed)
+            except Exception as e:
+                print(f"Erro ao gravar no cache de embeddings: {e}")
+            found.update(computed)
+
+        return [found[key] for key in keys]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await asyncio.to_thread(self.embed_documents, texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embeddings.embed_query(text)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return await self.embeddings.aembed_query(text)
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
@@ -0,0 +1,131 @@
+import contextvars
+import random
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, List, Optional, Sequence
+
+from app.core.metrics import stage_metrics, usage_metrics
+from app.services.tokenizer import count_tokens
+
+
+class EmbeddingPipeline:
+    """
+    Etapa de embeddings da ingestão: agrupa os chunks em lotes limitados por
+    quantidade e por tokens (tiktoken), gera os embeddings com concorrência
+    limitada e retry/backoff por lote, e grava cada lote em bulk na collection.
+    """
+    def __init__(
+        self,
+        embeddings: Any,
+        batch_size: int = 128,
+        max_batch_tokens: int = 8000,
+        max_concurrency: int = 4,
+        max_retries: int = 5,
+        backoff_base: float = 1.0,
+        backoff_max: float = 30.0,
+    ):
+        self.embeddings = embeddings
+        self.batch_size = max(1, batch_size)
+        self.max_batch_tokens = max(1, max_batch_tokens)
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max(0, max_retries)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+    @property
+    def model(self) -> Optional[str]:
+        return getattr(self.embeddings, "model", None)
+
+    def pack(self, texts: Sequence[str]) -> List[List[int]]:
+        """Agrupa os índices dos textos em lotes respeitando batch_size e max_batch_tokens."""
+        batches, current, current_tokens = [], [], 0
+        for index, text in enumerate(texts):
+            tokens = count_tokens(text, self.model)
+            if current and (len(current) >= self.batch_size or current_tokens + tokens > self.max_batch_tokens):
+                batches.append(current)
+                current, current_tokens = [], 0
+            current.append(index)
+            current_tokens += tokens
+        if current:
+            batches.append(current)
+        return batches
+
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        attempt = 0
+        while True:
+            try:
+                with stage_metrics.time("embedding_call", kind="documents"):
+                    vectors = self.embeddings.embed_documents(texts)
+                usage_metrics.record("embedding_texts", len(texts))
+                return vectors
+            except Exception as e:
+                attempt += 1
+                if attempt > self.max_retries:
+                    raise
+                delay = min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1))
+                delay *= random.uniform(0.5, 1.0)
+                print(f"Falha ao gerar embeddings de um lote ({e}); tentativa {attempt}/{self.max_retries} em {delay:.1f}s")
+                time.sleep(delay)
+
+    def embed(self, texts: Sequence[str]) -> List[List[float]]:
+        """Gera os embeddings de todos os textos, preservando a ordem."""
+        vectors: List[Optional[List[float]]] = [None] * len(texts)
+        for batch, batch_vectors in self._run(texts):
+            for index, vector in zip(batch, batch_vectors):
+                vectors[index] = vector
+        return vectors
+
+    def _run(self, texts: Sequence[str]):
+        batches = self.pack(texts)
+        if len(batches) <= 1 or self.max_concurrency == 1:
+            for batch in batches:
+                yield batch, self._embed_batch([texts[i] for i in batch])
+            return
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            # copy_context: as threads herdam os labels (tenant, task) das métricas.
+            futures = {
+                executor.submit(contextvars.copy_context().run, self._embed_batch, [texts[i] for i in batch]): batch
+                for batch in batches
+            }
+            try:
+                for future in as_completed(futures):
+                    yield futures[future], future.result()
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+
+    def embed_and_store(
+        self,
+        collection: Any,
+        docs: Sequence[Any],
+        ids: Optional[List[str]] = None,
+        on_progress: Optional[Callable[[str, int], None]] = None,
+    ) -> int:
+        """
+        Gera os embeddings dos documentos (LangChain `Document`) e os grava na
+        collection Chroma lote a lote, conforme cada lote fica pronto.
+        `on_progress("embedded" | "written", n_chunks)` é chamado a cada lote.
+        Retorna o número de chunks gravados.
+        """
+        if not docs:
+            return 0
+        texts = [doc.page_content for doc in docs]
+        ids = ids or [str(uuid.uuid4()) for _ in docs]
+        written = 0
+        for batch, vectors in self._run(texts):
+            if on_progress is not None:
+                on_progress("embedded", len(batch))
+            with stage_metrics.time("chroma_write"):
+                collection.upsert(
+                    ids=[ids[i] for i in batch],
+                    embeddings=vectors,
+                    documents=[texts[i] for i in batch],
+                    metadatas=[docs[i].metadata or None for i in batch],
+                )
+            written += len(batch)
+            if on_progress is not None:
+                on_progress("written", len(batch))
+        return written
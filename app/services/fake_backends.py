@@ -0,0 +1,144 @@
+"""
+Backends falsos de LLM e embeddings, sem rede, para benchmarks e desenvolvimento
+offline. A latência é configurável e os vetores são determinísticos (mesmo texto,
+mesmo vetor), então a busca vetorial continua fazendo sentido.
+"""
+import asyncio
+import hashlib
+import math
+import random
+import re
+import time
+from typing import Any, AsyncIterator, Iterator, List, Optional
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+
+class FakeEmbeddingsError(RuntimeError):
+    """Falha simulada (ex: rate limit) dos embeddings falsos."""
+
+
+class FakeEmbeddings(Embeddings):
+    """
+    Embeddings determinísticos derivados do hash do texto. Cada chamada custa
+    `latency` + `latency_per_text` * len(textos) segundos e falha com
+    probabilidade `failure_rate`.
+    """
+
+    def __init__(self, size: int = 256, latency: float = 0.0, latency_per_text: float = 0.0, failure_rate: float = 0.0):
+        self.size = size
+        self.latency = latency
+        self.latency_per_text = latency_per_text
+        self.failure_rate = failure_rate
+        self.calls = 0
+
+    def _cost(self, texts: List[str]) -> float:
+        self.calls += 1
+        if self.failure_rate and random.random() < self.failure_rate:
+            raise FakeEmbeddingsError("Falha simulada na API de embeddings.")
+        return self.latency + self.latency_per_text * len(texts)
+
+    def _vector(self, text: str) -> List[float]:
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
+        rng = random.Random(seed)
+        return [rng.gauss(0, 1) for _ in range(self.size)]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        cost = self._cost(texts)
+        if cost:
+            time.sleep(cost)
+        return [self._vector(t) for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        cost = self._cost(texts)
+        if cost:
+            await asyncio.sleep(cost)
+        return [self._vector(t) for t in texts]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
+
+
+class LexicalFakeEmbeddings(FakeEmbeddings):
+    """
+    Embeddings falsos com noção de similaridade: feature hashing das palavras do
+    texto (normalizado L2). Ignora tokens com dígitos, como modelos de embeddings
+    reais que representam mal códigos de produto e números de cláusula.
+    """
+
+    def _vector(self, text: str) -> List[float]:
+        vector = [0.0] * self.size
+        for word in re.findall(r"[^\W\d_]{3,}", text.lower()):
+            bucket = int.from_bytes(hashlib.md5(word.encode("utf-8")).digest()[:4], "big") % self.size
+            vector[bucket] += 1.0
+        norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+        return [value / norm for value in vector]
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    LLM falsa: espera `latency` segundos antes do primeiro token e `token_latency`
+    entre tokens, e responde sempre `response`.
+    """
+    response: str = "Resposta simulada com base nos documentos do cliente."
+    latency: float = 0.0
+    token_latency: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def _tokens(self) -> List[str]:
+        words = self.response.split(" ")
+        return [w if i == 0 else f" {w}" for i, w in enumerate(words)]
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        time.sleep(self.latency + self.token_latency * len(self._tokens()))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.response))])
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        await asyncio.sleep(self.latency + self.token_latency * len(self._tokens()))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.response))])
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self.latency)
+        for token in self._tokens():
+            time.sleep(self.token_latency)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self.latency)
+        for token in self._tokens():
+            await asyncio.sleep(self.token_latency)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
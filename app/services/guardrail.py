@@ -0,0 +1,77 @@
+import re
+import unicodedata
+from typing import List, Optional, Tuple
+
+# Veredictos do guardrail (mesmas palavras pedidas à LLM no GUARDRAIL_PROMPT_TEMPLATE)
+VERDICT_OK = "OK"
+VERDICT_RISK = "RISCO"
+
+GUARDRAIL_MODES = ("serial", "parallel", "local", "off")
+
+# (padrão, peso). Pesos >= RISK_SCORE sozinhos já bloqueiam a pergunta.
+_RISK_PATTERNS: List[Tuple[str, float]] = [
+    (r"\b(ignore|ignora|desconsidere|esqueca|esqueça)\b.{0,40}\b(instru|regra|rule|prompt|contexto|context)", 1.0),
+    (r"\b(system|sistema)\s*prompt\b|\bprompt\s+(do|de)\s+sistema\b", 1.0),
+    (r"\b(jailbreak|dan mode|developer mode|modo desenvolvedor|modo dan)\b", 1.0),
+    (r"\b(revele|mostre|repita|print|reveal|show|repeat)\b.{0,30}\b(instru|prompt|regras|rules)", 1.0),
+    (r"\b(voce|você|you)\s+(agora\s+(e|é)|(e|é)\s+agora|are\s+now)\b", 0.6),
+    (r"\b(finja|pretend|act as|aja como|atue como|roleplay)\b", 0.6),
+    (r"\b(sem|without|no)\s+(restri|filtro|filter|censura|limit)", 0.6),
+    (r"<\s*/?\s*(system|assistant|instructions?)\s*>|\[\s*(system|inst)\s*\]", 0.8),
+    (r"\b(api[_ ]?key|openai|chave secreta|senha do banco|password|token de acesso)\b", 0.5),
+    (r"\b(qual|which|what)\s+(modelo|model|llm)\b", 0.4),
+]
+
+RISK_SCORE = 1.0
+
+# Formato de pergunta de FAQ: começa por uma palavra interrogativa, uma única frase curta
+# só com letras, dígitos e pontuação simples, terminada em "?". Só isso libera sem a LLM.
+_ALLOW_PATTERNS: List[str] = [
+    r"^(qual|quais|como|quando|onde|quanto|quantos|quantas|que horas|voces|vocês|existe|tem|posso|"
+    r"what|how|when|where|which|do you|is there|can i)\b[\w ,'-]{0,100}\?$",
+]
+
+
+def _normalize(text: str) -> str:
+    text = unicodedata.normalize("NFKC", text).casefold()
+    return re.sub(r"\s+", " ", text).strip()
+
+
+class LocalGuardrail:
+    """
+    Pré-filtro local (sem rede) para o guardrail. Combina regras de prompt
+    injection com um escore heurístico e decide apenas os casos óbvios:
+      - `RISCO` quando o escore passa de RISK_SCORE;
+      - `OK` só com um sinal forte de pergunta legítima: escore zero e a pergunta
+        casa com `_ALLOW_PATTERNS` (nenhuma regra disparar não basta);
+      - `None` (indeciso) nos demais casos, que seguem para a LLM.
+    """
+    def __init__(self, max_ok_length: int = 300, allow_patterns: Optional[List[str]] = None):
+        self.max_ok_length = max_ok_length
+        self._patterns = [(re.compile(p), w) for p, w in _RISK_PATTERNS]
+        self._allow = [re.compile(p) for p in (_ALLOW_PATTERNS if allow_patterns is None else allow_patterns)]
+
+    def score(self, query: str) -> float:
+        text = _normalize(query)
+        score = sum(weight for pattern, weight in self._patterns if pattern.search(text))
+
+        # Sinais fracos: muitos símbolos/código ou texto muito longo para uma pergunta.
+        symbols = sum(1 for c in text if c in "{}<>[]`$#|\\")
+        if text and symbols / len(text) > 0.05:
+            score += 0.3
+        if len(text) > self.max_ok_length * 3:
+            score += 0.3
+        return score
+
+    def allowed(self, query: str) -> bool:
+        """A pergunta tem o formato de uma pergunta simples de FAQ (allowlist)."""
+        text = _normalize(query)
+        return len(text) <= self.max_ok_length and any(pattern.match(text) for pattern in self._allow)
+
+    def classify(self, query: str) -> Optional[str]:
+        score = self.score(query)
+        if score >= RISK_SCORE:
+            return VERDICT_RISK
+        if score == 0 and self.allowed(query):
+            return VERDICT_OK
+        return None
@@ -0,0 +1,355 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+from contextlib import closing
+from typing import Any, Dict, List, Optional, Sequence
+
+from app.core.cache import LRUCache
+from app.services.vector_index import DEFAULT_INCLUDE, VectorStoreBackend, query_result, where_to_sql
+
+_METADATA_KEY = re.compile(r"^[A-Za-z0-9_]+$")
+# Lotes para `IN (...)` (limite de variáveis do SQLite).
+_SQL_BATCH = 500
+
+
+def _sqlite_equals(key: str, value: Any):
+    if not _METADATA_KEY.match(key):
+        raise ValueError(f"Chave de metadado inválida no filtro: {key}")
+    return f"json_extract(metadata, '$.{key}') = ?", [value]
+
+
+def _batches(values: Sequence[Any], size: int = _SQL_BATCH):
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+class HnswCollection:
+    """
+    Collection de um tenant com índice HNSW (hnswlib) em memória e os chunks
+    (texto, metadados e vetor) em um SQLite ao lado do arquivo do índice.
+
+    O SQLite é a fonte da verdade; o índice é gravado em disco em `persist` (fim
+    da ingestão). Um contador `generation` no SQLite, incrementado a cada escrita,
+    diz se o índice em memória (ou o arquivo) está atualizado: outro processo (a
+    API, enquanto o worker ingere) continua buscando no índice anterior até o
+    `persist` e então recarrega o arquivo; um índice desatualizado por queda do
+    processo que escrevia é recriado a partir do SQLite.
+    """
+    def __init__(self, client_id: str, path: str, space: str = "cosine", m: int = 16,
+                 ef_construction: int = 200, ef_search: int = 64):
+        name = "t_" + hashlib.sha1(client_id.encode("utf-8")).hexdigest()[:20]
+        self.client_id = client_id
+        self.db_path = os.path.join(path, name + ".sqlite3")
+        self.index_path = os.path.join(path, name + ".hnsw")
+        self.space = space
+        self.m = m
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self.index = None
+        self.generation = None  # geração do SQLite refletida em `self.index`
+        self.live = 0
+        self._lock = threading.RLock()
+        self._refresh_lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS chunks (label INTEGER PRIMARY KEY AUTOINCREMENT, id TEXT NOT NULL UNIQUE, "
+                "document TEXT, metadata TEXT NOT NULL, embedding BLOB NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_chunks_doc_id ON chunks (json_extract(metadata, '$.doc_id'))")
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_chunks_source_file ON chunks (json_extract(metadata, '$.source_file'))")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            conn.execute("INSERT OR IGNORE INTO meta VALUES ('client_id', ?), ('generation', '0'), ('indexed_generation', '-1')", (client_id,))
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    @staticmethod
+    def _generations(conn: sqlite3.Connection):
+        meta = dict(conn.execute("SELECT key, value FROM meta WHERE key IN ('generation', 'indexed_generation', 'dim')"))
+        return int(meta["generation"]), int(meta["indexed_generation"]), int(meta["dim"]) if "dim" in meta else None
+
+    # --- índice em memória -------------------------------------------------
+
+    def _new_index(self, dim: int, capacity: Optional[int] = None):
+        """Índice vazio com espaço para `capacity` vetores (sem `capacity`: não inicializado, para `load_index`)."""
+        try:
+            import hnswlib
+        except ImportError:
+            raise ImportError("VECTOR_STORE_PROVIDER=hnsw requer o pacote hnswlib (pip install hnswlib).")
+        index = hnswlib.Index(space=self.space, dim=dim)
+        if capacity is not None:
+            index.init_index(max_elements=max(capacity, 1024), ef_construction=self.ef_construction, M=self.m)
+            index.set_ef(self.ef_search)
+        return index
+
+    def _read_index(self, conn: sqlite3.Connection, generation: int, indexed_generation: int, dim: Optional[int]):
+        """
+        Lê o arquivo do índice se ele estiver na geração atual; senão recria o índice a
+        partir do SQLite. Não altera `self`: retorna (índice ou None, chunks vivos).
+        """
+        live = conn.execute("SELECT count(*) FROM chunks").fetchone()[0]
+        if dim is None:
+            return None, live
+        if indexed_generation == generation and os.path.exists(self.index_path):
+            index = self._new_index(dim)
+            index.load_index(self.index_path, max_elements=max(1024, live))
+            index.set_ef(self.ef_search)
+            return index, live
+
+        import numpy as np
+
+        print(f"Recriando o índice HNSW do Cliente {self.client_id} a partir do SQLite ({live} chunks)")
+        index = self._new_index(dim, live * 2)
+        cursor = conn.execute("SELECT label, embedding FROM chunks ORDER BY label")
+        while rows := cursor.fetchmany(10000):
+            vectors = np.stack([np.frombuffer(blob, dtype=np.float32) for _, blob in rows])
+            index.add_items(vectors, [label for label, _ in rows])
+        return index, live
+
+    def _load(self, conn: sqlite3.Connection, generation: int, indexed_generation: int, dim: Optional[int]) -> None:
+        self.index, self.live = self._read_index(conn, generation, indexed_generation, dim)
+        self.generation = generation
+
+    def _refresh_for_read(self) -> None:
+        """
+        Recarrega o índice se o SQLite está em outra geração, sem segurar `self._lock`:
+        a leitura do arquivo ou a recriação (segundos em tenants grandes) não trava as
+        buscas, que seguem no índice anterior até a troca. Só a primeira carga espera.
+        """
+        # Outra thread já está conferindo/recarregando: busca no índice atual enquanto isso.
+        if not self._refresh_lock.acquire(blocking=self.index is None):
+            return
+        try:
+            with closing(self._connect()) as conn:
+                # Transação de leitura: geração e chunks do mesmo instante (WAL).
+                conn.isolation_level = None
+                conn.execute("BEGIN")
+                try:
+                    generation, indexed_generation, dim = self._generations(conn)
+                    if self.generation == generation:
+                        return
+                    # Escrita em andamento em outro processo: mantém o índice atual até o `persist`.
+                    if self.index is not None and indexed_generation != generation:
+                        return
+                    index, live = self._read_index(conn, generation, indexed_generation, dim)
+                finally:
+                    conn.execute("COMMIT")
+            with self._lock:
+                # Uma escrita deste processo durante a leitura já deixou o índice mais novo.
+                if self.generation is None or self.generation < generation:
+                    self.index, self.generation, self.live = index, generation, live
+        finally:
+            self._refresh_lock.release()
+
+    def _begin_write(self, conn: sqlite3.Connection) -> int:
+        """
+        Abre a transação de escrita e garante que o índice em memória reflete o SQLite.
+        Aqui a recarga acontece com `self._lock` (a escrita altera o índice): só ocorre
+        se outro processo escreveu desde a última leitura, e as buscas esperam por ela.
+        """
+        conn.isolation_level = None
+        conn.execute("BEGIN IMMEDIATE")
+        generation, indexed_generation, dim = self._generations(conn)
+        if self.generation != generation:
+            self._load(conn, generation, indexed_generation, dim)
+        return generation
+
+    def _commit_write(self, conn: sqlite3.Connection, generation: int) -> None:
+        conn.execute("UPDATE meta SET value = ? WHERE key = 'generation'", (str(generation + 1),))
+        conn.execute("COMMIT")
+        self.generation = generation + 1
+        self.live = conn.execute("SELECT count(*) FROM chunks").fetchone()[0]
+
+    def _labels(self, conn: sqlite3.Connection, ids: Sequence[str]) -> Dict[str, int]:
+        labels = {}
+        for batch in _batches(list(ids)):
+            placeholders = ",".join("?" * len(batch))
+            labels.update(conn.execute(f"SELECT id, label FROM chunks WHERE id IN ({placeholders})", batch))
+        return labels
+
+    # --- API de collection (subconjunto do Chroma) --------------------------
+
+    def upsert(self, ids, embeddings, documents=None, metadatas=None) -> None:
+        import numpy as np
+
+        if not ids:
+            return
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        documents = documents or [None] * len(ids)
+        metadatas = metadatas or [None] * len(ids)
+        with self._lock, closing(self._connect()) as conn:
+            generation = self._begin_write(conn)
+            try:
+                if self.index is None:
+                    conn.execute("INSERT OR REPLACE INTO meta VALUES ('dim', ?)", (str(vectors.shape[1]),))
+                    self.index = self._new_index(vectors.shape[1], len(ids) * 2)
+                conn.executemany(
+                    "INSERT INTO chunks (id, document, metadata, embedding) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(id) DO UPDATE SET document = excluded.document, metadata = excluded.metadata, "
+                    "embedding = excluded.embedding",
+                    [
+                        (chunk_id, document, json.dumps(metadata or {}, ensure_ascii=False), vector.tobytes())
+                        for chunk_id, document, metadata, vector in zip(ids, documents, metadatas, vectors)
+                    ],
+                )
+                labels = self._labels(conn, ids)
+                needed = self.index.get_current_count() + len(ids)
+                if needed > self.index.get_max_elements():
+                    self.index.resize_index(max(needed, self.index.get_max_elements() * 2))
+                self.index.add_items(vectors, [labels[chunk_id] for chunk_id in ids])
+                self._commit_write(conn, generation)
+            except BaseException:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                self.generation = None  # o índice em memória pode ter recebido parte do lote
+                raise
+
+    def update(self, ids, metadatas) -> None:
+        # Só metadados (ficam no SQLite): o índice não muda.
+        with self._lock, closing(self._connect()) as conn, conn:
+            conn.executemany(
+                "UPDATE chunks SET metadata = ? WHERE id = ?",
+                [(json.dumps(metadata or {}, ensure_ascii=False), chunk_id) for chunk_id, metadata in zip(ids, metadatas)],
+            )
+
+    def delete(self, ids=None, where=None) -> None:
+        with self._lock, closing(self._connect()) as conn:
+            generation = self._begin_write(conn)
+            try:
+                if ids is not None:
+                    labels = list(self._labels(conn, ids).values())
+                else:
+                    sql, params = where_to_sql(where or {}, _sqlite_equals)
+                    labels = [row[0] for row in conn.execute(f"SELECT label FROM chunks WHERE {sql}", params)]
+                for batch in _batches(labels):
+                    conn.execute(f"DELETE FROM chunks WHERE label IN ({','.join('?' * len(batch))})", batch)
+                if self.index is not None:
+                    for label in labels:
+                        try:
+                            self.index.mark_deleted(label)
+                        except RuntimeError:
+                            pass  # já removido
+                self._commit_write(conn, generation)
+            except BaseException:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                self.generation = None
+                raise
+
+    def get(self, ids=None, where=None, include=DEFAULT_INCLUDE, limit=None, offset=None) -> Dict[str, List[Any]]:
+        import numpy as np
+
+        sql, params = where_to_sql(where or {}, _sqlite_equals)
+        if ids is not None:
+            ids = list(ids)
+            sql += f" AND id IN ({','.join('?' * len(ids))})" if ids else " AND 0"
+            params += ids
+        sql = f"SELECT id, document, metadata, embedding FROM chunks WHERE {sql} ORDER BY label"
+        if limit is not None or offset:
+            sql += " LIMIT ? OFFSET ?"
+            params += [-1 if limit is None else limit, offset or 0]
+        with closing(self._connect()) as conn:
+            rows = conn.execute(sql, params).fetchall()
+        result = {"ids": [row[0] for row in rows]}
+        if "documents" in include:
+            result["documents"] = [row[1] for row in rows]
+        if "metadatas" in include:
+            result["metadatas"] = [json.loads(row[2]) for row in rows]
+        if "embeddings" in include:
+            result["embeddings"] = [np.frombuffer(row[3], dtype=np.float32).tolist() for row in rows]
+        return result
+
+    def query(self, query_embeddings, n_results: int = 10, include=DEFAULT_INCLUDE) -> Dict[str, List[List[Any]]]:
+        import numpy as np
+
+        self._refresh_for_read()
+        with self._lock:
+            k = min(n_results, self.live)
+            if self.index is None or k <= 0:
+                return query_result([], include)
+            self.index.set_ef(max(self.ef_search, k))
+            labels, distances = self.index.knn_query(np.asarray(query_embeddings[:1], dtype=np.float32), k=k)
+        labels, distances = labels[0].tolist(), distances[0].tolist()
+        with closing(self._connect()) as conn:
+            placeholders = ",".join("?" * len(labels))
+            by_label = {
+                label: (chunk_id, document, json.loads(metadata))
+                for label, chunk_id, document, metadata in conn.execute(
+                    f"SELECT label, id, document, metadata FROM chunks WHERE label IN ({placeholders})", labels
+                )
+            }
+        # Labels ausentes no SQLite: removidos por outro processo depois da última recarga do índice.
+        rows = [(*by_label[label], distance) for label, distance in zip(labels, distances) if label in by_label]
+        return query_result(rows, include)
+
+    def count(self) -> int:
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT count(*) FROM chunks").fetchone()[0]
+
+    def persist(self) -> None:
+        """Grava o índice em disco (troca atômica do arquivo) se ele reflete a geração atual do SQLite."""
+        with self._lock, closing(self._connect()) as conn:
+            conn.isolation_level = None
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                generation, indexed_generation, _ = self._generations(conn)
+                if self.index is not None and self.generation == generation and indexed_generation != generation:
+                    tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+                    self.index.save_index(tmp_path)
+                    os.replace(tmp_path, self.index_path)
+                    conn.execute("UPDATE meta SET value = ? WHERE key = 'indexed_generation'", (str(generation),))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def drop(self) -> None:
+        with self._lock:
+            self.index, self.generation, self.live = None, None, 0
+            for path in (self.index_path, self.db_path, self.db_path + "-wal", self.db_path + "-shm"):
+                if os.path.exists(path):
+                    os.remove(path)
+
+
+class HnswVectorStore(VectorStoreBackend):
+    """
+    Backend HNSW em processo (VECTOR_STORE_PROVIDER=hnsw): busca aproximada em
+    memória, sem servidor, para uma única máquina. Os índices dos tenants mais
+    usados ficam em um LRU; os demais são recarregados do disco sob demanda.
+    """
+    def __init__(self, path: str, space: str = "cosine", m: int = 16, ef_construction: int = 200,
+                 ef_search: int = 64, max_entries: int = 64):
+        self.path = path
+        self.options = {"space": space, "m": m, "ef_construction": ef_construction, "ef_search": ef_search}
+        self._cache = LRUCache(max_entries=max_entries)
+
+    def get_collection(self, client_id: str) -> HnswCollection:
+        return self._cache.get_or_create(client_id, lambda: HnswCollection(client_id, self.path, **self.options))
+
+    def delete_collection(self, client_id: str) -> None:
+        self.get_collection(client_id).drop()
+        self._cache.invalidate(client_id)
+
+    def list_collections(self) -> List[str]:
+        client_ids = []
+        for name in sorted(os.listdir(self.path)) if os.path.isdir(self.path) else []:
+            if name.endswith(".sqlite3"):
+                with closing(sqlite3.connect(os.path.join(self.path, name))) as conn:
+                    row = conn.execute("SELECT value FROM meta WHERE key = 'client_id'").fetchone()
+                if row:
+                    client_ids.append(row[0])
+        return client_ids
+
+    def persist(self, client_id: str) -> None:
+        self.get_collection(client_id).persist()
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return self._cache.stats()
@@ -0,0 +1,445 @@
+import json
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import defaultdict, deque
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+SMALL_QUEUE = "ingest_small"
+LARGE_QUEUE = "ingest_large"
+INGEST_QUEUES = (SMALL_QUEUE, LARGE_QUEUE)
+
+RATE_WINDOW_SECONDS = 60
+
+
+class IngestQueueStore(ABC):
+    """
+    Estado do escalonador: fila de jobs por (fila Celery, tenant), anel de tenants
+    com jobs pendentes, leases dos jobs despachados e contadores de rate limit.
+    Todas as chamadas de um `dispatch` acontecem dentro de `lock()`.
+    """
+
+    @abstractmethod
+    def lock(self):
+        ...
+
+    @abstractmethod
+    def push(self, queue: str, tenant: str, job: Dict[str, Any]) -> None:
+        """Enfileira o job e, se o tenant não tinha pendências nessa fila, o coloca no fim do anel."""
+
+    @abstractmethod
+    def pop(self, queue: str, tenant: str) -> Optional[Dict[str, Any]]:
+        """Retira o job mais antigo do tenant e o manda para o fim do anel (ou o remove, se acabou)."""
+
+    @abstractmethod
+    def ring(self, queue: str) -> List[str]:
+        """Tenants com jobs pendentes na fila, na ordem da vez."""
+
+    @abstractmethod
+    def pending(self, queue: str, tenant: Optional[str] = None) -> int:
+        ...
+
+    @abstractmethod
+    def add_lease(self, queue: str, tenant: str, doc_id: int, expires_at: float) -> None:
+        ...
+
+    @abstractmethod
+    def remove_lease(self, tenant: str, doc_id: int) -> bool:
+        ...
+
+    @abstractmethod
+    def running(self, queue: Optional[str] = None, tenant: Optional[str] = None) -> int:
+        """Jobs despachados e ainda não liberados, na fila ou do tenant."""
+
+    @abstractmethod
+    def expire_leases(self, now: float) -> int:
+        ...
+
+    @abstractmethod
+    def hit_rate(self, tenant: str, window: int) -> int:
+        """Conta um despacho do tenant na janela e retorna o total dela."""
+
+    @abstractmethod
+    def rate_count(self, tenant: str, window: int) -> int:
+        ...
+
+    @abstractmethod
+    def claim_wakeup(self, now: float, delay: float) -> bool:
+        """True se ninguém agendou um novo `dispatch` ainda pendente (evita agendar um por chamada)."""
+
+
+class LocalIngestQueueStore(IngestQueueStore):
+    """
+    Estado em memória: serve para um único processo (desenvolvimento e a simulação
+    do benchmark). Com API e workers separados use o store Redis.
+    """
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._jobs = defaultdict(deque)  # (queue, tenant) -> jobs
+        self._rings = defaultdict(deque)  # queue -> tenants
+        self._leases = {}  # (tenant, doc_id) -> (queue, expires_at)
+        self._rates = {}  # (tenant, window) -> despachos
+        self._wakeup_at = 0.0
+
+    def lock(self):
+        return self._lock
+
+    def push(self, queue, tenant, job):
+        jobs = self._jobs[(queue, tenant)]
+        if not jobs:
+            self._rings[queue].append(tenant)
+        jobs.append(job)
+
+    def pop(self, queue, tenant):
+        jobs = self._jobs.get((queue, tenant))
+        if not jobs:
+            return None
+        job = jobs.popleft()
+        self._rings[queue].remove(tenant)
+        if jobs:
+            self._rings[queue].append(tenant)
+        else:
+            del self._jobs[(queue, tenant)]
+        return job
+
+    def ring(self, queue):
+        return list(self._rings[queue])
+
+    def pending(self, queue, tenant=None):
+        if tenant is not None:
+            return len(self._jobs.get((queue, tenant), ()))
+        return sum(len(jobs) for (q, _), jobs in self._jobs.items() if q == queue)
+
+    def add_lease(self, queue, tenant, doc_id, expires_at):
+        self._leases[(tenant, doc_id)] = (queue, expires_at)
+
+    def remove_lease(self, tenant, doc_id):
+        return self._leases.pop((tenant, doc_id), None) is not None
+
+    def running(self, queue=None, tenant=None):
+        return sum(
+            1 for (t, _), (q, _) in self._leases.items()
+            if (queue is None or q == queue) and (tenant is None or t == tenant)
+        )
+
+    def expire_leases(self, now):
+        expired = [key for key, (_, expires_at) in self._leases.items() if expires_at <= now]
+        for key in expired:
+            del self._leases[key]
+        return len(expired)
+
+    def hit_rate(self, tenant, window):
+        self._rates = {key: count for key, count in self._rates.items() if key[1] >= window}
+        self._rates[(tenant, window)] = self._rates.get((tenant, window), 0) + 1
+        return self._rates[(tenant, window)]
+
+    def rate_count(self, tenant, window):
+        return self._rates.get((tenant, window), 0)
+
+    def claim_wakeup(self, now, delay):
+        if self._wakeup_at > now:
+            return False
+        self._wakeup_at = now + delay
+        return True
+
+
+class RedisIngestQueueStore(IngestQueueStore):
+    """
+    Estado no Redis, compartilhado entre a API (que enfileira) e os workers (que
+    liberam ao terminar). Chaves com prefixo `PREFIX`:
+      - `jobs:<fila>:<tenant>` (lista) e `ring:<fila>` (lista de tenants);
+      - `leases:<fila>` e `leases:tenant:<tenant>` (sorted sets por expiração);
+      - `rate:<tenant>:<janela>` (contador com TTL).
+    """
+    PREFIX = "ingest_scheduler"
+
+    def __init__(self, redis_client: Any, lock_timeout: float = 30.0):
+        self.redis = redis_client
+        self.lock_timeout = lock_timeout
+
+    def _key(self, *parts: Any) -> str:
+        return ":".join([self.PREFIX, *map(str, parts)])
+
+    def lock(self):
+        return self.redis.lock(self._key("lock"), timeout=self.lock_timeout, blocking_timeout=self.lock_timeout)
+
+    def push(self, queue, tenant, job):
+        if self.redis.rpush(self._key("jobs", queue, tenant), json.dumps(job)) == 1:
+            self.redis.rpush(self._key("ring", queue), tenant)
+
+    def pop(self, queue, tenant):
+        raw = self.redis.lpop(self._key("jobs", queue, tenant))
+        if raw is None:
+            return None
+        ring_key = self._key("ring", queue)
+        pipe = self.redis.pipeline()
+        pipe.lrem(ring_key, 1, tenant)
+        if self.redis.llen(self._key("jobs", queue, tenant)):
+            pipe.rpush(ring_key, tenant)
+        pipe.execute()
+        return json.loads(raw)
+
+    def ring(self, queue):
+        return [t.decode() if isinstance(t, bytes) else t for t in self.redis.lrange(self._key("ring", queue), 0, -1)]
+
+    def pending(self, queue, tenant=None):
+        tenants = [tenant] if tenant is not None else self.ring(queue)
+        return sum(self.redis.llen(self._key("jobs", queue, t)) for t in tenants)
+
+    def add_lease(self, queue, tenant, doc_id, expires_at):
+        pipe = self.redis.pipeline()
+        pipe.zadd(self._key("leases", queue), {f"{tenant}|{doc_id}": expires_at})
+        pipe.zadd(self._key("leases", "tenant", tenant), {f"{queue}|{doc_id}": expires_at})
+        pipe.execute()
+
+    def remove_lease(self, tenant, doc_id):
+        tenant_key = self._key("leases", "tenant", tenant)
+        for member in self.redis.zrange(tenant_key, 0, -1):
+            member = member.decode() if isinstance(member, bytes) else member
+            queue, lease_doc = member.split("|", 1)
+            if lease_doc == str(doc_id):
+                pipe = self.redis.pipeline()
+                pipe.zrem(tenant_key, member)
+                pipe.zrem(self._key("leases", queue), f"{tenant}|{doc_id}")
+                pipe.execute()
+                return True
+        return False
+
+    def running(self, queue=None, tenant=None):
+        if tenant is not None:
+            return self.redis.zcard(self._key("leases", "tenant", tenant))
+        queues = [queue] if queue is not None else INGEST_QUEUES
+        return sum(self.redis.zcard(self._key("leases", q)) for q in queues)
+
+    def expire_leases(self, now):
+        expired = 0
+        for queue in INGEST_QUEUES:
+            queue_key = self._key("leases", queue)
+            for member in self.redis.zrangebyscore(queue_key, "-inf", now):
+                tenant, doc_id = (member.decode() if isinstance(member, bytes) else member).split("|", 1)
+                pipe = self.redis.pipeline()
+                pipe.zrem(queue_key, member)
+                pipe.zrem(self._key("leases", "tenant", tenant), f"{queue}|{doc_id}")
+                pipe.execute()
+                expired += 1
+        return expired
+
+    def hit_rate(self, tenant, window):
+        key = self._key("rate", tenant, window)
+        pipe = self.redis.pipeline()
+        pipe.incr(key)
+        pipe.expire(key, RATE_WINDOW_SECONDS * 2)
+        return pipe.execute()[0]
+
+    def rate_count(self, tenant, window):
+        return int(self.redis.get(self._key("rate", tenant, window)) or 0)
+
+    def claim_wakeup(self, now, delay):
+        return bool(self.redis.set(self._key("wakeup"), now + delay, nx=True, px=max(1, int(delay * 1000))))
+
+
+def _job(tenant: str, doc_id: int, task_id: Optional[str], now: float, trace: Optional[Dict[str, str]]) -> Dict[str, Any]:
+    job = {"doc_id": doc_id, "tenant": tenant, "task_id": task_id, "submitted_at": now}
+    if trace:
+        job["trace"] = trace
+    return job
+
+
+class FairIngestScheduler:
+    """
+    Despacho justo das ingestões entre tenants.
+
+    Os jobs não vão direto para o broker: ficam em filas por tenant e `dispatch`
+    os libera para o Celery em round-robin entre os tenants, respeitando:
+      - `window[fila]`: jobs em execução por fila (igual à concorrência dos workers
+        dela), para que o broker nunca acumule uma fila longa de um tenant só;
+      - `max_running_per_tenant`: jobs simultâneos de um mesmo tenant;
+      - `rate_limit_per_minute`: despachos por tenant por minuto (0 = sem limite).
+
+    Documentos grandes vão para `LARGE_QUEUE` e pequenos para `SMALL_QUEUE`, com
+    workers separados: um PDF de 500 páginas não ocupa o worker de um de 3.
+
+    Cada job despachado tem um lease que é liberado em `release` (fim da task) ou
+    expira após `lease_seconds` (worker morto), devolvendo a vaga ao tenant. Leases
+    vencidos são recolhidos em todo `dispatch`, inclusive o periódico do Celery beat
+    (`dispatch_ingestions_task`): sem ele, a vaga de um worker morto só voltaria no
+    próximo envio ou término de outra ingestão.
+
+    `trace` (headers traceparent/tracestate da requisição que enviou o documento)
+    segue no job até o broker: o despacho pode acontecer depois, no `release` de
+    outra task, e a ingestão continua filha do upload que a originou.
+    """
+    def __init__(
+        self,
+        store: IngestQueueStore,
+        send: Callable[[str, List[Dict[str, Any]]], None],
+        window: Dict[str, int],
+        max_running_per_tenant: int = 2,
+        rate_limit_per_minute: int = 0,
+        large_file_bytes: int = 5 * 1024 * 1024,
+        lease_seconds: float = 3600,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.store = store
+        self.send = send
+        self.window = window
+        self.max_running_per_tenant = max(1, max_running_per_tenant)
+        self.rate_limit_per_minute = rate_limit_per_minute
+        self.large_file_bytes = large_file_bytes
+        self.lease_seconds = lease_seconds
+        self.clock = clock
+
+    def queue_for(self, size_bytes: int) -> str:
+        return LARGE_QUEUE if size_bytes >= self.large_file_bytes else SMALL_QUEUE
+
+    def submit(
+        self, tenant: str, doc_id: int, size_bytes: int, task_id: Optional[str] = None,
+        trace: Optional[Dict[str, str]] = None,
+    ) -> Tuple[str, Optional[float]]:
+        """Enfileira a ingestão do documento e despacha o que couber. Retorna (fila, retry_after) como `dispatch`."""
+        queues, retry_after = self.submit_many(tenant, [(doc_id, size_bytes, task_id)], trace=trace)
+        return queues[0], retry_after
+
+    def submit_many(
+        self, tenant: str, documents: List[Tuple[int, int, Optional[str]]], trace: Optional[Dict[str, str]] = None,
+    ) -> Tuple[List[str], Optional[float]]:
+        """Como `submit` para vários (doc_id, bytes, task_id) do tenant, com um único despacho."""
+        queues = [self.queue_for(size_bytes) for _, size_bytes, _ in documents]
+        now = self.clock()
+        with self.store.lock():
+            for queue, (doc_id, _, task_id) in zip(queues, documents):
+                self.store.push(queue, tenant, _job(tenant, doc_id, task_id, now, trace))
+        return queues, self.dispatch()
+
+    def release(self, tenant: str, doc_id: int) -> Optional[float]:
+        """Libera a vaga do job (fim da task, com sucesso ou não) e despacha o próximo."""
+        with self.store.lock():
+            self.store.remove_lease(tenant, doc_id)
+        return self.dispatch()
+
+    def _rate_allows(self, tenant: str, window: int) -> bool:
+        return not self.rate_limit_per_minute or self.store.rate_count(tenant, window) < self.rate_limit_per_minute
+
+    def _next_tenant(self, queue: str, window: int) -> Tuple[Optional[str], bool]:
+        """Primeiro tenant da vez que pode rodar mais um job; e se algum ficou de fora só pelo rate limit."""
+        rate_limited = False
+        for tenant in self.store.ring(queue):
+            if self.store.running(tenant=tenant) >= self.max_running_per_tenant:
+                continue
+            if not self._rate_allows(tenant, window):
+                rate_limited = True
+                continue
+            return tenant, rate_limited
+        return None, rate_limited
+
+    def dispatch(self) -> Optional[float]:
+        """
+        Libera jobs para o Celery enquanto houver vaga. Retorna em quantos segundos
+        chamar de novo quando sobrou job barrado só pelo rate limit e ninguém ainda
+        agendou essa chamada (senão None: a próxima liberação acontece no `release`
+        de um job em execução).
+        """
+        retry_after = None
+        with self.store.lock():
+            now = self.clock()
+            window = int(now // RATE_WINDOW_SECONDS)
+            self.store.expire_leases(now)
+            for queue in INGEST_QUEUES:
+                jobs = []
+                while self.store.running(queue=queue) < self.window.get(queue, 1):
+                    tenant, rate_limited = self._next_tenant(queue, window)
+                    if rate_limited:
+                        retry_after = (window + 1) * RATE_WINDOW_SECONDS - now
+                    if tenant is None:
+                        break
+                    job = self.store.pop(queue, tenant)
+                    self.store.add_lease(queue, tenant, job["doc_id"], now + self.lease_seconds)
+                    if self.rate_limit_per_minute:
+                        self.store.hit_rate(tenant, window)
+                    jobs.append(job)
+                if not jobs:
+                    continue
+                try:
+                    self.send(queue, jobs)
+                except Exception:
+                    # Broker indisponível: os jobs voltam para a fila do tenant (no fim) e as vagas são devolvidas.
+                    for job in jobs:
+                        self.store.remove_lease(job["tenant"], job["doc_id"])
+                        self.store.push(queue, job["tenant"], job)
+                    raise
+            if retry_after is not None and not self.store.claim_wakeup(now, retry_after):
+                retry_after = None
+        return retry_after
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            queue: {
+                "pending": self.store.pending(queue),
+                "running": self.store.running(queue=queue),
+                "window": self.window.get(queue, 1),
+                "tenants_waiting": len(self.store.ring(queue)),
+            }
+            for queue in INGEST_QUEUES
+        }
+
+
+class FifoIngestScheduler:
+    """
+    Sem escalonamento (INGEST_SCHEDULER='none'): envia direto para o broker, só
+    separando documentos pequenos e grandes. A ordem é a de chegada (FIFO).
+    """
+    def __init__(self, send: Callable[[str, List[Dict[str, Any]]], None], large_file_bytes: int = 5 * 1024 * 1024,
+                 clock: Callable[[], float] = time.time):
+        self.send = send
+        self.large_file_bytes = large_file_bytes
+        self.clock = clock
+
+    queue_for = FairIngestScheduler.queue_for
+
+    def submit(self, tenant, doc_id, size_bytes, task_id=None, trace=None):
+        return self.submit_many(tenant, [(doc_id, size_bytes, task_id)], trace=trace)[0][0], None
+
+    def submit_many(self, tenant, documents, trace=None):
+        now = self.clock()
+        batches = {}
+        for doc_id, size_bytes, task_id in documents:
+            job = _job(tenant, doc_id, task_id, now, trace)
+            batches.setdefault(self.queue_for(size_bytes), []).append(job)
+        for queue, jobs in batches.items():
+            self.send(queue, jobs)
+        return [self.queue_for(size_bytes) for _, size_bytes, _ in documents], None
+
+    def release(self, tenant, doc_id):
+        return None
+
+    def dispatch(self):
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        return {}
+
+
+def build_ingest_scheduler(settings: Any, send: Callable[[str, List[Dict[str, Any]]], None], **options: Any):
+    """Cria o escalonador conforme `INGEST_SCHEDULER` ('redis', 'local' ou 'none')."""
+    backend_name = (settings.INGEST_SCHEDULER or "none").lower()
+    if backend_name == "none":
+        return FifoIngestScheduler(send, large_file_bytes=settings.INGEST_LARGE_FILE_BYTES, **options)
+    if backend_name not in ("local", "redis"):
+        raise ValueError(f"INGEST_SCHEDULER desconhecido: {settings.INGEST_SCHEDULER}")
+
+    if backend_name == "redis":
+        import redis
+
+        store = RedisIngestQueueStore(redis.Redis.from_url(settings.INGEST_SCHEDULER_REDIS_URL or settings.CELERY_REDIS_DSN))
+    else:
+        store = LocalIngestQueueStore()
+    return FairIngestScheduler(
+        store,
+        send,
+        window={SMALL_QUEUE: settings.INGEST_SMALL_QUEUE_WINDOW, LARGE_QUEUE: settings.INGEST_LARGE_QUEUE_WINDOW},
+        max_running_per_tenant=settings.INGEST_TENANT_MAX_RUNNING,
+        rate_limit_per_minute=settings.INGEST_TENANT_RATE_LIMIT_PER_MINUTE,
+        large_file_bytes=settings.INGEST_LARGE_FILE_BYTES,
+        lease_seconds=settings.INGEST_LEASE_SECONDS,
+        **options,
+    )
@@ -0,0 +1,205 @@
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import unicodedata
+from contextlib import closing
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# Palavras muito frequentes nas perguntas que só adicionam ruído à busca por termos.
+_STOPWORDS = frozenset(
+    "a o as os um uma de da do das dos e em no na nos nas por para com sem que qual quais "
+    "como onde quando se ao aos à às é são ser foi meu minha seu sua isso este esta esse essa".split()
+)
+# Palavras e identificadores compostos (códigos de produto, números de cláusula): "x-0012-03", "4.2.1"
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[-./][a-z0-9]+)*")
+_COMBINING_RE = re.compile(r"[\u0300-\u036f]")
+
+
+def normalize_text(text: str) -> str:
+    """Minúsculas e sem acentos (a mesma normalização dos termos indexados)."""
+    return _COMBINING_RE.sub("", unicodedata.normalize("NFKD", text.lower()))
+
+
+def keyword_tokens(text: str) -> List[str]:
+    """
+    Normaliza (minúsculas, sem acentos) e quebra o texto em termos. Identificadores
+    compostos geram o termo inteiro e também suas partes ("x-0012-03", "x", "0012", "03").
+    """
+    tokens = []
+    for token in _TOKEN_RE.findall(normalize_text(text)):
+        parts = re.split(r"[-./]", token)
+        if len(parts) > 1:
+            tokens.append(token)
+        tokens.extend(part for part in parts if part not in _STOPWORDS)
+    return tokens
+
+
+class KeywordIndex:
+    """
+    Índice invertido por tenant (SQLite FTS5, ranking BM25) mantido ao lado da
+    collection Chroma. É persistente e compartilhado entre o worker (que o atualiza
+    na ingestão) e a API (que o consulta), sem cache em memória para invalidar.
+
+    Colunas UNINDEXED do FTS5 não têm índice: a tabela `<tabela>_ids` (mesmo rowid)
+    guarda chunk_id/doc_id/source_file indexados para upserts e remoções sem varrer
+    o índice inteiro.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        with closing(self._new_connection()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")  # leitores não bloqueiam a escrita do worker
+
+    def _new_connection(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    def _connect(self) -> sqlite3.Connection:
+        """Conexão reaproveitada por thread (abrir uma por consulta custa mais que a busca)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._new_connection()
+        return conn
+
+    @staticmethod
+    def _table(client_id: str) -> str:
+        return "kw_" + hashlib.sha1(client_id.encode("utf-8")).hexdigest()[:20]
+
+    def _ensure_table(self, conn: sqlite3.Connection, client_id: str) -> str:
+        table = self._table(client_id)
+        conn.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING fts5("
+            "chunk_id UNINDEXED, doc_id UNINDEXED, source_file UNINDEXED, terms, content UNINDEXED, metadata UNINDEXED, "
+            "tokenize=\"unicode61 tokenchars '-./'\")"
+        )
+        conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table}_ids "
+            "(rowid INTEGER PRIMARY KEY, chunk_id TEXT NOT NULL UNIQUE, doc_id INTEGER, source_file TEXT)"
+        )
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_ids_doc ON {table}_ids (doc_id)")
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_ids_source ON {table}_ids (source_file)")
+        return table
+
+    def exists(self, client_id: str) -> bool:
+        # Pela tabela de ids: índices criados antes dela existir são refeitos a partir do Chroma.
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = ?", (self._table(client_id) + "_ids",)
+            ).fetchone()
+        return row is not None
+
+    @staticmethod
+    def _delete_rows(conn: sqlite3.Connection, table: str, column: str, values: Sequence[Any]) -> None:
+        for start in range(0, len(values), 500):
+            batch = list(values[start:start + 500])
+            marks = ",".join("?" * len(batch))
+            rowids = [row[0] for row in conn.execute(f"SELECT rowid FROM {table}_ids WHERE {column} IN ({marks})", batch)]
+            if not rowids:
+                continue
+            marks = ",".join("?" * len(rowids))
+            conn.execute(f"DELETE FROM {table} WHERE rowid IN ({marks})", rowids)
+            conn.execute(f"DELETE FROM {table}_ids WHERE rowid IN ({marks})", rowids)
+
+    @classmethod
+    def _write(cls, conn: sqlite3.Connection, table: str, ids, texts, metadatas) -> None:
+        cls._delete_rows(conn, table, "chunk_id", ids)
+        for chunk_id, text, metadata in zip(ids, texts, metadatas):
+            metadata = metadata or {}
+            doc_id, source_file = metadata.get("doc_id"), metadata.get("source_file")
+            rowid = conn.execute(
+                f"INSERT INTO {table}_ids (chunk_id, doc_id, source_file) VALUES (?, ?, ?)",
+                (chunk_id, doc_id, source_file),
+            ).lastrowid
+            conn.execute(
+                f"INSERT INTO {table} (rowid, chunk_id, doc_id, source_file, terms, content, metadata) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (rowid, chunk_id, doc_id, source_file, " ".join(keyword_tokens(text)), text,
+                 json.dumps(metadata, ensure_ascii=False)),
+            )
+
+    def upsert(
+        self,
+        client_id: str,
+        ids: Sequence[str],
+        texts: Sequence[str],
+        metadatas: Sequence[Optional[Dict[str, Any]]],
+    ) -> None:
+        if not ids:
+            return
+        with self._connect() as conn:
+            self._write(conn, self._ensure_table(conn, client_id), ids, texts, metadatas)
+
+    def delete(
+        self,
+        client_id: str,
+        ids: Optional[Sequence[str]] = None,
+        doc_id: Optional[int] = None,
+        source_file: Optional[str] = None,
+    ) -> None:
+        """Remove chunks por id, por documento e/ou por arquivo de origem."""
+        if not self.exists(client_id):
+            return
+        table = self._table(client_id)
+        with self._connect() as conn:
+            if ids:
+                self._delete_rows(conn, table, "chunk_id", ids)
+            if doc_id is not None:
+                self._delete_rows(conn, table, "doc_id", [doc_id])
+            if source_file:
+                self._delete_rows(conn, table, "source_file", [source_file])
+
+    def drop(self, client_id: str) -> None:
+        table = self._table(client_id)
+        with self._connect() as conn:
+            conn.execute(f"DROP TABLE IF EXISTS {table}")
+            conn.execute(f"DROP TABLE IF EXISTS {table}_ids")
+
+    def rebuild(self, client_id: str, collection: Any, page_size: int = 1000, only_if_missing: bool = False) -> int:
+        """
+        Recria o índice do tenant a partir do conteúdo já gravado na collection Chroma,
+        em uma única transação (leitores continuam vendo a versão anterior até o fim).
+        Com `only_if_missing`, não faz nada se outro processo já criou o índice.
+        """
+        total = 0
+        with closing(self._new_connection()) as conn:
+            conn.isolation_level = None
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                table = self._table(client_id)
+                exists = conn.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (table + "_ids",)).fetchone()
+                if exists and only_if_missing:
+                    conn.execute("ROLLBACK")
+                    return 0
+                conn.execute(f"DROP TABLE IF EXISTS {table}")
+                conn.execute(f"DROP TABLE IF EXISTS {table}_ids")
+                self._ensure_table(conn, client_id)
+                offset = 0
+                while True:
+                    page = collection.get(include=["documents", "metadatas"], limit=page_size, offset=offset)
+                    if not page["ids"]:
+                        break
+                    self._write(conn, table, page["ids"], page["documents"], page["metadatas"])
+                    total += len(page["ids"])
+                    offset += page_size
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return total
+
+    def search(self, client_id: str, query: str, k: int) -> List[Tuple[str, str, Dict[str, Any], float]]:
+        """Top-k por BM25: lista de (chunk_id, texto, metadados, score), melhor primeiro."""
+        terms = list(dict.fromkeys(keyword_tokens(query)))
+        if not terms or not self.exists(client_id):
+            return []
+        match = " OR ".join('"' + term.replace('"', '""') + '"' for term in terms)
+        table = self._table(client_id)
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT chunk_id, content, metadata, bm25({table}) AS score FROM {table} "
+                f"WHERE {table} MATCH ? ORDER BY score LIMIT ?",
+                (match, k),
+            ).fetchall()
+        # bm25() do FTS5 é negativo (menor = mais relevante)
+        return [(chunk_id, content, json.loads(metadata), -score) for chunk_id, content, metadata, score in rows]
@@ -0,0 +1,124 @@
+import gc
+import os
+from collections import deque
+from typing import TYPE_CHECKING, Callable, Iterator, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
+
+
+def current_rss_mb() -> Optional[float]:
+    """RSS atual do processo em MB (Linux, via /proc); None se não for possível medir."""
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _extract_page_range(file_path: str, start: int, end: int) -> List[Tuple[int, str]]:
+    """Executado em um processo filho: extrai o texto das páginas [start, end)."""
+    from pypdf import PdfReader
+
+    reader = PdfReader(file_path)
+    return [(number, reader.pages[number].extract_text() or "") for number in range(start, end)]
+
+
+def _count_pages(file_path: str) -> int:
+    from pypdf import PdfReader
+
+    return len(PdfReader(file_path).pages)
+
+
+class StreamingPDFLoader:
+    """
+    Carrega um PDF página a página, sem materializar o documento inteiro.
+
+    Com `workers` > 1 as páginas são divididas em faixas de `pages_per_task`
+    extraídas em paralelo por um pool de processos (billiard, que funciona dentro
+    dos workers prefork do Celery), mantendo no máximo 2 faixas por processo em
+    voo. As páginas são sempre entregues na ordem do documento.
+    """
+    def __init__(
+        self,
+        file_path: str,
+        workers: int = 1,
+        pages_per_task: int = 16,
+        memory_limit_mb: int = 0,
+    ):
+        self.file_path = file_path
+        self.workers = max(1, workers)
+        self.pages_per_task = max(1, pages_per_task)
+        self.memory_limit_mb = memory_limit_mb
+        self.pages_loaded = 0
+
+    def over_memory_limit(self) -> bool:
+        if self.memory_limit_mb <= 0:
+            return False
+        rss = current_rss_mb()
+        return rss is not None and rss >= self.memory_limit_mb
+
+    def lazy_load(self) -> Iterator["Document"]:
+        if self.workers > 1:
+            pages = self._parallel_pages()
+        else:
+            from langchain_community.document_loaders import PyPDFLoader
+
+            pages = PyPDFLoader(self.file_path).lazy_load()
+        for page in pages:
+            self.pages_loaded += 1
+            yield page
+
+    def _parallel_pages(self) -> Iterator["Document"]:
+        import billiard
+        from langchain_core.documents import Document
+
+        total_pages = _count_pages(self.file_path)
+        ranges = deque(
+            (start, min(start + self.pages_per_task, total_pages))
+            for start in range(0, total_pages, self.pages_per_task)
+        )
+        max_in_flight = self.workers * 2
+
+        with billiard.Pool(processes=self.workers) as pool:
+            pending = deque()
+            while ranges or pending:
+                # Acima do teto de memória, só uma faixa em voo por vez.
+                limit = 1 if self.over_memory_limit() else max_in_flight
+                while ranges and len(pending) < limit:
+                    start, end = ranges.popleft()
+                    pending.append(pool.apply_async(_extract_page_range, (self.file_path, start, end)))
+
+                for number, text in pending.popleft().get():
+                    yield Document(
+                        page_content=text,
+                        metadata={"source": self.file_path, "page": number, "total_pages": total_pages},
+                    )
+
+
+def iter_chunk_batches(
+    loader: StreamingPDFLoader,
+    text_splitter,
+    flush_chunks: int = 512,
+    on_page: Optional[Callable[["Document", int], None]] = None,
+) -> Iterator[List["Document"]]:
+    """
+    Divide as páginas em chunks conforme chegam do loader e os entrega em lotes de
+    até `flush_chunks`. O lote é entregue antes se o processo passar do teto de memória.
+    `on_page(página, n_chunks)` é chamado a cada página dividida.
+    """
+    buffer: List["Document"] = []
+    for page in loader.lazy_load():
+        chunks = text_splitter.split_documents([page])
+        if on_page is not None:
+            on_page(page, len(chunks))
+        buffer.extend(chunks)
+        over_limit = bool(buffer) and loader.over_memory_limit()
+        if len(buffer) >= flush_chunks or over_limit:
+            yield buffer
+            buffer = []
+            if over_limit:
+                gc.collect()
+    if buffer:
+        yield buffer
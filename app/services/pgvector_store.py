@@ -0,0 +1,316 @@
+import itertools
+import json
+import threading
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import text
+
+from app.services.keyword_index import keyword_tokens
+from app.services.vector_index import DEFAULT_INCLUDE, VectorStoreBackend, query_result, where_to_sql
+
+TABLE = "vector_chunks"
+# Linhas por INSERT em `upsert` (executemany do psycopg2).
+UPSERT_BATCH = 500
+
+
+def _vector_literal(vector) -> str:
+    # Sem o pacote pgvector: o vetor vai como texto '[x,y,...]' com CAST para `vector`.
+    return "[" + ",".join(repr(float(value)) for value in vector) + "]"
+
+
+def _terms_literal(document: Optional[str]) -> str:
+    """
+    tsvector (texto) com os termos de `keyword_tokens` e suas posições: os mesmos
+    termos do índice SQLite, sem passar pelo parser de texto do PostgreSQL.
+    """
+    positions = defaultdict(list)
+    for position, token in enumerate(keyword_tokens(document or ""), start=1):
+        # Limites do tsvector: posições até 16383 e no máximo 256 por termo.
+        if position <= 16383 and len(positions[token]) < 256:
+            positions[token].append(str(position))
+    # Os termos só têm [a-z0-9-./]: as aspas simples bastam como escape.
+    return " ".join(f"'{token}':{','.join(found)}" for token, found in positions.items())
+
+
+class PgVectorCollection:
+    """Collection de um tenant: linhas de `vector_chunks` com o `client_id` dele."""
+    def __init__(self, store: "PgVectorStore", client_id: str):
+        self.store = store
+        self.client_id = client_id
+
+    def _where(self, where) -> tuple:
+        names = itertools.count()
+
+        def equals(key, value):
+            name = f"w{next(names)}"
+            return f"metadata @> CAST(:{name} AS jsonb)", [(name, json.dumps({key: value}))]
+
+        sql, params = where_to_sql(where or {}, equals)
+        return sql, dict(params)
+
+    def upsert(self, ids, embeddings, documents=None, metadatas=None) -> None:
+        documents = documents or [None] * len(ids)
+        metadatas = metadatas or [None] * len(ids)
+        rows = [
+            {
+                "client_id": self.client_id,
+                "id": chunk_id,
+                "document": document,
+                "metadata": json.dumps(metadata or {}, ensure_ascii=False),
+                "embedding": _vector_literal(vector),
+                "terms": _terms_literal(document),
+            }
+            for chunk_id, vector, document, metadata in zip(ids, embeddings, documents, metadatas)
+        ]
+        # `terms` (busca por termos, PgKeywordIndex) é gravado junto com o chunk.
+        statement = text(
+            f"INSERT INTO {TABLE} (client_id, id, document, metadata, embedding, terms) "
+            "VALUES (:client_id, :id, :document, CAST(:metadata AS jsonb), CAST(:embedding AS vector), "
+            "CAST(:terms AS tsvector)) "
+            "ON CONFLICT (client_id, id) DO UPDATE SET document = EXCLUDED.document, "
+            "metadata = EXCLUDED.metadata, embedding = EXCLUDED.embedding, terms = EXCLUDED.terms"
+        )
+        with self.store.begin() as conn:
+            for start in range(0, len(rows), UPSERT_BATCH):
+                conn.execute(statement, rows[start:start + UPSERT_BATCH])
+
+    def update(self, ids, metadatas) -> None:
+        rows = [
+            {"client_id": self.client_id, "id": chunk_id, "metadata": json.dumps(metadata or {}, ensure_ascii=False)}
+            for chunk_id, metadata in zip(ids, metadatas)
+        ]
+        if rows:
+            with self.store.begin() as conn:
+                conn.execute(
+                    text(f"UPDATE {TABLE} SET metadata = CAST(:metadata AS jsonb) WHERE client_id = :client_id AND id = :id"),
+                    rows,
+                )
+
+    def delete(self, ids=None, where=None) -> None:
+        if ids is not None:
+            sql, params = "id = ANY(:ids)", {"ids": list(ids)}
+        else:
+            sql, params = self._where(where)
+        with self.store.begin() as conn:
+            conn.execute(text(f"DELETE FROM {TABLE} WHERE client_id = :client_id AND {sql}"), {"client_id": self.client_id, **params})
+
+    def get(self, ids=None, where=None, include=DEFAULT_INCLUDE, limit=None, offset=None) -> Dict[str, List[Any]]:
+        sql, params = self._where(where)
+        if ids is not None:
+            sql += " AND id = ANY(:ids)"
+            params["ids"] = list(ids)
+        statement = (
+            f"SELECT id, document, metadata, {'embedding::text' if 'embeddings' in include else 'NULL'} "
+            f"FROM {TABLE} WHERE client_id = :client_id AND {sql} ORDER BY id"
+        )
+        if limit is not None:
+            statement += " LIMIT :limit"
+            params["limit"] = limit
+        if offset:
+            statement += " OFFSET :offset"
+            params["offset"] = offset
+        with self.store.begin() as conn:
+            rows = conn.execute(text(statement), {"client_id": self.client_id, **params}).all()
+        result = {"ids": [row[0] for row in rows]}
+        if "documents" in include:
+            result["documents"] = [row[1] for row in rows]
+        if "metadatas" in include:
+            result["metadatas"] = [row[2] for row in rows]
+        if "embeddings" in include:
+            result["embeddings"] = [json.loads(row[3]) for row in rows]
+        return result
+
+    def query(self, query_embeddings, n_results: int = 10, include=DEFAULT_INCLUDE) -> Dict[str, List[List[Any]]]:
+        with self.store.begin() as conn:
+            self.store.configure_search(conn, n_results)
+            rows = conn.execute(
+                text(
+                    "SELECT id, document, metadata, distance FROM ("
+                    f"SELECT id, document, metadata, embedding <=> CAST(:query AS vector) AS distance FROM {TABLE} "
+                    "WHERE client_id = :client_id ORDER BY distance LIMIT :k) AS nearest ORDER BY distance"
+                ),
+                {"client_id": self.client_id, "query": _vector_literal(query_embeddings[0]), "k": n_results},
+            ).all()
+        return query_result([tuple(row) for row in rows], include)
+
+    def count(self) -> int:
+        with self.store.begin() as conn:
+            return conn.execute(text(f"SELECT count(*) FROM {TABLE} WHERE client_id = :client_id"), {"client_id": self.client_id}).scalar()
+
+
+class PgKeywordIndex:
+    """
+    Busca por termos do backend pgvector, com a mesma interface de `KeywordIndex`:
+    coluna `terms` (tsvector) de `vector_chunks` com índice GIN, gravada pelo
+    `upsert` da collection junto com o chunk. API e workers de todos os nós leem o
+    mesmo banco, então o modo híbrido enxerga cada ingestão assim que ela é gravada
+    (o índice SQLite do `KeywordIndex` é local a uma máquina).
+
+    O ranking é `ts_rank` (frequência do termo normalizada pelo tamanho do chunk),
+    sem o IDF do BM25 do FTS5. Linhas gravadas antes da coluna existir ficam com
+    `terms` NULL até o `rebuild` do tenant (feito pelo retriever no primeiro uso).
+    """
+    def __init__(self, store: "PgVectorStore"):
+        self.store = store
+        # Tenants sem linhas pendentes (upserts sempre gravam `terms`: não voltam a ter).
+        self._complete = set()
+
+    def exists(self, client_id: str) -> bool:
+        if client_id in self._complete:
+            return True
+        with self.store.begin() as conn:
+            pending = conn.execute(
+                text(f"SELECT 1 FROM {TABLE} WHERE client_id = :client_id AND terms IS NULL LIMIT 1"),
+                {"client_id": client_id},
+            ).first()
+        if pending is None:
+            self._complete.add(client_id)
+        return pending is None
+
+    def upsert(self, client_id: str, ids: Sequence[str], texts: Sequence[str], metadatas: Sequence[Any]) -> None:
+        """Nada a fazer: `PgVectorCollection.upsert` já gravou os termos."""
+
+    def delete(self, client_id: str, ids=None, doc_id=None, source_file=None) -> None:
+        """Nada a fazer: os termos saem com as linhas removidas da collection."""
+
+    def drop(self, client_id: str) -> None:
+        self._complete.discard(client_id)
+
+    def rebuild(self, client_id: str, collection: Any = None, page_size: int = 1000, only_if_missing: bool = False) -> int:
+        """Preenche `terms` das linhas do tenant gravadas antes da coluna existir; retorna quantas."""
+        total = 0
+        while True:
+            with self.store.begin() as conn:
+                rows = conn.execute(
+                    text(
+                        f"SELECT id, document FROM {TABLE} WHERE client_id = :client_id AND terms IS NULL "
+                        "LIMIT :limit FOR UPDATE SKIP LOCKED"
+                    ),
+                    {"client_id": client_id, "limit": page_size},
+                ).all()
+                if rows:
+                    conn.execute(
+                        text(f"UPDATE {TABLE} SET terms = CAST(:terms AS tsvector) WHERE client_id = :client_id AND id = :id"),
+                        [{"client_id": client_id, "id": chunk_id, "terms": _terms_literal(document)} for chunk_id, document in rows],
+                    )
+            total += len(rows)
+            if len(rows) < page_size:
+                break
+        return total
+
+    def search(self, client_id: str, query: str, k: int) -> List[Tuple[str, str, Dict[str, Any], float]]:
+        """Top-k por ts_rank: lista de (chunk_id, texto, metadados, score), melhor primeiro."""
+        terms = list(dict.fromkeys(keyword_tokens(query)))
+        if not terms:
+            return []
+        with self.store.begin() as conn:
+            rows = conn.execute(
+                text(
+                    "SELECT id, document, metadata, ts_rank(terms, query, 1) AS score "
+                    f"FROM {TABLE}, CAST(:query AS tsquery) AS query "
+                    "WHERE client_id = :client_id AND terms @@ query ORDER BY score DESC, id LIMIT :k"
+                ),
+                {"client_id": client_id, "query": " | ".join(f"'{term}'" for term in terms), "k": k},
+            ).all()
+        return [(chunk_id, document, metadata or {}, float(score)) for chunk_id, document, metadata, score in rows]
+
+
+class PgVectorStore(VectorStoreBackend):
+    """
+    Backend pgvector (VECTOR_STORE_PROVIDER=pgvector): os chunks de todos os tenants
+    em uma tabela do PostgreSQL, com índice ANN (HNSW ou IVFFlat, distância de
+    cosseno), índice GIN nos metadados para os filtros `where` e a busca por termos
+    do modo híbrido (`keyword_index()`, coluna `terms` com índice GIN).
+
+    A busca é filtrada por `client_id`; com pgvector >= 0.8 ela usa `iterative_scan`
+    para que o filtro não descarte os vizinhos devolvidos pelo índice (que é global)
+    e deixe a resposta com menos de `n_results` chunks.
+    """
+    def __init__(self, engine: Any, dimensions: int, index: str = "hnsw", m: int = 16, ef_construction: int = 200,
+                 ef_search: int = 64, lists: int = 100, probes: int = 10):
+        if index not in ("hnsw", "ivfflat", "none"):
+            raise ValueError(f"PGVECTOR_INDEX inválido: {index} (use 'hnsw', 'ivfflat' ou 'none')")
+        self.engine = engine
+        self.dimensions = dimensions
+        self.index = index
+        self.m = m
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self.lists = lists
+        self.probes = probes
+        self.iterative_scan = False
+        self._schema_ready = False
+        self._schema_lock = threading.Lock()
+
+    def ensure_schema(self) -> None:
+        """Cria extensão, tabela e índices (idempotente; serializado entre processos por advisory lock)."""
+        if self._schema_ready:
+            return
+        with self._schema_lock:
+            if self._schema_ready:
+                return
+            with self.engine.begin() as conn:
+                conn.execute(text("SELECT pg_advisory_xact_lock(hashtext(:name))"), {"name": TABLE})
+                conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
+                conn.execute(text(
+                    f"CREATE TABLE IF NOT EXISTS {TABLE} ("
+                    "client_id VARCHAR(255) NOT NULL, id VARCHAR(255) NOT NULL, document TEXT, "
+                    "metadata JSONB NOT NULL DEFAULT '{}'::jsonb, "
+                    f"embedding vector({int(self.dimensions)}) NOT NULL, terms tsvector, PRIMARY KEY (client_id, id))"
+                ))
+                # Tabelas criadas antes da busca por termos no PostgreSQL.
+                conn.execute(text(f"ALTER TABLE {TABLE} ADD COLUMN IF NOT EXISTS terms tsvector"))
+                conn.execute(text(f"CREATE INDEX IF NOT EXISTS ix_{TABLE}_metadata ON {TABLE} USING gin (metadata jsonb_path_ops)"))
+                conn.execute(text(f"CREATE INDEX IF NOT EXISTS ix_{TABLE}_terms ON {TABLE} USING gin (terms)"))
+                # Parcial: só as linhas ainda sem termos (vazio depois do rebuild), para `exists` ser barato.
+                conn.execute(text(
+                    f"CREATE INDEX IF NOT EXISTS ix_{TABLE}_terms_pending ON {TABLE} (client_id) WHERE terms IS NULL"
+                ))
+                if self.index == "hnsw":
+                    conn.execute(text(
+                        f"CREATE INDEX IF NOT EXISTS ix_{TABLE}_embedding_hnsw ON {TABLE} USING hnsw (embedding vector_cosine_ops) "
+                        f"WITH (m = {int(self.m)}, ef_construction = {int(self.ef_construction)})"
+                    ))
+                elif self.index == "ivfflat":
+                    conn.execute(text(
+                        f"CREATE INDEX IF NOT EXISTS ix_{TABLE}_embedding_ivfflat ON {TABLE} USING ivfflat (embedding vector_cosine_ops) "
+                        f"WITH (lists = {int(self.lists)})"
+                    ))
+                version = conn.execute(text("SELECT extversion FROM pg_extension WHERE extname = 'vector'")).scalar() or "0"
+            self.iterative_scan = tuple(int(part) for part in version.split(".")[:2] if part.isdigit()) >= (0, 8)
+            if self.index != "none" and not self.iterative_scan:
+                print(f"pgvector {version}: sem iterative_scan, buscas filtradas por tenant podem voltar com menos chunks")
+            self._schema_ready = True
+
+    def begin(self):
+        self.ensure_schema()
+        return self.engine.begin()
+
+    def configure_search(self, conn: Any, k: int) -> None:
+        # SET LOCAL vale só para a transação da busca (conexões do pool voltam ao padrão).
+        if self.index == "hnsw":
+            conn.execute(text(f"SET LOCAL hnsw.ef_search = {max(int(self.ef_search), int(k))}"))
+            if self.iterative_scan:
+                conn.execute(text("SET LOCAL hnsw.iterative_scan = relaxed_order"))
+        elif self.index == "ivfflat":
+            conn.execute(text(f"SET LOCAL ivfflat.probes = {int(self.probes)}"))
+            if self.iterative_scan:
+                conn.execute(text("SET LOCAL ivfflat.iterative_scan = relaxed_order"))
+
+    def get_collection(self, client_id: str) -> PgVectorCollection:
+        return PgVectorCollection(self, client_id)
+
+    def keyword_index(self) -> PgKeywordIndex:
+        return PgKeywordIndex(self)
+
+    def delete_collection(self, client_id: str) -> None:
+        with self.begin() as conn:
+            conn.execute(text(f"DELETE FROM {TABLE} WHERE client_id = :client_id"), {"client_id": client_id})
+
+    def list_collections(self) -> List[str]:
+        with self.begin() as conn:
+            return list(conn.execute(text(f"SELECT DISTINCT client_id FROM {TABLE} ORDER BY client_id")).scalars())
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": "pgvector", "index": self.index, "pool": self.engine.pool.stats()}
@@ -0,0 +1,123 @@
+import json
+import time
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+
+from app.core.config import settings
+
+PROGRESS_CHANNEL = "ingestion_progress:{client_id}"
+# Etapas finais: publicadas na hora. As demais (parsing/embedding/writing se alternam
+# a cada lote) respeitam o intervalo mínimo entre publicações.
+TERMINAL_STAGES = ("completed", "failed")
+
+_redis_client = None
+
+
+def _get_redis():
+    global _redis_client
+    if _redis_client is None:
+        import redis
+
+        _redis_client = redis.Redis.from_url(settings.CELERY_REDIS_DSN)
+    return _redis_client
+
+
+def publish_progress(client_id: str, payload: Dict[str, Any]) -> None:
+    """Publica um evento de progresso no canal Redis do tenant (falhas são apenas logadas)."""
+    try:
+        _get_redis().publish(PROGRESS_CHANNEL.format(client_id=client_id), json.dumps(payload, ensure_ascii=False))
+    except Exception as e:
+        print(f"Erro ao publicar progresso da ingestão: {e}")
+
+
+async def subscribe_progress(client_id: str, keepalive_seconds: float = 15.0) -> AsyncIterator[Optional[Dict[str, Any]]]:
+    """
+    Assina o canal de progresso do tenant. Produz cada evento recebido e `None`
+    a cada `keepalive_seconds` sem mensagens (para o chamador manter a conexão viva).
+    """
+    import redis.asyncio as aioredis
+
+    client = aioredis.Redis.from_url(settings.CELERY_REDIS_DSN)
+    pubsub = client.pubsub()
+    await pubsub.subscribe(PROGRESS_CHANNEL.format(client_id=client_id))
+    try:
+        while True:
+            message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=keepalive_seconds)
+            yield json.loads(message["data"]) if message else None
+    finally:
+        await pubsub.unsubscribe()
+        await pubsub.aclose()
+        await client.aclose()
+
+
+class IngestionProgress:
+    """
+    Acompanha o progresso de uma ingestão (páginas lidas, chunks gerados, embedados
+    e gravados) e o publica via `publish`, no máximo a cada `min_interval` segundos;
+    só as etapas finais (`TERMINAL_STAGES`) são publicadas na hora.
+    """
+    def __init__(
+        self,
+        doc_id: int,
+        client_id: str,
+        publish: Callable[[Dict[str, Any]], None],
+        min_interval: float = 0.5,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.doc_id = doc_id
+        self.client_id = client_id
+        self.publish = publish
+        self.min_interval = min_interval
+        self.clock = clock
+        self.started_at = clock()
+        self._last_published: Optional[float] = None
+        self.stage = "queued"
+        self.counters = {
+            "total_pages": None,
+            "pages_parsed": 0,
+            "chunks_split": 0,
+            "chunks_embedded": 0,
+            "chunks_written": 0,
+        }
+
+    def fraction(self) -> float:
+        total_pages = self.counters["total_pages"]
+        if not total_pages:
+            return 0.0
+        parsed = min(1.0, self.counters["pages_parsed"] / total_pages)
+        split = self.counters["chunks_split"]
+        written = self.counters["chunks_written"] / split if split else 0.0
+        return parsed * written
+
+    def snapshot(self) -> Dict[str, Any]:
+        elapsed = self.clock() - self.started_at
+        fraction = self.fraction()
+        eta = elapsed / fraction - elapsed if 0 < fraction < 1 else None
+        return {
+            "doc_id": self.doc_id,
+            "stage": self.stage,
+            **self.counters,
+            "progress": round(fraction, 3),
+            "elapsed_seconds": round(elapsed, 1),
+            "eta_seconds": round(eta, 1) if eta is not None else None,
+        }
+
+    def update(self, stage: Optional[str] = None, **counters: Any) -> None:
+        if stage is not None:
+            self.stage = stage
+        for name, value in counters.items():
+            self.counters[name] = value
+
+        now = self.clock()
+        if (
+            self.stage in TERMINAL_STAGES
+            or self._last_published is None
+            or now - self._last_published >= self.min_interval
+        ):
+            self._last_published = now
+            try:
+                self.publish(self.snapshot())
+            except Exception as e:
+                print(f"Erro ao publicar progresso da ingestão: {e}")
+
+    def add(self, stage: Optional[str] = None, **increments: int) -> None:
+        self.update(stage, **{name: self.counters[name] + value for name, value in increments.items()})
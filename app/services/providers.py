@@ -0,0 +1,134 @@
+"""
+Registro de backends do RAGService (LLM, embeddings e vector store), escolhidos
+em `Settings` por LLM_PROVIDER, EMBEDDINGS_PROVIDER e VECTOR_STORE_PROVIDER.
+
+Cada provider é uma fábrica `(settings, **dependências) -> objeto` que importa
+a biblioteca do backend só quando é chamada: importar este módulo (ou o
+rag_service) não carrega OpenAI, LangChain nem Chroma.
+
+Backends de fora do projeto podem ser registrados com `register_provider` ou
+indicados direto na configuração como "pacote.modulo:fabrica".
+"""
+import importlib
+import os
+from typing import Any, Callable, Dict, List
+
+PROVIDER_KINDS = ("llm", "embeddings", "vector_store")
+
+_registry: Dict[str, Dict[str, Callable[..., Any]]] = {kind: {} for kind in PROVIDER_KINDS}
+
+
+def register_provider(kind: str, name: str):
+    """Decorador que registra `fabrica(settings, **deps)` como o provider `name` de `kind`."""
+    if kind not in _registry:
+        raise ValueError(f"Tipo de provider desconhecido: {kind} (use {', '.join(PROVIDER_KINDS)})")
+
+    def decorator(factory: Callable[..., Any]) -> Callable[..., Any]:
+        _registry[kind][name] = factory
+        return factory
+    return decorator
+
+
+def available_providers(kind: str) -> List[str]:
+    return sorted(_registry[kind])
+
+
+def create_provider(kind: str, settings: Any, **dependencies: Any) -> Any:
+    """Instancia o backend configurado em `<KIND>_PROVIDER`."""
+    setting = f"{kind.upper()}_PROVIDER"
+    name = getattr(settings, setting)
+    factory = _registry[kind].get(name)
+    if factory is None and ":" in name:
+        module_name, attribute = name.split(":", 1)
+        factory = getattr(importlib.import_module(module_name), attribute)
+    if factory is None:
+        raise ValueError(f"{setting} inválido: {name} (use {', '.join(available_providers(kind))} ou 'modulo:fabrica')")
+    return factory(settings, **dependencies)
+
+
+@register_provider("llm", "openai")
+def _openai_llm(settings: Any) -> Any:
+    from langchain_openai import ChatOpenAI
+
+    return ChatOpenAI(
+        model=settings.LLM_MODEL,
+        openai_api_key=settings.OPENAI_API_KEY,
+        temperature=settings.LLM_TEMPERATURE,
+    )
+
+
+@register_provider("llm", "fake")
+def _fake_llm(settings: Any) -> Any:
+    from app.services.fake_backends import FakeChatModel
+
+    return FakeChatModel(latency=settings.FAKE_LLM_LATENCY)
+
+
+@register_provider("embeddings", "openai")
+def _openai_embeddings(settings: Any) -> Any:
+    from langchain_openai import OpenAIEmbeddings
+
+    options = {"model": settings.EMBEDDINGS_MODEL} if settings.EMBEDDINGS_MODEL else {}
+    return OpenAIEmbeddings(openai_api_key=settings.OPENAI_API_KEY, **options)
+
+
+@register_provider("embeddings", "fake")
+def _fake_embeddings(settings: Any) -> Any:
+    from app.services.fake_backends import FakeEmbeddings
+
+    return FakeEmbeddings(latency=settings.FAKE_EMBEDDINGS_LATENCY)
+
+
+@register_provider("embeddings", "fake_lexical")
+def _fake_lexical_embeddings(settings: Any) -> Any:
+    from app.services.fake_backends import LexicalFakeEmbeddings
+
+    return LexicalFakeEmbeddings(latency=settings.FAKE_EMBEDDINGS_LATENCY)
+
+
+@register_provider("vector_store", "chroma")
+def _chroma_vector_store(settings: Any, embeddings: Any) -> Any:
+    from app.services.vector_store_cache import VectorStoreCache
+
+    os.makedirs(settings.CHROMA_PATH, exist_ok=True)
+    return VectorStoreCache(
+        chroma_path=settings.CHROMA_PATH,
+        embeddings=embeddings,
+        max_entries=settings.VECTOR_STORE_CACHE_MAX_ENTRIES,
+        ttl_seconds=settings.VECTOR_STORE_CACHE_TTL_SECONDS,
+        memory_limit_bytes=settings.CHROMA_MEMORY_LIMIT_BYTES,
+        search_kwargs={"k": settings.RETRIEVAL_K},
+    )
+
+
+@register_provider("vector_store", "pgvector")
+def _pgvector_vector_store(settings: Any, embeddings: Any) -> Any:
+    from app.core.db import make_engine
+    from app.services.pgvector_store import PgVectorStore
+
+    engine = make_engine(
+        "pgvector", settings.PGVECTOR_POOL_SIZE, settings.PGVECTOR_MAX_OVERFLOW, url=settings.PGVECTOR_DATABASE_URL
+    )
+    return PgVectorStore(
+        engine,
+        dimensions=settings.PGVECTOR_DIMENSIONS,
+        index=settings.PGVECTOR_INDEX,
+        m=settings.HNSW_M,
+        ef_construction=settings.HNSW_EF_CONSTRUCTION,
+        ef_search=settings.HNSW_EF_SEARCH,
+        lists=settings.PGVECTOR_IVFFLAT_LISTS,
+        probes=settings.PGVECTOR_IVFFLAT_PROBES,
+    )
+
+
+@register_provider("vector_store", "hnsw")
+def _hnsw_vector_store(settings: Any, embeddings: Any) -> Any:
+    from app.services.hnsw_store import HnswVectorStore
+
+    return HnswVectorStore(
+        settings.HNSW_PATH,
+        m=settings.HNSW_M,
+        ef_construction=settings.HNSW_EF_CONSTRUCTION,
+        ef_search=settings.HNSW_EF_SEARCH,
+        max_entries=settings.VECTOR_STORE_CACHE_MAX_ENTRIES,
+    )
@@ -1,23 +1,37 @@
+import asyncio
+import hashlib
 import os
+import threading
+import time
 import uuid
-from typing import List, Any
-import chromadb 
+from collections import Counter
+from typing import AsyncIterator, List, Any, Optional, Tuple
 
+from app.core import telemetry
 from app.core.config import settings
 from app.core.celery_app import celery_app
-from app.core.db import SessionLocal
-from app.core.models import Document as DocumentModel, DocumentStatus
-
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_community.document_loaders import PyPDFLoader
-from langchain_community.vectorstores import Chroma
-from langchain_openai import OpenAIEmbeddings, ChatOpenAI
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.runnables import RunnablePassthrough
-from langchain_core.output_parsers import StrOutputParser
-from sqlalchemy import update
+from app.core.db import WorkerSessionLocal
+from app.core.models import Client, Document as DocumentModel, DocumentStatus
+from app.services.answer_cache import build_answer_cache, normalize_query
+from app.services.chunking import ChunkingConfig, create_splitter, resolve_chunking
+from app.services.collection_versions import build_collection_versions
+from app.services.conversation import build_conversation_memory
+from app.services.embedding_pipeline import EmbeddingPipeline
+from app.services.embedding_cache import CachedEmbeddings
+from app.services.pdf_loader import StreamingPDFLoader, iter_chunk_batches
+from app.services.progress import IngestionProgress, publish_progress
+from app.services.keyword_index import KeywordIndex
+from app.services.retrieval import HybridRetriever
+from app.services.guardrail import GUARDRAIL_MODES, VERDICT_OK, VERDICT_RISK, LocalGuardrail
+from app.core.metrics import bind_labels, stage_metrics, usage_metrics
+from app.core.single_flight import SingleFlight
+from app.services.context_builder import ContextBuilder
+from app.services.tokenizer import count_tokens
+from app.services.providers import create_provider
+from app.services.ingest_scheduler import SMALL_QUEUE, build_ingest_scheduler
 
-CHROMA_DB_PATH = "chroma_db"
+from celery import group
+from sqlalchemy import update
 
 GUARDRAIL_PROMPT_TEMPLATE = """
 Você é um sistema de segurança. Sua tarefa é analisar a pergunta do usuário.
@@ -41,97 +55,767 @@ Pergunta do Usuário: {question}
 Resposta:
 """
 
+CONDENSE_PROMPT_TEMPLATE = """
+Dada a conversa abaixo e uma nova pergunta do usuário, reescreva a nova pergunta como uma pergunta completa e independente, que possa ser entendida sem o histórico.
+Não responda a pergunta. Se ela já for independente, repita-a sem mudanças. Responda APENAS com a pergunta reescrita.
+
+Histórico:
+{history}
+
+Nova pergunta: {question}
+
+Pergunta independente:
+"""
+
+SUMMARY_PROMPT_TEMPLATE = """
+Atualize o resumo de uma conversa entre um usuário e um assistente com os novos turnos abaixo.
+Mantenha os assuntos, nomes, números e decisões que possam ser retomados. Use no máximo {max_words} palavras. Responda APENAS com o resumo.
+
+Resumo atual:
+{summary}
+
+Novos turnos:
+{turns}
+
+Resumo atualizado:
+"""
+
+GUARDRAIL_BLOCKED_MESSAGE = "Sinto muito, mas essa pergunta não parece estar focada no conteúdo dos documentos e foi bloqueada por razões de segurança. Por favor, reformule sua questão."
+RAG_ERROR_MESSAGE = "Desculpe, houve um erro interno ao processar sua solicitação. Tente novamente mais tarde."
+
+
+def chunk_hash(text: str) -> str:
+    """Hash do conteúdo de um chunk (identifica chunks inalterados entre ingestões)."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _prompt(template: str):
+    from langchain_core.prompts import ChatPromptTemplate
+
+    return ChatPromptTemplate.from_template(template)
+
+
+def _cancel_task(task: asyncio.Task) -> None:
+    """Cancela a tarefa se ainda estiver rodando, sem deixar exceção não observada."""
+    if not task.done():
+        task.cancel()
+    elif not task.cancelled():
+        task.exception()
+
+
+class _component:
+    """
+    Atributo criado no primeiro acesso, uma vez por instância (com lock: requisições
+    concorrentes não criam dois clientes). Depois disso é um atributo comum da
+    instância e pode ser substituído por atribuição.
+    """
+    def __init__(self, factory):
+        self.factory = factory
+        self.name = factory.__name__
+
+    def __get__(self, obj, owner=None):
+        if obj is None:
+            return self
+        with obj._build_lock:
+            if self.name not in obj.__dict__:
+                started = time.perf_counter()
+                obj.__dict__[self.name] = self.factory(obj)
+                obj.startup_timings[self.name] = round((time.perf_counter() - started) * 1000, 1)
+        return obj.__dict__[self.name]
+
+
 class RAGService:
     """
     Classe de serviço que encapsula toda a lógica RAG, incluindo LLM, embeddings, 
     divisão de documentos e interação com o ChromaDB.
     """
     def __init__(self, settings: Any):
-        self.embeddings = OpenAIEmbeddings(openai_api_key=settings.OPENAI_API_KEY)
-        self.llm = ChatOpenAI(
-            model="gpt-3.5-turbo",
-            openai_api_key=settings.OPENAI_API_KEY,
-            temperature=0.1
-        )
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=150,
-            separators=["\n\n", "\n", ".", " ", ""],
+        self.settings = settings
+        self.llm_model = settings.LLM_MODEL
+        self.chroma_path = settings.CHROMA_PATH
+        self.startup_timings = {}
+        self._build_lock = threading.RLock()
+        self._background_tasks = set()
+        self._summarizing = set()
+        self.single_flight = SingleFlight() if settings.CHAT_COALESCE else None
+        # Splitters por configuração de chunking (tenants com colunas chunk_* próprias).
+        self._splitters = {}
+        self.context_builder = ContextBuilder(
+            max_tokens=settings.CONTEXT_MAX_TOKENS,
+            min_chunk_tokens=settings.CONTEXT_MIN_CHUNK_TOKENS,
+            model=self.llm_model,
         )
-        self.chroma_path = CHROMA_DB_PATH
-        
+
+        if settings.GUARDRAIL_MODE not in GUARDRAIL_MODES:
+            raise ValueError(f"GUARDRAIL_MODE inválido: {settings.GUARDRAIL_MODE} (use {', '.join(GUARDRAIL_MODES)})")
+        self.guardrail_mode = settings.GUARDRAIL_MODE
+        use_local_guardrail = settings.GUARDRAIL_LOCAL_PREFILTER or self.guardrail_mode == "local"
+        self.local_guardrail = LocalGuardrail() if use_local_guardrail else None
+
+    # Componentes pesados: criados no primeiro uso (ou em `warm_up`). Atribuir um
+    # componente antes do primeiro uso (ex: `service.embeddings = FakeEmbeddings()`)
+    # faz os que dependem dele serem criados já com o substituto.
+
+    @_component
+    def llm(self):
+        return create_provider("llm", self.settings)
+
+    @_component
+    def embeddings(self):
+        return create_provider("embeddings", self.settings)
+
+    @_component
+    def vector_stores(self):
+        return create_provider("vector_store", self.settings, embeddings=self.embeddings)
+
+    @_component
+    def text_splitter(self):
+        return create_splitter(resolve_chunking(self.settings), self.settings.EMBEDDINGS_MODEL)
+
+    @_component
+    def keyword_index(self):
+        # pgvector: busca por termos no PostgreSQL, visível para todos os nós.
+        shared = self.vector_stores.keyword_index()
+        if shared is not None:
+            return shared
         os.makedirs(self.chroma_path, exist_ok=True)
+        return KeywordIndex(
+            self.settings.KEYWORD_INDEX_PATH or os.path.join(self.chroma_path, "keyword_index.sqlite3")
+        )
+
+    @_component
+    def retriever(self):
+        settings = self.settings
+        return HybridRetriever(
+            self.vector_stores,
+            self.keyword_index,
+            self.embeddings,
+            mode=settings.RETRIEVAL_MODE,
+            k=settings.RETRIEVAL_K,
+            fetch_k=settings.RETRIEVAL_FETCH_K,
+            rrf_k=settings.RETRIEVAL_RRF_K,
+            rerank=settings.RETRIEVAL_RERANK,
+            mmr_lambda=settings.RETRIEVAL_MMR_LAMBDA,
+            cross_encoder_model=settings.RETRIEVAL_CROSS_ENCODER_MODEL,
+        )
+
+    @_component
+    def answer_cache(self):
+        return build_answer_cache(self.settings)
+
+    @_component
+    def collection_versions(self):
+        return build_collection_versions(self.settings)
+
+    @_component
+    def conversation(self):
+        return build_conversation_memory(self.settings)
+
+    @_component
+    def embedding_pipeline(self):
+        settings = self.settings
+        ingestion_embeddings = self.embeddings
+        if settings.EMBEDDING_CACHE_ENABLED:
+            ingestion_embeddings = CachedEmbeddings(self.embeddings, WorkerSessionLocal)
+        return EmbeddingPipeline(
+            ingestion_embeddings,
+            batch_size=settings.EMBEDDING_BATCH_SIZE,
+            max_batch_tokens=settings.EMBEDDING_BATCH_MAX_TOKENS,
+            max_concurrency=settings.EMBEDDING_MAX_CONCURRENCY,
+            max_retries=settings.EMBEDDING_MAX_RETRIES,
+        )
+
+    @_component
+    def _prompt_base_tokens(self):
+        # Carrega o encoding do tiktoken (download na primeira vez).
+        return count_tokens(RAG_PROMPT_TEMPLATE.format(context="", question=""), self.llm_model)
+
+    def warm_up(self, ingestion: bool = False) -> dict:
+        """
+        Cria os componentes agora (SERVICE_WARMUP), para a primeira requisição não pagar
+        a inicialização. Retorna o tempo de criação de cada um, em ms (incluindo os
+        componentes que ele cria, ex: `retriever` inclui `vector_stores`).
+        """
+        names = ["llm", "embeddings", "vector_stores", "keyword_index", "retriever", "collection_versions", "answer_cache", "conversation", "_prompt_base_tokens"]
+        if ingestion:
+            names += ["text_splitter", "embedding_pipeline"]
+        for name in names:
+            getattr(self, name)
+        return dict(self.startup_timings)
+
+    def _build_context(self, query: str, docs) -> str:
+        """Monta o contexto do prompt dentro do orçamento de tokens e registra o tamanho do prompt."""
+        context, stats = self.context_builder.build(query, docs)
+        prompt_tokens = self._prompt_base_tokens + stats["tokens"] + count_tokens(query, self.llm_model)
+        usage_metrics.record("prompt_tokens", prompt_tokens)
+        usage_metrics.record("context_tokens_saved", max(0, stats["raw_tokens"] - stats["tokens"]))
+        print(
+            f"Prompt RAG: {prompt_tokens} tokens (contexto {stats['tokens']}/{stats['raw_tokens']} tokens, "
+            f"{stats['chunks_used']}/{stats['chunks_in']} chunks, {stats['duplicates']} duplicados, "
+            f"{stats['compressed']} comprimidos)"
+        )
+        return context
+
+    def splitter_for(self, chunking: Optional[ChunkingConfig] = None) -> Any:
+        """Splitter da configuração do tenant (sem ela, o padrão de Settings); um por configuração."""
+        if chunking is None:
+            return self.text_splitter
+        with self._build_lock:
+            splitter = self._splitters.get(chunking.key())
+            if splitter is None:
+                splitter = self._splitters[chunking.key()] = create_splitter(chunking, self.settings.EMBEDDINGS_MODEL)
+        return splitter
 
-    def _format_docs(self, docs):
-        """Função auxiliar para formatar os documentos (chunks) em uma string única."""
-        return "\n\n".join(doc.page_content for doc in docs)
+    def ingest_document(
+        self,
+        file_path: str,
+        client_id: str,
+        progress: Optional[IngestionProgress] = None,
+        doc_id: Optional[int] = None,
+        chunking: Optional[ChunkingConfig] = None,
+    ) -> bool:
+        """
+        Processa um documento e o armazena no ChromaDB (página a página, em lotes).
 
-    def ingest_document(self, file_path: str, client_id: str) -> bool:
-        """Processa um documento e o armazena no ChromaDB."""
+        Com `doc_id`, os chunks recebem ids determinísticos (documento + hash do
+        conteúdo) e a ingestão é incremental: chunks já indexados para o documento
+        não são embedados de novo e os que deixaram de existir são removidos.
+        `chunking` é a divisão configurada para o tenant (padrão: CHUNK_* de Settings).
+        """
         try:
-            loader = PyPDFLoader(file_path)
-            data = loader.load()
-            docs = self.text_splitter.split_documents(data)
-            
-            for doc in docs:
-                doc.metadata['client_id'] = client_id
-                doc.metadata['source_file'] = os.path.basename(file_path)
-            
-            Chroma.from_documents(
-                documents=docs, 
-                embedding=self.embeddings, 
-                collection_name=client_id,
-                persist_directory=self.chroma_path
+            splitter = self.splitter_for(chunking)
+            loader = StreamingPDFLoader(
+                file_path,
+                workers=self.settings.PDF_PARSE_WORKERS,
+                pages_per_task=self.settings.PDF_PAGES_PER_TASK,
+                memory_limit_mb=self.settings.INGESTION_MEMORY_LIMIT_MB,
             )
+            collection = self.vector_stores.get_collection(client_id)
+            if not self.keyword_index.exists(client_id):
+                # Tenant indexado antes do índice BM25: monta-o com o que já está no Chroma antes de acrescentar o documento.
+                self.keyword_index.rebuild(client_id, collection, only_if_missing=True)
+            existing_ids = set(self.document_chunk_ids(client_id, doc_id)) if doc_id is not None else set()
+            seen_ids = set()
+            occurrences = Counter()
+            total_chunks = reused_chunks = 0
+
+            on_page = on_batch = None
+            if progress is not None:
+                def on_page(page, n_chunks):
+                    if page.metadata.get("total_pages"):
+                        progress.counters["total_pages"] = page.metadata["total_pages"]
+                    progress.add("parsing", pages_parsed=1, chunks_split=n_chunks)
+
+                def on_batch(event, n_chunks):
+                    if event == "embedded":
+                        progress.add("embedding", chunks_embedded=n_chunks)
+                    else:
+                        progress.add("writing", chunks_written=n_chunks)
+
+            started = time.perf_counter()
+            batches = iter_chunk_batches(loader, splitter, self.settings.INGESTION_FLUSH_CHUNKS, on_page)
+            while True:
+                # Etapas medidas por lote: leitura/divisão do PDF, embeddings + gravação no Chroma, índice BM25.
+                with stage_metrics.time("ingestion_parse"):
+                    docs = next(batches, None)
+                if docs is None:
+                    break
+
+                new_docs, new_ids, kept_docs, kept_ids = [], [], [], []
+                for doc in docs:
+                    content_hash = chunk_hash(doc.page_content)
+                    doc.metadata['client_id'] = client_id
+                    doc.metadata['source_file'] = os.path.basename(file_path)
+                    doc.metadata['chunk_hash'] = content_hash
+                    if doc_id is None:
+                        new_docs.append(doc)
+                        new_ids.append(str(uuid.uuid4()))
+                        continue
+
+                    doc.metadata['doc_id'] = doc_id
+                    occurrences[content_hash] += 1
+                    chunk_id = f"{doc_id}:{content_hash}:{occurrences[content_hash]}"
+                    seen_ids.add(chunk_id)
+                    if chunk_id in existing_ids:
+                        kept_docs.append(doc)
+                        kept_ids.append(chunk_id)
+                    else:
+                        new_docs.append(doc)
+                        new_ids.append(chunk_id)
+
+                with stage_metrics.time("ingestion_embedding"):
+                    if kept_ids:
+                        # Chunk inalterado: só atualiza os metadados (página pode ter mudado), sem embedar.
+                        collection.update(ids=kept_ids, metadatas=[doc.metadata for doc in kept_docs])
+                        reused_chunks += len(kept_ids)
+                        if on_batch is not None:
+                            on_batch("embedded", len(kept_ids))
+                            on_batch("written", len(kept_ids))
+                    total_chunks += self.embedding_pipeline.embed_and_store(collection, new_docs, new_ids, on_progress=on_batch)
+
+                batch_docs, batch_ids = kept_docs + new_docs, kept_ids + new_ids
+                with stage_metrics.time("ingestion_keyword_index"):
+                    self.keyword_index.upsert(
+                        client_id, batch_ids, [doc.page_content for doc in batch_docs], [doc.metadata for doc in batch_docs]
+                    )
+
+            stale_ids = list(existing_ids - seen_ids)
+            if stale_ids:
+                collection.delete(ids=stale_ids)
+                self.keyword_index.delete(client_id, ids=stale_ids)
+
+            self.vector_stores.persist(client_id)
+            self.vector_stores.invalidate(client_id)
+            stage_metrics.observe("ingestion_total", time.perf_counter() - started)
+            usage_metrics.record("ingestion_pages", loader.pages_loaded)
             
-            print(f"Sucesso na ingestão para Cliente {client_id}. Chunks: {len(docs)}")
+            print(
+                f"Sucesso na ingestão para Cliente {client_id}. Páginas: {loader.pages_loaded}, "
+                f"Chunks novos: {total_chunks}, reaproveitados: {reused_chunks}, removidos: {len(stale_ids)}"
+            )
             return True
         
         except Exception as e:
             print(f"Erro na ingestão do documento: {e}")
             return False
 
-    def query_rag_service(self, query: str, client_id: str) -> str:
-        """Executa a sanitização, busca RAG e retorna a resposta."""
-        # GUARDAIL 
+    def document_chunk_ids(self, client_id: str, doc_id: int) -> List[str]:
+        """Ids dos chunks do documento indexados na collection do cliente."""
+        collection = self.vector_stores.get_collection(client_id)
+        return collection.get(where={"doc_id": doc_id}, include=[])["ids"]
+
+    def delete_document_vectors(self, client_id: str, doc_id: int, source_file: Optional[str] = None) -> bool:
+        """
+        Remove da collection do cliente apenas os chunks de um documento. `source_file`
+        cobre chunks indexados antes de existir a tag `doc_id` (mesmo nome de arquivo em disco).
+        """
+        where = {"doc_id": doc_id}
+        if source_file:
+            where = {"$or": [where, {"source_file": source_file}]}
         try:
-            guardrail_chain = ChatPromptTemplate.from_template(GUARDRAIL_PROMPT_TEMPLATE) | self.llm
-            sanitization_result = guardrail_chain.invoke({"query": query}).content.strip().upper()
-            
-            if sanitization_result == 'RISCO':
-                 return "Sinto muito, mas essa pergunta não parece estar focada no conteúdo dos documentos e foi bloqueada por razões de segurança. Por favor, reformule sua questão."
-        except:
-             pass
-        
+            self.vector_stores.get_collection(client_id).delete(where=where)
+            self.vector_stores.persist(client_id)
+            self.keyword_index.delete(client_id, doc_id=doc_id, source_file=source_file)
+            self.invalidate_client_caches(client_id)
+            print(f"Sucesso na exclusão dos vetores do documento {doc_id} (Cliente {client_id})")
+            return True
+        except Exception as e:
+            print(f"Erro ao remover vetores do documento {doc_id}: {e}")
+            return False
+
+    def _local_guardrail(self, query: str) -> Optional[bool]:
+        """
+        Decide o guardrail sem rede quando possível.
+        Retorna True (bloquear), False (liberar) ou None (é preciso consultar a LLM).
+        """
+        if self.guardrail_mode == "off":
+            return False
+        verdict = None
+        if self.local_guardrail is not None:
+            with stage_metrics.time("guardrail_local"):
+                verdict = self.local_guardrail.classify(query)
+        if verdict == VERDICT_RISK:
+            return True
+        if verdict == VERDICT_OK or self.guardrail_mode == "local":
+            return False
+        return None
+
+    def _is_query_blocked(self, query: str) -> bool:
+        """GUARDRAIL: pede à LLM para classificar a pergunta como OK ou RISCO."""
         try:
-            db = Chroma(
-                persist_directory=self.chroma_path, 
-                embedding_function=self.embeddings, 
-                collection_name=client_id
-            )
-            
-            retriever = db.as_retriever(search_kwargs={"k": 3})
-            rag_prompt = ChatPromptTemplate.from_template(RAG_PROMPT_TEMPLATE)
-
-            rag_chain = (
-                {"context": retriever | self._format_docs, "question": RunnablePassthrough()}
-                | rag_prompt
-                | self.llm 
-                | StrOutputParser()
-            )
-            
-            result = rag_chain.invoke(query)
-            return result
+            with stage_metrics.time("guardrail_llm"):
+                guardrail_chain = _prompt(GUARDRAIL_PROMPT_TEMPLATE) | self.llm
+                sanitization_result = guardrail_chain.invoke({"query": query}).content.strip().upper()
+            return sanitization_result == VERDICT_RISK
+        except Exception:
+            return False
+
+    async def _ais_query_blocked(self, query: str) -> bool:
+        try:
+            with stage_metrics.time("guardrail_llm"):
+                guardrail_chain = _prompt(GUARDRAIL_PROMPT_TEMPLATE) | self.llm
+                sanitization_result = (await guardrail_chain.ainvoke({"query": query})).content.strip().upper()
+            return sanitization_result == VERDICT_RISK
+        except Exception:
+            return False
+
+    def _condense(self, query: str, client_id: str, session_id: Optional[str]) -> str:
+        """Reescreve a pergunta como pergunta independente usando o histórico da sessão (sem sessão: a própria pergunta)."""
+        memory = self.conversation
+        if memory is None or not session_id:
+            return query
+        try:
+            inputs = memory.condense_inputs(query, memory.load(client_id, session_id))
+            if inputs is None:
+                return query
+            with stage_metrics.time("conversation_condense"):
+                rewritten = (_prompt(CONDENSE_PROMPT_TEMPLATE) | self.llm).invoke(inputs).content
+            return memory.standalone_question(query, rewritten)
+        except Exception as e:
+            print(f"Erro ao reescrever a pergunta com o histórico: {e}")
+            return query
+
+    async def _acondense(self, query: str, client_id: str, session_id: Optional[str]) -> str:
+        memory = self.conversation
+        if memory is None or not session_id:
+            return query
+        try:
+            state = await asyncio.to_thread(memory.load, client_id, session_id)
+            inputs = memory.condense_inputs(query, state)
+            if inputs is None:
+                return query
+            with stage_metrics.time("conversation_condense"):
+                rewritten = (await (_prompt(CONDENSE_PROMPT_TEMPLATE) | self.llm).ainvoke(inputs)).content
+            return memory.standalone_question(query, rewritten)
+        except Exception as e:
+            print(f"Erro ao reescrever a pergunta com o histórico: {e}")
+            return query
+
+    def _remember(self, client_id: str, session_id: Optional[str], question: str, answer: str) -> None:
+        """Guarda o turno na sessão e, se passou de CONVERSATION_MAX_TURNS, resume os turnos antigos."""
+        memory = self.conversation
+        if memory is None or not session_id:
+            return
+        try:
+            if memory.remember(client_id, session_id, question, answer):
+                self._summarize(client_id, session_id)
+        except Exception as e:
+            print(f"Erro ao atualizar o histórico da conversa: {e}")
+
+    def _summarize(self, client_id: str, session_id: str) -> None:
+        memory = self.conversation
+        pending = memory.summary_inputs(client_id, session_id)
+        if pending is None:
+            return
+        inputs, last_turn = pending
+        with stage_metrics.time("conversation_summarize"):
+            summary = (_prompt(SUMMARY_PROMPT_TEMPLATE) | self.llm).invoke(inputs).content
+        memory.apply_summary(client_id, session_id, summary, last_turn)
+
+    async def _aremember(self, client_id: str, session_id: Optional[str], question: str, answer: str) -> None:
+        # O resumo roda em segundo plano: a resposta não espera por essa chamada extra à LLM.
+        memory = self.conversation
+        if memory is None or not session_id:
+            return
+        try:
+            needs_summary = await asyncio.to_thread(memory.remember, client_id, session_id, question, answer)
+        except Exception as e:
+            print(f"Erro ao atualizar o histórico da conversa: {e}")
+            return
+        if needs_summary and (client_id, session_id) not in self._summarizing:
+            task = asyncio.create_task(self._asummarize(client_id, session_id))
+            self._background_tasks.add(task)
+            task.add_done_callback(self._background_tasks.discard)
+
+    async def _asummarize(self, client_id: str, session_id: str) -> None:
+        memory = self.conversation
+        # Um resumo por sessão de cada vez: dois resumos concorrentes sobrescreveriam um ao outro.
+        self._summarizing.add((client_id, session_id))
+        try:
+            pending = await asyncio.to_thread(memory.summary_inputs, client_id, session_id)
+            if pending is None:
+                return
+            inputs, last_turn = pending
+            with stage_metrics.time("conversation_summarize"):
+                summary = (await (_prompt(SUMMARY_PROMPT_TEMPLATE) | self.llm).ainvoke(inputs)).content
+            await asyncio.to_thread(memory.apply_summary, client_id, session_id, summary, last_turn)
+        except Exception as e:
+            print(f"Erro ao resumir o histórico da conversa: {e}")
+        finally:
+            self._summarizing.discard((client_id, session_id))
+
+    def _retrieve(self, query: str, client_id: str, query_vector: Optional[List[float]] = None):
+        """Busca os chunks mais relevantes (vetorial/BM25/híbrida), reaproveitando o embedding da pergunta se já existir."""
+        with stage_metrics.time("retrieval"):
+            return self.retriever.retrieve(query, client_id, query_vector)
+
+    async def _aretrieve(self, query: str, client_id: str, query_vector: Optional[List[float]] = None):
+        # Chroma local e o índice BM25 (SQLite) fazem I/O de disco: ficam fora do event loop.
+        with stage_metrics.time("retrieval"):
+            if query_vector is None and self.retriever.mode != "keyword":
+                with stage_metrics.time("embedding_call", kind="query"):
+                    query_vector = await self.embeddings.aembed_query(query)
+            return await asyncio.to_thread(self.retriever.retrieve, query, client_id, query_vector)
+
+    def _rag_chain(self):
+        from langchain_core.output_parsers import StrOutputParser
+
+        return _prompt(RAG_PROMPT_TEMPLATE) | self.llm | StrOutputParser()
+
+    def _record_completion(self, answer: str) -> str:
+        usage_metrics.record("completion_tokens", count_tokens(answer, self.llm_model))
+        return answer
+
+    def _generate(self, query: str, docs) -> str:
+        context = self._build_context(query, docs)
+        with stage_metrics.time("generation"):
+            answer = self._rag_chain().invoke({"context": context, "question": query})
+        return self._record_completion(answer)
+
+    async def _aanswer(self, query: str, client_id: str, query_vector: Optional[List[float]]) -> str:
+        docs = await self._aretrieve(query, client_id, query_vector)
+        context = self._build_context(query, docs)
+        with stage_metrics.time("generation"):
+            answer = await self._rag_chain().ainvoke({"context": context, "question": query})
+        return self._record_completion(answer)
+
+    def _collection_version(self, client_id: str) -> Optional[int]:
+        """Versão da collection do tenant (compartilhada entre processos); None se indisponível."""
+        try:
+            return self.collection_versions.get(client_id)
+        except Exception as e:
+            print(f"Erro ao consultar a versão da collection do tenant {client_id}: {e}")
+            return None
 
+    def _lookup_cache(
+        self, query: str, client_id: str, version: Optional[int]
+    ) -> Tuple[Optional[str], Optional[List[float]]]:
+        """
+        Consulta o cache de respostas. Retorna (resposta_em_cache, embedding_da_pergunta);
+        o embedding só é calculado quando a busca por similaridade está ativa.
+        """
+        cache = self.answer_cache
+        if cache is None or version is None:
+            return None, None
+
+        cached = cache.lookup_exact(client_id, query, version)
+        if cached is not None or not cache.semantic_enabled:
+            return cached, None
+        try:
+            with stage_metrics.time("embedding_call", kind="query"):
+                query_vector = self.embeddings.embed_query(query)
+        except Exception as e:
+            print(f"Erro ao gerar embedding da pergunta: {e}")
+            return None, None
+        return cache.lookup_similar(client_id, query_vector, version), query_vector
+
+    async def _alookup_cache(
+        self, query: str, client_id: str, version: Optional[int]
+    ) -> Tuple[Optional[str], Optional[List[float]]]:
+        """Versão assíncrona de `_lookup_cache` (I/O do cache fora do event loop)."""
+        cache = self.answer_cache
+        if cache is None or version is None:
+            return None, None
+
+        cached = await asyncio.to_thread(cache.lookup_exact, client_id, query, version)
+        if cached is not None or not cache.semantic_enabled:
+            return cached, None
+        try:
+            with stage_metrics.time("embedding_call", kind="query"):
+                query_vector = await self.embeddings.aembed_query(query)
         except Exception as e:
-            print(f"Erro no pipeline RAG: {e}")
-            return "Desculpe, houve um erro interno ao processar sua solicitação. Tente novamente mais tarde."
+            print(f"Erro ao gerar embedding da pergunta: {e}")
+            return None, None
+        return await asyncio.to_thread(cache.lookup_similar, client_id, query_vector, version), query_vector
+
+    def query_rag_service(self, query: str, client_id: str, session_id: Optional[str] = None) -> str:
+        """
+        Executa a sanitização, busca RAG e retorna a resposta.
+        No caminho síncrono o guardrail via LLM é sempre serial (modo 'parallel' só no assíncrono).
+        Com `session_id`, a pergunta é reescrita com o histórico da conversa antes da busca
+        (cache, busca e geração usam a pergunta independente; o guardrail, a original).
+        """
+        with stage_metrics.time("chat_total", guardrail_mode=self.guardrail_mode):
+            question = self._condense(query, client_id, session_id)
+            version = self._collection_version(client_id)
+            cached, query_vector = self._lookup_cache(question, client_id, version)
+            if cached is not None:
+                self._remember(client_id, session_id, question, cached)
+                return cached
+
+            blocked = self._local_guardrail(query)
+            if blocked is None:
+                blocked = self._is_query_blocked(query)
+            if blocked:
+                return GUARDRAIL_BLOCKED_MESSAGE
+
+            try:
+                docs = self._retrieve(question, client_id, query_vector)
+                result = self._generate(question, docs)
+            except Exception as e:
+                print(f"Erro no pipeline RAG: {e}")
+                return RAG_ERROR_MESSAGE
+
+        if self.answer_cache is not None:
+            self.answer_cache.store(client_id, question, result, query_vector, version)
+        self._remember(client_id, session_id, question, result)
+        return result
+
+    async def _astart_guardrail(self, query: str) -> Tuple[bool, Optional[asyncio.Task]]:
+        """
+        Aplica o guardrail conforme GUARDRAIL_MODE. Retorna (bloqueado, tarefa_pendente):
+        no modo 'parallel' a checagem via LLM fica rodando em segundo plano e o chamador
+        deve aguardar a tarefa antes de entregar qualquer resposta.
+        """
+        blocked = self._local_guardrail(query)
+        if blocked is not None:
+            return blocked, None
+        if self.guardrail_mode == "parallel":
+            return False, asyncio.create_task(self._ais_query_blocked(query))
+        return await self._ais_query_blocked(query), None
+
+    def _coalesce(
+        self, client_id: str, query: str, question: str, version: Optional[int], producer
+    ) -> AsyncIterator[str]:
+        """
+        Compartilha guardrail, busca e geração entre perguntas idênticas simultâneas do
+        mesmo tenant (CHAT_COALESCE). A chave inclui a versão da collection lida pela
+        requisição (a mesma do cache de respostas, incrementada pelo worker após cada
+        ingestão): perguntas posteriores a uma ingestão não acompanham uma geração anterior.
+        """
+        if self.single_flight is None:
+            return producer()
+        key = (client_id, version, normalize_query(question))
+        if question != query:
+            # Pergunta reescrita com o histórico: o guardrail avalia a original, que também entra na chave.
+            key += (normalize_query(query),)
+        return self.single_flight.subscribe(key, producer, on_coalesced=lambda: usage_metrics.record("chat_coalesced", 1))
+
+    async def _aanswer_chunks(
+        self, query: str, question: str, client_id: str, query_vector: Optional[List[float]], version: Optional[int]
+    ) -> AsyncIterator[str]:
+        """Guardrail, busca e geração de `aquery_rag_service`; produz a resposta inteira de uma vez."""
+        blocked, guard_task = await self._astart_guardrail(query)
+        if blocked:
+            yield GUARDRAIL_BLOCKED_MESSAGE
+            return
+
+        answer_task = asyncio.ensure_future(self._aanswer(question, client_id, query_vector))
+        try:
+            if guard_task is not None and await guard_task:
+                yield GUARDRAIL_BLOCKED_MESSAGE
+                return
+            result = await answer_task
+        finally:
+            _cancel_task(answer_task)
+
+        yield result
+        if self.answer_cache is not None:
+            await asyncio.to_thread(self.answer_cache.store, client_id, question, result, query_vector, version)
+
+    async def aquery_rag_service(self, query: str, client_id: str, session_id: Optional[str] = None) -> str:
+        """Versão assíncrona de `query_rag_service` (usa `ainvoke` em todo o pipeline)."""
+        with stage_metrics.time("chat_total", guardrail_mode=self.guardrail_mode):
+            question = await self._acondense(query, client_id, session_id)
+            version = await asyncio.to_thread(self._collection_version, client_id)
+            cached, query_vector = await self._alookup_cache(question, client_id, version)
+            if cached is not None:
+                await self._aremember(client_id, session_id, question, cached)
+                return cached
+
+            chunks = self._coalesce(
+                client_id, query, question, version,
+                lambda: self._aanswer_chunks(query, question, client_id, query_vector, version),
+            )
+            try:
+                result = "".join([chunk async for chunk in chunks])
+            except Exception as e:
+                print(f"Erro no pipeline RAG: {e}")
+                return RAG_ERROR_MESSAGE
+
+        if result != GUARDRAIL_BLOCKED_MESSAGE:
+            await self._aremember(client_id, session_id, question, result)
+        return result
+
+    async def _astream_chunks(
+        self, query: str, question: str, client_id: str, query_vector: Optional[List[float]], version: Optional[int]
+    ) -> AsyncIterator[str]:
+        """Guardrail, busca e geração de `astream_rag_service`, pedaço a pedaço."""
+        blocked, guard_task = await self._astart_guardrail(query)
+        if blocked:
+            yield GUARDRAIL_BLOCKED_MESSAGE
+            return
+
+        try:
+            docs = await self._aretrieve(question, client_id, query_vector)
+            parts = []
+            context = self._build_context(question, docs)
+            started = time.perf_counter()
+            with stage_metrics.time("generation"):
+                async for chunk in self._rag_chain().astream({"context": context, "question": question}):
+                    if not parts:
+                        stage_metrics.observe("llm_first_token", time.perf_counter() - started)
+                    if guard_task is not None:
+                        # No modo paralelo nenhum token é entregue antes do veredito do guardrail.
+                        blocked = await guard_task
+                        guard_task = None
+                        if blocked:
+                            yield GUARDRAIL_BLOCKED_MESSAGE
+                            return
+                    parts.append(chunk)
+                    yield chunk
+            if guard_task is not None:
+                # A LLM não produziu nada: o veredito ainda decide entre bloqueio e resposta vazia.
+                blocked = await guard_task
+                guard_task = None
+                if blocked:
+                    yield GUARDRAIL_BLOCKED_MESSAGE
+                    return
+        finally:
+            if guard_task is not None:
+                _cancel_task(guard_task)
+
+        answer = self._record_completion("".join(parts))
+        if self.answer_cache is not None and answer.strip():
+            await asyncio.to_thread(self.answer_cache.store, client_id, question, answer, query_vector, version)
+
+    async def astream_rag_service(self, query: str, client_id: str, session_id: Optional[str] = None) -> AsyncIterator[str]:
+        """
+        Versão em streaming de `aquery_rag_service`: produz a resposta em pedaços
+        conforme a LLM os gera. Erros do pipeline são propagados ao chamador. Uma
+        pergunta idêntica já em andamento é acompanhada desde o primeiro pedaço.
+        """
+        question = await self._acondense(query, client_id, session_id)
+        version = await asyncio.to_thread(self._collection_version, client_id)
+        cached, query_vector = await self._alookup_cache(question, client_id, version)
+        if cached is not None:
+            await self._aremember(client_id, session_id, question, cached)
+            yield cached
+            return
+
+        parts = []
+        chunks = self._coalesce(
+            client_id, query, question, version,
+            lambda: self._astream_chunks(query, question, client_id, query_vector, version),
+        )
+        async for chunk in chunks:
+            parts.append(chunk)
+            yield chunk
+
+        answer = "".join(parts)
+        if answer != GUARDRAIL_BLOCKED_MESSAGE:
+            await self._aremember(client_id, session_id, question, answer)
+
+    def usage_stats(self) -> dict:
+        """Tokens do prompt por requisição (e economia da montagem de contexto)."""
+        return usage_metrics.summary()
+
+    def latency_stats(self) -> dict:
+        """Latência por etapa (guardrail local/LLM, busca, geração, total por modo)."""
+        return stage_metrics.summary()
+
+    def invalidate_client_caches(self, client_id: str) -> None:
+        """Descarta tudo o que foi cacheado para o tenant (após ingestão ou exclusão)."""
+        self.vector_stores.invalidate(client_id)
+        self.collection_versions.bump(client_id)
+        if self.answer_cache is not None:
+            self.answer_cache.invalidate(client_id)
+
+    def cache_stats(self) -> dict:
+        """Contadores de hit/miss dos caches do serviço (para diagnóstico)."""
+        stats = {"vector_stores": self.vector_stores.stats()}
+        if self.answer_cache is not None:
+            stats["answers"] = self.answer_cache.stats()
+        if self.single_flight is not None:
+            stats["coalescing"] = self.single_flight.stats()
+        return stats
 
     def delete_client_collection(self, client_id: str) -> bool:
-        """Remove permanentemente a collection de vetores de um cliente no ChromaDB."""
+        """Remove permanentemente a collection de vetores de um cliente (ChromaDB, pgvector ou HNSW)."""
+        self.invalidate_client_caches(client_id)
         try:
-            client = chromadb.PersistentClient(path=self.chroma_path)
-            client.delete_collection(client_id)
+            self.keyword_index.drop(client_id)
+            self.vector_stores.delete_collection(client_id)
             print(f"Sucesso na exclusão da collection para Cliente {client_id}")
             return True
         except ValueError as e:
@@ -144,28 +828,97 @@ class RAGService:
 
 rag_service_instance = RAGService(settings)
 
+_ingest_scheduler = None
+
+
+def _send_ingestions(queue: str, jobs: List[dict]) -> None:
+    # Um group publica todas as tasks do lote com uma única conexão ao broker. O trace
+    # vai nos headers de cada task: o despacho pode acontecer no `release` de outra
+    # ingestão, com outro span corrente.
+    group(
+        ingest_document_task.signature(
+            (job["doc_id"],), queue=queue, task_id=job.get("task_id"), headers=job.get("trace") or None
+        )
+        for job in jobs
+    ).apply_async()
+
+
+def get_ingest_scheduler():
+    global _ingest_scheduler
+    if _ingest_scheduler is None:
+        _ingest_scheduler = build_ingest_scheduler(settings, _send_ingestions)
+    return _ingest_scheduler
+
+
+def _schedule_dispatch(retry_after: Optional[float]) -> None:
+    # Jobs barrados pelo rate limit: ninguém vai liberá-los num `release`, então agenda um `dispatch`.
+    if retry_after is not None:
+        dispatch_ingestions_task.apply_async(countdown=retry_after, queue=SMALL_QUEUE)
+
+
+def enqueue_ingestion(document_id: int, client_id: str, file_path: str) -> str:
+    """
+    Agenda a ingestão do documento: fila pelo tamanho do PDF e despacho justo entre
+    tenants (ver `ingest_scheduler`). Retorna o ID que a task Celery terá.
+    """
+    return enqueue_ingestions(client_id, [(document_id, os.path.getsize(file_path))])[0]
+
+
+def enqueue_ingestions(client_id: str, documents: List[Tuple[int, int]]) -> List[str]:
+    """Como `enqueue_ingestion` para vários (doc_id, bytes) do tenant, num único despacho."""
+    task_ids = [str(uuid.uuid4()) for _ in documents]
+    # Span do upload, guardado no job até o despacho.
+    trace = {}
+    telemetry.inject_trace_context(trace)
+    _, retry_after = get_ingest_scheduler().submit_many(
+        client_id, [(doc_id, size, task_id) for (doc_id, size), task_id in zip(documents, task_ids)], trace=trace
+    )
+    _schedule_dispatch(retry_after)
+    return task_ids
+
+
+@celery_app.task(name="dispatch_ingestions_task")
+def dispatch_ingestions_task():
+    # Também roda periodicamente (beat_schedule): recolhe leases de workers mortos e libera a fila do tenant.
+    _schedule_dispatch(get_ingest_scheduler().dispatch())
+
 
 @celery_app.task(bind=True, name="ingest_document_task")
 def ingest_document_task(self, document_id: int): 
-    db = SessionLocal() 
-    doc = db.query(DocumentModel).filter(DocumentModel.id == document_id).first()
-    
-    if not doc:
-        db.close()
-        return {"status": "FAILED", "reason": "Document ID not found."}
+    # Sessões curtas: nenhuma conexão do pool fica presa durante a leitura do PDF e as chamadas de embeddings.
+    with WorkerSessionLocal() as db:
+        doc = db.query(DocumentModel).filter(DocumentModel.id == document_id).first()
+        if not doc:
+            return {"status": "FAILED", "reason": "Document ID not found."}
 
-    file_path_to_clean = doc.file_path 
-    client_id_for_chroma = doc.client_id
+        file_path_to_clean = doc.file_path 
+        client_id_for_chroma = doc.client_id
+        client = db.query(
+            Client.chunk_strategy, Client.chunk_tokens, Client.chunk_overlap_tokens
+        ).filter(Client.client_token == client_id_for_chroma).first()
+        chunking = resolve_chunking(settings, client)
+        doc.status = DocumentStatus.PROCESSING.value 
+        db.commit() 
     
     status_final = DocumentStatus.FAILED
 
+    def publish(snapshot):
+        # Estado do Celery (consultável pelo task_id) + push para o dashboard do tenant
+        self.update_state(state="PROGRESS", meta=snapshot)
+        publish_progress(client_id_for_chroma, {**snapshot, "status": DocumentStatus.PROCESSING.value})
+
+    progress = IngestionProgress(document_id, client_id_for_chroma, publish)
+    bind_labels(tenant=client_id_for_chroma)
+
     try:
-        doc.status = DocumentStatus.PROCESSING.value 
-        db.commit() 
+        progress.update("processing")
         
         success = rag_service_instance.ingest_document(
             file_path=file_path_to_clean,
-            client_id=client_id_for_chroma
+            client_id=client_id_for_chroma,
+            progress=progress,
+            doc_id=document_id,
+            chunking=chunking,
         )
         
         if not success:
@@ -173,22 +926,30 @@ def ingest_document_task(self, document_id: int):
 
         status_final = DocumentStatus.COMPLETED
         reason = "Sucesso na indexação."
+        rag_service_instance.invalidate_client_caches(client_id_for_chroma)
         
     except Exception as e:
         status_final = DocumentStatus.FAILED
         reason = str(e)
         
     finally:
-        db.execute(
-            update(DocumentModel)
-            .where(DocumentModel.id == document_id)
-            .values(status=status_final.value)
-        )
-        db.commit() 
+        with WorkerSessionLocal() as db:
+            db.execute(
+                update(DocumentModel)
+                .where(DocumentModel.id == document_id)
+                .values(status=status_final.value)
+            )
+            db.commit() 
+        
+        progress.stage = "completed" if status_final == DocumentStatus.COMPLETED else "failed"
+        publish_progress(client_id_for_chroma, {**progress.snapshot(), "status": status_final.value})
         
         if status_final == DocumentStatus.COMPLETED and os.path.exists(file_path_to_clean):
             os.remove(file_path_to_clean)
-        
-        db.close()
+
+        try:
+            _schedule_dispatch(get_ingest_scheduler().release(client_id_for_chroma, document_id))
+        except Exception as e:
+            print(f"Erro ao liberar a vaga da ingestão no escalonador: {e}")
         
         return {'status': status_final.name, 'reason': reason if status_final == DocumentStatus.FAILED else "Sucesso na indexação."}
\ No newline at end of file
@@ -0,0 +1,344 @@
+"""
+Limites do /chat: token bucket por tenant e por IP do usuário final (dentro do
+tenant) e admissão global de requisições concorrentes por processo da API.
+
+Os buckets ficam em memória (um processo) ou no Redis (compartilhados entre
+réplicas, atualizados por um script Lua atômico). Os limites de cada tenant vêm
+das colunas `chat_*` do Client (NULL: padrão de Settings; 0: sem limite).
+"""
+import asyncio
+import ipaddress
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+from app.core.cache import LRUCache
+from app.core.config import settings
+from app.core.metrics import stage_metrics, usage_metrics
+
+
+class RateLimitExceeded(Exception):
+    """Requisição recusada; `retry_after` em segundos (cabeçalho Retry-After do 429)."""
+    def __init__(self, scope: str, retry_after: float):
+        super().__init__(f"Limite de requisições excedido ({scope}).")
+        self.scope = scope
+        self.retry_after = retry_after
+
+    @property
+    def retry_after_header(self) -> str:
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+class ChatLimits:
+    """Limites efetivos de um tenant (por minuto; 0 = sem limite)."""
+    def __init__(self, rate_per_minute: int, burst: int, ip_rate_per_minute: int, ip_burst: int):
+        self.rate_per_minute = rate_per_minute
+        self.burst = burst
+        self.ip_rate_per_minute = ip_rate_per_minute
+        self.ip_burst = ip_burst
+
+
+# (chave, fichas por segundo, burst)
+Bucket = Tuple[str, float, int]
+
+
+class TokenBucketStore(ABC):
+    # Chamadas de rede: o chamador as executa fora do event loop.
+    blocking = False
+
+    @abstractmethod
+    def take(self, buckets: Sequence[Bucket]) -> Tuple[Optional[int], float]:
+        """
+        Consome uma ficha de cada bucket, tudo ou nada: se algum estiver vazio nenhum
+        é cobrado. Retorna (None, 0) ou (índice do primeiro bucket vazio, segundos até a próxima ficha).
+        """
+
+
+class LocalTokenBucketStore(TokenBucketStore):
+    """Buckets em memória (por processo). Bucket ausente = cheio: os ociosos podem sair do LRU."""
+    def __init__(self, max_entries: int = 100000, clock: Callable[[], float] = time.monotonic):
+        self._buckets = LRUCache(max_entries=max_entries)
+        self._lock = threading.Lock()
+        self.clock = clock
+
+    def take(self, buckets: Sequence[Bucket]) -> Tuple[Optional[int], float]:
+        now = self.clock()
+        with self._lock:
+            refilled = []
+            for index, (key, rate_per_second, burst) in enumerate(buckets):
+                tokens, updated = self._buckets.get(key, (burst, now))
+                tokens = min(burst, tokens + (now - updated) * rate_per_second)
+                if tokens < 1:
+                    return index, (1 - tokens) / rate_per_second
+                refilled.append((key, tokens))
+            for key, tokens in refilled:
+                self._buckets.put(key, (tokens - 1, now))
+        return None, 0.0
+
+
+class RedisTokenBucketStore(TokenBucketStore):
+    """Buckets no Redis (hash com fichas e instante), compartilhados entre processos e réplicas."""
+    PREFIX = "chat_rate"
+    blocking = True
+    # Relógio do próprio Redis (TIME): réplicas da API com relógios diferentes não distorcem o refill.
+    # Todos os buckets no mesmo script: nenhum é cobrado se outro recusar (ARGV: rate e burst de cada KEY).
+    SCRIPT = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local refilled = {}
+for i, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[2 * i - 1])
+    local burst = tonumber(ARGV[2 * i])
+    local state = redis.call('HMGET', key, 'tokens', 'updated')
+    local tokens = tonumber(state[1]) or burst
+    local updated = tonumber(state[2]) or now
+    tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+    if tokens < 1 then
+        return {i - 1, tostring((1 - tokens) / rate)}
+    end
+    refilled[i] = tokens
+end
+for i, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[2 * i - 1])
+    local burst = tonumber(ARGV[2 * i])
+    redis.call('HSET', key, 'tokens', tostring(refilled[i] - 1), 'updated', tostring(now))
+    redis.call('PEXPIRE', key, math.ceil(burst / rate * 1000) + 1000)
+end
+return {-1, '0'}
+"""
+
+    def __init__(self, redis_client: Any):
+        self.redis = redis_client
+        self._script = redis_client.register_script(self.SCRIPT)
+
+    def take(self, buckets: Sequence[Bucket]) -> Tuple[Optional[int], float]:
+        try:
+            index, retry_after = self._script(
+                keys=[f"{self.PREFIX}:{key}" for key, _, _ in buckets],
+                args=[value for _, rate_per_second, burst in buckets for value in (rate_per_second, burst)],
+            )
+        except Exception as e:
+            # Redis fora do ar não derruba o chat: a requisição passa sem limite.
+            print(f"Erro ao consultar o rate limit no Redis: {e}")
+            return None, 0.0
+        index = int(index)
+        return (None, 0.0) if index < 0 else (index, float(retry_after))
+
+
+def parse_networks(value: Optional[str]) -> Tuple[Any, ...]:
+    """Redes de uma lista separada por vírgulas ("10.0.0.0/8, 127.0.0.1")."""
+    return tuple(ipaddress.ip_network(item.strip(), strict=False) for item in (value or "").split(",") if item.strip())
+
+
+def _in_networks(address: str, networks: Sequence[Any]) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in networks)
+
+
+def resolve_client_ip(
+    peer: Optional[str], forwarded_for: Optional[str], trusted_proxies: Sequence[Any] = (), trust_forwarded_for: bool = False
+) -> Optional[str]:
+    """
+    IP do usuário final para o bucket por IP. Conexões vindas de um proxy conhecido
+    (`trusted_proxies`) usam o último endereço do X-Forwarded-For que não é proxy; sem
+    ele, None: o limite por IP é pulado (só o do tenant vale) em vez de todos os
+    usuários atrás do proxy dividirem um bucket. `trust_forwarded_for` confia no
+    primeiro endereço do cabeçalho vindo de qualquer conexão.
+    """
+    if trust_forwarded_for and forwarded_for:
+        return forwarded_for.split(",")[0].strip()
+    if peer is None or not _in_networks(peer, trusted_proxies):
+        return peer
+    for address in reversed((forwarded_for or "").split(",")):
+        address = address.strip()
+        if address and not _in_networks(address, trusted_proxies):
+            return address
+    return None
+
+
+class ChatRateLimiter:
+    """
+    Token bucket por tenant (`client_token`) e por IP do usuário final dentro do
+    tenant. Os limites por tenant são cacheados (`limits_ttl_seconds`) para não
+    consultar o banco a cada mensagem.
+    """
+    def __init__(
+        self,
+        store: TokenBucketStore,
+        defaults: ChatLimits,
+        limits_ttl_seconds: float = 60,
+        max_tenants: int = 10000,
+    ):
+        self.store = store
+        self.defaults = defaults
+        self._limits = LRUCache(max_entries=max_tenants, ttl_seconds=limits_ttl_seconds)
+
+    def cached_limits(self, tenant_id: str) -> Optional[ChatLimits]:
+        return self._limits.get(tenant_id)
+
+    def load_limits(self, tenant_id: str, client: Any) -> ChatLimits:
+        """Limites a partir das colunas do Client (None: sem linha, usa os padrões) e os guarda no cache."""
+        def pick(column: str, default: int) -> int:
+            value = getattr(client, column, None) if client is not None else None
+            return default if value is None else value
+
+        limits = ChatLimits(
+            rate_per_minute=pick("chat_rate_per_minute", self.defaults.rate_per_minute),
+            burst=pick("chat_burst", self.defaults.burst),
+            ip_rate_per_minute=pick("chat_ip_rate_per_minute", self.defaults.ip_rate_per_minute),
+            ip_burst=pick("chat_ip_burst", self.defaults.ip_burst),
+        )
+        self._limits.put(tenant_id, limits)
+        return limits
+
+    def invalidate(self, tenant_id: str) -> None:
+        self._limits.invalidate(tenant_id)
+
+    def check(self, tenant_id: str, client_ip: Optional[str], limits: ChatLimits) -> None:
+        """
+        Consome uma ficha do IP e do tenant; `RateLimitExceeded` se algum estiver vazio.
+        A cobrança é tudo ou nada: uma requisição recusada pelo tenant não gasta a ficha do
+        IP (nem o contrário).
+        """
+        # IP primeiro: o usuário insistente é recusado pelo próprio bucket, com o scope "ip".
+        candidates = [("ip", f"ip:{tenant_id}:{client_ip}", limits.ip_rate_per_minute, limits.ip_burst)] if client_ip else []
+        candidates.append(("tenant", f"tenant:{tenant_id}", limits.rate_per_minute, limits.burst))
+        candidates = [candidate for candidate in candidates if candidate[2] > 0]
+        if not candidates:
+            return
+        index, retry_after = self.store.take(
+            [(key, per_minute / 60.0, max(1, burst)) for _, key, per_minute, burst in candidates]
+        )
+        if index is not None:
+            scope = candidates[index][0]
+            usage_metrics.record("chat_rejected", 1, reason=scope)
+            raise RateLimitExceeded(scope, retry_after)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"limits_cache": self._limits.stats()}
+
+
+class ChatAdmission:
+    """
+    Admissão global das requisições do /chat neste processo: até `max_concurrent`
+    em execução e até `max_waiting` aguardando vaga por no máximo `wait_timeout`
+    segundos. Acima disso a requisição é recusada na hora (429 + Retry-After) em vez
+    de esperar na fila até estourar o timeout do cliente. Cada tenant ocupa no
+    máximo `max_per_tenant` dessas vagas (em execução ou aguardando), para que um
+    pico de um widget não recuse as perguntas dos outros tenants.
+    """
+    def __init__(
+        self,
+        max_concurrent: int,
+        max_waiting: int = 0,
+        wait_timeout: float = 0.0,
+        retry_after: float = 1.0,
+        max_per_tenant: int = 0,
+    ):
+        self.max_concurrent = max_concurrent
+        self.max_waiting = max_waiting
+        self.wait_timeout = wait_timeout
+        self.retry_after = retry_after
+        self.max_per_tenant = max_per_tenant
+        self.running = 0
+        self.waiting = 0
+        self.rejected = 0
+        self._in_flight: Dict[str, int] = {}
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def _reject(self, scope: str) -> RateLimitExceeded:
+        self.rejected += 1
+        usage_metrics.record("chat_rejected", 1, reason=scope)
+        return RateLimitExceeded(scope, self.retry_after)
+
+    def _leave(self, tenant_id: str) -> None:
+        remaining = self._in_flight.get(tenant_id, 0) - 1
+        if remaining > 0:
+            self._in_flight[tenant_id] = remaining
+        else:
+            self._in_flight.pop(tenant_id, None)
+
+    async def acquire(self, tenant_id: str) -> None:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        if self.max_per_tenant > 0 and self._in_flight.get(tenant_id, 0) >= self.max_per_tenant:
+            raise self._reject("tenant_concurrency")
+        if self._semaphore.locked() and (self.waiting >= self.max_waiting or self.wait_timeout <= 0):
+            raise self._reject("overload")
+
+        self._in_flight[tenant_id] = self._in_flight.get(tenant_id, 0) + 1
+        if not self._semaphore.locked():
+            await self._semaphore.acquire()
+        else:
+            self.waiting += 1
+            started = time.perf_counter()
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), self.wait_timeout)
+            except asyncio.TimeoutError:
+                self._leave(tenant_id)
+                raise self._reject("overload")
+            except BaseException:
+                self._leave(tenant_id)
+                raise
+            finally:
+                self.waiting -= 1
+                stage_metrics.observe("chat_admission_wait", time.perf_counter() - started)
+        self.running += 1
+
+    def release(self, tenant_id: str) -> None:
+        self.running -= 1
+        self._leave(tenant_id)
+        self._semaphore.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "running": self.running,
+            "waiting": self.waiting,
+            "rejected": self.rejected,
+            "tenants": len(self._in_flight),
+        }
+
+
+def build_chat_rate_limiter(settings: Any) -> Optional[ChatRateLimiter]:
+    """Cria o limitador conforme `CHAT_RATE_LIMIT_BACKEND` ('local', 'redis' ou 'none')."""
+    backend_name = (settings.CHAT_RATE_LIMIT_BACKEND or "none").lower()
+    if backend_name == "none":
+        return None
+    if backend_name == "local":
+        store = LocalTokenBucketStore()
+    elif backend_name == "redis":
+        import redis
+
+        store = RedisTokenBucketStore(redis.Redis.from_url(settings.CHAT_RATE_LIMIT_REDIS_URL or settings.CELERY_REDIS_DSN))
+    else:
+        raise ValueError(f"CHAT_RATE_LIMIT_BACKEND desconhecido: {settings.CHAT_RATE_LIMIT_BACKEND}")
+    defaults = ChatLimits(
+        rate_per_minute=settings.CHAT_TENANT_RATE_PER_MINUTE,
+        burst=settings.CHAT_TENANT_BURST,
+        ip_rate_per_minute=settings.CHAT_IP_RATE_PER_MINUTE,
+        ip_burst=settings.CHAT_IP_BURST,
+    )
+    return ChatRateLimiter(store, defaults, limits_ttl_seconds=settings.CHAT_LIMITS_CACHE_TTL_SECONDS)
+
+
+def build_chat_admission(settings: Any) -> Optional[ChatAdmission]:
+    if settings.CHAT_MAX_CONCURRENT <= 0:
+        return None
+    return ChatAdmission(
+        max_concurrent=settings.CHAT_MAX_CONCURRENT,
+        max_waiting=settings.CHAT_MAX_WAITING,
+        wait_timeout=settings.CHAT_ADMISSION_TIMEOUT_SECONDS,
+        retry_after=settings.CHAT_RETRY_AFTER_SECONDS,
+        max_per_tenant=settings.CHAT_TENANT_MAX_CONCURRENT,
+    )
+
+
+chat_rate_limiter = build_chat_rate_limiter(settings)
+chat_trusted_proxies = parse_networks(settings.CHAT_TRUSTED_PROXIES)
+chat_admission = build_chat_admission(settings)
@@ -0,0 +1,178 @@
+import re
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence
+
+from app.core.metrics import stage_metrics
+from app.services.keyword_index import KeywordIndex, keyword_tokens, normalize_text
+
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
+
+RETRIEVAL_MODES = ("vector", "keyword", "hybrid")
+RERANK_MODES = ("none", "mmr", "cross_encoder")
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[Sequence[str]],
+    rrf_k: int = 60,
+    weights: Optional[Sequence[float]] = None,
+) -> Dict[str, float]:
+    """Funde rankings de ids por RRF: score(id) = Σ peso / (rrf_k + posição). Retorna {id: score}, melhor primeiro."""
+    weights = weights or [1.0] * len(rankings)
+    scores: Dict[str, float] = {}
+    for ranking, weight in zip(rankings, weights):
+        for position, chunk_id in enumerate(ranking, start=1):
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + weight / (rrf_k + position)
+    return dict(sorted(scores.items(), key=lambda item: item[1], reverse=True))
+
+
+def identifiers(text: str) -> List[str]:
+    """Códigos e números compostos citados no texto (ex: "x-0012-03", "4.2.1"), normalizados."""
+    return [token for token in keyword_tokens(text) if any(ch in "-./" for ch in token) and any(ch.isdigit() for ch in token)]
+
+
+def _identifier_pattern(cited: Sequence[str]) -> "re.Pattern":
+    # O identificador inteiro, sem fazer parte de um maior ("4.2" não casa com "14.2" nem "4.21").
+    alternatives = "|".join(re.escape(token) for token in cited)
+    return re.compile(rf"(?<![a-z0-9])(?<![a-z0-9][-./])(?:{alternatives})(?![a-z0-9]|[-./][a-z0-9])")
+
+
+class HybridRetriever:
+    """
+    Busca os chunks de um tenant combinando a busca vetorial do Chroma com o índice
+    BM25 (`KeywordIndex`) via reciprocal rank fusion, com rerank opcional (MMR ou
+    cross-encoder local) dos `fetch_k` candidatos antes de devolver os `k` melhores.
+
+    Quando a pergunta cita códigos ou números compostos, os chunks que contêm
+    literalmente esses identificadores vão para o topo do resultado fundido (a busca
+    vetorial raramente os acerta e o RRF sozinho os dilui entre resultados parciais).
+    """
+    def __init__(
+        self,
+        vector_stores: Any,
+        keyword_index: KeywordIndex,
+        embeddings: Any,
+        mode: str = "hybrid",
+        k: int = 3,
+        fetch_k: int = 20,
+        rrf_k: int = 60,
+        rerank: str = "none",
+        mmr_lambda: float = 0.5,
+        cross_encoder_model: Optional[str] = None,
+    ):
+        if mode not in RETRIEVAL_MODES:
+            raise ValueError(f"RETRIEVAL_MODE inválido: {mode} (use {', '.join(RETRIEVAL_MODES)})")
+        if rerank not in RERANK_MODES:
+            raise ValueError(f"RETRIEVAL_RERANK inválido: {rerank} (use {', '.join(RERANK_MODES)})")
+        self.vector_stores = vector_stores
+        self.keyword_index = keyword_index
+        self.embeddings = embeddings
+        self.mode = mode
+        self.k = k
+        self.fetch_k = max(k, fetch_k)
+        self.rrf_k = rrf_k
+        self.rerank = rerank
+        self.mmr_lambda = mmr_lambda
+        self.cross_encoder_model = cross_encoder_model
+        self._cross_encoder = None
+
+    def _vector_search(self, client_id: str, query_vector: List[float]) -> Dict[str, "Document"]:
+        from langchain_core.documents import Document
+
+        with stage_metrics.time("retrieval_vector"):
+            collection = self.vector_stores.get_collection(client_id)
+            result = collection.query(
+                query_embeddings=[query_vector],
+                n_results=self.fetch_k,
+                include=["documents", "metadatas"],
+            )
+        return {
+            chunk_id: Document(page_content=text, metadata=metadata or {})
+            for chunk_id, text, metadata in zip(result["ids"][0], result["documents"][0], result["metadatas"][0])
+        }
+
+    def _keyword_search(self, client_id: str, query: str) -> Dict[str, "Document"]:
+        from langchain_core.documents import Document
+
+        with stage_metrics.time("retrieval_keyword"):
+            if not self.keyword_index.exists(client_id):
+                # Tenant indexado antes do índice BM25 existir: monta a partir do Chroma.
+                collection = self.vector_stores.get_collection(client_id)
+                indexed = self.keyword_index.rebuild(client_id, collection, only_if_missing=True)
+                if indexed:
+                    print(f"Índice BM25 do Cliente {client_id} criado a partir do Chroma: {indexed} chunks")
+            hits = self.keyword_index.search(client_id, query, self.fetch_k)
+        return {chunk_id: Document(page_content=text, metadata=metadata) for chunk_id, text, metadata, _ in hits}
+
+    def retrieve(self, query: str, client_id: str, query_vector: Optional[List[float]] = None) -> List["Document"]:
+        rankings, candidates = [], {}
+        if self.mode in ("vector", "hybrid") or self.rerank == "mmr":
+            if query_vector is None:
+                with stage_metrics.time("embedding_call", kind="query"):
+                    query_vector = self.embeddings.embed_query(query)
+        if self.mode in ("vector", "hybrid"):
+            vector_hits = self._vector_search(client_id, query_vector)
+            rankings.append(list(vector_hits))
+            candidates.update(vector_hits)
+        if self.mode in ("keyword", "hybrid"):
+            keyword_hits = self._keyword_search(client_id, query)
+            rankings.append(list(keyword_hits))
+            candidates.update(keyword_hits)
+
+        fused = reciprocal_rank_fusion(rankings, self.rrf_k)
+        ids = list(fused)
+        cited = identifiers(query)
+        exact = set()
+        if cited and len(rankings) > 1:
+            pattern = _identifier_pattern(cited)
+            exact = {chunk_id for chunk_id in ids if pattern.search(normalize_text(candidates[chunk_id].page_content))}
+
+        if self.rerank != "none":
+            ids = ids[:self.fetch_k]
+            with stage_metrics.time("rerank", method=self.rerank):
+                if self.rerank == "mmr":
+                    order = self._mmr(client_id, ids, [fused[chunk_id] for chunk_id in ids])
+                else:
+                    order = self._cross_encode(query, [candidates[chunk_id] for chunk_id in ids])
+            ids = [ids[index] for index in order]
+
+        # Ordenação estável: quem contém o identificador citado vem primeiro.
+        ids.sort(key=lambda chunk_id: chunk_id not in exact)
+        return [candidates[chunk_id] for chunk_id in ids[:self.k]]
+
+    def _mmr(self, client_id: str, ids: List[str], relevance: List[float]) -> List[int]:
+        """
+        Maximal marginal relevance sobre os candidatos fundidos: a relevância é o score
+        RRF (normalizado), não só a similaridade vetorial, e a redundância é o cosseno
+        entre os embeddings já gravados no Chroma.
+        """
+        import numpy as np
+
+        stored = self.vector_stores.get_collection(client_id).get(ids=ids, include=["embeddings"])
+        by_id = dict(zip(stored["ids"], stored["embeddings"]))
+        vectors = np.array([by_id[chunk_id] for chunk_id in ids], dtype=np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-12
+        similarity = vectors @ vectors.T
+        relevance = np.array(relevance) / max(relevance)
+
+        selected: List[int] = []
+        remaining = list(range(len(ids)))
+        while remaining:
+            def score(index):
+                redundancy = max((similarity[index][chosen] for chosen in selected), default=0.0)
+                return self.mmr_lambda * relevance[index] - (1 - self.mmr_lambda) * redundancy
+            best = max(remaining, key=score)
+            selected.append(best)
+            remaining.remove(best)
+        return selected
+
+    def _cross_encode(self, query: str, docs: List["Document"]) -> List[int]:
+        if self._cross_encoder is None:
+            try:
+                from sentence_transformers import CrossEncoder
+            except ImportError:
+                print("sentence-transformers não instalado: rerank por cross-encoder desativado.")
+                self.rerank = "none"
+                return list(range(len(docs)))
+            self._cross_encoder = CrossEncoder(self.cross_encoder_model)
+        scores = self._cross_encoder.predict([(query, doc.page_content) for doc in docs])
+        return sorted(range(len(docs)), key=lambda index: scores[index], reverse=True)
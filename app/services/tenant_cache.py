@@ -0,0 +1,179 @@
+import hashlib
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app.core.cache import LRUCache
+from app.core.config import settings
+from app.core.models import Client
+
+
+def _token_key(client_token: str) -> str:
+    # O token do widget é uma credencial: não vai em claro para o Redis.
+    return hashlib.sha256(client_token.encode("utf-8")).hexdigest()
+
+
+class TenantTokenCache:
+    """
+    Cache da validação de `client_token` do /chat (token ativo ou não), para não
+    consultar o PostgreSQL a cada requisição do widget.
+
+    - camada local (LRU em memória) com TTL curto; tokens inválidos também são
+      guardados (`negative_ttl_seconds`) para amortecer floods de tokens aleatórios;
+    - camada Redis opcional, compartilhada entre processos, só com tokens válidos
+      (negativos em Redis virariam escrita por requisição durante um flood);
+    - `invalidate()` remove o token das duas camadas e avisa os outros processos
+      pelo canal `CHANNEL` do Redis.
+    """
+    PREFIX = "tenant_token"
+    CHANNEL = "tenant_token:invalidate"
+
+    def __init__(
+        self,
+        ttl_seconds: float = 60,
+        negative_ttl_seconds: float = 10,
+        max_entries: int = 10000,
+        redis_client: Any = None,
+        redis_ttl_seconds: float = 300,
+    ):
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self._local = LRUCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        self.redis = redis_client
+        self.redis_ttl_seconds = int(redis_ttl_seconds)
+        self._listener = None
+        self._listener_lock = threading.Lock()
+        self.db_lookups = 0
+
+    def _start_listener(self) -> None:
+        """Assina o canal de invalidação (uma thread por processo, iniciada no primeiro uso)."""
+        if self.redis is None or self._listener is not None:
+            return
+        with self._listener_lock:
+            if self._listener is not None:
+                return
+            try:
+                pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(**{self.CHANNEL: self._on_invalidate})
+                self._listener = pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+            except Exception as e:
+                print(f"Erro ao assinar invalidações do cache de tokens: {e}")
+
+    def _on_invalidate(self, message: Dict[str, Any]) -> None:
+        key = message["data"]
+        self._local.invalidate(key.decode() if isinstance(key, bytes) else key)
+
+    def get_local(self, client_token: str) -> Optional[bool]:
+        """True/False se a validade do token estiver na camada local; None se não souber."""
+        return self._local.get(_token_key(client_token))
+
+    def validate(self, client_token: str, loader: Callable[[str], bool], check_local: bool = True) -> bool:
+        """
+        Retorna se o token é de um cliente ativo, consultando local -> Redis -> `loader` (banco).
+        `check_local=False` pula a camada local (o chamador já a consultou com `get_local`).
+        """
+        self._start_listener()
+        key = _token_key(client_token)
+        cached = self._local.get(key) if check_local else None
+        if cached is not None:
+            return cached
+
+        if self.redis is not None:
+            try:
+                if self.redis.get(f"{self.PREFIX}:{key}") is not None:
+                    self._local.put(key, True)
+                    return True
+            except Exception as e:
+                print(f"Erro ao consultar o cache de tokens no Redis: {e}")
+
+        self.db_lookups += 1
+        active = loader(client_token)
+        self._local.put(key, active, ttl_seconds=None if active else self.negative_ttl_seconds)
+        if active and self.redis is not None:
+            try:
+                self.redis.set(f"{self.PREFIX}:{key}", 1, ex=self.redis_ttl_seconds)
+            except Exception as e:
+                print(f"Erro ao gravar o cache de tokens no Redis: {e}")
+        return active
+
+    def invalidate(self, client_token: str) -> None:
+        key = _token_key(client_token)
+        self._local.invalidate(key)
+        if self.redis is not None:
+            try:
+                self.redis.delete(f"{self.PREFIX}:{key}")
+                self.redis.publish(self.CHANNEL, key)
+            except Exception as e:
+                print(f"Erro ao invalidar o token no Redis: {e}")
+
+    def clear(self) -> None:
+        self._local.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._local.stats(), "db_lookups": self.db_lookups}
+
+
+def build_tenant_token_cache(settings: Any) -> Optional[TenantTokenCache]:
+    """Cria o cache conforme `TENANT_CACHE_BACKEND` ('local', 'redis' ou 'none')."""
+    backend_name = (settings.TENANT_CACHE_BACKEND or "none").lower()
+    if backend_name == "none":
+        return None
+    if backend_name not in ("local", "redis"):
+        raise ValueError(f"TENANT_CACHE_BACKEND desconhecido: {settings.TENANT_CACHE_BACKEND}")
+
+    redis_client = None
+    if backend_name == "redis":
+        import redis
+
+        redis_client = redis.Redis.from_url(settings.TENANT_CACHE_REDIS_URL or settings.CELERY_REDIS_DSN)
+    return TenantTokenCache(
+        ttl_seconds=settings.TENANT_CACHE_TTL_SECONDS,
+        negative_ttl_seconds=settings.TENANT_CACHE_NEGATIVE_TTL_SECONDS,
+        max_entries=settings.TENANT_CACHE_MAX_ENTRIES,
+        redis_client=redis_client,
+        redis_ttl_seconds=settings.TENANT_CACHE_REDIS_TTL_SECONDS,
+    )
+
+
+def watch_client_changes(cache: TenantTokenCache) -> None:
+    """
+    Invalida o token no cache quando um Client é criado (descarta um eventual cache
+    negativo), desativado, tem o token trocado ou é removido via ORM. A invalidação
+    acontece depois do commit, para que uma requisição concorrente não recarregue do
+    banco o estado antigo. Updates em massa (`update(Client)`) não passam por aqui:
+    nesses casos chame `tenant_token_cache.invalidate(token)` após o commit.
+    """
+    # Carrega o token antigo ao trocá-lo, mesmo com o objeto expirado por um commit
+    # anterior: sem isso o histórico não teria o valor antigo e ele ficaria no cache.
+    @event.listens_for(Client.client_token, "set", active_history=True)
+    def _load_old_token(target, value, oldvalue, initiator):
+        pass
+
+    def _pending(session: Session) -> set:
+        return session.info.setdefault("tenant_tokens_to_invalidate", set())
+
+    @event.listens_for(Session, "before_flush")
+    def _collect(session, flush_context, instances):
+        for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+            if not isinstance(obj, Client):
+                continue
+            state = inspect(obj)
+            token_history = state.attrs.client_token.history
+            changed = state.attrs.is_active.history.has_changes() or token_history.has_changes()
+            if obj in session.new or obj in session.deleted or changed:
+                _pending(session).update(filter(None, [obj.client_token, *token_history.deleted]))
+
+    @event.listens_for(Session, "after_commit")
+    def _invalidate(session):
+        for client_token in session.info.pop("tenant_tokens_to_invalidate", ()):
+            cache.invalidate(client_token)
+
+    @event.listens_for(Session, "after_rollback")
+    def _discard(session):
+        session.info.pop("tenant_tokens_to_invalidate", None)
+
+
+tenant_token_cache = build_tenant_token_cache(settings)
+if tenant_token_cache is not None:
+    watch_client_changes(tenant_token_cache)
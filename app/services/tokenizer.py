@@ -0,0 +1,41 @@
+from functools import lru_cache
+from typing import Optional
+
+# Encoding usado pelos modelos de chat e de embeddings da OpenAI (gpt-3.5/4, text-embedding-*)
+DEFAULT_ENCODING = "cl100k_base"
+
+
+@lru_cache(maxsize=8)
+def _get_encoding(model: Optional[str]):
+    """Carrega o encoding do tiktoken; retorna None se não estiver disponível (ex: sem rede)."""
+    try:
+        import tiktoken
+
+        if model:
+            try:
+                return tiktoken.encoding_for_model(model)
+            except KeyError:
+                pass
+        return tiktoken.get_encoding(DEFAULT_ENCODING)
+    except Exception as e:
+        print(f"tiktoken indisponível, usando estimativa de tokens: {e}")
+        return None
+
+
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    """Conta tokens com o tiktoken; sem ele, estima ~4 caracteres por token."""
+    encoding = _get_encoding(model)
+    if encoding is None:
+        return max(1, len(text) // 4) if text else 0
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_tokens(text: str, max_tokens: int, model: Optional[str] = None) -> str:
+    """Corta o texto para caber em `max_tokens` tokens."""
+    if max_tokens <= 0:
+        return ""
+    encoding = _get_encoding(model)
+    if encoding is None:
+        return text[:max_tokens * 4]
+    tokens = encoding.encode(text, disallowed_special=())
+    return text if len(tokens) <= max_tokens else encoding.decode(tokens[:max_tokens])
@@ -0,0 +1,183 @@
+"""
+Gravação dos uploads de PDF no diretório de uploads.
+
+Os arquivos são lidos em blocos e gravados fora do event loop (threadpool), com o
+SHA-256 calculado durante a escrita. O cabeçalho (%PDF- / PK de zip) e os limites
+de tamanho são verificados antes de criar o arquivo em disco: um upload recusado
+não deixa nada gravado.
+"""
+import hashlib
+import os
+import uuid
+import zipfile
+import zlib
+from typing import Any, Awaitable, Callable, List, Optional, Tuple
+
+import anyio
+
+PDF_MAGIC = b"%PDF-"
+ZIP_MAGIC = b"PK\x03\x04"
+# A especificação do PDF admite bytes antes do cabeçalho, dentro do primeiro 1 KB.
+PDF_HEADER_WINDOW = 1024
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+class UploadRejected(Exception):
+    """Arquivo recusado (formato, tamanho ou quantidade); `status_code` é o HTTP sugerido."""
+    def __init__(self, filename: str, reason: str, status_code: int = 400):
+        super().__init__(reason)
+        self.filename = filename
+        self.reason = reason
+        self.status_code = status_code
+
+
+class StoredUpload:
+    """PDF gravado em disco: nome original, caminho, SHA-256 e tamanho em bytes."""
+    def __init__(self, filename: str, file_path: str, content_hash: str, size: int):
+        self.filename = filename
+        self.file_path = file_path
+        self.content_hash = content_hash
+        self.size = size
+
+
+def is_pdf(head: bytes) -> bool:
+    return PDF_MAGIC in head[:PDF_HEADER_WINDOW]
+
+
+def upload_path(upload_folder: str, client_token: str, filename: str) -> str:
+    # Nomes vindos de zip podem ter diretórios (ou "..").
+    return os.path.join(upload_folder, f"{client_token}_{uuid.uuid4().hex}_{os.path.basename(filename)}")
+
+
+def _too_large(filename: str, max_bytes: int) -> UploadRejected:
+    return UploadRejected(filename, f"Arquivo maior que o limite de {max_bytes / (1024 * 1024):g} MB.", 413)
+
+
+def discard_uploads(uploads) -> None:
+    """Remove do disco os PDFs gravados de um envio que não chegou a ser registrado."""
+    for upload in uploads:
+        if os.path.exists(upload.file_path):
+            os.remove(upload.file_path)
+
+
+def _open_for_write(file_path: str):
+    os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+    return open(file_path, "wb")
+
+
+def _write_hashed(buffer, digest, chunk: bytes) -> None:
+    # hashlib libera o GIL em blocos grandes: hash e escrita não seguram o event loop.
+    digest.update(chunk)
+    buffer.write(chunk)
+
+
+async def stream_pdf_to_disk(
+    read: Callable[[int], Awaitable[bytes]],
+    filename: str,
+    file_path: str,
+    max_bytes: int,
+    size_hint: Optional[int] = None,
+) -> StoredUpload:
+    """
+    Lê o PDF com `read(n)` e o grava em `file_path`. Recusa (`UploadRejected`) antes
+    de gravar se `size_hint` ou o primeiro bloco não passarem na validação; se o
+    conteúdo passar de `max_bytes` durante a escrita, o arquivo parcial é removido.
+    """
+    if size_hint is not None and size_hint > max_bytes:
+        raise _too_large(filename, max_bytes)
+    head = await read(UPLOAD_CHUNK_SIZE)
+    if not is_pdf(head):
+        raise UploadRejected(filename, "Formato de arquivo não suportado. Apenas PDF é permitido.", 415)
+
+    digest = hashlib.sha256()
+    size = 0
+    buffer = await anyio.to_thread.run_sync(_open_for_write, file_path)
+    try:
+        chunk = head
+        while chunk:
+            size += len(chunk)
+            if size > max_bytes:
+                raise _too_large(filename, max_bytes)
+            await anyio.to_thread.run_sync(_write_hashed, buffer, digest, chunk)
+            chunk = await read(UPLOAD_CHUNK_SIZE)
+    except BaseException:
+        await anyio.to_thread.run_sync(buffer.close)
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        raise
+    await anyio.to_thread.run_sync(buffer.close)
+    return StoredUpload(filename, file_path, digest.hexdigest(), size)
+
+
+async def store_pdf_upload(file: Any, client_token: str, upload_folder: str, max_bytes: int) -> StoredUpload:
+    """Grava um `UploadFile` de PDF (extensão, cabeçalho e tamanho validados antes)."""
+    if not (file.filename or "").lower().endswith(".pdf"):
+        raise UploadRejected(file.filename, "Formato de arquivo não suportado. Apenas PDF é permitido.")
+    file_path = upload_path(upload_folder, client_token, file.filename)
+    return await stream_pdf_to_disk(file.read, file.filename, file_path, max_bytes, size_hint=file.size)
+
+
+async def _extract_member(archive: zipfile.ZipFile, info: zipfile.ZipInfo, file_path: str, max_bytes: int) -> StoredUpload:
+    member = await anyio.to_thread.run_sync(archive.open, info)
+    try:
+        read = lambda n: anyio.to_thread.run_sync(member.read, n)  # noqa: E731
+        return await stream_pdf_to_disk(read, info.filename, file_path, max_bytes)
+    finally:
+        member.close()
+
+
+async def store_zip_upload(
+    file: Any,
+    client_token: str,
+    upload_folder: str,
+    max_bytes: int,
+    max_files: int,
+) -> Tuple[List[StoredUpload], List[UploadRejected]]:
+    """
+    Extrai os PDFs de um zip, um por vez e direto para o diretório de uploads.
+    Membros que não são PDF, que passam do limite (pelo tamanho declarado no zip e
+    de novo durante a extração, contra zip bombs) ou além de `max_files` são recusados,
+    assim como membros corrompidos, criptografados ou com compressão não suportada.
+    """
+    head = await file.read(len(ZIP_MAGIC))
+    if head != ZIP_MAGIC:
+        raise UploadRejected(file.filename, "Arquivo zip inválido.", 415)
+    await file.seek(0)
+    try:
+        archive = await anyio.to_thread.run_sync(zipfile.ZipFile, file.file)
+    except zipfile.BadZipFile:
+        raise UploadRejected(file.filename, "Arquivo zip inválido.", 415)
+
+    stored, rejected = [], []
+    try:
+        with archive:
+            for info in archive.infolist():
+                name = info.filename
+                if info.is_dir() or name.startswith("__MACOSX/"):
+                    continue
+                if not name.lower().endswith(".pdf"):
+                    rejected.append(UploadRejected(name, "Formato de arquivo não suportado. Apenas PDF é permitido."))
+                    continue
+                if len(stored) >= max_files:
+                    rejected.append(UploadRejected(name, f"Limite de {max_files} arquivos por envio.", 413))
+                    continue
+                if info.file_size > max_bytes:
+                    rejected.append(_too_large(name, max_bytes))
+                    continue
+                try:
+                    stored.append(await _extract_member(archive, info, upload_path(upload_folder, client_token, name), max_bytes))
+                except UploadRejected as e:
+                    rejected.append(e)
+                except (zipfile.BadZipFile, zlib.error, EOFError):
+                    rejected.append(UploadRejected(name, "Arquivo corrompido dentro do zip."))
+                except NotImplementedError:
+                    # Antes de RuntimeError: NotImplementedError é subclasse dele.
+                    rejected.append(UploadRejected(name, "Método de compressão não suportado dentro do zip."))
+                except RuntimeError:
+                    # zipfile recusa membros criptografados sem senha com RuntimeError.
+                    rejected.append(UploadRejected(name, "Arquivo protegido por senha dentro do zip."))
+    except BaseException:
+        # Falha inesperada (disco, cancelamento): os PDFs já extraídos não ficam órfãos.
+        discard_uploads(stored)
+        raise
+    return stored, rejected
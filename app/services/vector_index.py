@@ -0,0 +1,92 @@
+"""
+Interface comum dos backends de vetores (VECTOR_STORE_PROVIDER).
+
+O RAGService, o pipeline de embeddings, o índice BM25 e o retriever usam apenas
+um subconjunto da API de collections do Chroma, por tenant:
+
+    upsert(ids, embeddings, documents, metadatas)
+    update(ids, metadatas)
+    delete(ids=None, where=None)
+    get(ids=None, where=None, include=[...], limit=None, offset=None)
+    query(query_embeddings, n_results, include=[...])
+    count()
+
+Cada backend (Chroma, pgvector, HNSW em processo) entrega collections com essa
+API via `get_collection(client_id)`. `where` aceita igualdade por chave de
+metadado, `$eq`, `$and` e `$or` (o que o serviço usa).
+"""
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, List, Tuple
+
+DEFAULT_INCLUDE = ("documents", "metadatas")
+
+
+class VectorStoreBackend(ABC):
+    """Collections de vetores por tenant (as do Chroma são o modelo)."""
+
+    @abstractmethod
+    def get_collection(self, client_id: str) -> Any:
+        ...
+
+    @abstractmethod
+    def delete_collection(self, client_id: str) -> None:
+        ...
+
+    @abstractmethod
+    def list_collections(self) -> List[str]:
+        ...
+
+    def keyword_index(self) -> Any:
+        """
+        Busca por termos (interface de `KeywordIndex`) guardada no próprio backend,
+        compartilhada entre máquinas; None (padrão) usa o índice SQLite local.
+        """
+        return None
+
+    def persist(self, client_id: str) -> None:
+        """Grava em disco o que ainda está só em memória (fim de uma ingestão ou exclusão)."""
+
+    def invalidate(self, client_id: str) -> None:
+        """Descarta o que foi cacheado para o tenant neste processo."""
+
+    def clear(self) -> None:
+        ...
+
+    def stats(self) -> Dict[str, Any]:
+        return {}
+
+
+def where_to_sql(where: Dict[str, Any], equals: Callable[[str, Any], Tuple[str, List[Any]]]) -> Tuple[str, List[Any]]:
+    """
+    Traduz um filtro `where` no estilo Chroma para SQL. `equals(chave, valor)` gera a
+    condição de igualdade de um metadado no dialeto do backend: (sql, parâmetros).
+    """
+    clauses, params = [], []
+    for key, value in where.items():
+        if key in ("$and", "$or"):
+            parts = [where_to_sql(item, equals) for item in value]
+            joiner = " AND " if key == "$and" else " OR "
+            clauses.append("(" + joiner.join(sql for sql, _ in parts) + ")")
+            for _, part_params in parts:
+                params += part_params
+            continue
+        if isinstance(value, dict):
+            if set(value) != {"$eq"}:
+                raise ValueError(f"Operador de filtro não suportado: {value}")
+            value = value["$eq"]
+        sql, part_params = equals(key, value)
+        clauses.append(sql)
+        params += part_params
+    return " AND ".join(clauses) or "1=1", params
+
+
+def query_result(rows: List[Tuple[str, str, Dict[str, Any], float]], include) -> Dict[str, List[List[Any]]]:
+    """Resultado de `query` no formato do Chroma (uma lista por consulta) a partir de (id, texto, metadados, distância)."""
+    result = {"ids": [[row[0] for row in rows]]}
+    if "documents" in include:
+        result["documents"] = [[row[1] for row in rows]]
+    if "metadatas" in include:
+        result["metadatas"] = [[row[2] for row in rows]]
+    if "distances" in include:
+        result["distances"] = [[row[3] for row in rows]]
+    return result
@@ -0,0 +1,87 @@
+"""
+Migração das collections de vetores entre backends (ex: Chroma -> pgvector).
+
+Copia, por tenant e em páginas, ids, textos, metadados e os embeddings já
+calculados (sem chamar a API de embeddings) e confere as contagens no fim. O
+destino recebe upserts: a migração pode ser repetida após uma interrupção. Com
+destino pgvector os termos da busca híbrida são gravados junto com os chunks
+(coluna `terms`); nos demais backends o índice BM25 local (keyword_index) não é
+copiado e é reconstruído no primeiro uso.
+
+Uso:
+    python -m app.services.vector_migration --from chroma --to pgvector
+    python -m app.services.vector_migration --from chroma --to hnsw --tenants <client_token> --batch-size 1000
+
+Depois de migrar, troque VECTOR_STORE_PROVIDER na API e nos workers.
+"""
+import argparse
+import time
+from typing import Any, Dict, List, Optional
+
+from app.services.providers import create_provider
+
+
+def build_backend(name: str, settings: Any) -> Any:
+    """Backend de vetores `name` com o restante da configuração atual."""
+    return create_provider("vector_store", settings.model_copy(update={"VECTOR_STORE_PROVIDER": name}), embeddings=None)
+
+
+def migrate_collection(source: Any, target: Any, client_id: str, batch_size: int = 500) -> Dict[str, Any]:
+    """Copia a collection do tenant de `source` para `target`; retorna as contagens dos dois lados."""
+    started = time.perf_counter()
+    source_collection = source.get_collection(client_id)
+    target_collection = target.get_collection(client_id)
+    copied = offset = 0
+    while True:
+        page = source_collection.get(include=["embeddings", "documents", "metadatas"], limit=batch_size, offset=offset)
+        if not len(page["ids"]):
+            break
+        target_collection.upsert(
+            ids=page["ids"], embeddings=page["embeddings"], documents=page["documents"], metadatas=page["metadatas"]
+        )
+        copied += len(page["ids"])
+        offset += len(page["ids"])
+    target.persist(client_id)
+    return {
+        "client_id": client_id,
+        "copied": copied,
+        "source_count": source_collection.count(),
+        "target_count": target_collection.count(),
+        "seconds": round(time.perf_counter() - started, 2),
+    }
+
+
+def migrate(source: Any, target: Any, tenants: Optional[List[str]] = None, batch_size: int = 500) -> List[Dict[str, Any]]:
+    results = []
+    for client_id in tenants or source.list_collections():
+        result = migrate_collection(source, target, client_id, batch_size)
+        status = "ok" if result["source_count"] == result["target_count"] else "DIVERGENTE"
+        print(
+            f"Cliente {client_id}: {result['copied']} chunks copiados em {result['seconds']}s "
+            f"(origem={result['source_count']}, destino={result['target_count']}) {status}"
+        )
+        results.append(result)
+    return results
+
+
+def main():
+    from app.core.config import settings
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--from", dest="source", default="chroma", help="provider de origem")
+    parser.add_argument("--to", dest="target", required=True, help="provider de destino (pgvector, hnsw, ...)")
+    parser.add_argument("--tenants", nargs="+", help="client_tokens a migrar (padrão: todos da origem)")
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+    if args.source == args.target:
+        parser.error("--from e --to devem ser backends diferentes")
+
+    results = migrate(build_backend(args.source, settings), build_backend(args.target, settings), args.tenants, args.batch_size)
+    diverged = [r["client_id"] for r in results if r["source_count"] != r["target_count"]]
+    print(f"{len(results)} collections migradas, {sum(r['copied'] for r in results)} chunks")
+    if diverged:
+        raise SystemExit(f"Contagens divergentes em: {', '.join(diverged)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+from typing import Any, Dict, List, Optional
+
+from app.core.cache import LRUCache
+from app.services.vector_index import VectorStoreBackend
+
+
+class VectorStoreCache(VectorStoreBackend):
+    """
+    Mantém um handle Chroma (e seu retriever) por tenant, reaproveitando um único
+    PersistentClient por processo em vez de reabri-lo a cada chamada do /chat.
+
+    O número de tenants em cache é limitado por LRU e o consumo de memória dos
+    índices carregados é limitado pelo cache de segmentos do próprio Chroma.
+    """
+    def __init__(
+        self,
+        chroma_path: str,
+        embeddings: Any,
+        max_entries: int = 64,
+        ttl_seconds: Optional[float] = None,
+        memory_limit_bytes: int = 0,
+        search_kwargs: Optional[Dict[str, Any]] = None,
+    ):
+        self.chroma_path = chroma_path
+        self.embeddings = embeddings
+        self.search_kwargs = search_kwargs or {"k": 3}
+        self._cache = LRUCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+
+        # chromadb e o wrapper do LangChain custam ~1s de import: só quando o cache é criado.
+        import chromadb
+        from chromadb.config import Settings as ChromaSettings
+
+        client_settings = {"anonymized_telemetry": False}
+        if memory_limit_bytes > 0:
+            client_settings["chroma_segment_cache_policy"] = "LRU"
+            client_settings["chroma_memory_limit_bytes"] = memory_limit_bytes
+        self.client = chromadb.PersistentClient(
+            path=chroma_path, settings=ChromaSettings(**client_settings)
+        )
+
+    def _build(self, client_id: str) -> Dict[str, Any]:
+        from langchain_community.vectorstores import Chroma
+
+        store = Chroma(
+            client=self.client,
+            embedding_function=self.embeddings,
+            collection_name=client_id,
+        )
+        return {"store": store, "retriever": store.as_retriever(search_kwargs=self.search_kwargs)}
+
+    def get_store(self, client_id: str):
+        return self._cache.get_or_create(client_id, lambda: self._build(client_id))["store"]
+
+    def get_retriever(self, client_id: str):
+        return self._cache.get_or_create(client_id, lambda: self._build(client_id))["retriever"]
+
+    def get_collection(self, client_id: str):
+        """Collection Chroma crua do tenant, para escritas em bulk com embeddings já calculados."""
+        return self.get_store(client_id)._collection
+
+    def delete_collection(self, client_id: str) -> None:
+        self.client.delete_collection(client_id)
+        self.invalidate(client_id)
+
+    def list_collections(self) -> List[str]:
+        return [collection.name for collection in self.client.list_collections()]
+
+    def invalidate(self, client_id: str) -> None:
+        """Descarta o handle do tenant (após ingestão ou exclusão da collection)."""
+        self._cache.invalidate(client_id)
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return self._cache.stats()
@@ -0,0 +1,61 @@
+"""
+Preparação comum dos benchmarks: variáveis de ambiente mínimas para importar o
+app sem .env, diretório de trabalho temporário (chroma_db/ e data/) e um banco
+SQLite em memória no lugar do PostgreSQL.
+"""
+import os
+import tempfile
+
+_DEFAULT_ENV = {
+    "POSTGRES_USER": "bench",
+    "POSTGRES_PASSWORD": "bench",
+    "POSTGRES_SERVER": "localhost",
+    "POSTGRES_PORT": "5432",
+    "POSTGRES_DB": "bench",
+    "SECRET_KEY": "benchmark-secret-key",
+    "OPENAI_API_KEY": "sk-benchmark",
+    "CELERY_REDIS_DSN": "redis://localhost:6379/0",
+    "CELERY_BROKER_URL": "memory://",
+    "CELERY_RESULT_BACKEND": "cache+memory://",
+    "ANSWER_CACHE_BACKEND": "none",
+    "COLLECTION_VERSIONS_BACKEND": "local",
+    "LLM_PROVIDER": "fake",
+    "EMBEDDINGS_PROVIDER": "fake",
+    # Os benchmarks de carga disparam centenas de requisições do mesmo tenant.
+    "CHAT_RATE_LIMIT_BACKEND": "none",
+    "CHAT_MAX_CONCURRENT": "0",
+}
+
+
+def prepare_environment() -> str:
+    """Define o ambiente padrão e muda para um diretório temporário. Retorna o diretório."""
+    for key, value in _DEFAULT_ENV.items():
+        os.environ.setdefault(key, value)
+    workdir = tempfile.mkdtemp(prefix="rag-bench-")
+    os.chdir(workdir)
+    return workdir
+
+
+def sqlite_session_factory():
+    """Cria um banco SQLite em memória com as tabelas do app e retorna o sessionmaker."""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+
+    from app.core.models import Base
+
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def percentile(values, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
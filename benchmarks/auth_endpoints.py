@@ -0,0 +1,130 @@
+"""
+Benchmark dos endpoints de autenticação e de leitura do dashboard (sem rede).
+
+Roda o router da API via ASGI com um SQLite em memória no lugar do PostgreSQL e
+mede vazão e latência de:
+  - POST /register   (hash da senha + insert do Client)
+  - POST /token      (login: verificação do hash + JWT)
+  - GET  /documents  (validação do JWT + listagem dos documentos do cliente)
+
+Uso:
+    python -m benchmarks.auth_endpoints --requests 200 --concurrency 20 --documents 50
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from benchmarks._env import percentile, prepare_environment, sqlite_session_factory
+
+
+def build_app(session_factory):
+    from fastapi import FastAPI
+
+    from app.api.endpoints import router
+    from app.core.db import get_db
+
+    app = FastAPI()
+    app.include_router(router, prefix="/api/v1")
+
+    def override_get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    return app
+
+
+def seed_documents(session_factory, client_token: str, count: int) -> None:
+    from app.core.models import Document, DocumentStatus
+
+    db = session_factory()
+    db.add_all([
+        Document(
+            filename=f"manual-{i}.pdf", file_path=f"/tmp/manual-{i}.pdf",
+            client_id=client_token, status=DocumentStatus.COMPLETED.value,
+        )
+        for i in range(count)
+    ])
+    db.commit()
+    db.close()
+
+
+async def run_scenario(client, name: str, requests: int, concurrency: int, make_request) -> dict:
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        async with semaphore:
+            started = time.perf_counter()
+            response = await make_request(client, i)
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - started
+    return {
+        "scenario": name,
+        "requests": requests,
+        "concurrency": concurrency,
+        "req_per_s": round(requests / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+async def run(app, session_factory, requests: int, concurrency: int, documents: int):
+    import httpx
+
+    password = "senha-de-benchmark"
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        results = [await run_scenario(
+            client, "register", requests, concurrency,
+            lambda c, i: c.post("/api/v1/register", json={"name": f"Empresa {i}", "email": f"bench{i}@example.com", "password": password}),
+        )]
+        results.append(await run_scenario(
+            client, "login", requests, concurrency,
+            lambda c, i: c.post("/api/v1/token", json={"email": f"bench{i % requests}@example.com", "password": password}),
+        ))
+
+        login = (await client.post("/api/v1/token", json={"email": "bench0@example.com", "password": password})).json()
+        seed_documents(session_factory, login["client_token"], documents)
+        headers = {"Authorization": f"Bearer {login['access_token']}"}
+        results.append(await run_scenario(
+            client, f"list_documents ({documents} docs)", requests, concurrency,
+            lambda c, i: c.get("/api/v1/documents", headers=headers),
+        ))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200, help="requisições por cenário")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--documents", type=int, default=50, help="documentos do cliente na listagem")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    prepare_environment()
+    session_factory = sqlite_session_factory()
+    app = build_app(session_factory)
+    results = asyncio.run(run(app, session_factory, args.requests, args.concurrency, args.documents))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for result in results:
+        print(
+            f"{result['scenario']:<26} {result['req_per_s']:>8} req/s  "
+            f"p50={result['p50_ms']}ms p95={result['p95_ms']}ms p99={result['p99_ms']}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
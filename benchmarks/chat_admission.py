@@ -0,0 +1,149 @@
+"""
+Rate limit e admissão do /chat com um tenant "barulhento" (sem rede).
+
+A LLM falsa atende no máximo `--upstream-capacity` chamadas simultâneas (a cota
+da OpenAI compartilhada por todos os tenants). Um tenant dispara `--noisy`
+requisições de uma vez (usuários diferentes do mesmo widget) enquanto outro
+tenant envia `--quiet` perguntas espaçadas. Compara:
+  - off: sem rate limit nem admissão (comportamento anterior);
+  - on:  token bucket por tenant/IP e admissão global com 429 + Retry-After.
+
+Mede a latência das perguntas do tenant tranquilo e quantas requisições do
+barulhento foram aceitas ou recusadas (429).
+
+Uso:
+    python -m benchmarks.chat_admission --noisy 400 --quiet 20 --json
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from benchmarks._env import percentile, prepare_environment, sqlite_session_factory
+from benchmarks.chat_concurrency import build_app, seed
+
+
+def limit_upstream() -> None:
+    """Troca a LLM do serviço por uma que aceita no máximo `--upstream-capacity` chamadas ao mesmo tempo."""
+    from app.services.fake_backends import FakeChatModel
+    from app.services.rag_service import rag_service_instance
+
+    class CapacityLimitedChatModel(FakeChatModel):
+        async def _agenerate(self, *args, **kwargs):
+            async with _upstream[0]:
+                return await super()._agenerate(*args, **kwargs)
+
+    rag_service_instance.llm = CapacityLimitedChatModel(latency=rag_service_instance.llm.latency)
+
+
+# Semáforo da "cota" da LLM, recriado a cada cenário (um event loop por asyncio.run).
+_upstream = [None]
+
+
+def configure(mode: str, args) -> None:
+    from app.api import endpoints
+    from app.core.config import settings
+    from app.services.rate_limit import ChatAdmission, ChatLimits, ChatRateLimiter, LocalTokenBucketStore
+
+    settings.CHAT_TRUST_FORWARDED_FOR = True
+    if mode == "off":
+        endpoints.chat_rate_limiter, endpoints.chat_admission = None, None
+        return
+    endpoints.chat_rate_limiter = ChatRateLimiter(
+        LocalTokenBucketStore(), ChatLimits(args.tenant_rate, args.tenant_burst, args.ip_rate, args.ip_burst)
+    )
+    endpoints.chat_admission = ChatAdmission(
+        args.max_concurrent, max_waiting=args.max_waiting, wait_timeout=args.admission_timeout, retry_after=2,
+        max_per_tenant=args.tenant_max_concurrent,
+    )
+
+
+async def run_scenario(app, noisy_token: str, quiet_token: str, args) -> dict:
+    import httpx
+
+    _upstream[0] = asyncio.Semaphore(args.upstream_capacity)
+    quiet_latencies, quiet_rejected, noisy_status = [], 0, []
+
+    async def noisy(client, i):
+        response = await client.post(
+            "/api/v1/chat", json={"query": f"pergunta {i}", "client_token": noisy_token},
+            headers={"X-Forwarded-For": f"10.0.{i // 250}.{i % 250}"},
+        )
+        noisy_status.append(response.status_code)
+
+    async def quiet(client, i):
+        nonlocal quiet_rejected
+        await asyncio.sleep(i * args.quiet_interval)
+        started = time.perf_counter()
+        response = await client.post(
+            "/api/v1/chat", json={"query": f"dúvida {i}", "client_token": quiet_token},
+            headers={"X-Forwarded-For": f"192.168.0.{i % 250}"},
+        )
+        if response.status_code == 429:
+            quiet_rejected += 1
+        else:
+            quiet_latencies.append(time.perf_counter() - started)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        started = time.perf_counter()
+        await asyncio.gather(
+            *(noisy(client, i) for i in range(args.noisy)),
+            *(quiet(client, i) for i in range(args.quiet)),
+        )
+        elapsed = time.perf_counter() - started
+
+    return {
+        "quiet_ok": len(quiet_latencies),
+        "quiet_rejected": quiet_rejected,
+        "quiet_p50_ms": round(percentile(quiet_latencies, 50) * 1000, 1),
+        "quiet_p95_ms": round(percentile(quiet_latencies, 95) * 1000, 1),
+        "noisy_ok": noisy_status.count(200),
+        "noisy_rejected": noisy_status.count(429),
+        "wall_s": round(elapsed, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--noisy", type=int, default=400, help="requisições simultâneas do tenant barulhento")
+    parser.add_argument("--quiet", type=int, default=20, help="perguntas do tenant tranquilo")
+    parser.add_argument("--quiet-interval", type=float, default=0.1, help="segundos entre as perguntas do tranquilo")
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    parser.add_argument("--upstream-capacity", type=int, default=16, help="chamadas simultâneas aceitas pela LLM")
+    parser.add_argument("--tenant-rate", type=int, default=300, help="CHAT_TENANT_RATE_PER_MINUTE")
+    parser.add_argument("--tenant-burst", type=int, default=60, help="CHAT_TENANT_BURST")
+    parser.add_argument("--ip-rate", type=int, default=20, help="CHAT_IP_RATE_PER_MINUTE")
+    parser.add_argument("--ip-burst", type=int, default=10, help="CHAT_IP_BURST")
+    parser.add_argument("--max-concurrent", type=int, default=32, help="CHAT_MAX_CONCURRENT")
+    parser.add_argument("--max-waiting", type=int, default=32, help="CHAT_MAX_WAITING")
+    parser.add_argument("--admission-timeout", type=float, default=2.0, help="CHAT_ADMISSION_TIMEOUT_SECONDS")
+    parser.add_argument("--tenant-max-concurrent", type=int, default=16, help="CHAT_TENANT_MAX_CONCURRENT")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    prepare_environment()
+    session_factory = sqlite_session_factory()
+    app = build_app(session_factory, args.llm_latency, 0.0, "local", True)
+    limit_upstream()
+    noisy_token = seed(session_factory, 200, name="Noisy")
+    quiet_token = seed(session_factory, 200, name="Quiet")
+
+    results = []
+    for mode in ("off", "on"):
+        configure(mode, args)
+        results.append({"mode": mode, **asyncio.run(run_scenario(app, noisy_token, quiet_token, args))})
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for r in results:
+            print(
+                f"{r['mode']:<4} tranquilo: {r['quiet_ok']} ok / {r['quiet_rejected']} 429, "
+                f"p50={r['quiet_p50_ms']}ms p95={r['quiet_p95_ms']}ms | "
+                f"barulhento: {r['noisy_ok']} ok / {r['noisy_rejected']} 429 | {r['wall_s']}s"
+            )
+
+
+if __name__ == "__main__":
+    main()
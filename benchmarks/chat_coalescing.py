@@ -0,0 +1,148 @@
+"""
+Perguntas idênticas simultâneas no /chat (widget "viralizou"), sem rede.
+
+`--users` usuários do mesmo tenant enviam, ao longo de `--spread` segundos, uma
+entre `--distinct` perguntas (metade pelo /chat, metade pelo /chat/stream). A
+LLM falsa conta as chamadas recebidas (guardrail e geração). Compara:
+  - off: cada requisição faz o próprio guardrail, busca e geração;
+  - on:  single-flight (CHAT_COALESCE) por (tenant, pergunta normalizada, versão
+         da collection); streams que chegam no meio acompanham a geração em andamento.
+
+O cache de respostas fica desligado: só a deduplicação do que está em andamento é medida.
+
+Uso:
+    python -m benchmarks.chat_coalescing --users 200 --distinct 5 --json
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from benchmarks._env import percentile, prepare_environment, sqlite_session_factory
+from benchmarks.chat_concurrency import build_app, seed
+
+QUESTIONS = [
+    "Qual o prazo de garantia do equipamento?",
+    "Como faço para trocar o produto?",
+    "Qual o horário de atendimento?",
+    "Vocês entregam em todo o Brasil?",
+    "Como cancelo minha assinatura?",
+    "Quais as formas de pagamento?",
+    "Onde fica a loja física?",
+    "Tem desconto para empresas?",
+]
+
+# Chamadas recebidas pela LLM falsa no cenário atual.
+_llm_calls = [0]
+
+
+def install_counting_llm(latency: float, token_latency: float) -> None:
+    from app.services.fake_backends import FakeChatModel
+    from app.services.rag_service import rag_service_instance
+
+    class CountingChatModel(FakeChatModel):
+        async def _agenerate(self, *args, **kwargs):
+            _llm_calls[0] += 1
+            return await super()._agenerate(*args, **kwargs)
+
+        async def _astream(self, *args, **kwargs):
+            _llm_calls[0] += 1
+            async for chunk in super()._astream(*args, **kwargs):
+                yield chunk
+
+    rag_service_instance.llm = CountingChatModel(latency=latency, token_latency=token_latency)
+
+
+def variant(question: str, i: int) -> str:
+    # Mesmo texto com caixa/espaços/pontuação diferentes (a chave usa a pergunta normalizada).
+    return [question, question.lower(), f"  {question.rstrip('?')} ", question.upper()][i % 4]
+
+
+async def run_scenario(app, token: str, args) -> dict:
+    import httpx
+
+    from app.services.rag_service import rag_service_instance
+
+    _llm_calls[0] = 0
+    latencies, ttfts, errors = [], [], 0
+    rng = random.Random(args.seed)
+    plan = [(rng.uniform(0, args.spread), variant(QUESTIONS[i % args.distinct], i), i % 2 == 0) for i in range(args.users)]
+
+    async def one(client, delay, query, streaming):
+        nonlocal errors
+        await asyncio.sleep(delay)
+        started = time.perf_counter()
+        body = {"query": query, "client_token": token}
+        if streaming:
+            first_token = None
+            async with client.stream("POST", "/api/v1/chat/stream", json=body) as response:
+                async for line in response.aiter_lines():
+                    if first_token is None and line.startswith("event: token"):
+                        first_token = time.perf_counter() - started
+            if first_token is not None:
+                ttfts.append(first_token)
+            ok = response.status_code == 200
+        else:
+            ok = (await client.post("/api/v1/chat", json=body)).status_code == 200
+        errors += not ok
+        latencies.append(time.perf_counter() - started)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(one(client, *item) for item in plan))
+        elapsed = time.perf_counter() - started
+
+    flights = rag_service_instance.single_flight
+    return {
+        "requests": args.users,
+        "llm_calls": _llm_calls[0],
+        "coalesced": flights.coalesced if flights else 0,
+        "errors": errors,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "stream_ttft_p50_ms": round(percentile(ttfts, 50) * 1000, 1),
+        "wall_s": round(elapsed, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--distinct", type=int, default=5, choices=range(1, len(QUESTIONS) + 1), metavar="N")
+    parser.add_argument("--spread", type=float, default=0.5, help="segundos em que as requisições chegam")
+    parser.add_argument("--llm-latency", type=float, default=0.3)
+    parser.add_argument("--token-latency", type=float, default=0.02, help="segundos entre tokens no stream")
+    parser.add_argument("--guardrail-mode", default="parallel", choices=["serial", "parallel", "local", "off"])
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    prepare_environment()
+    from app.core.single_flight import SingleFlight
+    from app.services.rag_service import rag_service_instance
+
+    session_factory = sqlite_session_factory()
+    app = build_app(session_factory, args.llm_latency, 0.0, args.guardrail_mode, False)
+    install_counting_llm(args.llm_latency, args.token_latency)
+    token = seed(session_factory, 200)
+
+    results = []
+    for mode in ("off", "on"):
+        rag_service_instance.single_flight = SingleFlight() if mode == "on" else None
+        results.append({"mode": mode, **asyncio.run(run_scenario(app, token, args))})
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for r in results:
+            print(
+                f"{r['mode']:<4} {r['requests']} requisições: {r['llm_calls']} chamadas à LLM "
+                f"({r['coalesced']} compartilhadas), p50={r['p50_ms']}ms p95={r['p95_ms']}ms "
+                f"ttft(stream) p50={r['stream_ttft_p50_ms']}ms, {r['errors']} erros, {r['wall_s']}s"
+            )
+
+
+if __name__ == "__main__":
+    main()
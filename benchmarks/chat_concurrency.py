@@ -0,0 +1,152 @@
+"""
+Benchmark de carga do /chat com LLM e embeddings falsos (sem rede).
+
+Dispara N requisições simultâneas contra o app via ASGI e mede vazão e latência,
+comparando o handler assíncrono atual com o antigo (chamadas síncronas dentro de
+`async def`, que travam o event loop).
+
+Uso:
+    python -m benchmarks.chat_concurrency --levels 50 200 1000 --llm-latency 0.2
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from benchmarks._env import percentile, prepare_environment, sqlite_session_factory
+
+
+def build_app(session_factory, llm_latency: float, embedding_latency: float, guardrail_mode: str, local_prefilter: bool):
+    from fastapi import Depends, FastAPI
+
+    from app.api.endpoints import router, validate_client_token
+    from app.api.schemas import ChatQuery, ChatResponse
+    from app.core.db import get_db
+    from app.services.fake_backends import FakeChatModel, FakeEmbeddings
+    from app.services.guardrail import LocalGuardrail
+    from app.services.rag_service import rag_service_instance
+
+    rag_service_instance.llm = FakeChatModel(latency=llm_latency)
+    # Antes do primeiro uso: vector store, retriever e pipeline são criados já com os falsos.
+    rag_service_instance.embeddings = FakeEmbeddings(latency=embedding_latency)
+    rag_service_instance.answer_cache = None
+    rag_service_instance.guardrail_mode = guardrail_mode
+    rag_service_instance.local_guardrail = LocalGuardrail() if local_prefilter or guardrail_mode == "local" else None
+
+    app = FastAPI()
+    app.include_router(router, prefix="/api/v1")
+
+    @app.post("/blocking/chat", response_model=ChatResponse)
+    async def blocking_chat(data: ChatQuery, db=Depends(get_db)):
+        # Reproduz o handler antigo: tudo síncrono dentro de `async def`.
+        tenant_id = validate_client_token(data.client_token, db)
+        return ChatResponse(answer=rag_service_instance.query_rag_service(data.query, tenant_id))
+
+    def override_get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    return app
+
+
+def seed(session_factory, chunks: int, name: str = "Bench") -> str:
+    from app.core.models import Client
+    from app.services.rag_service import rag_service_instance
+
+    db = session_factory()
+    client = Client(name=name, email=f"{name.lower()}@example.com", hashed_password="x")
+    db.add(client)
+    db.commit()
+    token = client.client_token
+    db.close()
+
+    # Grava pela API de collection (comum a todos os VECTOR_STORE_PROVIDER).
+    texts = [f"Trecho {i} do manual de benchmark." for i in range(chunks)]
+    collection = rag_service_instance.vector_stores.get_collection(token)
+    collection.upsert(
+        ids=[f"bench-{i}" for i in range(chunks)],
+        embeddings=rag_service_instance.embeddings.embed_documents(texts),
+        documents=texts,
+        metadatas=[{"client_id": token} for _ in texts],
+    )
+    rag_service_instance.vector_stores.persist(token)
+    return token
+
+
+async def run_level(app, path: str, token: str, concurrency: int):
+    import httpx
+
+    latencies = []
+
+    async def one(client, i):
+        started = time.perf_counter()
+        response = await client.post(path, json={"query": f"pergunta {i}", "client_token": token})
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - started)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(one(client, i) for i in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "path": path,
+        "concurrency": concurrency,
+        "wall_s": round(elapsed, 3),
+        "req_per_s": round(concurrency / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--levels", type=int, nargs="+", default=[50, 200, 1000])
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="segundos por chamada à LLM falsa")
+    parser.add_argument("--embedding-latency", type=float, default=0.02)
+    parser.add_argument("--chunks", type=int, default=500, help="chunks na collection do tenant")
+    parser.add_argument("--guardrail-mode", default="parallel", choices=["serial", "parallel", "local", "off"])
+    parser.add_argument("--no-local-prefilter", action="store_true", help="sempre consulta a LLM no guardrail")
+    parser.add_argument("--skip-blocking", action="store_true", help="não mede o handler síncrono antigo")
+    parser.add_argument("--json", action="store_true", help="imprime os resultados em JSON")
+    args = parser.parse_args()
+
+    prepare_environment()
+    session_factory = sqlite_session_factory()
+    app = build_app(
+        session_factory, args.llm_latency, args.embedding_latency,
+        args.guardrail_mode, not args.no_local_prefilter,
+    )
+    token = seed(session_factory, args.chunks)
+
+    paths = ["/api/v1/chat"] + ([] if args.skip_blocking else ["/blocking/chat"])
+    results = []
+    for path in paths:
+        for level in args.levels:
+            result = asyncio.run(run_level(app, path, token, level))
+            results.append(result)
+            if not args.json:
+                print(
+                    f"{path:<16} conc={level:<5} {result['req_per_s']:>8} req/s  "
+                    f"p50={result['p50_ms']}ms p95={result['p95_ms']}ms p99={result['p99_ms']}ms"
+                )
+
+    from app.services.rag_service import rag_service_instance
+
+    stages = rag_service_instance.latency_stats()
+    if args.json:
+        print(json.dumps({"results": results, "stages": stages}, indent=2))
+    else:
+        print("\nLatência por etapa:")
+        for stage, summary in stages.items():
+            print(f"  {stage:<40} n={summary['count']:<6} avg={summary['avg_ms']}ms p95={summary['p95_ms']}ms")
+
+
+if __name__ == "__main__":
+    main()
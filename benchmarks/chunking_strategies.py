@@ -0,0 +1,179 @@
+"""
+Estratégias de chunking (app.services.chunking) no mesmo PDF, sem rede.
+
+Gera um PDF sintético com títulos, parágrafos, listas e tabelas
+(benchmarks.pdf_fixtures, `structured=True`), ingere-o pelo pipeline real com
+embeddings falsos lexicais (latência por chamada e por chunk) e compara:
+  - legacy:     corte por caracteres anterior (1000 caracteres, sobreposição de 150);
+  - tokens:     corte recursivo por tokens (CHUNK_TOKENS / CHUNK_OVERLAP_TOKENS);
+  - structure:  blocos de layout (padrão).
+
+Mede chunks, tokens enviados aos embeddings, tempo de ingestão, tamanho do índice
+em disco (Chroma + BM25) e recall@k da busca híbrida. As perguntas citam o código
+de uma linha (achado pelo BM25), então o recall mede se o chunk encontrado traz a
+resposta inteira:
+  - table: "Qual a potência do modelo T-0012-03?" (a linha e o cabeçalho da tabela);
+  - list:  "O que diz o item L-0012-03?" (o item inteiro e a frase que abre a lista);
+  - text:  "O que diz a referência P-0012-03?" (a linha inteira do parágrafo).
+
+Uso:
+    python -m benchmarks.chunking_strategies --pages 60 --queries 150 --json
+"""
+import argparse
+import json
+import os
+import random
+import re
+import time
+
+from benchmarks._env import prepare_environment
+
+TABLE_HEADER = "Modelo Tensao Potencia Corrente"
+LIST_INTRO = "Itens verificados na revisao:"
+
+
+def strategies(chunk_tokens: int, overlap_tokens: int) -> dict:
+    from app.services.chunking import ChunkingConfig
+
+    return {
+        # 1000/150 caracteres: o RecursiveCharacterTextSplitter fixo de antes.
+        "legacy": ChunkingConfig("characters", 250, 38),
+        "tokens": ChunkingConfig("tokens", chunk_tokens, overlap_tokens),
+        "structure": ChunkingConfig("structure", chunk_tokens, overlap_tokens, min_tokens=chunk_tokens // 4),
+    }
+
+
+def build_queries(pages: int, count: int, seed: int = 7):
+    """(tipo, pergunta, trechos que o chunk precisa conter), do mesmo gerador do PDF."""
+    from benchmarks.pdf_fixtures import _structured_page_lines
+
+    rng = random.Random(42)
+    lines = [line for page in range(pages) for line in _structured_page_lines(page, 45, rng)]
+    by_kind = {
+        "table": [line for line in lines if line.startswith("T-")],
+        "list": [line for line in lines if line.startswith("- ")],
+        "text": [line for line in lines if "Ref P-" in line],
+    }
+    pick = random.Random(seed)
+    queries = []
+    for index in range(count):
+        kind = ("table", "list", "text")[index % 3]
+        line = pick.choice(by_kind[kind])
+        code = re.search(r"[TLP]-\d{4}-\d{2}", line).group(0)
+        if kind == "table":
+            queries.append((kind, f"Qual a potência do modelo {code}?", [TABLE_HEADER, line]))
+        elif kind == "list":
+            queries.append((kind, f"O que diz o item {code}?", [LIST_INTRO, line]))
+        else:
+            queries.append((kind, f"O que diz a referência {code}?", [line]))
+    return queries
+
+
+def normalize(text: str) -> str:
+    return " ".join(text.split())
+
+
+def directory_bytes(path: str) -> int:
+    return sum(
+        os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=60)
+    parser.add_argument("--queries", type=int, default=150)
+    parser.add_argument("--k", type=int, nargs="+", default=[1, 3, 5])
+    parser.add_argument("--chunk-tokens", type=int, default=256, help="CHUNK_TOKENS de 'tokens' e 'structure'")
+    parser.add_argument("--overlap-tokens", type=int, default=32, help="CHUNK_OVERLAP_TOKENS")
+    parser.add_argument("--latency", type=float, default=0.05, help="latência fixa por chamada de embeddings (s)")
+    parser.add_argument("--latency-per-text", type=float, default=0.001, help="latência por chunk (s)")
+    parser.add_argument("--strategies", nargs="+", default=["legacy", "tokens", "structure"],
+                        choices=["legacy", "tokens", "structure"])
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    workdir = prepare_environment()
+
+    from app.core.config import settings
+    from app.services.fake_backends import LexicalFakeEmbeddings
+    from app.services.rag_service import RAGService
+    from app.services.retrieval import HybridRetriever
+    from app.services.tokenizer import count_tokens
+    from benchmarks.pdf_fixtures import make_pdf
+
+    settings.EMBEDDING_CACHE_ENABLED = False
+    pdf_path = make_pdf(os.path.join(workdir, "structured.pdf"), args.pages, structured=True)
+    warmup_path = make_pdf(os.path.join(workdir, "warmup.pdf"), 1, structured=True)
+    queries = build_queries(args.pages, args.queries)
+    configs = strategies(args.chunk_tokens, args.overlap_tokens)
+    max_k = max(args.k)
+
+    results = []
+    for name in args.strategies:
+        # Um diretório de índice por estratégia: o tamanho em disco é só dela.
+        index_path = os.path.join(workdir, f"index-{name}")
+        service = RAGService(settings.model_copy(update={"CHROMA_PATH": index_path}))
+        embeddings = service.embeddings = LexicalFakeEmbeddings(
+            latency=args.latency, latency_per_text=args.latency_per_text
+        )
+        client_id = f"chunking-{name}"
+        # Imports e criação do Chroma/BM25 fora da medição.
+        service.ingest_document(warmup_path, f"warmup-{name}", chunking=configs[name])
+        embeddings.calls = 0
+
+        started = time.perf_counter()
+        if not service.ingest_document(pdf_path, client_id, doc_id=1, chunking=configs[name]):
+            raise SystemExit(f"Falha na ingestão ({name}).")
+        elapsed = time.perf_counter() - started
+
+        texts = service.vector_stores.get_collection(client_id).get(include=["documents"])["documents"]
+        tokens = [count_tokens(text) for text in texts]
+        retriever = HybridRetriever(
+            service.vector_stores, service.keyword_index, embeddings,
+            k=max_k, fetch_k=settings.RETRIEVAL_FETCH_K, rrf_k=settings.RETRIEVAL_RRF_K,
+        )
+        hits = {k: {} for k in args.k}
+        for kind, question, needles in queries:
+            docs = retriever.retrieve(question, client_id)
+            for k in args.k:
+                found = any(all(needle in normalize(doc.page_content) for needle in needles) for doc in docs[:k])
+                hits[k].setdefault(kind, []).append(found)
+
+        result = {
+            "strategy": name,
+            "pages": args.pages,
+            "chunk_count": len(texts),
+            "embedded_tokens": sum(tokens),
+            "mean_chunk_tokens": round(sum(tokens) / max(1, len(tokens)), 1),
+            "max_chunk_tokens": max(tokens, default=0),
+            "ingest_seconds": round(elapsed, 3),
+            "embedding_calls": embeddings.calls,
+            "index_bytes": directory_bytes(index_path),
+            "recall": {
+                f"@{k}": {
+                    "all": round(sum(sum(v) for v in by_kind.values()) / len(queries), 3),
+                    **{kind: round(sum(v) / len(v), 3) for kind, v in by_kind.items()},
+                }
+                for k, by_kind in hits.items()
+            },
+        }
+        results.append(result)
+        if not args.json:
+            recall = "  ".join(f"recall{k}={v['all']:.3f}" for k, v in result["recall"].items())
+            by_kind = ", ".join(
+                f"{kind} {value:.2f}" for kind, value in result["recall"][f"@{max_k}"].items() if kind != "all"
+            )
+            print(
+                f"{name:<10} {result['chunk_count']} chunks, {result['embedded_tokens']} tokens "
+                f"(média {result['mean_chunk_tokens']}, máx {result['max_chunk_tokens']}), "
+                f"{result['ingest_seconds']}s, índice {result['index_bytes'] / 1024:.0f} KB\n"
+                f"{'':<10} {recall}  ({by_kind} @{max_k})"
+            )
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
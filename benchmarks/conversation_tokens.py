@@ -0,0 +1,173 @@
+"""
+Tokens enviados à LLM por turno em conversas longas do /chat (sem rede).
+
+Uma sessão de `--turns` perguntas (avulsas e de acompanhamento, como "e para
+peças de reposição?") passa por `aquery_rag_service` com uma LLM falsa que conta
+os tokens de entrada de cada chamada. `per_turn_tokens` soma as chamadas no
+caminho da requisição (reescrita + resposta); o resumo, que roda em segundo
+plano, é contado à parte em `summary_tokens`. Compara:
+  - stateless: sem session_id (cada pergunta avulsa, sem histórico);
+  - naive:     histórico completo reenviado a cada turno, sem resumo nem corte;
+  - bounded:   memória atual (CONVERSATION_*): resumo dos turnos antigos e corte por turno.
+
+Uso:
+    python -m benchmarks.conversation_tokens --turns 20 --json
+"""
+import argparse
+import asyncio
+import json
+import re
+import uuid
+
+from benchmarks._env import prepare_environment
+
+QUESTIONS = [
+    "Qual o prazo de garantia do equipamento?",
+    "E para peças de reposição?",
+    "Como faço para acionar isso?",
+    "Quais documentos preciso enviar para abrir o chamado de assistência técnica?",
+    "Esse prazo vale também para revendas?",
+    "Qual o procedimento de manutenção preventiva do compressor?",
+    "Com que frequência?",
+    "E se eu não fizer, perco a garantia?",
+    "Quais são as condições de frete para devolução de produtos com defeito?",
+    "Quem paga isso?",
+]
+
+# Chamadas da LLM no turno atual: (tipo, tokens de entrada).
+_calls = []
+
+
+def prompt_kind(prompt: str) -> str:
+    if "Pergunta independente:" in prompt:
+        return "condense"
+    if "Resumo atualizado:" in prompt:
+        return "summary"
+    if "Análise:" in prompt:
+        return "guardrail"
+    return "answer"
+
+
+def install_recording_llm(answer_words: int) -> None:
+    """Troca a LLM do serviço por uma falsa que registra os tokens de entrada e responde conforme o prompt."""
+    from langchain_core.messages import AIMessage
+    from langchain_core.outputs import ChatGeneration, ChatResult
+
+    from app.services.fake_backends import FakeChatModel
+    from app.services.rag_service import rag_service_instance
+    from app.services.tokenizer import count_tokens
+
+    answer = " ".join(f"detalhe{i}" for i in range(answer_words))
+
+    def output(kind: str, prompt: str) -> str:
+        if kind == "condense":
+            question = prompt.rsplit("Nova pergunta:", 1)[1].split("\n", 1)[0].strip()
+            return f"{question} (sobre o equipamento e a garantia discutidos)"
+        if kind == "summary":
+            max_words = int(re.search(r"no máximo (\d+) palavras", prompt).group(1))
+            return " ".join(f"fato{i}" for i in range(max_words))
+        if kind == "guardrail":
+            return "OK"
+        return f"Segundo o manual, {answer}."
+
+    class RecordingChatModel(FakeChatModel):
+        def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+            prompt = "".join(message.content for message in messages)
+            kind = prompt_kind(prompt)
+            _calls.append((kind, count_tokens(prompt)))
+            return ChatResult(generations=[ChatGeneration(message=AIMessage(content=output(kind, prompt)))])
+
+        async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+            return self._generate(messages, stop, **kwargs)
+
+    rag_service_instance.llm = RecordingChatModel()
+
+
+def seed(tenant: str, chunks: int) -> None:
+    from app.services.rag_service import rag_service_instance
+
+    texts = [f"Trecho {i} do manual: garantia, manutenção, frete e assistência técnica." for i in range(chunks)]
+    rag_service_instance.vector_stores.get_collection(tenant).upsert(
+        ids=[f"conv-{i}" for i in range(chunks)],
+        embeddings=rag_service_instance.embeddings.embed_documents(texts),
+        documents=texts,
+        metadatas=[{"client_id": tenant} for _ in texts],
+    )
+    rag_service_instance.vector_stores.persist(tenant)
+
+
+def build_memory(mode: str):
+    from app.core.config import settings
+    from app.services.conversation import ConversationMemory, LocalConversationStore, build_conversation_memory
+
+    if mode == "stateless":
+        return None
+    if mode == "naive":
+        unbounded = 10 ** 9
+        store = LocalConversationStore(max_sessions=100, ttl_seconds=3600)
+        return ConversationMemory(store, max_turns=unbounded, keep_turns=unbounded, turn_max_tokens=unbounded, condense="always")
+    return build_conversation_memory(settings.model_copy(update={"CONVERSATION_BACKEND": "local"}))
+
+
+async def run_session(mode: str, tenant: str, turns: int) -> dict:
+    from app.services.rag_service import rag_service_instance as service
+
+    service.conversation = build_memory(mode)
+    session_id = None if mode == "stateless" else uuid.uuid4().hex
+    per_turn, calls, summary_tokens = [], 0, 0
+    for turn in range(turns):
+        _calls.clear()
+        await service.aquery_rag_service(QUESTIONS[turn % len(QUESTIONS)], tenant, session_id)
+        await asyncio.gather(*list(service._background_tasks))
+        per_turn.append(sum(tokens for kind, tokens in _calls if kind != "summary"))
+        summary_tokens += sum(tokens for kind, tokens in _calls if kind == "summary")
+        calls += len(_calls)
+
+    return {
+        "mode": mode,
+        "turns": turns,
+        "first_turn_tokens": per_turn[0],
+        "last_turn_tokens": per_turn[-1],
+        "max_turn_tokens": max(per_turn),
+        "mean_turn_tokens": round(sum(per_turn) / turns, 1),
+        "summary_tokens": summary_tokens,
+        "total_tokens": sum(per_turn) + summary_tokens,
+        "llm_calls": calls,
+        "per_turn_tokens": per_turn,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--answer-words", type=int, default=120, help="tamanho das respostas da LLM falsa")
+    parser.add_argument("--chunks", type=int, default=50, help="chunks na collection do tenant")
+    parser.add_argument("--modes", nargs="+", default=["stateless", "naive", "bounded"], choices=["stateless", "naive", "bounded"])
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    prepare_environment()
+    from app.services.rag_service import rag_service_instance
+
+    # Só as chamadas do pipeline de conversa e da resposta entram na conta.
+    rag_service_instance.guardrail_mode = "off"
+    install_recording_llm(args.answer_words)
+    tenant = "conversation-bench"
+    seed(tenant, args.chunks)
+
+    results = [asyncio.run(run_session(mode, tenant, args.turns)) for mode in args.modes]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for r in results:
+            print(
+                f"{r['mode']:<9} {r['turns']} turnos: 1º={r['first_turn_tokens']} último={r['last_turn_tokens']} "
+                f"máx={r['max_turn_tokens']} média={r['mean_turn_tokens']} resumo={r['summary_tokens']} "
+                f"total={r['total_tokens']} tokens, {r['llm_calls']} chamadas"
+            )
+            print(f"          por turno: {r['per_turn_tokens']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+Histórico de documentos (GET /documents) de um tenant com muitos PDFs (sem rede).
+
+O tenant tem `--docs` documentos (outros tenants somam `--other-docs`) em SQLite.
+Cada cenário é repetido `--repeat` vezes; mede latência e bytes do corpo:
+  - full:      lista completa sem paginação (handler anterior, `.all()`);
+  - page:      primeira página (`limit`), como o dashboard abre o histórico;
+  - deep_page: página `--deep-page` seguindo X-Next-Cursor (keyset: custo constante);
+  - since:     polling com `since` depois de `--changed` documentos mudarem de status;
+  - not_modified: polling com If-None-Match sem mudanças (304, sem corpo).
+
+Uso:
+    python -m benchmarks.documents_history --docs 20000 --limit 50 --json
+"""
+import argparse
+import asyncio
+import json
+import time
+from datetime import datetime, timedelta
+
+from benchmarks._env import percentile, prepare_environment, sqlite_session_factory
+
+BASE = datetime(2026, 1, 1)
+
+
+def build_app(session_factory):
+    from typing import List
+
+    from fastapi import Depends, FastAPI
+
+    from app.api.endpoints import get_current_client_token, router
+    from app.api.schemas import DocumentSchema
+    from app.core.db import get_db
+    from app.core.models import Document
+
+    app = FastAPI()
+    app.include_router(router, prefix="/api/v1")
+
+    @app.get("/legacy/documents", response_model=List[DocumentSchema])
+    async def legacy_history(tenant_id: str = Depends(get_current_client_token), db=Depends(get_db)):
+        # Reproduz o handler antigo: todas as linhas do tenant, sem paginação nem ETag.
+        return db.query(Document).filter(Document.client_id == tenant_id).all()
+
+    def override_get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_current_client_token] = lambda: "history-bench"
+    return app
+
+
+def seed(session_factory, docs: int, other_docs: int, tenants: int = 4) -> None:
+    """Datas explícitas (um upload por minuto), processados logo após o upload."""
+    from sqlalchemy import insert
+
+    from app.core.models import Document, DocumentStatus
+
+    rows = []
+    for i in range(docs + other_docs):
+        uploaded = BASE + timedelta(minutes=i)
+        rows.append({
+            "client_id": "history-bench" if i < docs else f"other-{i % tenants}",
+            "filename": f"manual-{i}.pdf",
+            "file_path": f"data/manual-{i}.pdf",
+            "status": DocumentStatus.COMPLETED,
+            "uploaded_at": uploaded,
+            "updated_at": uploaded + timedelta(seconds=30),
+        })
+    db = session_factory()
+    for start in range(0, len(rows), 5000):
+        db.execute(insert(Document), rows[start:start + 5000])
+    db.commit()
+    db.close()
+
+
+def change_statuses(session_factory, docs: int, changed: int) -> None:
+    from sqlalchemy import update
+
+    from app.core.models import Document, DocumentStatus
+
+    changed_at = BASE + timedelta(minutes=docs + 60)
+    db = session_factory()
+    db.execute(
+        update(Document)
+        .where(Document.client_id == "history-bench", Document.id <= changed)
+        .values(status=DocumentStatus.FAILED, updated_at=changed_at)
+    )
+    db.commit()
+    db.close()
+
+
+async def measure(client, repeat: int, path: str, params=None, headers=None) -> dict:
+    latencies, size, status = [], 0, None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = await client.get(path, params=params, headers=headers)
+        latencies.append(time.perf_counter() - started)
+        size, status = len(response.content), response.status_code
+    return {
+        "status": status,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "bytes": size,
+    }
+
+
+async def run(app, session_factory, args) -> list:
+    import httpx
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        results = [{"scenario": "full", **await measure(client, args.repeat, "/legacy/documents")}]
+        results.append({"scenario": "page", **await measure(client, args.repeat, "/api/v1/documents", {"limit": args.limit})})
+
+        cursor = None
+        for _ in range(args.deep_page - 1):
+            response = await client.get("/api/v1/documents", params={"limit": args.limit, "cursor": cursor} if cursor else {"limit": args.limit})
+            cursor = response.headers.get("x-next-cursor")
+        params = {"limit": args.limit, "cursor": cursor} if cursor else {"limit": args.limit}
+        results.append({"scenario": "deep_page", **await measure(client, args.repeat, "/api/v1/documents", params)})
+
+        # O dashboard guardou X-Changes-Cursor/ETag no último ciclo; depois disso, alguns documentos mudam.
+        first = await client.get("/api/v1/documents", params={"limit": args.limit})
+        since = first.headers["x-changes-cursor"]
+        change_statuses(session_factory, args.docs, args.changed)
+        results.append({"scenario": "since", **await measure(client, args.repeat, "/api/v1/documents", {"since": since})})
+
+        polled = await client.get("/api/v1/documents", params={"since": since})
+        results.append({
+            "scenario": "not_modified",
+            **await measure(
+                client, args.repeat, "/api/v1/documents",
+                {"since": polled.headers["x-changes-cursor"]}, {"If-None-Match": polled.headers["etag"]},
+            ),
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=20000, help="documentos do tenant medido")
+    parser.add_argument("--other-docs", type=int, default=20000, help="documentos dos demais tenants")
+    parser.add_argument("--limit", type=int, default=50, help="tamanho da página")
+    parser.add_argument("--deep-page", type=int, default=20, help="página medida no cenário deep_page")
+    parser.add_argument("--changed", type=int, default=5, help="documentos que mudam antes do polling")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    prepare_environment()
+    session_factory = sqlite_session_factory()
+    seed(session_factory, args.docs, args.other_docs)
+    app = build_app(session_factory)
+    results = [{"docs": args.docs, **row} for row in asyncio.run(run(app, session_factory, args))]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for r in results:
+            print(f"{r['scenario']:<12} {r['status']} p50={r['p50_ms']}ms p95={r['p95_ms']}ms {r['bytes']} bytes")
+
+
+if __name__ == "__main__":
+    main()
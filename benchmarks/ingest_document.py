@@ -0,0 +1,70 @@
+"""
+Benchmark de ponta a ponta do `RAGService.ingest_document` (sem rede).
+
+Ingere um PDF sintético pelo pipeline real (leitura página a página, divisão,
+embeddings em lotes, gravação no Chroma e no índice BM25) com embeddings falsos
+de latência configurável, e mede chunks/s e páginas/s da primeira ingestão e
+de uma reingestão do mesmo arquivo (incremental: nenhum chunk é embedado de novo).
+
+Uso:
+    python -m benchmarks.ingest_document --pages 100 --latency 0.05 --latency-per-text 0.001 --json
+"""
+import argparse
+import json
+import os
+import time
+
+from benchmarks._env import prepare_environment
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.05, help="latência fixa por chamada de embeddings (s)")
+    parser.add_argument("--latency-per-text", type=float, default=0.001, help="latência por chunk (s)")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    workdir = prepare_environment()
+
+    from app.core.config import settings
+    from app.services.fake_backends import FakeEmbeddings
+    from app.services.rag_service import RAGService
+    from benchmarks.pdf_fixtures import make_pdf
+
+    settings.EMBEDDING_CACHE_ENABLED = False
+    service = RAGService(settings)
+    embeddings = service.embeddings = FakeEmbeddings(latency=args.latency, latency_per_text=args.latency_per_text)
+
+    pdf_path = make_pdf(os.path.join(workdir, "ingest.pdf"), args.pages)
+    client_id = "ingest-bench"
+    results = []
+    for run in ("first", "reingest"):
+        calls_before = embeddings.calls
+        started = time.perf_counter()
+        if not service.ingest_document(pdf_path, client_id, doc_id=1):
+            raise SystemExit("Falha na ingestão do benchmark.")
+        elapsed = time.perf_counter() - started
+        chunks = len(service.document_chunk_ids(client_id, 1))
+        result = {
+            "run": run,
+            "pages": args.pages,
+            "chunks": chunks,
+            "seconds": round(elapsed, 3),
+            "chunks_per_s": round(chunks / elapsed, 1),
+            "pages_per_s": round(args.pages / elapsed, 1),
+            "embedding_calls": embeddings.calls - calls_before,
+        }
+        results.append(result)
+        if not args.json:
+            print(
+                f"{run:<9} {result['chunks_per_s']:>9} chunks/s  {result['pages_per_s']:>7} págs/s  "
+                f"({result['seconds']}s, {chunks} chunks, {result['embedding_calls']} chamadas de embeddings)"
+            )
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
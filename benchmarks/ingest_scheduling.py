@@ -0,0 +1,161 @@
+"""
+Simulação do escalonamento das ingestões com um "vizinho barulhento" (sem rede,
+sem Celery: eventos discretos com relógio simulado).
+
+Um tenant envia `--noisy-docs` PDFs de uma vez (parte deles grandes) e
+`--tenants` tenants pequenos enviam poucos PDFs pequenos ao longo do tempo.
+Compara:
+  - fifo: uma fila só, todos os workers consumindo na ordem de chegada (o
+    comportamento com a fila padrão do Celery);
+  - fair: o FairIngestScheduler real (store local), com filas pequena/grande e
+    round-robin entre tenants.
+
+Mede a espera (envio -> início da ingestão) de cada grupo. No modo fair, a
+espera dos tenants pequenos é limitada por ~(tenants / workers + 1) ingestões
+pequenas, independentemente do tamanho do backlog do vizinho (o limite é
+mostrado junto; a verificação fica em tests/test_ingest_scheduler.py).
+
+Uso:
+    python -m benchmarks.ingest_scheduling --noisy-docs 200 --tenants 10 --json
+"""
+import argparse
+import heapq
+import itertools
+import json
+import math
+import random
+
+from benchmarks._env import percentile
+
+
+def build_workload(args):
+    """Lista de (instante, tenant, doc_id, bytes, duração) ordenada pelo instante de envio."""
+    rng = random.Random(args.seed)
+    jobs, doc_ids = [], itertools.count(1)
+    for _ in range(args.noisy_docs):
+        large = rng.random() < args.noisy_large_fraction
+        duration = args.large_seconds if large else args.small_seconds
+        jobs.append((0.0, "noisy", next(doc_ids), (20 if large else 1) * 1024 * 1024, duration * rng.uniform(0.8, 1.2)))
+    for tenant in range(args.tenants):
+        for _ in range(rng.randint(1, 3)):
+            jobs.append((rng.uniform(0, args.horizon), f"small-{tenant}", next(doc_ids), 512 * 1024,
+                         args.small_seconds * rng.uniform(0.8, 1.2)))
+    return sorted(jobs)
+
+
+def simulate(mode: str, workload, args):
+    """Roda a simulação e retorna {doc_id: (tenant, espera em s)}."""
+    from app.services.ingest_scheduler import (
+        LARGE_QUEUE, SMALL_QUEUE, FairIngestScheduler, FifoIngestScheduler, LocalIngestQueueStore,
+    )
+
+    now = [0.0]
+    events, sequence = [], itertools.count()
+    info = {doc_id: (tenant, size, duration, at) for at, tenant, doc_id, size, duration in workload}
+    waits = {}
+
+    if mode == "fifo":
+        workers = {"all": args.small_workers + args.large_workers}
+        route = lambda queue: "all"  # noqa: E731
+    else:
+        workers = {SMALL_QUEUE: args.small_workers, LARGE_QUEUE: args.large_workers}
+        route = lambda queue: queue  # noqa: E731
+    broker = {queue: [] for queue in workers}
+    busy = {queue: 0 for queue in workers}
+
+    def send(queue, jobs):
+        broker[route(queue)].extend(jobs)
+
+    if mode == "fifo":
+        scheduler = FifoIngestScheduler(send, clock=lambda: now[0])
+    else:
+        scheduler = FairIngestScheduler(
+            LocalIngestQueueStore(), send, window=dict(workers),
+            max_running_per_tenant=args.max_running, rate_limit_per_minute=args.rate_limit,
+            clock=lambda: now[0],
+        )
+
+    def start_workers():
+        for queue, jobs in broker.items():
+            while jobs and busy[queue] < workers[queue]:
+                job = jobs.pop(0)
+                tenant, _, duration, submitted = info[job["doc_id"]]
+                waits[job["doc_id"]] = (tenant, now[0] - submitted)
+                busy[queue] += 1
+                heapq.heappush(events, (now[0] + duration, next(sequence), "done", (queue, tenant, job["doc_id"])))
+
+    def wake_up(retry_after):
+        if retry_after is not None:
+            heapq.heappush(events, (now[0] + retry_after, next(sequence), "dispatch", None))
+
+    for at, tenant, doc_id, size, _ in workload:
+        heapq.heappush(events, (at, next(sequence), "submit", (tenant, doc_id, size)))
+    while events:
+        now[0], _, kind, data = heapq.heappop(events)
+        if kind == "submit":
+            wake_up(scheduler.submit(*data)[1])
+        elif kind == "done":
+            queue, tenant, doc_id = data
+            busy[queue] -= 1
+            wake_up(scheduler.release(tenant, doc_id))
+        else:
+            wake_up(scheduler.dispatch())
+        start_workers()
+    return waits
+
+
+def summarize(mode: str, waits) -> list:
+    groups = {"noisy": [], "small_tenants": []}
+    for tenant, wait in waits.values():
+        groups["noisy" if tenant == "noisy" else "small_tenants"].append(wait)
+    return [
+        {
+            "mode": mode,
+            "group": group,
+            "jobs": len(values),
+            "wait_p50_s": round(percentile(values, 50), 1),
+            "wait_p95_s": round(percentile(values, 95), 1),
+            "wait_max_s": round(max(values), 1),
+        }
+        for group, values in groups.items() if values
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--noisy-docs", type=int, default=200)
+    parser.add_argument("--noisy-large-fraction", type=float, default=0.3)
+    parser.add_argument("--tenants", type=int, default=10, help="tenants pequenos")
+    parser.add_argument("--horizon", type=float, default=600, help="janela (s) em que os tenants pequenos enviam")
+    parser.add_argument("--small-seconds", type=float, default=20, help="duração de uma ingestão pequena")
+    parser.add_argument("--large-seconds", type=float, default=180, help="duração de uma ingestão grande")
+    parser.add_argument("--small-workers", type=int, default=4)
+    parser.add_argument("--large-workers", type=int, default=2)
+    parser.add_argument("--max-running", type=int, default=2, help="INGEST_TENANT_MAX_RUNNING")
+    parser.add_argument("--rate-limit", type=int, default=0, help="INGEST_TENANT_RATE_LIMIT_PER_MINUTE")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    workload = build_workload(args)
+    results = []
+    for mode in ("fifo", "fair"):
+        results += summarize(mode, simulate(mode, workload, args))
+
+    # Tenant pequeno entra no fim do anel: espera no máximo uma volta (um job de cada
+    # tenant à frente, `small_workers` por vez) mais o término de uma ingestão em andamento.
+    bound = (math.ceil((args.tenants + 1) / args.small_workers) + 1) * args.small_seconds * 1.2
+
+    if args.json:
+        print(json.dumps({"results": results, "small_wait_bound_s": round(bound, 1)}, indent=2))
+    else:
+        for r in results:
+            print(
+                f"{r['mode']:<5} {r['group']:<14} {r['jobs']:>4} jobs  espera p50={r['wait_p50_s']}s "
+                f"p95={r['wait_p95_s']}s max={r['wait_max_s']}s"
+            )
+        print(f"limite de espera dos tenants pequenos (fair): {bound:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
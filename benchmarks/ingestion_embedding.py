@@ -0,0 +1,104 @@
+"""
+Benchmark da etapa de embeddings da ingestão, com embeddings falsos (sem rede).
+
+Compara o caminho antigo (todos os chunks em uma única chamada de embeddings)
+com o EmbeddingPipeline em várias combinações de tamanho de lote e concorrência,
+medindo chunks/s até a gravação na collection Chroma.
+
+Uso:
+    python -m benchmarks.ingestion_embedding --chunks 5000 --latency 0.1 --latency-per-text 0.002
+"""
+import argparse
+import json
+import time
+import uuid
+
+from benchmarks._env import prepare_environment
+
+
+def synthetic_docs(count: int):
+    from langchain_core.documents import Document
+
+    base = "Seção {i}. O equipamento modelo X-{i} deve ser inspecionado a cada {i} horas de uso. "
+    return [
+        Document(page_content=(base.format(i=i) * 10)[:900], metadata={"page": i // 4, "client_id": "bench"})
+        for i in range(count)
+    ]
+
+
+def run_single_call(embeddings, collection, docs):
+    """Reproduz o comportamento antigo: uma chamada com todos os textos e um único add."""
+    texts = [d.page_content for d in docs]
+    vectors = embeddings.embed_documents(texts)
+    ids = [str(uuid.uuid4()) for _ in docs]
+    max_batch = collection._client.get_max_batch_size()
+    for start in range(0, len(ids), max_batch):
+        end = start + max_batch
+        collection.upsert(
+            ids=ids[start:end], embeddings=vectors[start:end],
+            documents=texts[start:end], metadatas=[d.metadata for d in docs[start:end]],
+        )
+    return len(ids)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=5000)
+    parser.add_argument("--latency", type=float, default=0.1, help="latência fixa por chamada (s)")
+    parser.add_argument("--latency-per-text", type=float, default=0.002, help="latência por chunk (s)")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="probabilidade de falha por chamada")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[64, 128, 256])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    prepare_environment()
+
+    import chromadb
+
+    from app.services.embedding_pipeline import EmbeddingPipeline
+    from app.services.fake_backends import FakeEmbeddings
+
+    client = chromadb.PersistentClient(path="chroma_db")
+    docs = synthetic_docs(args.chunks)
+    results = []
+
+    def record(name, elapsed, written, calls):
+        result = {
+            "strategy": name,
+            "chunks": written,
+            "seconds": round(elapsed, 3),
+            "chunks_per_s": round(written / elapsed, 1),
+            "embedding_calls": calls,
+        }
+        results.append(result)
+        if not args.json:
+            print(f"{name:<28} {result['chunks_per_s']:>10} chunks/s  ({result['seconds']}s, {calls} chamadas)")
+
+    if not args.failure_rate:
+        embeddings = FakeEmbeddings(latency=args.latency, latency_per_text=args.latency_per_text)
+        collection = client.get_or_create_collection("bench-single", embedding_function=None)
+        started = time.perf_counter()
+        written = run_single_call(embeddings, collection, docs)
+        record("single_call", time.perf_counter() - started, written, embeddings.calls)
+
+    for batch_size in args.batch_sizes:
+        for concurrency in args.concurrency:
+            embeddings = FakeEmbeddings(
+                latency=args.latency, latency_per_text=args.latency_per_text, failure_rate=args.failure_rate,
+            )
+            pipeline = EmbeddingPipeline(
+                embeddings, batch_size=batch_size, max_batch_tokens=10 ** 9,
+                max_concurrency=concurrency, backoff_base=0.05,
+            )
+            collection = client.get_or_create_collection(f"bench-b{batch_size}-c{concurrency}", embedding_function=None)
+            started = time.perf_counter()
+            written = pipeline.embed_and_store(collection, docs)
+            record(f"pipeline b={batch_size} c={concurrency}", time.perf_counter() - started, written, embeddings.calls)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
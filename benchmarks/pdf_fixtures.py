@@ -0,0 +1,88 @@
+"""Geração de PDFs sintéticos (texto puro, fonte Helvetica) para os benchmarks de ingestão."""
+import random
+
+_WORDS = (
+    "manual equipamento manutenção garantia contrato cláusula prazo cliente produto "
+    "instalação segurança procedimento código modelo tensão potência suporte técnico "
+    "revisão tabela seção anexo especificação parâmetro operação limpeza peça reposição"
+).split()
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _page_lines(page: int, lines_per_page: int, rng: random.Random):
+    yield f"Capitulo {page // 10 + 1} - Secao {page + 1}"
+    for line in range(lines_per_page - 1):
+        words = " ".join(rng.choice(_WORDS) for _ in range(rng.randint(8, 14)))
+        yield f"{page + 1}.{line + 1} {words}. Codigo X-{page:04d}-{line:02d}."
+
+
+def _structured_page_lines(page: int, lines_per_page: int, rng: random.Random):
+    """Página com títulos, parágrafos, uma lista e uma tabela (linhas de tabela/lista com código único)."""
+    def words(low: int, high: int) -> str:
+        return " ".join(rng.choice(_WORDS) for _ in range(rng.randint(low, high)))
+
+    yield f"Capitulo {page // 10 + 1} - Secao {page + 1}"
+    yield f"{page + 1}.1 Procedimento de {rng.choice(_WORDS)}"
+    for line in range(6):
+        yield f"{words(10, 14)} {words(2, 4)}. Ref P-{page:04d}-{line:02d}."
+    yield "Itens verificados na revisao:"
+    for item in range(5):
+        yield f"- {words(6, 10)} item L-{page:04d}-{item:02d}"
+    yield f"Tabela {page + 1} - Especificacoes dos modelos"
+    yield "Modelo Tensao Potencia Corrente"
+    for row in range(20):
+        yield f"T-{page:04d}-{row:02d} {rng.choice((127, 220, 380))}V {rng.randint(5, 60) * 100}W {rng.randint(10, 300) / 10:.1f}A"
+    yield f"{page + 1}.2 Observacoes de {rng.choice(_WORDS)}"
+    for line in range(6, max(7, lines_per_page - 25)):
+        yield f"{words(10, 14)}. Ref P-{page:04d}-{line:02d}."
+
+
+def make_pdf(path: str, pages: int, lines_per_page: int = 45, seed: int = 42, structured: bool = False) -> str:
+    """
+    Escreve um PDF válido com `pages` páginas de texto extraível e retorna o caminho.
+    Com `structured`, as páginas têm títulos, listas e tabelas (`_structured_page_lines`).
+    """
+    rng = random.Random(seed)
+    page_lines = _structured_page_lines if structured else _page_lines
+    objects = []  # conteúdo (bytes) de cada objeto, na ordem dos números 1..N
+
+    def add(body: bytes) -> int:
+        objects.append(body)
+        return len(objects)
+
+    catalog = add(b"")  # preenchido depois (precisa do número de Pages)
+    pages_obj = add(b"")
+    font = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+
+    page_ids = []
+    for page in range(pages):
+        text_ops = ["BT", "/F1 9 Tf", "11 TL", "40 800 Td"]
+        for line in page_lines(page, lines_per_page, rng):
+            text_ops.append(f"({_escape(line)}) Tj T*")
+        text_ops.append("ET")
+        stream = "\n".join(text_ops).encode("latin-1", errors="replace")
+        content = add(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        page_ids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>" % (pages_obj, font, content)
+        ))
+
+    kids = b" ".join(b"%d 0 R" % pid for pid in page_ids)
+    objects[pages_obj - 1] = b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % len(page_ids)
+    objects[catalog - 1] = b"<< /Type /Catalog /Pages %d 0 R >>" % pages_obj
+
+    with open(path, "wb") as f:
+        f.write(b"%PDF-1.4\n")
+        offsets = []
+        for number, body in enumerate(objects, start=1):
+            offsets.append(f.tell())
+            f.write(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+        xref = f.tell()
+        f.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+        for offset in offsets:
+            f.write(b"%010d 00000 n \n" % offset)
+        f.write(b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, catalog, xref))
+    return path
@@ -0,0 +1,100 @@
+"""
+Benchmark da leitura + divisão de PDFs grandes (sem embeddings).
+
+Gera PDFs sintéticos com centenas de páginas e compara, cada modo em um processo
+separado para medir o pico de RSS isoladamente:
+  - load_all: comportamento antigo (PyPDFLoader.load() + split de tudo de uma vez);
+  - stream:   StreamingPDFLoader página a página;
+  - parallel: StreamingPDFLoader com N processos extraindo faixas de páginas.
+
+Uso:
+    python -m benchmarks.pdf_parsing --pages 200 500 --workers 4
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+from benchmarks._env import prepare_environment
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss é em KB no Linux (bytes no macOS)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def run_mode(mode: str, path: str, workers: int, memory_limit_mb: int) -> dict:
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    from app.services.pdf_loader import StreamingPDFLoader, iter_chunk_batches
+
+    splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=150, separators=["\n\n", "\n", ".", " ", ""])
+    started = time.perf_counter()
+
+    if mode == "load_all":
+        from langchain_community.document_loaders import PyPDFLoader
+
+        data = PyPDFLoader(path).load()
+        pages, chunks = len(data), len(splitter.split_documents(data))
+    else:
+        loader = StreamingPDFLoader(path, workers=workers if mode == "parallel" else 1, memory_limit_mb=memory_limit_mb)
+        chunks = sum(len(batch) for batch in iter_chunk_batches(loader, splitter))
+        pages = loader.pages_loaded
+
+    elapsed = time.perf_counter() - started
+    return {
+        "mode": mode if mode != "parallel" else f"parallel-{workers}",
+        "pages": pages,
+        "chunks": chunks,
+        "seconds": round(elapsed, 3),
+        "pages_per_s": round(pages / elapsed, 1),
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, nargs="+", default=[200, 500])
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--memory-limit-mb", type=int, default=0)
+    parser.add_argument("--json", action="store_true")
+    parser.add_argument("--run-one", nargs=2, metavar=("MODE", "PDF"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_one:
+        mode, path = args.run_one
+        print(json.dumps(run_mode(mode, path, args.workers, args.memory_limit_mb)))
+        return
+
+    repo_root = os.getcwd()
+    workdir = prepare_environment()
+
+    from benchmarks.pdf_fixtures import make_pdf
+
+    results = []
+    for pages in args.pages:
+        path = make_pdf(os.path.join(workdir, f"synthetic-{pages}.pdf"), pages)
+        for mode in ("load_all", "stream", "parallel"):
+            output = subprocess.run(
+                [sys.executable, "-W", "ignore", "-m", "benchmarks.pdf_parsing", "--run-one", mode, path,
+                 "--workers", str(args.workers), "--memory-limit-mb", str(args.memory_limit_mb)],
+                cwd=repo_root, capture_output=True, text=True, check=True,
+            )
+            result = json.loads(output.stdout.strip().splitlines()[-1])
+            results.append(result)
+            if not args.json:
+                print(
+                    f"{pages:>5} págs  {result['mode']:<12} {result['pages_per_s']:>8} págs/s  "
+                    f"{result['seconds']:>7}s  pico RSS {result['peak_rss_mb']} MB  ({result['chunks']} chunks)"
+                )
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
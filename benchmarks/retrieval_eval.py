@@ -0,0 +1,158 @@
+"""
+Avaliação offline da busca (sem rede): recall@k e latência por modo de retrieval.
+
+Ingere um PDF sintético (benchmarks.pdf_fixtures) pelo pipeline real de ingestão,
+com embeddings falsos lexicais (que, como modelos reais, representam mal códigos
+e números de cláusula), e roda três tipos de pergunta com resposta conhecida:
+  - code:     "Qual o procedimento do código X-0012-03?"
+  - clause:   "O que diz o item 13.4?"
+  - semantic: o texto da linha, sem números nem códigos.
+
+Um acerto é um chunk do top-k que contém a linha de referência. Também mede o
+contexto montado para o prompt (ContextBuilder, orçamento CONTEXT_MAX_TOKENS) a
+partir dos candidatos: tokens médios e se a linha de referência chegou ao prompt,
+comparados à concatenação simples dos 3 primeiros chunks (comportamento antigo).
+
+Uso:
+    python -m benchmarks.retrieval_eval --pages 60 --queries 100 --k 1 3 5 --json
+"""
+import argparse
+import json
+import os
+import random
+import re
+import time
+
+from benchmarks._env import percentile, prepare_environment
+
+MODES = {
+    "vector": {"mode": "vector", "rerank": "none"},
+    "keyword": {"mode": "keyword", "rerank": "none"},
+    "hybrid": {"mode": "hybrid", "rerank": "none"},
+    "hybrid+mmr": {"mode": "hybrid", "rerank": "mmr"},
+}
+
+
+def build_queries(pages: int, count: int, seed: int = 7):
+    """Gera (tipo, pergunta, linha de referência) a partir do mesmo gerador do PDF."""
+    from benchmarks.pdf_fixtures import _page_lines
+
+    rng = random.Random(42)
+    lines = [line for page in range(pages) for line in list(_page_lines(page, 45, rng))[1:]]
+    pick = random.Random(seed)
+    queries = []
+    for index in range(count):
+        line = pick.choice(lines)
+        code = re.search(r"X-\d{4}-\d{2}", line).group(0)
+        clause = line.split(" ", 1)[0]
+        kind = ("code", "clause", "semantic")[index % 3]
+        if kind == "code":
+            question = f"Qual o procedimento do código {code}?"
+        elif kind == "clause":
+            question = f"O que diz o item {clause}?"
+        else:
+            question = " ".join(w for w in re.findall(r"[^\W\d_]+", line) if w not in ("Codigo", "X"))
+        queries.append((kind, question, f"{clause} "))
+    return queries
+
+
+def is_hit(text: str, reference: str) -> bool:
+    # A linha de referência começa no início do texto ou após uma quebra de linha.
+    return text.startswith(reference) or f"\n{reference}" in text
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=60)
+    parser.add_argument("--queries", type=int, default=150)
+    parser.add_argument("--k", type=int, nargs="+", default=[1, 3, 5])
+    parser.add_argument("--fetch-k", type=int, default=20)
+    parser.add_argument("--candidates", type=int, default=None, help="chunks candidatos ao contexto (padrão: RETRIEVAL_K)")
+    parser.add_argument("--modes", nargs="+", default=list(MODES), choices=list(MODES))
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    workdir = prepare_environment()
+
+    from app.core.config import settings
+    from app.services.fake_backends import LexicalFakeEmbeddings
+    from app.services.rag_service import RAGService
+    from app.services.retrieval import HybridRetriever
+    from app.services.tokenizer import count_tokens
+    from benchmarks.pdf_fixtures import make_pdf
+
+    settings.EMBEDDING_CACHE_ENABLED = False
+    service = RAGService(settings)
+    embeddings = service.embeddings = LexicalFakeEmbeddings()
+
+    client_id = "retrieval-eval"
+    pdf_path = make_pdf(os.path.join(workdir, "corpus.pdf"), args.pages)
+    if not service.ingest_document(pdf_path, client_id, doc_id=1):
+        raise SystemExit("Falha na ingestão do corpus de avaliação.")
+
+    queries = build_queries(args.pages, args.queries)
+    max_k = max(args.k)
+    candidates = args.candidates or settings.RETRIEVAL_K
+    results = []
+    for name in args.modes:
+        retriever = HybridRetriever(
+            service.vector_stores, service.keyword_index, embeddings,
+            k=max(max_k, candidates), fetch_k=args.fetch_k, rrf_k=settings.RETRIEVAL_RRF_K, **MODES[name],
+        )
+        hits = {k: {} for k in args.k}
+        latencies = []
+        context = {"packed_tokens": [], "packed_hits": [], "top3_tokens": [], "top3_hits": []}
+        for kind, question, reference in queries:
+            started = time.perf_counter()
+            docs = retriever.retrieve(question, client_id)
+            latencies.append((time.perf_counter() - started) * 1000)
+            for k in args.k:
+                found = any(is_hit(doc.page_content, reference) for doc in docs[:k])
+                hits[k].setdefault(kind, []).append(found)
+
+            packed, stats = service.context_builder.build(question, docs[:candidates])
+            top3 = "\n\n".join(doc.page_content for doc in docs[:3])
+            context["packed_tokens"].append(stats["tokens"])
+            context["packed_hits"].append(is_hit(packed, reference))
+            context["top3_tokens"].append(count_tokens(top3))
+            context["top3_hits"].append(is_hit(top3, reference))
+
+        result = {
+            "mode": name,
+            "queries": len(queries),
+            "recall": {
+                f"@{k}": {
+                    "all": round(sum(sum(v) for v in by_kind.values()) / len(queries), 3),
+                    **{kind: round(sum(v) / len(v), 3) for kind, v in by_kind.items()},
+                }
+                for k, by_kind in hits.items()
+            },
+            "latency_ms": {
+                "p50": round(percentile(latencies, 50), 2),
+                "p95": round(percentile(latencies, 95), 2),
+            },
+            "context": {
+                name: round(sum(values) / len(values), 3 if name.endswith("hits") else 1)
+                for name, values in context.items()
+            },
+        }
+        results.append(result)
+        if not args.json:
+            recall = "  ".join(f"recall{k}={v['all']:.3f}" for k, v in result["recall"].items())
+            by_kind = ", ".join(
+                f"{kind} {value:.2f}" for kind, value in result["recall"][f"@{max_k}"].items() if kind != "all"
+            )
+            ctx = result["context"]
+            print(
+                f"{name:<11} {recall}  ({by_kind} @{max_k})  "
+                f"p50={result['latency_ms']['p50']}ms p95={result['latency_ms']['p95']}ms\n"
+                f"{'':<11} contexto: {ctx['packed_tokens']} tokens, recall {ctx['packed_hits']:.3f}  "
+                f"(top-3 fixo: {ctx['top3_tokens']} tokens, recall {ctx['top3_hits']:.3f})"
+            )
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
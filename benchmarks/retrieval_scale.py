@@ -0,0 +1,118 @@
+"""
+Latência da busca conforme a collection do tenant cresce (sem rede).
+
+Insere chunks sintéticos em lotes, com vetores determinísticos gerados direto
+(sem chamar embeddings), na collection Chroma e no índice BM25 de um tenant, e
+a cada tamanho alvo mede a latência do HybridRetriever em cada modo. Os tamanhos
+são cumulativos: `--sizes 10000 100000 1000000` insere 1M chunks no total (leva
+tempo e alguns GB de disco; os padrões rodam em poucos minutos num notebook).
+
+Uso:
+    python -m benchmarks.retrieval_scale --sizes 10000 100000 --queries 50 --json
+"""
+import argparse
+import json
+import random
+import time
+
+from benchmarks._env import percentile, prepare_environment
+
+WORDS = (
+    "contrato cláusula prazo pagamento garantia manutenção equipamento inspeção relatório "
+    "segurança procedimento fornecedor entrega multa rescisão auditoria treinamento suporte "
+    "licença atualização backup servidor rede acesso senha usuário cadastro fatura reembolso"
+).split()
+
+
+def synthetic_chunk(index: int, rng: random.Random) -> str:
+    words = " ".join(rng.choice(WORDS) for _ in range(60))
+    return f"{index % 97}.{index % 13} Código X-{index:07d}-{index % 100:02d} {words}"
+
+
+def insert_chunks(collection, keyword_index, client_id: str, start: int, end: int, dim: int, batch_size: int) -> float:
+    """Insere os chunks [start, end) e retorna os segundos gastos."""
+    import numpy as np
+
+    rng = random.Random(start)
+    vectors_rng = np.random.default_rng(start)
+    started = time.perf_counter()
+    for batch_start in range(start, end, batch_size):
+        batch_end = min(end, batch_start + batch_size)
+        ids = [f"bench:{i}" for i in range(batch_start, batch_end)]
+        texts = [synthetic_chunk(i, rng) for i in range(batch_start, batch_end)]
+        metadatas = [{"client_id": client_id, "source_file": "bench.pdf", "page": i // 4} for i in range(batch_start, batch_end)]
+        vectors = vectors_rng.standard_normal((len(ids), dim), dtype=np.float32)
+        collection.add(ids=ids, embeddings=vectors, documents=texts, metadatas=metadatas)
+        keyword_index.upsert(client_id, ids, texts, metadatas)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 50000, 100000])
+    parser.add_argument("--queries", type=int, default=50, help="consultas medidas por tamanho e modo")
+    parser.add_argument("--dim", type=int, default=256, help="dimensão dos vetores")
+    parser.add_argument("--batch-size", type=int, default=2000, help="chunks por insert")
+    parser.add_argument("--modes", nargs="+", default=["vector", "keyword", "hybrid"], choices=["vector", "keyword", "hybrid"])
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    prepare_environment()
+
+    from app.core.config import settings
+    from app.services.fake_backends import FakeEmbeddings
+    from app.services.keyword_index import KeywordIndex
+    from app.services.retrieval import HybridRetriever
+    from app.services.vector_store_cache import VectorStoreCache
+
+    embeddings = FakeEmbeddings(size=args.dim)
+    vector_stores = VectorStoreCache(chroma_path="chroma_db", embeddings=embeddings)
+    keyword_index = KeywordIndex("chroma_db/keyword_index.sqlite3")
+    client_id = "retrieval-scale"
+    collection = vector_stores.get_collection(client_id)
+    max_batch = collection._client.get_max_batch_size()
+    batch_size = min(args.batch_size, max_batch)
+
+    rng = random.Random(3)
+    queries = []
+    for index in range(args.queries):
+        kind = index % 2
+        queries.append(f"Qual o procedimento do código X-{rng.randrange(args.sizes[0]):07d}?" if kind else
+                       " ".join(rng.choice(WORDS) for _ in range(6)))
+
+    results, inserted = [], 0
+    for size in sorted(args.sizes):
+        insert_s = insert_chunks(collection, keyword_index, client_id, inserted, size, args.dim, batch_size)
+        inserted_now, inserted = size - inserted, size
+        for mode in args.modes:
+            retriever = HybridRetriever(
+                vector_stores, keyword_index, embeddings, mode=mode,
+                k=settings.RETRIEVAL_K, fetch_k=settings.RETRIEVAL_FETCH_K, rrf_k=settings.RETRIEVAL_RRF_K,
+            )
+            retriever.retrieve(queries[0], client_id)  # aquece caches do Chroma/SQLite
+            latencies = []
+            for query in queries:
+                started = time.perf_counter()
+                retriever.retrieve(query, client_id)
+                latencies.append((time.perf_counter() - started) * 1000)
+            result = {
+                "chunks": size,
+                "mode": mode,
+                "insert_chunks_per_s": round(inserted_now / insert_s, 1) if insert_s else None,
+                "p50_ms": round(percentile(latencies, 50), 2),
+                "p95_ms": round(percentile(latencies, 95), 2),
+                "p99_ms": round(percentile(latencies, 99), 2),
+            }
+            results.append(result)
+            if not args.json:
+                print(
+                    f"{size:>9} chunks  {mode:<8} p50={result['p50_ms']}ms p95={result['p95_ms']}ms "
+                    f"p99={result['p99_ms']}ms  (inserção {result['insert_chunks_per_s']} chunks/s)"
+                )
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
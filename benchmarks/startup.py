@@ -0,0 +1,122 @@
+"""
+Tempo de inicialização da API e do worker (sem rede).
+
+Cada medida roda em um processo Python novo (import frio):
+  - import: `python -X importtime` do módulo de entrada da API (app.main) e do
+    worker (app.core.celery_app + app.services.rag_service), com os pacotes que
+    mais pesam no import;
+  - primeira consulta: do início do processo até a primeira resposta de
+    `query_rag_service` (backends falsos), com e sem SERVICE_WARMUP, e o tempo
+    de criação de cada componente do RAGService.
+
+Uso:
+    python -m benchmarks.startup --repeat 3 --json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+from benchmarks._env import prepare_environment
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TARGETS = {
+    "api": "import app.main",
+    "worker": "import app.core.celery_app, app.services.rag_service",
+}
+
+# Roda no processo filho: mede do início do interpretador até a 1ª consulta respondida.
+FIRST_QUERY = """
+import json, time
+started = time.perf_counter()
+from app.core.config import settings
+from app.services.rag_service import rag_service_instance as service
+imported = time.perf_counter()
+if settings.SERVICE_WARMUP:
+    service.warm_up()
+ready = time.perf_counter()
+service.query_rag_service("Qual o prazo de garantia do equipamento?", "startup-bench")
+answered = time.perf_counter()
+service.query_rag_service("Qual o procedimento de manutenção?", "startup-bench")
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "warm_up_ms": (ready - imported) * 1000,
+    "first_query_ms": (answered - ready) * 1000,
+    "second_query_ms": (time.perf_counter() - answered) * 1000,
+    "components_ms": service.startup_timings,
+}))
+"""
+
+
+def _run(code: str, extra_env=None, importtime: bool = False, cwd=None) -> subprocess.CompletedProcess:
+    env = {**os.environ, "PYTHONPATH": REPO_ROOT, **(extra_env or {})}
+    command = [sys.executable, "-W", "ignore", *(["-X", "importtime"] if importtime else []), "-c", code]
+    return subprocess.run(command, capture_output=True, text=True, check=True, env=env, cwd=cwd)
+
+
+def measure_import(code: str, top: int):
+    """(ms de import do alvo, [(pacote, ms de import próprio)] dos `top` mais pesados)."""
+    total_us, by_package = 0, defaultdict(int)
+    # Na raiz do repositório: app.main monta client-website/ pelo caminho relativo.
+    for line in _run(code, importtime=True, cwd=REPO_ROOT).stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        by_package[name.strip().split(".")[0]] += int(self_us)
+        if name.startswith(" app.") or name.strip() == "app":
+            total_us = max(total_us, int(cumulative_us))
+    heaviest = sorted(by_package.items(), key=lambda item: item[1], reverse=True)[:top]
+    return round(total_us / 1000, 1), [{"package": name, "ms": round(us / 1000, 1)} for name, us in heaviest]
+
+
+def measure_first_query(warmup: bool) -> dict:
+    output = _run(FIRST_QUERY, {"SERVICE_WARMUP": str(warmup).lower()}).stdout.splitlines()
+    return json.loads(output[-1])
+
+
+def _median(values):
+    ordered = sorted(values)
+    return round(ordered[len(ordered) // 2], 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3, help="processos por medida (usa a mediana)")
+    parser.add_argument("--top", type=int, default=5, help="pacotes mais pesados listados por alvo")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    prepare_environment()
+
+    results = []
+    for target, code in TARGETS.items():
+        runs = [measure_import(code, args.top) for _ in range(args.repeat)]
+        result = {"scenario": f"import_{target}", "import_ms": _median([ms for ms, _ in runs]), "heaviest": runs[-1][1]}
+        results.append(result)
+        if not args.json:
+            heaviest = ", ".join(f"{item['package']} {item['ms']}ms" for item in result["heaviest"])
+            print(f"import {target:<7} {result['import_ms']:>8}ms  ({heaviest})")
+
+    for warmup in (False, True):
+        runs = [measure_first_query(warmup) for _ in range(args.repeat)]
+        result = {"scenario": "first_query_warmup" if warmup else "first_query_lazy"}
+        for key in ("import_ms", "warm_up_ms", "first_query_ms", "second_query_ms"):
+            result[key] = _median([run[key] for run in runs])
+        result["components_ms"] = {name: _median([run["components_ms"].get(name, 0) for run in runs]) for name in runs[-1]["components_ms"]}
+        results.append(result)
+        if not args.json:
+            components = ", ".join(f"{name} {ms}ms" for name, ms in result["components_ms"].items())
+            print(
+                f"{result['scenario']:<19} import={result['import_ms']}ms warm_up={result['warm_up_ms']}ms "
+                f"1ª consulta={result['first_query_ms']}ms 2ª={result['second_query_ms']}ms  ({components})"
+            )
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""
+Suíte de benchmarks offline: roda cada benchmark de `benchmarks/` em um processo
+separado (com `--json`) e grava um único JSON com os resultados e os metadados
+da execução (commit, Python, CPU), para comparar entre versões.
+
+Perfis:
+  - quick: poucos minutos num notebook (padrão);
+  - full:  cargas maiores, incluindo a busca com até 1M de chunks.
+
+Uso:
+    python -m benchmarks.suite --output bench-v1.json
+    python -m benchmarks.suite --profile full --only chat ingest_document --output bench-v2.json
+    python -m benchmarks.suite --compare bench-v1.json bench-v2.json --threshold 10
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+SCHEMA_VERSION = 1
+
+PROFILES = {
+    "quick": {
+        "chat": ["chat_concurrency", "--levels", "50", "200", "--skip-blocking", "--llm-latency", "0.2"],
+        "ingest_document": ["ingest_document", "--pages", "60"],
+        "ingestion_embedding": ["ingestion_embedding", "--chunks", "2000", "--batch-sizes", "128", "--concurrency", "1", "4"],
+        "pdf_parsing": ["pdf_parsing", "--pages", "100", "--workers", "2"],
+        "retrieval_eval": ["retrieval_eval", "--pages", "30", "--queries", "60"],
+        "retrieval_scale": ["retrieval_scale", "--sizes", "10000", "--queries", "30"],
+        "auth": ["auth_endpoints", "--requests", "100", "--concurrency", "10"],
+        "startup": ["startup", "--repeat", "3"],
+        "ingest_scheduling": ["ingest_scheduling"],
+        "vector_backends": ["vector_backends", "--chunks", "20000", "--queries", "200"],
+        "chat_admission": ["chat_admission"],
+        "conversation_tokens": ["conversation_tokens", "--turns", "20"],
+        "chat_coalescing": ["chat_coalescing", "--users", "200"],
+        "documents_history": ["documents_history", "--docs", "5000", "--other-docs", "5000"],
+        "chunking_strategies": ["chunking_strategies", "--pages", "30", "--queries", "60"],
+    },
+    "full": {
+        "chat": ["chat_concurrency", "--levels", "50", "200", "1000", "--llm-latency", "0.2"],
+        "ingest_document": ["ingest_document", "--pages", "500"],
+        "ingestion_embedding": ["ingestion_embedding", "--chunks", "5000"],
+        "pdf_parsing": ["pdf_parsing", "--pages", "200", "500"],
+        "retrieval_eval": ["retrieval_eval", "--pages", "60", "--queries", "150"],
+        "retrieval_scale": ["retrieval_scale", "--sizes", "10000", "100000", "1000000", "--queries", "100"],
+        "auth": ["auth_endpoints", "--requests", "500", "--concurrency", "20"],
+        "startup": ["startup", "--repeat", "5"],
+        "ingest_scheduling": ["ingest_scheduling", "--noisy-docs", "1000", "--tenants", "50", "--horizon", "3600"],
+        "vector_backends": ["vector_backends", "--chunks", "200000", "--queries", "500"],
+        "chat_admission": ["chat_admission", "--noisy", "2000", "--quiet", "50"],
+        "conversation_tokens": ["conversation_tokens", "--turns", "50"],
+        "chat_coalescing": ["chat_coalescing", "--users", "1000", "--distinct", "8", "--spread", "2"],
+        "documents_history": ["documents_history", "--docs", "50000", "--other-docs", "50000"],
+        "chunking_strategies": ["chunking_strategies", "--pages", "200", "--queries", "300"],
+    },
+}
+
+# Campos que identificam uma linha de resultado (e não são métricas)
+KEY_FIELDS = {"chunks", "concurrency", "pages", "queries", "requests", "k", "docs"}
+HIGHER_IS_BETTER = ("per_s", "recall", "hits", "@")
+LOWER_IS_BETTER = ("_ms", "_s", "seconds", "rss_mb", "tokens", "calls", "bytes")
+
+
+def _git(*args: str) -> str:
+    try:
+        return subprocess.run(["git", *args], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def run_benchmark(argv):
+    """Roda `python -m benchmarks.<nome> ... --json` e devolve o JSON impresso ao final."""
+    output = subprocess.run(
+        [sys.executable, "-W", "ignore", "-m", f"benchmarks.{argv[0]}", *argv[1:], "--json"],
+        capture_output=True, text=True, check=True,
+    )
+    # Os serviços imprimem logs no stdout antes do resultado: o JSON começa na última linha "[" ou "{".
+    lines = output.stdout.splitlines()
+    start = max(i for i, line in enumerate(lines) if line in ("[", "{"))
+    return json.loads("\n".join(lines[start:]))
+
+
+def _row_label(row: dict) -> str:
+    keys = [f"{k}={v}" for k, v in row.items() if isinstance(v, str) or (k in KEY_FIELDS and isinstance(v, int))]
+    return "[" + ",".join(keys) + "]"
+
+
+def flatten(value, prefix: str = ""):
+    """Métricas numéricas por caminho (ex: "chat[path=/api/v1/chat,concurrency=50].p95_ms")."""
+    metrics = {}
+    if isinstance(value, dict):
+        for key, item in value.items():
+            if key in KEY_FIELDS and isinstance(item, int):
+                continue
+            metrics.update(flatten(item, f"{prefix}.{key}" if prefix else key))
+    elif isinstance(value, list):
+        for index, item in enumerate(value):
+            label = _row_label(item) if isinstance(item, dict) else f"[{index}]"
+            metrics.update(flatten(item, prefix + label))
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        metrics[prefix] = value
+    return metrics
+
+
+def _direction(path: str) -> int:
+    """+1 se maior é melhor, -1 se menor é melhor, 0 se indiferente."""
+    leaf = path.rsplit(".", 1)[-1]
+    if any(marker in leaf for marker in HIGHER_IS_BETTER):
+        return 1
+    if any(leaf.endswith(marker) or marker in leaf for marker in LOWER_IS_BETTER):
+        return -1
+    return 0
+
+
+def compare(old_path: str, new_path: str, threshold: float) -> int:
+    """Imprime as variações entre duas execuções; retorna o número de regressões acima de `threshold`%."""
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    print(f"{old['meta'].get('commit', '?')[:10]} -> {new['meta'].get('commit', '?')[:10]}")
+
+    regressions = 0
+    for name in sorted(set(old["benchmarks"]) & set(new["benchmarks"])):
+        before = flatten(old["benchmarks"][name]["results"], name)
+        after = flatten(new["benchmarks"][name]["results"], name)
+        for path in sorted(set(before) & set(after)):
+            direction = _direction(path)
+            if not direction or not before[path]:
+                continue
+            change = (after[path] - before[path]) / abs(before[path]) * 100
+            regressed = change * direction < -threshold
+            improved = change * direction > threshold
+            regressions += regressed
+            if regressed or improved:
+                flag = "REGRESSÃO" if regressed else "melhora"
+                print(f"  {flag:<9} {path}: {before[path]} -> {after[path]} ({change:+.1f}%)")
+        for path in sorted(set(before) ^ set(after)):
+            print(f"  {'só em ' + ('antiga' if path in before else 'nova'):<9} {path}")
+    print(f"{regressions} regressões acima de {threshold}%")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profile", default="quick", choices=list(PROFILES))
+    parser.add_argument("--only", nargs="+", help="benchmarks a rodar (padrão: todos do perfil)")
+    parser.add_argument("--output", help="arquivo JSON de saída (padrão: stdout)")
+    parser.add_argument("--compare", nargs=2, metavar=("ANTIGO", "NOVO"), help="compara dois JSONs da suíte")
+    parser.add_argument("--threshold", type=float, default=10.0, help="variação (%%) considerada regressão")
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(1 if compare(*args.compare, args.threshold) else 0)
+
+    benchmarks = PROFILES[args.profile]
+    unknown = set(args.only or []) - set(benchmarks)
+    if unknown:
+        parser.error(f"benchmarks desconhecidos: {', '.join(sorted(unknown))} (use {', '.join(benchmarks)})")
+
+    report = {
+        "schema": SCHEMA_VERSION,
+        "meta": {
+            "commit": _git("rev-parse", "HEAD"),
+            "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+            "started_at": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            "profile": args.profile,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "benchmarks": {},
+    }
+    for name, argv in benchmarks.items():
+        if args.only and name not in args.only:
+            continue
+        print(f"Rodando {name}: python -m benchmarks.{' '.join(argv)}", file=sys.stderr)
+        started = time.perf_counter()
+        try:
+            results = run_benchmark(argv)
+        except subprocess.CalledProcessError as e:
+            print(f"Falha em {name}:\n{e.stderr[-2000:]}", file=sys.stderr)
+            report["benchmarks"][name] = {"argv": argv, "error": (e.stderr or "")[-2000:]}
+            continue
+        report["benchmarks"][name] = {"argv": argv, "seconds": round(time.perf_counter() - started, 1), "results": results}
+
+    payload = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(payload + "\n")
+        print(f"Resultados gravados em {args.output}", file=sys.stderr)
+    else:
+        print(payload)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Comparação dos backends de vetores (VECTOR_STORE_PROVIDER) com dados sintéticos.
+
+Insere `--chunks` vetores normalizados (agrupados em clusters, como embeddings
+de documentos de um mesmo tenant) pela API de collection de cada backend e mede:
+  - insert_per_s: chunks gravados por segundo (upsert em lotes + persist);
+  - query_p50_ms / query_p95_ms: latência de `query` com k vizinhos;
+  - recall@k: fração dos k vizinhos exatos (força bruta em numpy) devolvida.
+
+Chroma e HNSW em processo rodam sempre (HNSW só se o hnswlib estiver
+instalado); pgvector só com `--pg-url` apontando para um PostgreSQL com a
+extensão vector (a tabela `vector_chunks` do banco é usada, com um tenant próprio).
+
+Uso:
+    python -m benchmarks.vector_backends --chunks 20000 --queries 200 --json
+    python -m benchmarks.vector_backends --backends pgvector --pg-url postgresql://u:p@localhost/rag
+"""
+import argparse
+import json
+import time
+import uuid
+
+from benchmarks._env import percentile, prepare_environment
+
+
+def synthetic_vectors(n: int, dim: int, clusters: int, seed: int):
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim), dtype=np.float32)
+    vectors = centers[rng.integers(0, clusters, n)] + 0.6 * rng.standard_normal((n, dim), dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def exact_neighbors(vectors, queries, k: int):
+    import numpy as np
+
+    similarity = queries @ vectors.T
+    return np.argsort(-similarity, axis=1)[:, :k]
+
+
+def build_backend(name: str, args):
+    if name == "chroma":
+        from app.services.vector_store_cache import VectorStoreCache
+
+        return VectorStoreCache(chroma_path="chroma_db", embeddings=None)
+    if name == "hnsw":
+        from app.services.hnsw_store import HnswVectorStore
+
+        return HnswVectorStore("hnsw_index", m=args.m, ef_construction=args.ef_construction, ef_search=args.ef_search)
+    from app.core.db import make_engine
+    from app.services.pgvector_store import PgVectorStore
+
+    return PgVectorStore(
+        make_engine("pgvector", 2, 0, url=args.pg_url), dimensions=args.dim, index=args.pg_index,
+        m=args.m, ef_construction=args.ef_construction, ef_search=args.ef_search,
+    )
+
+
+def run_backend(name: str, vectors, queries, truth, args) -> dict:
+    backend = build_backend(name, args)
+    client_id = f"bench-{uuid.uuid4().hex[:8]}"
+    collection = backend.get_collection(client_id)
+    ids = [f"chunk-{i}" for i in range(len(vectors))]
+
+    started = time.perf_counter()
+    for start in range(0, len(vectors), args.batch_size):
+        end = start + args.batch_size
+        collection.upsert(
+            ids=ids[start:end],
+            embeddings=vectors[start:end].tolist(),
+            documents=[f"trecho {i}" for i in range(start, min(end, len(vectors)))],
+            metadatas=[{"doc_id": i % 50} for i in range(start, min(end, len(vectors)))],
+        )
+    backend.persist(client_id)
+    insert_seconds = time.perf_counter() - started
+
+    position = {chunk_id: index for index, chunk_id in enumerate(ids)}
+    latencies, hits = [], 0
+    for query, expected in zip(queries, truth):
+        started = time.perf_counter()
+        result = collection.query(query_embeddings=[query.tolist()], n_results=args.k, include=[])
+        latencies.append(time.perf_counter() - started)
+        hits += len({position[chunk_id] for chunk_id in result["ids"][0]} & set(expected.tolist()))
+    backend.delete_collection(client_id)
+
+    return {
+        "backend": name,
+        "chunks": len(vectors),
+        "k": args.k,
+        "insert_per_s": round(len(vectors) / insert_seconds, 1),
+        "query_p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "query_p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        f"recall@{args.k}": round(hits / (len(queries) * args.k), 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=["chroma", "hnsw", "pgvector"], choices=["chroma", "hnsw", "pgvector"])
+    parser.add_argument("--chunks", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--clusters", type=int, default=50)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--m", type=int, default=16, help="HNSW_M")
+    parser.add_argument("--ef-construction", type=int, default=200, help="HNSW_EF_CONSTRUCTION")
+    parser.add_argument("--ef-search", type=int, default=64, help="HNSW_EF_SEARCH")
+    parser.add_argument("--pg-url", help="PostgreSQL com pgvector (sem ele, pgvector é ignorado)")
+    parser.add_argument("--pg-index", default="hnsw", choices=["hnsw", "ivfflat", "none"])
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    prepare_environment()
+    # Consultas dos mesmos clusters dos chunks (e fora da collection).
+    vectors = synthetic_vectors(args.chunks + args.queries, args.dim, args.clusters, args.seed)
+    vectors, queries = vectors[:args.chunks], vectors[args.chunks:]
+    truth = exact_neighbors(vectors, queries, args.k)
+
+    results = []
+    for name in args.backends:
+        if name == "pgvector" and not args.pg_url:
+            continue
+        if name == "hnsw":
+            try:
+                import hnswlib  # noqa: F401
+            except ImportError:
+                print("hnswlib não instalado: backend hnsw ignorado")
+                continue
+        results.append(run_backend(name, vectors, queries, truth, args))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        recall = f"recall@{args.k}"
+        for r in results:
+            print(
+                f"{r['backend']:<9} {r['chunks']:>8} chunks  insert={r['insert_per_s']}/s  "
+                f"query p50={r['query_p50_ms']}ms p95={r['query_p95_ms']}ms  {recall}={r[recall]}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -8,6 +8,14 @@ const historySection = document.getElementById('history-list');
 
 let pollingInterval = null; 
 const POLLING_RATE_MS = 8000; 
+const EVENTS_URL = `${API_BASE}/documents/events`;
+const RECONNECT_DELAY_MS = 5000;
+const pendingDocIds = new Set(); // documentos em processamento (usados no fallback por polling)
+let progressStreamOpen = false;
+const HISTORY_PAGE_SIZE = 50;
+let historyNextCursor = null; // X-Next-Cursor da última página carregada
+let changesCursor = null;     // X-Changes-Cursor: o polling pede só o que mudou depois dele
+let changesEtag = null;       // ETag da última resposta do polling (If-None-Match -> 304)
 
 
 if (!ACCESS_TOKEN || !CLIENT_TOKEN) {
@@ -17,6 +25,7 @@ if (!ACCESS_TOKEN || !CLIENT_TOKEN) {
 document.addEventListener('DOMContentLoaded', () => {
     iframeDisplay.textContent = generateIframeCode(CLIENT_TOKEN);
     fetchHistory(); 
+    startProgressStream();
 });
 
 
@@ -64,14 +73,82 @@ function showStatus(message, type) {
 }
 
 
-function startStatusPolling(docId) {
-    if (pollingInterval) {
-        clearInterval(pollingInterval);
+async function readEventStream(response, onEvent) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const rawEvent = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+
+            let eventName = 'message';
+            let data = '';
+            rawEvent.split('\n').forEach(line => {
+                if (line.startsWith('event:')) eventName = line.slice(6).trim();
+                else if (line.startsWith('data:')) data += line.slice(5).trim();
+            });
+            if (data) onEvent(eventName, JSON.parse(data)); // comentários (keepalive) não têm data
+        }
     }
+}
 
-    pollingInterval = setInterval(() => {
-        checkDocumentStatus(docId);
-    }, POLLING_RATE_MS);
+// Progresso das ingestões via SSE (push do worker). Se a conexão cair, volta ao
+// polling dos documentos pendentes até conseguir reconectar.
+async function startProgressStream() {
+    try {
+        const response = await fetch(EVENTS_URL, {
+            headers: { 'Authorization': `Bearer ${ACCESS_TOKEN}` }
+        });
+        if (response.status === 401) return;
+        if (!response.ok || !response.body) {
+            throw new Error(`Erro ${response.status} ao abrir o stream de progresso.`);
+        }
+
+        progressStreamOpen = true;
+        stopStatusPolling();
+        await readEventStream(response, (eventName, data) => {
+            if (eventName === 'progress') handleProgressEvent(data);
+        });
+    } catch (error) {
+        console.warn("Stream de progresso indisponível:", error);
+    }
+
+    progressStreamOpen = false;
+    if (pendingDocIds.size > 0) startStatusPolling();
+    setTimeout(startProgressStream, RECONNECT_DELAY_MS);
+}
+
+function handleProgressEvent(data) {
+    const statusLower = (data.status || '').toLowerCase();
+    if (statusLower === 'concluído' || statusLower === 'falhou') {
+        pendingDocIds.delete(data.doc_id);
+        fetchHistory();
+        return;
+    }
+
+    const statusSpan = historySection.querySelector(`li[data-doc-id="${data.doc_id}"] .status`);
+    if (!statusSpan) return;
+
+    const percent = Math.round((data.progress || 0) * 100);
+    const pages = data.total_pages ? ` · ${data.pages_parsed}/${data.total_pages} págs` : '';
+    const eta = data.eta_seconds != null ? ` · ~${Math.ceil(data.eta_seconds)}s` : '';
+    statusSpan.textContent = `PROCESSANDO ${percent}%${pages}${eta}`;
+}
+
+function startStatusPolling(docId) {
+    if (docId !== undefined) pendingDocIds.add(docId);
+    // Com o stream de progresso aberto, o status chega por push.
+    if (progressStreamOpen || pollingInterval) return;
+
+    // Uma requisição por ciclo para todos os pendentes (e não uma lista completa por documento).
+    pollingInterval = setInterval(checkDocumentStatus, POLLING_RATE_MS);
 }
 
 function stopStatusPolling() {
@@ -81,34 +158,35 @@ function stopStatusPolling() {
     }
 }
 
-async function checkDocumentStatus(docId) {
+async function checkDocumentStatus() {
     try {
-        const response = await fetch(`${API_BASE}/documents`, {
-            method: 'GET',
-            headers: { 'Authorization': `Bearer ${ACCESS_TOKEN}` }
-        });
+        const headers = { 'Authorization': `Bearer ${ACCESS_TOKEN}` };
+        if (changesEtag) headers['If-None-Match'] = changesEtag;
+        const query = changesCursor ? `?since=${encodeURIComponent(changesCursor)}` : `?limit=${HISTORY_PAGE_SIZE}`;
+        const response = await fetch(`${API_BASE}/documents${query}`, { method: 'GET', headers });
 
+        // 304: nada mudou desde o último ciclo (sem corpo).
+        if (response.status === 304) return;
         if (!response.ok) {
             stopStatusPolling();
             throw new Error(`Erro ${response.status} ao buscar status.`);
         }
-        
-        const documents = await response.json();
-        const targetDoc = documents.find(doc => doc.id === docId);
 
-        if (targetDoc) {
-            const statusLower = targetDoc.status.toLowerCase();
+        changesEtag = response.headers.get('ETag');
+        changesCursor = response.headers.get('X-Changes-Cursor') || changesCursor;
+        const changed = await response.json();
 
-            if (statusLower === 'concluído' || statusLower === 'falhou') {
-                stopStatusPolling();
-                fetchHistory();
-                return;
+        let finished = false;
+        changed.forEach(doc => {
+            const statusLower = doc.status.toLowerCase();
+            if (pendingDocIds.has(doc.id) && (statusLower === 'concluído' || statusLower === 'falhou')) {
+                pendingDocIds.delete(doc.id);
+                finished = true;
             }
-        } else {
-            // Se o documento não for encontrado após um tempo, pode ter sido um erro de registro inicial
-            console.warn("Documento não encontrado na lista de status. Continuando polling.");
-            // Não paramos o polling aqui para o caso de a lista demorar a ser populada
-        }
+        });
+
+        if (pendingDocIds.size === 0) stopStatusPolling();
+        if (finished) fetchHistory();
 
     } catch (error) {
         console.error("Erro no polling:", error);
@@ -154,7 +232,7 @@ document.getElementById("upload-form").addEventListener("submit", async (e) => {
         showStatus(`Sucesso! Processamento iniciado. Status será monitorado.`, "success");
         fileInput.value = ""; 
         
-        // Inicia o Polling usando o ID do documento.
+        // Acompanha o documento: por push (stream de progresso) ou, sem ele, por polling.
         // É essencial que o backend retorne o doc_id aqui.
         if (result.doc_id) { 
             startStatusPolling(result.doc_id); 
@@ -183,11 +261,58 @@ document.getElementById("upload-form").addEventListener("submit", async (e) => {
 });
 
 
-async function fetchHistory() {
-    historySection.innerHTML = '<p class="loading-state">Carregando histórico...</p>';
+function renderHistoryItem(doc) {
+    const statusUpper = doc.status.toUpperCase();           
+    const date = new Date(doc.uploaded_at).toLocaleDateString('pt-BR');
+    let statusText;
+    let statusClass;
+    
+    if (statusUpper === 'CONCLUÍDO') {
+        statusText = 'CONCLUÍDO';
+        statusClass = 'completed';
+    } else if (statusUpper === 'FALHOU') {
+        statusText = 'FALHOU';
+        statusClass = 'failed';
+    } else {
+        statusText = 'PROCESSANDO...'; 
+        statusClass = 'processing';
+    }
+    
+    const downloadLink = statusUpper === 'CONCLUÍDO' 
+        ? `<a href="${API_BASE}/documents/download/${doc.id}" target="_blank" class="download-link">&nbsp Visualizar</a>` 
+        : '<span>-</span>';
+
+    return `
+        <li class="history-item status-${statusClass}" data-doc-id="${doc.id}">
+            <span class="filename">${doc.filename}</span>
+            <span class="date">${date}</span>
+            <span class="status ${statusClass}">${statusText}</span>
+            <span class="action">${downloadLink}</span>
+        </li>
+    `;
+}
+
+function renderLoadMore() {
+    const existing = document.getElementById('load-more-history');
+    if (existing) existing.remove();
+    if (!historyNextCursor) return;
+
+    const button = document.createElement('button');
+    button.id = 'load-more-history';
+    button.className = 'load-more';
+    button.textContent = 'Carregar mais';
+    button.addEventListener('click', () => fetchHistory(true));
+    historySection.appendChild(button);
+}
+
+// Carrega a primeira página do histórico (ou, com `append`, a página seguinte via X-Next-Cursor).
+async function fetchHistory(append = false) {
+    if (!append) historySection.innerHTML = '<p class="loading-state">Carregando histórico...</p>';
     
     try {
-        const response = await fetch(`${API_BASE}/documents`, {
+        let query = `?limit=${HISTORY_PAGE_SIZE}`;
+        if (append && historyNextCursor) query += `&cursor=${encodeURIComponent(historyNextCursor)}`;
+        const response = await fetch(`${API_BASE}/documents${query}`, {
             method: 'GET',
             headers: { 'Authorization': `Bearer ${ACCESS_TOKEN}` }
         });
@@ -202,7 +327,19 @@ async function fetchHistory() {
         
         const documents = await response.json();
         const docCountDisplay = document.getElementById('doc-count');
-        
+        historyNextCursor = response.headers.get('X-Next-Cursor');
+        if (!append) {
+            changesCursor = response.headers.get('X-Changes-Cursor');
+            changesEtag = null;
+        }
+
+        const listHtml = documents.map(renderHistoryItem).join('');
+        if (append) {
+            historySection.querySelector('.document-list').insertAdjacentHTML('beforeend', listHtml);
+            renderLoadMore();
+            return;
+        }
+
         historySection.innerHTML = ''; 
 
         if (documents.length === 0) {
@@ -211,40 +348,9 @@ async function fetchHistory() {
             return;
         }
         
-        docCountDisplay.textContent = documents.length;
-
-        const listHtml = documents.map(doc => {
-            const statusUpper = doc.status.toUpperCase();           
-            const date = new Date(doc.uploaded_at).toLocaleDateString('pt-BR');
-            let statusText;
-            let statusClass;
-            
-            if (statusUpper === 'CONCLUÍDO') {
-                statusText = 'CONCLUÍDO';
-                statusClass = 'completed';
-            } else if (statusUpper === 'FALHOU') {
-                statusText = 'FALHOU';
-                statusClass = 'failed';
-            } else {
-                statusText = 'PROCESSANDO...'; 
-                statusClass = 'processing';
-            }
-            
-            const downloadLink = statusUpper === 'CONCLUÍDO' 
-                ? `<a href="${API_BASE}/documents/download/${doc.id}" target="_blank" class="download-link">&nbsp Visualizar</a>` 
-                : '<span>-</span>';
-
-            return `
-                <li class="history-item status-${statusClass}">
-                    <span class="filename">${doc.filename}</span>
-                    <span class="date">${date}</span>
-                    <span class="status ${statusClass}">${statusText}</span>
-                    <span class="action">${downloadLink}</span>
-                </li>
-            `;
-        }).join('');
-
+        docCountDisplay.textContent = response.headers.get('X-Total-Count') || documents.length;
         historySection.innerHTML = `<ul class="document-list">${listHtml}</ul>`;
+        renderLoadMore();
 
     } catch (error) {
         console.error('Erro ao buscar histórico:', error);
@@ -0,0 +1,42 @@
+"""
+Ambiente mínimo para importar o app nos testes sem .env (como benchmarks/_env.py):
+providers falsos de LLM/embeddings, caches em memória e diretórios temporários.
+"""
+import os
+import tempfile
+
+import pytest
+
+_TEST_DIR = tempfile.mkdtemp(prefix="rag-tests-")
+
+_DEFAULT_ENV = {
+    "POSTGRES_USER": "test",
+    "POSTGRES_PASSWORD": "test",
+    "POSTGRES_SERVER": "localhost",
+    "POSTGRES_PORT": "5432",
+    "POSTGRES_DB": "test",
+    "SECRET_KEY": "test-secret-key",
+    "OPENAI_API_KEY": "sk-test",
+    "CELERY_REDIS_DSN": "redis://localhost:6379/0",
+    "CELERY_BROKER_URL": "memory://",
+    "CELERY_RESULT_BACKEND": "cache+memory://",
+    "ANSWER_CACHE_BACKEND": "none",
+    "COLLECTION_VERSIONS_BACKEND": "local",
+    "INGEST_SCHEDULER": "local",
+    "LLM_PROVIDER": "fake",
+    "EMBEDDINGS_PROVIDER": "fake",
+    "SERVICE_WARMUP": "false",
+    "CHROMA_PATH": os.path.join(_TEST_DIR, "chroma_db"),
+    "UPLOAD_FOLDER": os.path.join(_TEST_DIR, "data"),
+}
+
+for _key, _value in _DEFAULT_ENV.items():
+    os.environ.setdefault(_key, _value)
+
+
+@pytest.fixture
+def session_factory():
+    """SQLite em memória com as tabelas do app (o mesmo banco dos benchmarks)."""
+    from benchmarks._env import sqlite_session_factory
+
+    return sqlite_session_factory()
@@ -0,0 +1,84 @@
+"""Cache de respostas: casamento exato/semântico e invalidação pela versão da collection."""
+import pytest
+
+from app.services.answer_cache import (
+    AnswerCache, LocalAnswerCacheBackend, RedisAnswerCacheBackend, normalize_query,
+)
+from app.services.collection_versions import CollectionVersions
+
+
+def _fake_redis():
+    fakeredis = pytest.importorskip("fakeredis")
+    return fakeredis.FakeRedis()
+
+
+@pytest.fixture(params=["local", "redis"])
+def backend_factory(request):
+    """Fábrica de backends; no Redis todos compartilham o mesmo servidor (como réplicas da API)."""
+    if request.param == "local":
+        return lambda: LocalAnswerCacheBackend(max_entries_per_tenant=10, ttl_seconds=60)
+    server = _fake_redis()
+    return lambda: RedisAnswerCacheBackend(server, max_entries_per_tenant=10, ttl_seconds=60)
+
+
+def test_normalize_query():
+    assert normalize_query("  Qual   o PRAZO de entrega?? ") == "qual o prazo de entrega"
+    assert normalize_query("Ação!") == normalize_query("acao")
+
+
+def test_exact_match_is_scoped_by_tenant_and_version(backend_factory):
+    cache = AnswerCache(backend_factory())
+    cache.store("t", "Qual o prazo?", "5 dias", None, 0)
+    assert cache.lookup_exact("t", "qual o prazo", 0) == "5 dias"
+    assert cache.lookup_exact("other", "qual o prazo", 0) is None
+    # Versão nova (ingestão): a resposta antiga some, e o escopo antigo é descartado.
+    assert cache.lookup_exact("t", "qual o prazo", 1) is None
+    assert cache.lookup_exact("t", "qual o prazo", 0) is None
+    # Resposta gerada sob uma versão já superada não é gravada.
+    cache.store("t", "Qual o prazo?", "velha", None, 0)
+    assert cache.lookup_exact("t", "qual o prazo", 1) is None
+    # Versão indisponível (Redis fora): sem cache.
+    cache.store("t", "Qual o prazo?", "x", None, None)
+    assert cache.lookup_exact("t", "qual o prazo", None) is None
+    assert cache.stats()["exact_hits"] == 1
+
+
+def test_empty_answers_are_not_stored(backend_factory):
+    cache = AnswerCache(backend_factory())
+    cache.store("t", "pergunta", "  ", None, 0)
+    assert cache.lookup_exact("t", "pergunta", 0) is None
+
+
+def test_semantic_match_above_threshold(backend_factory):
+    cache = AnswerCache(backend_factory(), similarity_threshold=0.9)
+    cache.store("t", "Qual o prazo de entrega?", "5 dias", [1.0, 0.0, 0.0], 0)
+    assert cache.lookup_similar("t", [0.99, 0.05, 0.0], 0) == "5 dias"
+    assert cache.lookup_similar("t", [0.0, 1.0, 0.0], 0) is None
+    # Embedding de outra dimensão (troca de modelo) não casa nem quebra a busca.
+    assert cache.lookup_similar("t", [1.0, 0.0], 0) is None
+    assert cache.stats()["semantic_hits"] == 1
+
+
+def test_worker_invalidation_reaches_other_processes():
+    server = _fake_redis()
+    versions = CollectionVersions(server)
+
+    def api_process():
+        return AnswerCache(RedisAnswerCacheBackend(server, max_entries_per_tenant=10, ttl_seconds=60))
+
+    api_a, api_b = api_process(), api_process()
+    api_a.store("t", "Qual o prazo?", "5 dias", None, versions.get("t"))
+    assert api_b.lookup_exact("t", "qual o prazo", versions.get("t")) == "5 dias"
+
+    # Worker (outro processo) termina uma ingestão: só incrementa a versão compartilhada.
+    CollectionVersions(server).bump("t")
+    assert api_a.lookup_exact("t", "qual o prazo", versions.get("t")) is None
+    assert api_b.lookup_exact("t", "qual o prazo", versions.get("t")) is None
+
+
+def test_local_versions_fallback():
+    versions = CollectionVersions()
+    assert versions.get("t") == 0
+    versions.bump("t")
+    assert versions.get("t") == 1
+    assert versions.get("other") == 0
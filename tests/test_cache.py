@@ -0,0 +1,97 @@
+"""LRUCache: contadores, construção por chave em `get_or_create`, TTL e despejo."""
+import threading
+import time
+
+from app.core.cache import LRUCache
+
+
+def test_get_or_create_counts_one_lookup_per_call():
+    cache = LRUCache(max_entries=4)
+    assert cache.get_or_create("a", lambda: 1) == 1
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["hits"] == 0
+
+    assert cache.get_or_create("a", lambda: 2) == 1
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 1, 0.5)
+
+
+def test_concurrent_callers_build_once_and_count_misses():
+    cache = LRUCache(max_entries=4)
+    started, release = threading.Event(), threading.Event()
+    calls, results = [], []
+
+    def factory():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "value"
+
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_create("k", factory))) for _ in range(4)]
+    threads[0].start()
+    started.wait(5)
+    for thread in threads[1:]:
+        thread.start()
+    # Os demais chegam enquanto o primeiro constrói e ficam no lock da chave.
+    deadline = time.monotonic() + 5
+    while cache.stats()["misses"] < 4 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert results == ["value"] * 4
+    assert len(calls) == 1
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (0, 4)
+
+
+def test_slow_build_does_not_block_other_keys():
+    cache = LRUCache(max_entries=4)
+    cache.put("ready", 1)
+    release = threading.Event()
+
+    def slow():
+        release.wait(5)
+        return 2
+
+    builder = threading.Thread(target=lambda: cache.get_or_create("slow", slow))
+    builder.start()
+    try:
+        time.sleep(0.05)
+        started = time.monotonic()
+        assert cache.get_or_create("ready", lambda: 0) == 1
+        assert cache.get_or_create("other", lambda: 3) == 3
+        assert time.monotonic() - started < 1
+    finally:
+        release.set()
+        builder.join(5)
+    assert cache.get("slow") == 2
+
+
+def test_value_invalidated_during_build_is_not_cached():
+    cache = LRUCache(max_entries=4)
+
+    def factory():
+        cache.invalidate("k")
+        return "stale"
+
+    assert cache.get_or_create("k", factory) == "stale"
+    assert cache.get("k") is None
+    assert cache.get_or_create("k", lambda: "fresh") == "fresh"
+    assert cache.get("k") == "fresh"
+
+
+def test_ttl_and_lru_eviction():
+    cache = LRUCache(max_entries=2, ttl_seconds=60)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert [key for key, _ in cache.items()] == ["a", "c"]
+    assert cache.stats()["evictions"] == 1
+
+    cache.put("short", 4, ttl_seconds=0.01)
+    time.sleep(0.02)
+    assert cache.get("short", "missing") == "missing"
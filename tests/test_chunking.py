@@ -0,0 +1,90 @@
+"""Chunking por estrutura: blocos detectados e empacotamento de tabelas e listas."""
+import pytest
+
+from app.services.chunking import (
+    LIST, PARAGRAPH, TABLE, ChunkingConfig, StructureSplitter, available_splitters, create_splitter,
+    detect_blocks, register_splitter,
+)
+from app.services.tokenizer import count_tokens
+
+TABLE_TEXT = "\n".join(
+    ["Modelo Tensão Potência Preço"]
+    + [f"MX-{n:03d} 220V {n * 10}W R${n},00" for n in range(1, 41)]
+)
+LIST_TEXT = "Itens verificados:\n" + "\n".join(f"- item {n} com uma descrição curta" for n in range(1, 41))
+
+
+def _splitter(chunk_tokens=60, min_tokens=0):
+    return StructureSplitter(ChunkingConfig("structure", chunk_tokens, 0, min_tokens))
+
+
+def test_detect_blocks():
+    text = "1. Introdução\nTexto do manual.\n\n" + TABLE_TEXT + "\n\n" + LIST_TEXT
+    kinds = [kind for kind, _ in detect_blocks(text)]
+    assert kinds == ["heading", PARAGRAPH, TABLE, LIST]
+    blocks = dict(detect_blocks(text)[2:])
+    assert blocks[TABLE][0] == "Modelo Tensão Potência Preço"  # cabeçalho sem números entra na tabela
+    assert blocks[LIST][0] == "Itens verificados:"  # a frase de introdução fica com a lista
+
+
+def test_wrapped_list_items_are_joined():
+    blocks = detect_blocks("- primeiro item que o extrator\nquebrou em duas linhas\n- segundo item")
+    assert blocks == [(LIST, ["- primeiro item que o extrator quebrou em duas linhas", "- segundo item"])]
+
+
+def test_large_table_is_split_by_rows_and_repeats_the_header():
+    chunks = _splitter().split_text(TABLE_TEXT)
+    assert len(chunks) > 1
+    rows = []
+    for chunk in chunks:
+        lines = chunk.splitlines()
+        assert lines[0] == "Modelo Tensão Potência Preço"
+        assert count_tokens(chunk) <= 60
+        rows.extend(lines[1:])
+    # Nenhuma linha cortada, perdida ou repetida.
+    assert rows == TABLE_TEXT.splitlines()[1:]
+
+
+def test_large_list_is_split_between_items():
+    chunks = _splitter().split_text(LIST_TEXT)
+    assert len(chunks) > 1
+    items = [line for chunk in chunks for line in chunk.splitlines()]
+    assert items == LIST_TEXT.splitlines()
+    assert all(count_tokens(chunk) <= 60 for chunk in chunks)
+
+
+def test_table_fills_the_room_left_in_the_current_chunk():
+    text = "Resumo curto da tabela abaixo.\n\n" + TABLE_TEXT
+    chunks = _splitter(chunk_tokens=120).split_text(text)
+    first = chunks[0].split("\n\n")
+    # A primeira parte da tabela divide o chunk com o parágrafo em vez de abrir um chunk novo.
+    assert first[0] == "Resumo curto da tabela abaixo."
+    assert first[1].startswith("Modelo Tensão Potência Preço\nMX-001")
+    assert all(count_tokens(chunk) <= 120 for chunk in chunks)
+
+
+def test_chunks_carry_the_section_title():
+    text = "1. Instalação\n" + LIST_TEXT + "\n\n2. Garantia\nA garantia é de um ano."
+    sections = _splitter().split_text_with_sections(text)
+    assert {section for section, _ in sections} == {"1. Instalação", "2. Garantia"}
+    continued = [chunk for section, chunk in sections if section == "1. Instalação"]
+    assert len(continued) > 1 and all(chunk.startswith("1. Instalação") for chunk in continued)
+
+
+def test_small_sections_are_merged_with_min_tokens():
+    text = "1. Um\nCurto.\n\n2. Dois\nTambém curto.\n\n3. Três\nOutro."
+    assert len(_splitter(min_tokens=0).split_text(text)) == 3
+    assert len(_splitter(min_tokens=20).split_text(text)) == 1
+
+
+def test_registry_and_external_factories():
+    @register_splitter("test-lines")
+    def _lines(config, model):
+        return config
+
+    assert {"characters", "tokens", "structure", "test-lines"} <= set(available_splitters())
+    config = ChunkingConfig("test-lines", 100, 10)
+    assert create_splitter(config) is config
+    assert isinstance(create_splitter(ChunkingConfig("app.services.chunking:StructureSplitter", 100, 10)), StructureSplitter)
+    with pytest.raises(ValueError):
+        create_splitter(ChunkingConfig("inexistente", 100, 10))
@@ -0,0 +1,105 @@
+"""Memória de conversa: histórico limitado, resumo dos turnos antigos e reescrita da pergunta."""
+import pytest
+
+from app.services.conversation import (
+    ConversationMemory, LocalConversationStore, RedisConversationStore, needs_condensing,
+)
+
+
+@pytest.fixture(params=["local", "redis"])
+def store(request):
+    if request.param == "local":
+        return LocalConversationStore(max_sessions=10, ttl_seconds=60)
+    fakeredis = pytest.importorskip("fakeredis")
+    return RedisConversationStore(fakeredis.FakeRedis(), ttl_seconds=60)
+
+
+def _memory(store, **kwargs):
+    return ConversationMemory(store, **{"max_turns": 4, "keep_turns": 2, **kwargs})
+
+
+def _talk(memory, turns, session="s"):
+    needs_summary = []
+    for n in range(1, turns + 1):
+        needs_summary.append(memory.remember("t", session, f"pergunta {n}", f"resposta {n}"))
+    return needs_summary
+
+
+def test_summary_is_requested_only_above_max_turns(store):
+    memory = _memory(store)
+    assert _talk(memory, 5) == [False, False, False, False, True]
+    assert memory.summary_inputs("t", "s") is not None
+    assert _memory(store).summary_inputs("t", "outra") is None
+
+
+def test_apply_summary_folds_old_turns_and_keeps_recent_ones(store):
+    memory = _memory(store)
+    _talk(memory, 5)
+    inputs, last_turn = memory.summary_inputs("t", "s")
+    assert last_turn == 3
+    assert "pergunta 3" in inputs["turns"] and "pergunta 4" not in inputs["turns"]
+    assert inputs["summary"] == "(vazio)"
+
+    # Um turno chega enquanto a LLM resume: ele não pode ser descartado.
+    memory.remember("t", "s", "pergunta 6", "resposta 6")
+    memory.apply_summary("t", "s", "  O usuário perguntou sobre 1 a 3. ", last_turn)
+
+    state = memory.load("t", "s")
+    assert state.summary == "O usuário perguntou sobre 1 a 3."
+    assert [turn["n"] for turn in state.turns] == [4, 5, 6]
+    history = memory.history_text(state)
+    assert history.startswith("Resumo da conversa até aqui: O usuário perguntou sobre 1 a 3.")
+    assert "pergunta 3" not in history and "pergunta 6" in history
+
+    # O resumo seguinte parte do anterior.
+    added = [memory.remember("t", "s", f"pergunta {n}", f"resposta {n}") for n in (7, 8)]
+    assert added == [False, True]
+    inputs, last_turn = memory.summary_inputs("t", "s")
+    assert inputs["summary"] == "O usuário perguntou sobre 1 a 3." and last_turn == 6
+
+
+def test_history_stays_bounded_in_a_long_conversation(store):
+    memory = _memory(store, turn_max_tokens=20, summary_max_tokens=30)
+    long_text = "palavra " * 200
+    sizes = []
+    for n in range(30):
+        if memory.remember("t", "s", long_text, long_text):
+            inputs, last_turn = memory.summary_inputs("t", "s")
+            memory.apply_summary("t", "s", long_text, last_turn)
+        sizes.append(memory.history_tokens(memory.load("t", "s")))
+    assert len(memory.load("t", "s").turns) <= 4
+    # Depois dos primeiros resumos o histórico não cresce mais.
+    assert max(sizes[10:]) <= max(sizes[:10])
+
+
+def test_sessions_are_scoped_by_tenant(store):
+    memory = _memory(store)
+    memory.remember("a", "s", "pergunta", "resposta")
+    assert memory.load("b", "s").turns == []
+    memory.clear("a", "s")
+    assert memory.load("a", "s").turns == []
+
+
+@pytest.mark.parametrize("question, expected", [
+    ("E o prazo disso?", True),
+    ("Mas e o frete para o Sul?", True),
+    ("Quanto custa?", True),  # curta demais para se sustentar sozinha
+    ("Qual o prazo de entrega para o Nordeste?", False),
+])
+def test_needs_condensing(question, expected):
+    assert needs_condensing(question) is expected
+
+
+def test_condense_inputs_and_standalone_question(store):
+    memory = _memory(store)
+    assert memory.condense_inputs("E o prazo disso?", memory.load("t", "s")) is None  # sem histórico
+    memory.remember("t", "s", "Vocês vendem peças?", "Sim.")
+    state = memory.load("t", "s")
+    assert memory.condense_inputs("Qual o prazo de entrega para o Nordeste?", state) is None
+    assert memory.condense_inputs("E o prazo disso?", state)["history"] == "Usuário: Vocês vendem peças?\nAssistente: Sim."
+    always = _memory(store, condense="always")
+    assert always.condense_inputs("Qual o prazo de entrega para o Nordeste?", state) is not None
+    assert ConversationMemory.standalone_question("E o prazo?", ' "Qual o prazo das peças?" ') == "Qual o prazo das peças?"
+    assert ConversationMemory.standalone_question("E o prazo?", "  ") == "E o prazo?"
+    with pytest.raises(ValueError):
+        _memory(store, condense="never")
@@ -0,0 +1,126 @@
+"""GET /documents: paginação por keyset, polling com `since` e ETag/304."""
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import insert, update
+
+from app.api.endpoints import get_current_client_token, router
+from app.core.db import get_db
+from app.core.models import Document, DocumentStatus
+
+BASE = datetime(2026, 1, 1)
+
+
+@pytest.fixture
+def client(session_factory):
+    db = session_factory()
+    rows = []
+    for i in range(25):
+        # Uploads em pares no mesmo instante: o id desempata a ordem do keyset.
+        uploaded = BASE + timedelta(minutes=i // 2)
+        rows.append({
+            "client_id": "tenant" if i < 23 else "other",
+            "filename": f"manual-{i}.pdf",
+            "file_path": f"data/manual-{i}.pdf",
+            "status": DocumentStatus.COMPLETED,
+            "uploaded_at": uploaded,
+            "updated_at": uploaded + timedelta(seconds=30),
+        })
+    db.execute(insert(Document), rows)
+    db.commit()
+    db.close()
+
+    app = FastAPI()
+    app.include_router(router, prefix="/api/v1")
+
+    def override_get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_current_client_token] = lambda: "tenant"
+    with TestClient(app) as test_client:
+        test_client.session_factory = session_factory
+        yield test_client
+
+
+def _pages(client, limit, **params):
+    pages, cursor = [], None
+    while True:
+        response = client.get("/api/v1/documents", params={"limit": limit, **params, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200
+        pages.append([doc["filename"] for doc in response.json()])
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            return pages, response
+
+
+def test_keyset_pages_cover_the_tenant_once_newest_first(client):
+    pages, response = _pages(client, 5)
+    names = [name for page in pages for name in page]
+    assert names == [f"manual-{i}.pdf" for i in range(22, -1, -1)]
+    assert [len(page) for page in pages] == [5, 5, 5, 5, 3]
+    assert response.headers["X-Total-Count"] == "23"
+
+
+def test_new_upload_does_not_shift_the_next_page(client):
+    first = client.get("/api/v1/documents", params={"limit": 5})
+    db = client.session_factory()
+    db.execute(insert(Document), [{
+        "client_id": "tenant", "filename": "novo.pdf", "file_path": "data/novo.pdf",
+        "status": DocumentStatus.PENDING, "uploaded_at": BASE + timedelta(days=1), "updated_at": BASE + timedelta(days=1),
+    }])
+    db.commit()
+    db.close()
+    second = client.get("/api/v1/documents", params={"limit": 5, "cursor": first.headers["X-Next-Cursor"]})
+    assert [doc["filename"] for doc in second.json()] == [f"manual-{i}.pdf" for i in range(17, 12, -1)]
+
+
+def test_invalid_cursor_is_rejected(client):
+    assert client.get("/api/v1/documents", params={"cursor": "não-é-cursor"}).status_code == 400
+
+
+def test_etag_answers_304_until_something_changes(client):
+    first = client.get("/api/v1/documents", params={"limit": 5})
+    etag = first.headers["ETag"]
+    again = client.get("/api/v1/documents", params={"limit": 5}, headers={"If-None-Match": etag})
+    assert again.status_code == 304 and again.content == b""
+    # Outra página tem outro ETag.
+    other_page = client.get("/api/v1/documents", params={"limit": 5, "cursor": first.headers["X-Next-Cursor"]}, headers={"If-None-Match": etag})
+    assert other_page.status_code == 200
+
+    db = client.session_factory()
+    db.execute(update(Document).where(Document.filename == "manual-3.pdf").values(
+        status=DocumentStatus.FAILED, updated_at=BASE + timedelta(days=2)))
+    db.commit()
+    db.close()
+    changed = client.get("/api/v1/documents", params={"limit": 5}, headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.headers["ETag"] != etag
+
+
+def test_since_returns_only_changes_and_keeps_the_etag_across_polls(client):
+    changes_cursor = client.get("/api/v1/documents", params={"limit": 1}).headers["X-Changes-Cursor"]
+    db = client.session_factory()
+    changed_at = BASE + timedelta(days=2)
+    db.execute(update(Document).where(Document.filename.in_(["manual-3.pdf", "manual-7.pdf"])).values(
+        status=DocumentStatus.FAILED, updated_at=changed_at))
+    db.commit()
+    db.close()
+
+    response = client.get("/api/v1/documents", params={"since": changes_cursor, "limit": 10})
+    names = [doc["filename"] for doc in response.json()]
+    # A janela de sobreposição (DOCUMENTS_SINCE_OVERLAP_SECONDS) repete as últimas mudanças já vistas.
+    assert names == ["manual-22.pdf", "manual-3.pdf", "manual-7.pdf"]
+    assert response.headers["X-Changes-Cursor"] == changed_at.isoformat()
+
+    poll = client.get(
+        "/api/v1/documents",
+        params={"since": response.headers["X-Changes-Cursor"], "limit": 10},
+        headers={"If-None-Match": response.headers["ETag"]},
+    )
+    assert poll.status_code == 304
@@ -0,0 +1,54 @@
+"""Cache de embeddings por hash do conteúdo: só textos novos chegam ao backend."""
+from app.services.embedding_cache import CachedEmbeddings, embedding_cache_key
+
+
+class CountingEmbeddings:
+    model = "fake-model"
+
+    def __init__(self):
+        self.calls = []
+
+    def embed_documents(self, texts):
+        self.calls.append(list(texts))
+        return [[float(len(text)), 1.0] for text in texts]
+
+    def embed_query(self, text):
+        return [float(len(text)), 1.0]
+
+
+def test_only_unseen_texts_are_embedded(session_factory):
+    backend = CountingEmbeddings()
+    cached = CachedEmbeddings(backend, session_factory)
+
+    first = cached.embed_documents(["a", "bb", "a"])
+    assert first == [[1.0, 1.0], [2.0, 1.0], [1.0, 1.0]]
+    assert backend.calls == [["a", "bb"]]  # repetido no mesmo lote: embedado uma vez
+
+    # Re-upload do mesmo PDF com um trecho novo: só o trecho novo vai ao backend.
+    assert cached.embed_documents(["bb", "ccc", "a"]) == [[2.0, 1.0], [3.0, 1.0], [1.0, 1.0]]
+    assert backend.calls[-1] == ["ccc"]
+    assert cached.stats() == {"hits": 2, "misses": 3}
+
+
+def test_cache_is_shared_through_the_database_and_keyed_by_model(session_factory):
+    CachedEmbeddings(CountingEmbeddings(), session_factory).embed_documents(["texto"])
+
+    # Outro processo (worker) com o mesmo banco: nenhum embedding novo.
+    other = CountingEmbeddings()
+    CachedEmbeddings(other, session_factory).embed_documents(["texto"])
+    assert other.calls == []
+
+    # Outro modelo: os vetores antigos não servem.
+    new_model = CountingEmbeddings()
+    CachedEmbeddings(new_model, session_factory, model="outro-modelo").embed_documents(["texto"])
+    assert new_model.calls == [["texto"]]
+    assert embedding_cache_key("texto", "fake-model") != embedding_cache_key("texto", "outro-modelo")
+
+
+def test_database_failure_falls_back_to_the_backend():
+    def broken_session():
+        raise RuntimeError("banco fora")
+
+    backend = CountingEmbeddings()
+    assert CachedEmbeddings(backend, broken_session).embed_documents(["a"]) == [[1.0, 1.0]]
+    assert backend.calls == [["a"]]
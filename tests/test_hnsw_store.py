@@ -0,0 +1,81 @@
+"""Backend HNSW: recarga do índice entre processos sem travar as buscas."""
+import threading
+
+import pytest
+
+pytest.importorskip("hnswlib")
+
+from app.services.hnsw_store import HnswCollection  # noqa: E402
+
+DIM = 4
+
+
+def _vector(i):
+    return [1.0 if j == i % DIM else 0.1 for j in range(DIM)]
+
+
+def _upsert(collection, start, count, doc_id=1):
+    ids = [f"c{i}" for i in range(start, start + count)]
+    collection.upsert(
+        ids,
+        [_vector(i) for i in range(start, start + count)],
+        documents=[f"chunk {i}" for i in range(start, start + count)],
+        metadatas=[{"doc_id": doc_id} for _ in ids],
+    )
+
+
+def test_query_get_and_delete(tmp_path):
+    collection = HnswCollection("tenant", str(tmp_path))
+    _upsert(collection, 0, 8, doc_id=1)
+    _upsert(collection, 8, 4, doc_id=2)
+    assert collection.query([_vector(0)], n_results=3)["ids"][0][0] in {"c0", "c4", "c8"}
+    collection.delete(where={"doc_id": 1})
+    assert collection.count() == 4
+    assert set(collection.query([_vector(0)], n_results=10)["ids"][0]) == {"c8", "c9", "c10", "c11"}
+
+
+def test_delete_by_filter_on_an_empty_collection(tmp_path):
+    collection = HnswCollection("tenant", str(tmp_path))
+    collection.delete(where={"doc_id": 1})
+    assert collection.query([_vector(0)], n_results=3)["ids"] == [[]]
+
+
+def test_reader_process_reloads_only_after_persist(tmp_path):
+    worker, api = HnswCollection("tenant", str(tmp_path)), HnswCollection("tenant", str(tmp_path))
+    _upsert(worker, 0, 4)
+    worker.persist()
+    assert len(api.query([_vector(0)], n_results=10)["ids"][0]) == 4
+
+    # Ingestão em andamento no worker: a API segue no índice gravado.
+    _upsert(worker, 4, 4)
+    assert len(api.query([_vector(0)], n_results=10)["ids"][0]) == 4
+    worker.persist()
+    assert len(api.query([_vector(0)], n_results=10)["ids"][0]) == 8
+
+
+def test_reload_does_not_block_concurrent_queries(tmp_path, monkeypatch):
+    worker, api = HnswCollection("tenant", str(tmp_path)), HnswCollection("tenant", str(tmp_path))
+    _upsert(worker, 0, 4)
+    worker.persist()
+    api.query([_vector(0)], n_results=10)
+    _upsert(worker, 4, 4)
+    worker.persist()
+
+    loading, release = threading.Event(), threading.Event()
+    read_index = api._read_index
+
+    def slow_read_index(*args):
+        loading.set()
+        release.wait(5)
+        return read_index(*args)
+
+    monkeypatch.setattr(api, "_read_index", slow_read_index)
+    results = {}
+    reloader = threading.Thread(target=lambda: results.setdefault("reload", api.query([_vector(0)], n_results=10)))
+    reloader.start()
+    assert loading.wait(5)
+    # Enquanto o índice novo é lido, outra busca responde com o índice anterior.
+    assert len(api.query([_vector(0)], n_results=10)["ids"][0]) == 4
+    release.set()
+    reloader.join(5)
+    assert len(results["reload"]["ids"][0]) == 8
@@ -0,0 +1,226 @@
+"""
+Simulação do FairIngestScheduler com o store local e relógio falso: parcela de
+cada tenant, jobs simultâneos por tenant, leases e espera dos tenants pequenos
+atrás de um vizinho barulhento.
+"""
+import heapq
+import itertools
+import math
+import random
+from collections import Counter
+
+import pytest
+
+from app.services.ingest_scheduler import (
+    LARGE_QUEUE, SMALL_QUEUE, FairIngestScheduler, LocalIngestQueueStore,
+)
+
+MB = 1024 * 1024
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_scheduler(clock, window=None, max_running=2, rate_limit=0, lease_seconds=3600, send=None):
+    sent = []
+
+    def default_send(queue, jobs):
+        sent.extend((queue, job) for job in jobs)
+
+    store = LocalIngestQueueStore()
+    scheduler = FairIngestScheduler(
+        store, send or default_send, window=window or {SMALL_QUEUE: 4, LARGE_QUEUE: 2},
+        max_running_per_tenant=max_running, rate_limit_per_minute=rate_limit,
+        large_file_bytes=5 * MB, lease_seconds=lease_seconds, clock=clock,
+    )
+    return scheduler, store, sent
+
+
+def test_round_robin_gives_each_backlogged_tenant_an_equal_share():
+    clock = Clock()
+    scheduler, store, sent = make_scheduler(clock, window={SMALL_QUEUE: 3, LARGE_QUEUE: 1}, max_running=1)
+    doc_ids = itertools.count(1)
+    for tenant in ("a", "b", "c"):
+        scheduler.submit_many(tenant, [(next(doc_ids), MB, None) for _ in range(20)])
+
+    # Libera os jobs na ordem de despacho: cada término abre a vaga do próximo da vez.
+    released = 0
+    while released < len(sent):
+        _, job = sent[released]
+        clock.now += 1
+        scheduler.release(job["tenant"], job["doc_id"])
+        released += 1
+
+    order = [job["tenant"] for _, job in sent]
+    assert len(order) == 60
+    for start in range(0, 60, 15):
+        assert Counter(order[start:start + 15]) == {"a": 5, "b": 5, "c": 5}
+    assert store.running() == 0
+    assert scheduler.stats()[SMALL_QUEUE]["pending"] == 0
+
+
+def test_tenant_in_flight_and_leases_are_bounded():
+    clock = Clock()
+    scheduler, store, sent = make_scheduler(clock, max_running=2)
+    scheduler.submit_many("noisy", [(doc_id, MB, None) for doc_id in range(50)])
+
+    # Janela de 4 na fila pequena, mas só 2 por tenant.
+    assert len(sent) == 2
+    assert store.running(tenant="noisy") == 2
+    assert store.running(queue=SMALL_QUEUE) == 2
+    assert store.pending(SMALL_QUEUE, "noisy") == 48
+
+    scheduler.submit("quiet", 100, MB)
+    assert [job["tenant"] for _, job in sent[2:]] == ["quiet"]
+    assert store.running() == 3
+
+    _, first = sent[0]
+    scheduler.release("noisy", first["doc_id"])
+    assert len(sent) == 4
+    assert store.running(tenant="noisy") == 2
+    # Liberar um lease que não existe (release repetido) não abre vaga.
+    scheduler.release("noisy", first["doc_id"])
+    assert len(sent) == 4
+
+
+def test_expired_lease_returns_the_slot_on_periodic_dispatch():
+    clock = Clock()
+    scheduler, store, sent = make_scheduler(clock, max_running=1, lease_seconds=600)
+    scheduler.submit_many("tenant", [(1, MB, None), (2, MB, None)])
+    assert len(sent) == 1
+
+    # Worker morto: ninguém chama `release`; antes do vencimento a vaga continua presa.
+    clock.now = 599
+    scheduler.dispatch()
+    assert len(sent) == 1
+    clock.now = 600
+    scheduler.dispatch()
+    assert [job["doc_id"] for _, job in sent] == [1, 2]
+    assert store.running(tenant="tenant") == 1
+
+
+def test_large_documents_go_to_their_own_queue():
+    clock = Clock()
+    scheduler, store, sent = make_scheduler(clock, max_running=4)
+    queues, _ = scheduler.submit_many("tenant", [(1, 20 * MB, None), (2, MB, None), (3, 6 * MB, None)])
+    assert queues == [LARGE_QUEUE, SMALL_QUEUE, LARGE_QUEUE]
+    assert sorted((queue, job["doc_id"]) for queue, job in sent) == [(LARGE_QUEUE, 1), (LARGE_QUEUE, 3), (SMALL_QUEUE, 2)]
+    assert store.running(queue=LARGE_QUEUE) == 2
+
+
+def test_rate_limit_asks_for_a_single_wakeup():
+    clock = Clock()
+    scheduler, store, sent = make_scheduler(clock, max_running=10, rate_limit=2)
+    clock.now = 30
+    _, retry_after = scheduler.submit_many("tenant", [(doc_id, MB, None) for doc_id in range(5)])
+    assert len(sent) == 2
+    assert retry_after == pytest.approx(30)
+    # Um wakeup já agendado: o próximo dispatch não agenda outro.
+    assert scheduler.dispatch() is None
+
+    clock.now = 60
+    scheduler.dispatch()
+    assert len(sent) == 4
+
+
+def test_broker_failure_puts_jobs_back():
+    clock = Clock()
+    failing = [True]
+    sent = []
+
+    def send(queue, jobs):
+        if failing[0]:
+            raise ConnectionError("broker fora do ar")
+        sent.extend(jobs)
+
+    scheduler, store, _ = make_scheduler(clock, send=send)
+    with pytest.raises(ConnectionError):
+        scheduler.submit_many("tenant", [(1, MB, None), (2, MB, None)])
+    assert store.running() == 0
+    assert store.pending(SMALL_QUEUE, "tenant") == 2
+
+    failing[0] = False
+    scheduler.dispatch()
+    assert sorted(job["doc_id"] for job in sent) == [1, 2]
+
+
+def test_trace_travels_with_deferred_jobs():
+    clock = Clock()
+    scheduler, store, sent = make_scheduler(clock, max_running=1)
+    upload = {"traceparent": "00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01"}
+    scheduler.submit_many("tenant", [(1, MB, None), (2, MB, None)], trace=upload)
+    scheduler.submit("tenant", 3, MB)
+
+    # O job 2 só sai no `release` do 1, mas leva o trace do seu próprio upload.
+    scheduler.release("tenant", 1)
+    scheduler.release("tenant", 2)
+    traces = {job["doc_id"]: job.get("trace") for _, job in sent}
+    assert traces == {1: upload, 2: upload, 3: None}
+
+
+def simulate_noisy_neighbor(tenants=10, noisy_docs=200, small_workers=4, large_workers=2,
+                            small_seconds=20.0, large_seconds=180.0, horizon=600.0, seed=7):
+    """Eventos discretos: um tenant envia `noisy_docs` de uma vez, os pequenos poucos PDFs ao longo do tempo."""
+    rng = random.Random(seed)
+    clock = Clock()
+    workers = {SMALL_QUEUE: small_workers, LARGE_QUEUE: large_workers}
+    broker = {queue: [] for queue in workers}
+    busy = {queue: 0 for queue in workers}
+    in_flight, max_in_flight = Counter(), Counter()
+    events, sequence = [], itertools.count()
+    info, waits = {}, {}
+    scheduler, store, _ = make_scheduler(
+        clock, window=dict(workers), max_running=2, send=lambda queue, jobs: broker[queue].extend(jobs)
+    )
+
+    doc_ids = itertools.count(1)
+    for _ in range(noisy_docs):
+        large = rng.random() < 0.3
+        info[next(doc_ids)] = ("noisy", 20 * MB if large else MB, (large_seconds if large else small_seconds) * rng.uniform(0.8, 1.2), 0.0)
+    for tenant in range(tenants):
+        for _ in range(rng.randint(1, 3)):
+            info[next(doc_ids)] = (f"small-{tenant}", MB // 2, small_seconds * rng.uniform(0.8, 1.2), rng.uniform(0, horizon))
+    for doc_id, (tenant, size, _, at) in info.items():
+        heapq.heappush(events, (at, next(sequence), "submit", (tenant, doc_id, size)))
+
+    while events:
+        clock.now, _, kind, data = heapq.heappop(events)
+        if kind == "submit":
+            scheduler.submit(*data)
+        else:
+            queue, tenant, doc_id = data
+            busy[queue] -= 1
+            in_flight[tenant] -= 1
+            scheduler.release(tenant, doc_id)
+        for queue, jobs in broker.items():
+            while jobs and busy[queue] < workers[queue]:
+                job = jobs.pop(0)
+                tenant, _, duration, submitted = info[job["doc_id"]]
+                waits[job["doc_id"]] = (tenant, clock.now - submitted)
+                busy[queue] += 1
+                in_flight[tenant] += 1
+                max_in_flight[tenant] = max(max_in_flight[tenant], in_flight[tenant])
+                heapq.heappush(events, (clock.now + duration, next(sequence), "done", (queue, tenant, job["doc_id"])))
+        assert store.running() == sum(busy.values()) + sum(len(jobs) for jobs in broker.values())
+    return waits, max_in_flight, store
+
+
+def test_small_tenants_wait_is_bounded_behind_a_noisy_neighbor():
+    tenants, small_workers, small_seconds = 10, 4, 20.0
+    waits, max_in_flight, store = simulate_noisy_neighbor(
+        tenants=tenants, small_workers=small_workers, small_seconds=small_seconds
+    )
+
+    small = [wait for tenant, wait in waits.values() if tenant != "noisy"]
+    noisy = [wait for tenant, wait in waits.values() if tenant == "noisy"]
+    assert len(noisy) == 200
+    # Tenant pequeno entra no fim do anel: espera no máximo uma volta mais o término de uma ingestão.
+    bound = (math.ceil((tenants + 1) / small_workers) + 1) * small_seconds * 1.2
+    assert max(small) <= bound
+    assert max(max_in_flight.values()) <= 2
+    assert store.running() == 0
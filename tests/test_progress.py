@@ -0,0 +1,55 @@
+"""Progresso da ingestão: publicações limitadas por intervalo, inclusive com etapas alternadas."""
+from app.services.progress import IngestionProgress
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _progress(min_interval=0.5):
+    clock, published = Clock(), []
+    progress = IngestionProgress(1, "tenant", published.append, min_interval=min_interval, clock=clock)
+    return progress, clock, published
+
+
+def test_alternating_stages_are_throttled():
+    progress, clock, published = _progress()
+    progress.update("processing")
+    # Loop da ingestão: parsing/embedding/writing a cada lote, 100 lotes em 1s.
+    for batch in range(100):
+        clock.now = batch * 0.01
+        progress.add("parsing", pages_parsed=1, chunks_split=10)
+        progress.add("embedding", chunks_embedded=10)
+        progress.add("writing", chunks_written=10)
+    assert len(published) == 2  # início e uma publicação após 0,5s
+    assert published[-1]["stage"] == "parsing" and published[-1]["pages_parsed"] == 51
+
+
+def test_terminal_stages_are_published_immediately():
+    progress, clock, published = _progress()
+    progress.update("processing", total_pages=4)
+    progress.add("writing", pages_parsed=4, chunks_split=8, chunks_written=8)
+    progress.update("completed")
+    assert [event["stage"] for event in published] == ["processing", "completed"]
+    assert published[-1]["progress"] == 1.0
+
+
+def test_snapshot_estimates_the_remaining_time():
+    progress, clock, published = _progress(min_interval=0)
+    progress.update("parsing", total_pages=10, pages_parsed=5, chunks_split=10, chunks_written=10)
+    clock.now = 4.0
+    snapshot = progress.snapshot()
+    assert snapshot["progress"] == 0.5 and snapshot["eta_seconds"] == 4.0
+
+
+def test_publish_errors_do_not_break_the_ingestion():
+    def broken(snapshot):
+        raise ConnectionError("redis fora")
+
+    progress = IngestionProgress(1, "tenant", broken)
+    progress.update("processing")
+    progress.update("failed")
@@ -0,0 +1,172 @@
+"""Limites do /chat: token buckets (tudo ou nada), IP do usuário atrás de proxy e vaga do /chat/stream."""
+import asyncio
+
+import pytest
+
+from app.services.rate_limit import (
+    ChatAdmission, ChatLimits, ChatRateLimiter, LocalTokenBucketStore, RateLimitExceeded, RedisTokenBucketStore,
+    parse_networks, resolve_client_ip,
+)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _redis_store():
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")  # scripts Lua no fakeredis
+    return RedisTokenBucketStore(fakeredis.FakeRedis())
+
+
+@pytest.fixture(params=["local", "redis"])
+def store(request):
+    return LocalTokenBucketStore(clock=Clock()) if request.param == "local" else _redis_store()
+
+
+def _attempt(limiter, tenant, ip, limits):
+    try:
+        limiter.check(tenant, ip, limits)
+        return "ok"
+    except RateLimitExceeded as e:
+        return e.scope
+
+
+def test_tenant_rejection_does_not_charge_the_ip_bucket(store):
+    limiter = ChatRateLimiter(store, ChatLimits(60, 2, 60, 3))
+    assert [_attempt(limiter, "t", "1.1.1.1", limiter.defaults) for _ in range(3)] == ["ok", "ok", "tenant"]
+    # A recusa pelo tenant não gastou a 3ª ficha do IP: sem o limite do tenant, sobra exatamente uma.
+    ip_only = ChatRateLimiter(store, ChatLimits(0, 0, 60, 3))
+    assert [_attempt(ip_only, "t", "1.1.1.1", ip_only.defaults) for _ in range(2)] == ["ok", "ip"]
+
+
+def test_ip_rejection_does_not_charge_the_tenant_bucket(store):
+    limiter = ChatRateLimiter(store, ChatLimits(60, 3, 60, 1))
+    limits = limiter.defaults
+    assert _attempt(limiter, "t", "1.1.1.1", limits) == "ok"
+    assert [_attempt(limiter, "t", "1.1.1.1", limits) for _ in range(5)] == ["ip"] * 5
+    # O tenant gastou só 1 das 3 fichas: dois outros usuários ainda passam.
+    assert [_attempt(limiter, "t", f"2.2.2.{i}", limits) for i in range(3)] == ["ok", "ok", "tenant"]
+
+
+def test_disabled_limits_and_missing_ip(store):
+    limiter = ChatRateLimiter(store, ChatLimits(0, 0, 0, 0))
+    for _ in range(10):
+        limiter.check("t", "1.1.1.1", limiter.defaults)
+    limiter = ChatRateLimiter(store, ChatLimits(60, 1, 60, 1))
+    assert _attempt(limiter, "t", None, limiter.defaults) == "ok"
+    assert _attempt(limiter, "t", None, limiter.defaults) == "tenant"
+
+
+def test_local_bucket_refills_over_time():
+    clock = Clock()
+    store = LocalTokenBucketStore(clock=clock)
+    assert store.take([("k", 1.0, 1)]) == (None, 0.0)
+    index, retry_after = store.take([("k", 1.0, 1)])
+    assert index == 0 and retry_after == pytest.approx(1.0)
+    clock.now = 1.0
+    assert store.take([("k", 1.0, 1)]) == (None, 0.0)
+
+
+@pytest.mark.parametrize("peer, forwarded, trust, expected", [
+    ("8.8.8.8", "1.2.3.4", False, "8.8.8.8"),  # conexão direta: o cabeçalho é ignorado
+    ("10.0.0.2", "1.2.3.4", False, "1.2.3.4"),  # proxy conhecido
+    ("10.0.0.2", "9.9.9.9, 1.2.3.4, 10.0.0.7", False, "1.2.3.4"),  # 9.9.9.9 pode ter sido forjado pelo cliente
+    ("10.0.0.2", None, False, None),  # proxy sem cabeçalho: pula o limite por IP
+    ("10.0.0.2", "10.0.0.3", False, None),
+    ("8.8.8.8", "1.2.3.4, 5.6.7.8", True, "1.2.3.4"),  # CHAT_TRUST_FORWARDED_FOR
+    ("testclient", None, False, "testclient"),
+    (None, "1.2.3.4", False, None),
+])
+def test_resolve_client_ip(peer, forwarded, trust, expected):
+    proxies = parse_networks("10.0.0.0/8, 127.0.0.1")
+    assert resolve_client_ip(peer, forwarded, proxies, trust) == expected
+
+
+def test_parse_networks():
+    assert parse_networks("") == ()
+    assert [str(network) for network in parse_networks(" 10.1.2.3/8 ,::1")] == ["10.0.0.0/8", "::1/128"]
+
+
+def test_admission_rejects_over_tenant_and_global_limits():
+    async def scenario():
+        admission = ChatAdmission(max_concurrent=2, max_per_tenant=1)
+        await admission.acquire("a")
+        with pytest.raises(RateLimitExceeded) as rejected:
+            await admission.acquire("a")
+        assert rejected.value.scope == "tenant_concurrency"
+        await admission.acquire("b")
+        with pytest.raises(RateLimitExceeded) as rejected:
+            await admission.acquire("c")
+        assert rejected.value.scope == "overload"
+        admission.release("a")
+        await admission.acquire("c")
+        return admission.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["running"] == 2 and stats["rejected"] == 2 and stats["tenants"] == 2
+
+
+def _stream_response(monkeypatch, admission):
+    from app.api import endpoints
+
+    monkeypatch.setattr(endpoints, "chat_admission", admission)
+    slot = endpoints._ChatSlot("tenant")
+
+    async def body():
+        try:
+            yield "event: token\n\n"
+        finally:
+            slot.release()
+
+    return endpoints._ChatStreamingResponse(body(), slot, media_type="text/event-stream"), slot
+
+
+@pytest.mark.parametrize("spec_version", ["2.3", "2.4"])
+def test_stream_slot_released_when_client_leaves_before_the_body(monkeypatch, spec_version):
+    async def scenario():
+        admission = ChatAdmission(max_concurrent=1)
+        await admission.acquire("tenant")
+        response, slot = _stream_response(monkeypatch, admission)
+
+        async def receive():
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            raise OSError("conexão fechada")
+
+        scope = {"type": "http", "asgi": {"spec_version": spec_version}}
+        with pytest.raises(Exception):
+            await response(scope, receive, send)
+        return admission.stats(), slot.released
+
+    stats, released = asyncio.run(scenario())
+    assert released
+    assert stats["running"] == 0 and stats["tenants"] == 0
+
+
+def test_stream_slot_released_once_after_full_body(monkeypatch):
+    async def scenario():
+        admission = ChatAdmission(max_concurrent=1)
+        await admission.acquire("tenant")
+        response, _ = _stream_response(monkeypatch, admission)
+        sent = []
+
+        async def receive():
+            await asyncio.sleep(10)
+
+        async def send(message):
+            sent.append(message)
+
+        await response({"type": "http", "asgi": {"spec_version": "2.4"}}, receive, send)
+        # Vaga livre: o próximo acquire passa na hora (liberar duas vezes daria running negativo).
+        await admission.acquire("other")
+        return admission.stats(), sent
+
+    stats, sent = asyncio.run(scenario())
+    assert sent[-1] == {"type": "http.response.body", "body": b"", "more_body": False}
+    assert stats["running"] == 1 and stats["tenants"] == 1
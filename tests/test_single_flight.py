@@ -0,0 +1,143 @@
+"""SingleFlight: execução compartilhada, repasse de erros e cancelamento."""
+import asyncio
+
+import pytest
+
+from app.core.single_flight import SingleFlight
+
+
+async def _collect(stream):
+    return [chunk async for chunk in stream]
+
+
+def test_identical_calls_share_one_execution():
+    async def scenario():
+        flights = SingleFlight()
+        runs, coalesced = [], []
+        release = asyncio.Event()
+
+        async def producer():
+            runs.append(1)
+            yield "a"
+            await release.wait()
+            yield "b"
+
+        first = asyncio.create_task(_collect(flights.subscribe("k", producer)))
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        # Chega depois do primeiro pedaço: recebe o que já foi produzido e o restante.
+        second = asyncio.create_task(_collect(flights.subscribe("k", producer, on_coalesced=lambda: coalesced.append(1))))
+        other = asyncio.create_task(_collect(flights.subscribe("other", producer)))
+        await asyncio.sleep(0.01)
+        release.set()
+        results = await asyncio.gather(first, second, other)
+        return results, runs, coalesced, flights.stats()
+
+    results, runs, coalesced, stats = asyncio.run(scenario())
+    assert results == [["a", "b"]] * 3
+    assert len(runs) == 2
+    assert coalesced == [1]
+    assert stats == {"leaders": 2, "coalesced": 1, "in_flight": 0}
+
+
+def test_producer_error_reaches_every_subscriber():
+    async def scenario():
+        flights = SingleFlight()
+        release = asyncio.Event()
+
+        async def producer():
+            yield "parcial"
+            await release.wait()
+            raise ValueError("falha da LLM")
+
+        streams = [asyncio.create_task(_collect(flights.subscribe("k", producer))) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        release.set()
+        results = await asyncio.gather(*streams, return_exceptions=True)
+        return results, flights.stats()
+
+    results, stats = asyncio.run(scenario())
+    assert all(isinstance(result, ValueError) for result in results)
+    assert stats["in_flight"] == 0
+
+
+def test_execution_cancelled_when_every_subscriber_leaves():
+    async def scenario():
+        flights = SingleFlight()
+        closed = asyncio.Event()
+
+        async def producer():
+            try:
+                yield "a"
+                await asyncio.sleep(10)
+                yield "b"
+            finally:
+                closed.set()
+
+        streams = [asyncio.create_task(_collect(flights.subscribe("k", producer))) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        for stream in streams:
+            stream.cancel()
+        await asyncio.gather(*streams, return_exceptions=True)
+        await asyncio.wait_for(closed.wait(), 1)
+
+        # A chave foi liberada: uma nova chamada inicia outra execução.
+        async def fresh():
+            yield "novo"
+
+        return await _collect(flights.subscribe("k", fresh)), flights.stats()
+
+    result, stats = asyncio.run(scenario())
+    assert result == ["novo"]
+    assert stats == {"leaders": 2, "coalesced": 1, "in_flight": 0}
+
+
+def test_one_subscriber_leaving_does_not_cancel_the_others():
+    async def scenario():
+        flights = SingleFlight()
+        release = asyncio.Event()
+
+        async def producer():
+            yield "a"
+            await release.wait()
+            yield "b"
+
+        leaving = asyncio.create_task(_collect(flights.subscribe("k", producer)))
+        staying = asyncio.create_task(_collect(flights.subscribe("k", producer)))
+        await asyncio.sleep(0.01)
+        leaving.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        with pytest.raises(asyncio.CancelledError):
+            await leaving
+        return await staying
+
+    assert asyncio.run(scenario()) == ["a", "b"]
+
+
+def test_rag_coalesce_key_includes_the_shared_collection_version():
+    from app.core.config import settings
+    from app.services.rag_service import RAGService
+
+    service = RAGService(settings)
+    service.single_flight = SingleFlight()
+
+    async def scenario():
+        release = asyncio.Event()
+
+        def producer(label):
+            async def run():
+                await release.wait()
+                yield label
+            return run
+
+        same = [service._coalesce("t", "Qual o prazo?", "Qual o prazo?", 1, producer(f"v1-{i}")) for i in range(2)]
+        newer = service._coalesce("t", "qual o prazo", "qual o prazo", 2, producer("v2"))
+        streams = [asyncio.create_task(_collect(stream)) for stream in [*same, newer]]
+        await asyncio.sleep(0.01)
+        release.set()
+        return await asyncio.gather(*streams)
+
+    # Mesma versão (e pergunta normalizada): uma geração; versão nova (após ingestão): outra.
+    assert asyncio.run(scenario()) == [["v1-0"], ["v1-0"], ["v2"]]
+    assert service.single_flight.stats()["leaders"] == 2
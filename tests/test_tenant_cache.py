@@ -0,0 +1,83 @@
+"""Cache da validação de client_token: camadas local/Redis e invalidação após o commit."""
+import time
+
+import pytest
+
+from app.core.models import Client
+from app.services.tenant_cache import TenantTokenCache, tenant_token_cache
+
+
+class Loader:
+    """Simula a consulta ao banco contando as chamadas."""
+    def __init__(self, active_tokens):
+        self.active_tokens = set(active_tokens)
+        self.calls = 0
+
+    def __call__(self, client_token):
+        self.calls += 1
+        return client_token in self.active_tokens
+
+
+def test_local_layer_caches_valid_and_invalid_tokens():
+    cache = TenantTokenCache(ttl_seconds=60, negative_ttl_seconds=0.05)
+    loader = Loader({"ok"})
+    assert [cache.validate("ok", loader) for _ in range(3)] == [True] * 3
+    assert [cache.validate("bad", loader) for _ in range(3)] == [False] * 3
+    assert loader.calls == 2
+    assert cache.get_local("ok") is True and cache.get_local("nunca-visto") is None
+
+    # O negativo expira antes: um cliente recém-criado não espera o TTL longo.
+    time.sleep(0.06)
+    loader.active_tokens.add("bad")
+    assert cache.validate("bad", loader) is True
+    assert cache.stats()["db_lookups"] == 3
+
+
+def test_redis_layer_is_shared_and_invalidation_reaches_other_processes():
+    fakeredis = pytest.importorskip("fakeredis")
+    server = fakeredis.FakeRedis()
+    api_a, api_b = TenantTokenCache(redis_client=server), TenantTokenCache(redis_client=server)
+    loader = Loader({"ok"})
+
+    assert api_a.validate("ok", loader) and api_b.validate("ok", loader)
+    assert loader.calls == 1  # o segundo processo achou o token no Redis
+    assert api_b.get_local("ok") is True
+
+    api_a.invalidate("ok")
+    deadline = time.monotonic() + 3
+    while api_b.get_local("ok") is not None and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert api_b.get_local("ok") is None
+    loader.active_tokens.clear()
+    assert api_b.validate("ok", loader) is False
+
+
+def test_client_changes_invalidate_after_commit(session_factory):
+    # O cache do processo (TENANT_CACHE_BACKEND=local) já observa as Sessions desde o import.
+    cache = tenant_token_cache
+    cache.clear()
+    db = session_factory()
+    client = Client(name="Loja", email="loja@example.com", hashed_password="x", client_token="tok")
+    db.add(client)
+    db.commit()
+
+    def loader(client_token):
+        return bool(db.query(Client).filter_by(client_token=client_token, is_active=True).count())
+
+    assert cache.validate("tok", loader) is True
+
+    client.is_active = False
+    db.flush()
+    assert cache.get_local("tok") is True  # ainda não comitado
+    db.commit()
+    assert cache.get_local("tok") is None
+    assert cache.validate("tok", loader) is False
+
+    # Troca de token: o antigo sai do cache.
+    client.is_active = True
+    db.commit()
+    assert cache.validate("tok", loader) is True
+    client.client_token = "tok-2"
+    db.commit()
+    assert cache.validate("tok", loader) is False
+    db.close()
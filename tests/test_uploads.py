@@ -0,0 +1,186 @@
+"""Gravação dos uploads: validação antes de gravar, limite durante a escrita e zips problemáticos."""
+import asyncio
+import io
+import os
+import zipfile
+
+import pytest
+from starlette.datastructures import UploadFile
+
+from app.services import uploads
+from app.services.uploads import UploadRejected, store_zip_upload, stream_pdf_to_disk
+
+PDF = b"%PDF-1.4\n" + b"conteudo " * 200
+
+
+def _reader(data: bytes):
+    stream = io.BytesIO(data)
+
+    async def read(n):
+        return stream.read(n)
+    return read
+
+
+def _store(tmp_path, data, max_bytes=10_000, size_hint=None):
+    path = str(tmp_path / "doc.pdf")
+    return path, asyncio.run(stream_pdf_to_disk(_reader(data), "doc.pdf", path, max_bytes, size_hint=size_hint))
+
+
+def test_pdf_is_written_with_its_hash(tmp_path):
+    import hashlib
+
+    path, stored = _store(tmp_path, PDF)
+    assert open(path, "rb").read() == PDF
+    assert stored.size == len(PDF) and stored.content_hash == hashlib.sha256(PDF).hexdigest()
+
+
+def test_bytes_before_the_pdf_header_are_accepted(tmp_path):
+    _, stored = _store(tmp_path, b"\x00" * 100 + PDF)
+    assert stored.size == 100 + len(PDF)
+
+
+@pytest.mark.parametrize("data, size_hint, status", [
+    (b"MZ\x90\x00 executavel" * 10, None, 415),
+    (b"\x00" * 2000 + PDF, None, 415),  # cabeçalho fora da janela de 1 KB
+    (PDF, 20_000, 413),  # tamanho declarado já passa do limite
+    (PDF * 10, None, 413),  # passa do limite durante a escrita
+])
+def test_rejected_uploads_leave_nothing_on_disk(tmp_path, data, size_hint, status):
+    with pytest.raises(UploadRejected) as rejected:
+        _store(tmp_path, data, size_hint=size_hint)
+    assert rejected.value.status_code == status
+    assert os.listdir(tmp_path) == []
+
+
+def _zip(members, compression=zipfile.ZIP_STORED):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression) as archive:
+        for name, data in members:
+            archive.writestr(name, data)
+    return bytearray(buffer.getvalue())
+
+
+def _patch_member(data: bytearray, index: int, flag_bits=None, compress_type=None) -> bytearray:
+    """Altera os cabeçalhos (local e central) do membro `index`: zipfile não grava zips criptografados."""
+    for signature, flags_at, method_at in ((b"PK\x03\x04", 6, 8), (b"PK\x01\x02", 8, 10)):
+        offset = -1
+        for _ in range(index + 1):
+            offset = data.index(signature, offset + 1)
+        if flag_bits is not None:
+            data[offset + flags_at:offset + flags_at + 2] = flag_bits.to_bytes(2, "little")
+        if compress_type is not None:
+            data[offset + method_at:offset + method_at + 2] = compress_type.to_bytes(2, "little")
+    return data
+
+
+def _store_zip(tmp_path, data, max_files=10):
+    file = UploadFile(io.BytesIO(bytes(data)), filename="lote.zip")
+    return asyncio.run(store_zip_upload(file, "tenant", str(tmp_path), 10_000, max_files))
+
+
+def test_zip_members_are_extracted_and_invalid_ones_rejected(tmp_path):
+    data = _zip([("a.pdf", PDF), ("falso.pdf", b"nada"), ("pasta/b.pdf", PDF + b"b"), ("leia.txt", b"oi"), ("c.pdf", PDF + b"c")])
+    stored, rejected = _store_zip(tmp_path, data, max_files=2)
+    assert [s.filename for s in stored] == ["a.pdf", "pasta/b.pdf"]
+    assert {e.filename: e.status_code for e in rejected} == {"leia.txt": 400, "falso.pdf": 415, "c.pdf": 413}
+    # Diretórios do zip não viram caminhos no disco.
+    assert sorted(os.path.dirname(s.file_path) for s in stored) == [str(tmp_path)] * 2
+
+
+@pytest.mark.parametrize("damage, reason", [
+    (lambda data: _patch_member(data, 1, flag_bits=0x1), "senha"),
+    (lambda data: _patch_member(data, 1, compress_type=99), "compressão"),
+])
+def test_encrypted_or_unsupported_members_are_rejected(tmp_path, damage, reason):
+    data = damage(_zip([("a.pdf", PDF), ("b.pdf", PDF + b"b"), ("c.pdf", PDF + b"c")]))
+    stored, rejected = _store_zip(tmp_path, data)
+    assert [s.filename for s in stored] == ["a.pdf", "c.pdf"]
+    assert [e.filename for e in rejected] == ["b.pdf"] and reason in rejected[0].reason
+
+
+def test_corrupted_deflate_member_is_rejected(tmp_path):
+    data = _zip([("a.pdf", PDF), ("b.pdf", PDF + b"b")], zipfile.ZIP_DEFLATED)
+    start = data.index(b"PK\x03\x04", 1) + 30 + len("b.pdf")
+    data[start:start + 20] = b"\xff" * 20
+    stored, rejected = _store_zip(tmp_path, data)
+    assert [s.filename for s in stored] == ["a.pdf"]
+    assert [e.filename for e in rejected] == ["b.pdf"]
+    assert sorted(os.listdir(tmp_path)) == [os.path.basename(stored[0].file_path)]
+
+
+def test_unexpected_failure_removes_the_extracted_pdfs(tmp_path, monkeypatch):
+    calls = []
+    original = uploads.stream_pdf_to_disk
+
+    async def failing(read, filename, file_path, max_bytes, size_hint=None):
+        calls.append(filename)
+        if len(calls) == 2:
+            raise OSError("disco cheio")
+        return await original(read, filename, file_path, max_bytes, size_hint)
+
+    monkeypatch.setattr(uploads, "stream_pdf_to_disk", failing)
+    with pytest.raises(OSError):
+        _store_zip(tmp_path, _zip([("a.pdf", PDF), ("b.pdf", PDF + b"b")]))
+    assert calls == ["a.pdf", "b.pdf"]
+    assert os.listdir(tmp_path) == []
+
+
+def test_invalid_zip_is_rejected(tmp_path):
+    with pytest.raises(UploadRejected) as rejected:
+        _store_zip(tmp_path, b"PK\x03\x04" + b"lixo" * 50)
+    assert rejected.value.status_code == 415
+
+
+@pytest.fixture
+def api(session_factory, tmp_path, monkeypatch):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from app.api import endpoints
+    from app.core.db import get_db
+
+    monkeypatch.setattr(endpoints.settings, "UPLOAD_FOLDER", str(tmp_path))
+    enqueued = []
+    monkeypatch.setattr(endpoints, "enqueue_ingestions", lambda tenant, documents: enqueued.append(documents))
+    app = FastAPI()
+    app.include_router(endpoints.router, prefix="/api/v1")
+
+    def override_get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[endpoints.get_current_client_token] = lambda: "tenant"
+    with TestClient(app) as client:
+        client.enqueued = enqueued
+        yield client
+
+
+def _bulk(api, *files):
+    return api.post("/api/v1/documents/upload/bulk", files=[("files", file) for file in files])
+
+
+def test_bulk_upload_registers_new_pdfs_once(api, tmp_path):
+    response = _bulk(api, ("a.pdf", PDF), ("lote.zip", bytes(_zip([("b.pdf", PDF + b"b"), ("a-copia.pdf", PDF)]))), ("x.txt", b"oi"))
+    assert response.status_code == 202
+    body = response.json()
+    assert [(item["filename"], item["duplicate"]) for item in body["accepted"]] == [
+        ("a.pdf", False), ("b.pdf", False), ("a-copia.pdf", True),
+    ]
+    assert [item["filename"] for item in body["rejected"]] == ["x.txt"]
+    assert len(api.enqueued[0]) == 2 and len(os.listdir(tmp_path)) == 2
+
+
+def test_bulk_upload_removes_the_files_if_registration_fails(api, tmp_path, monkeypatch):
+    from sqlalchemy.orm import Session
+
+    def broken_query(self, *args, **kwargs):
+        raise RuntimeError("banco fora")
+
+    monkeypatch.setattr(Session, "query", broken_query)
+    with pytest.raises(RuntimeError):
+        _bulk(api, ("a.pdf", PDF), ("b.pdf", PDF + b"b"))
+    assert os.listdir(tmp_path) == []